@@ -2,6 +2,7 @@ from tkinter import Tk
 from tkinter import Label, Frame
 from tkinter import Variable
 from time import sleep
+import queue
 import threading
 from PIL import ImageTk, Image
 import os
@@ -11,16 +12,19 @@ import select
 import sys
 
 HEADER_LENGTH = 10
+DISPLAY_HOST = 'localhost'
+DISPLAY_PORT = 285
+LISTEN_TIMEOUT = 0.5  # seconds select() waits before checking the client list again
+RECV_SIZE = 4096
+UPDATE_INTERVAL_MS = 50  # how often the Tk thread applies the received LED updates
 
 
 class DisplayPanel:
-    server = socket(AF_INET, SOCK_STREAM)
-    ip = 'localhost'
-    server.bind((ip, 285))
-    server.listen(5)
-    sockets_list = [server]
-
-    def __init__(self, title):
+    def __init__(self, title, ip=DISPLAY_HOST, port=DISPLAY_PORT):
+        self.ip = ip
+        self.port = port
+        self.server = None
+        self.sockets_list = []
         self.top = None
         self.listener_thread = None
         self.title = title
@@ -30,6 +34,8 @@ class DisplayPanel:
         self.path_off = None
         self.path_on = None
         self.leds = {}
+        self.buffers = {}
+        self.updates = queue.Queue()
 
     def configure_display(self):
         self.top = Tk()
@@ -41,61 +47,148 @@ class DisplayPanel:
         self.img_off = ImageTk.PhotoImage(Image.open(self.path_off))
         self.img_on = ImageTk.PhotoImage(Image.open(self.path_on))
 
-    def receive_message(self, client_socket):
-        try:
-            message_header = client_socket.recv(HEADER_LENGTH)
-            if not len(message_header):
-                return False
-            message_length = int(message_header.decode('utf-8').strip())
-            return {'header': message_header, 'data': client_socket.recv(message_length)}
-        except:
-            return False
+    def extract_messages(self, buffer):
+        """
+        Remove the complete framed messages from the receive buffer of a client.
+        :param buffer: bytearray of data received so far from one client
+        :return: list of message payloads
+        """
+        messages = []
+        while len(buffer) >= HEADER_LENGTH:
+            try:
+                message_length = int(buffer[:HEADER_LENGTH].decode('utf-8').strip())
+            except ValueError:
+                # Lost framing with this client, drop what has been received
+                del buffer[:]
+                break
+            if len(buffer) < HEADER_LENGTH + message_length:
+                break
+            messages.append(bytes(buffer[HEADER_LENGTH:HEADER_LENGTH + message_length]))
+            del buffer[:HEADER_LENGTH + message_length]
+        return messages
 
     def listener(self):
-        client, addr = self.server.accept()
+        """
+        Serve any number of simulations with select().  Received commands are queued for the Tk thread.
+        """
         while True:
-            message = self.receive_message(client)
-            if message is False:
-                continue
-            if self.process_message(message['data']) is False:
-                continue
+            readable, _, errored = select.select(self.sockets_list, [], self.sockets_list, LISTEN_TIMEOUT)
+            for sock in readable:
+                if sock is self.server:
+                    client, addr = self.server.accept()
+                    self.sockets_list.append(client)
+                    self.buffers[client] = bytearray()
+                    continue
+                try:
+                    data = sock.recv(RECV_SIZE)
+                except OSError:
+                    data = b""
+                if not data:
+                    self.close_client(sock)
+                    continue
+                buffer = self.buffers[sock]
+                buffer.extend(data)
+                commands = []
+                for message in self.extract_messages(buffer):
+                    commands.extend(line.split() for line in message.splitlines() if line.strip())
+                quit_requested = any(command[0] == b"QUIT" for command in commands)
+                commands = [command for command in commands if command[0] != b"QUIT"]
+                if commands:
+                    self.updates.put(commands)
+                if quit_requested:
+                    # QUIT ends the connection of this simulation only, the panel keeps serving the others
+                    self.close_client(sock)
+            for sock in errored:
+                if sock is not self.server:
+                    self.close_client(sock)
+
+    def close_client(self, sock):
+        if sock in self.sockets_list:
+            self.sockets_list.remove(sock)
+        self.buffers.pop(sock, None)
+        sock.close()
+
+    def new_led(self, name):
+        if name in self.leds:
+            # announced again by a simulation that reconnected
+            return
+        frame = Frame(self.top)
+        frame.pack(side="left")
+        label = Label(frame, text=name)
+        label.pack(side="top", fill="both", expand="yes")
+        panel = Label(frame, image=self.img_off)
+        panel.pack(side="bottom", fill="both", expand="yes")
+        inst = (frame, panel, name)
+        self.leds[name] = inst
 
-    def process_message(self, message):
+    def set_led(self, name, state):
+        if name not in self.leds:
+            return
+        f, p, n = self.leds[name]
+        image = self.img_on if state else self.img_off
+        p.configure(image=image)
+        p.image = image
+
+    def process_message(self, command, states):
+        """
+        Apply one command, recording LED states in states so that only the last one is drawn
+        :param command: list of command words
+        :param states: dict of LED name to the latest state received in this batch
+        :return: False if the command is not understood
+        """
         ret = True
         try:
-            command = message.split()
             if command[0] == b"NEW_LED":
-                frame = Frame(self.top)
-                frame.pack(side="left")
-                label = Label(frame, text=command[1])
-                label.pack(side="top", fill="both", expand="yes")
-                panel = Label(frame, image=self.img_off)
-                panel.pack(side="bottom", fill="both", expand="yes")
-                inst = (frame, panel, command[1])
-                self.leds[command[1]] = inst
-            elif command[0] == b"QUIT":
-                self.top.destroy()
-                sys.exit(0)
+                self.new_led(command[1])
             elif command[0] == b"LED_ON":
-                f, p, n = self.leds[command[1]]
-                p.configure(image=self.img_on)
-                p.image = self.img_on
+                states[command[1]] = True
             elif command[0] == b"LED_OFF":
-                f, p, n = self.leds[command[1]]
-                p.configure(image=self.img_off)
-                p.image = self.img_off
+                states[command[1]] = False
+            elif command[0] == b"LEDS":
+                for item in command[1:]:
+                    name, _, state = item.rpartition(b":")
+                    states[name] = state == b"1"
             else:
                 ret = False
-        except:
+        except IndexError:
             ret = False
         return ret
 
+    def apply_updates(self):
+        """
+        Runs on the Tk thread.  Drain all queued commands and redraw each changed LED once.
+        """
+        states = {}
+        while True:
+            try:
+                commands = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            for command in commands:
+                self.process_message(command, states)
+        for name, state in states.items():
+            self.set_led(name, state)
+        self.top.after(UPDATE_INTERVAL_MS, self.apply_updates)
+
+    def open_server(self):
+        """
+        Bind and listen for simulations.  Done when the listener is created rather than at import time.
+        """
+        if self.server is None:
+            self.server = socket(AF_INET, SOCK_STREAM)
+            self.server.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+            self.server.bind((self.ip, self.port))
+            self.server.listen(5)
+            self.sockets_list = [self.server]
+
     def create_listener(self):
+        self.open_server()
         self.listener_thread = threading.Thread(target=self.listener, args=[])
-        self.listener_thread.setDaemon(True)
+        self.listener_thread.daemon = True
         self.listener_thread.start()
 
     def start_display(self):
+        self.top.after(UPDATE_INTERVAL_MS, self.apply_updates)
         self.top.mainloop()
 
 
@@ -9,7 +9,7 @@ from subprocess import Popen, PIPE
 
 import telnetlib
 from time import sleep
-from hdl.hosts.jtaghost.JTAG_Ctrl_Master import SHIFT_DR, SHIFT_IR, RUN_TEST_IDLE
+from hdl.hosts.jtaghost.JTAG_Ctrl_Master import SHIFT_DR, SHIFT_IR, RUN_TEST_IDLE, TEST_LOGIC_RESET, PAUSE_DR, PAUSE_IR
 from hdl.hosts.jtaghost.tapsim import *
 
 
@@ -157,6 +157,27 @@ class ATE:
     def get_last_response(self):
         return self.resp
 
+    def bitbang(self, dev_address, segments):
+        """
+        Run a compiled bit-bang program of the JeffBBEx device in the server with one round trip.
+        :param dev_address: I2C address of the device
+        :param segments: format_program() of the BitBangProgram (hdl.devices.JeffBBEx.bitbang)
+        :return: int of the SO bits of the shift clocks, first shifted out in bit 0
+        """
+        self.tn_inst.write("BITBANG 0x{:X} {:s}\n".format(dev_address, " ".join(segments)))
+        self.resp = self.tn_inst.read_until("OK\r\n")
+        try:
+            return int(self.resp.split()[0], 16)
+        except (ValueError, IndexError):
+            raise AcknowledgeError("BITBANG failed: " + self.resp)
+
+    def jtag_scheduler(self):
+        """
+        :return: JTAGScheduler running scans on both JTAG ports of the simulation at the same time
+        """
+        from drivers.Python.atesim.scheduler import JTAGScheduler
+        return JTAGScheduler(self)
+
 
 class AcknowledgeError(Exception):
     def __init__(self, message):
@@ -182,6 +203,12 @@ class GPIOController:
 
 @traced
 class JTAGController:
+    # SVF stable state names
+    STATES = {"RESET": TEST_LOGIC_RESET, "IDLE": RUN_TEST_IDLE, "DRPAUSE": PAUSE_DR,
+              "IRPAUSE": PAUSE_IR, "DRSHIFT": SHIFT_DR, "IRSHIFT": SHIFT_IR}
+    # Size of the vector buffer of the host in bits
+    MAX_SCAN_BITS = 0x400 * 8
+
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
 
@@ -268,27 +295,29 @@ class JTAGController:
             tdo_vector[num_full_words] = int(data)
         return tdo_vector
 
-    def ba_scan_ir(self, tdi_vector, count):
+    def ba_scan_ir(self, tdi_vector, count, end=None):
         """
         Scan the vector to the TAP with the IR data and capture the response in tdo_vector
         :param tdi_vector: Data to be shifted out as bytearray
         :param count: number of bits to shift
+        :param end: State to end the scan in, Run-Test/Idle by default
         :return: tdo_vector: Data to be captured as bytearray
         """
         start = SHIFT_IR
-        end = RUN_TEST_IDLE
+        end = RUN_TEST_IDLE if end is None else end
         return self.__scan_vector(tdi_vector, count, start, end)
 
-    def ba_scan_dr(self, tdi_vector, count):
+    def ba_scan_dr(self, tdi_vector, count, end=None):
         """
         Scan the vector to the TAP with the DR data and capture the response in tdo_vector
         :param ate_inst:
         :param tdi_vector: Data to be shifted out as bytearray
         :param count: number of bits to shift
+        :param end: State to end the scan in, Run-Test/Idle by default
         :return: tdo_vector: Data to be captured as bytearray
         """
         start = SHIFT_DR
-        end = RUN_TEST_IDLE
+        end = RUN_TEST_IDLE if end is None else end
         return self.__scan_vector(tdi_vector, count, start, end)
 
     def scan_ir(self, count, tdi_string):
@@ -345,9 +374,15 @@ class JTAGController:
             # print("tdo_string = ", tdo_string)
         return tdo_string
 
-    def runtest(self, ticks):
-        start = RUN_TEST_IDLE
-        end = RUN_TEST_IDLE
+    def runtest(self, ticks, state=None, end=None):
+        """
+        Clock the TAP in a stable state
+        :param ticks: number of TCK cycles
+        :param state: State to clock the TAP in, Run-Test/Idle by default
+        :param end: State to end in, the state clocked in by default
+        """
+        start = RUN_TEST_IDLE if state is None else state
+        end = start if end is None else end
         blocks = ticks // 1024
         rem = ticks % 1024
         for i in range(blocks):
@@ -370,6 +405,12 @@ class JTAGController:
 
 
 class JTAGController2:
+    # SVF stable state names
+    STATES = {"RESET": SI_TEST_LOGIC_RESET, "IDLE": SI_RUN_TEST_IDLE, "DRPAUSE": SI_PAUSE_DR,
+              "IRPAUSE": SI_PAUSE_IR, "DRSHIFT": SI_SHIFT_DR, "IRSHIFT": SI_SHIFT_IR}
+    # Size of the vector buffer of the host in bits
+    MAX_SCAN_BITS = 0x400 * 8
+
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
 
@@ -461,27 +502,29 @@ class JTAGController2:
             tdo_vector[num_full_words] = int(data)
         return tdo_vector
 
-    def ba_scan_ir(self, tdi_vector, count):
+    def ba_scan_ir(self, tdi_vector, count, end=None):
         """
         Scan the vector to the TAP with the IR data and capture the response in tdo_vector
         :param tdi_vector: Data to be shifted out as bytearray
         :param count: number of bits to shift
+        :param end: State to end the scan in, Run-Test/Idle by default
         :return: tdo_vector: Data to be captured as bytearray
         """
         start = SI_SHIFT_IR
-        end = SI_RUN_TEST_IDLE
+        end = SI_RUN_TEST_IDLE if end is None else end
         return self.__scan_vector(tdi_vector, count, start, end)
 
-    def ba_scan_dr(self, tdi_vector, count):
+    def ba_scan_dr(self, tdi_vector, count, end=None):
         """
         Scan the vector to the TAP with the DR data and capture the response in tdo_vector
         :param ate_inst:
         :param tdi_vector: Data to be shifted out as bytearray
         :param count: number of bits to shift
+        :param end: State to end the scan in, Run-Test/Idle by default
         :return: tdo_vector: Data to be captured as bytearray
         """
         start = SI_SHIFT_DR
-        end = SI_RUN_TEST_IDLE
+        end = SI_RUN_TEST_IDLE if end is None else end
         return self.__scan_vector(tdi_vector, count, start, end)
 
     def scan_ir(self, count, tdi_string):
@@ -538,9 +581,15 @@ class JTAGController2:
             # print("tdo_string = ", tdo_string)
         return tdo_string
 
-    def runtest(self, ticks):
-        start = SI_RUN_TEST_IDLE
-        end = SI_RUN_TEST_IDLE
+    def runtest(self, ticks, state=None, end=None):
+        """
+        Clock the TAP in a stable state
+        :param ticks: number of TCK cycles
+        :param state: State to clock the TAP in, Run-Test/Idle by default
+        :param end: State to end in, the state clocked in by default
+        """
+        start = SI_RUN_TEST_IDLE if state is None else state
+        end = start if end is None else end
         blocks = ticks // 1024
         rem = ticks % 1024
         for i in range(blocks):
@@ -859,6 +908,55 @@ class I2CController:
         print("I2C Read: At [{0:x}] = {0:x}".format(reg_address, retval))
         return retval
 
+    def __wait_ready(self, message):
+        status = self.__read_status_register()
+        while status & 0x01:  # busy set
+            status = self.__read_status_register()
+        # check for ack error
+        if status & 0x02:
+            raise AcknowledgeError(message)
+
+    def i2c_stream_write(self, dev_address, reg_address, data):
+        """
+        Write all bytes of data in one I2C transaction starting at reg_address.  The device decides whether
+        the bytes go to consecutive registers (autoincrement) or all to the same one.
+        :param dev_address: 7 bit I2C device address
+        :param reg_address: First register written
+        :param data: bytes or bytearray to write
+        """
+        self.__write_transmit_register((dev_address << 1) & 0xFE)
+        self.__write_control_register(0x0B)  # START & WRITE & EXECUTE
+        self.__wait_ready("Acknowledge error detected during device address transmission.")
+        self.__write_transmit_register(reg_address)
+        self.__write_control_register(0x03 if len(data) else 0x13)  # WRITE & EXECUTE
+        self.__wait_ready("Acknowledge error detected during register address transmission.")
+        for i, value in enumerate(data):
+            self.__write_transmit_register(value & 0xFF)
+            self.__write_control_register(0x13 if i == len(data) - 1 else 0x03)  # WRITE & EXECUTE (& STOP)
+            self.__wait_ready("Acknowledge error detected during data transmission {:d}.".format(i + 1))
+        return True
+
+    def i2c_stream_read(self, dev_address, reg_address, count):
+        """
+        Read count bytes in one I2C transaction starting at reg_address.
+        :return: list of the bytes read
+        """
+        self.__write_transmit_register((dev_address << 1) & 0xFE)
+        self.__write_control_register(0x0B)  # START & WRITE & EXECUTE
+        self.__wait_ready("Acknowledge error detected during device address transmission.")
+        self.__write_transmit_register(reg_address)
+        self.__write_control_register(0x03)  # WRITE & EXECUTE
+        self.__wait_ready("Acknowledge error detected during register address transmission.")
+        self.__write_transmit_register((dev_address << 1) | 1)
+        self.__write_control_register(0x0B)  # START & WRITE & EXECUTE
+        self.__wait_ready("Acknowledge error detected during device address transmission for read.")
+        values = []
+        for i in range(count):
+            self.__write_control_register(0x15 if i == count - 1 else 0x01)  # EXECUTE (& MASTER_ACK & STOP)
+            self.__wait_ready("Acknowledge error detected during data transmission {:d}.".format(i + 1))
+            values.append(self.__read_receive_register())
+        return values
+
 
 class SPIController:
     def __init__(self, ate_inst):
@@ -0,0 +1,349 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Scheduler keeping both JTAG hosts of the ioslave (JTAG at 0x1000 and JTAG2
+at 0x3000) scanning at the same time.
+
+The Wishbone bus carries one transaction at a time, but once a host is
+started it shifts on its own.  JTAGController and JTAGController2 wait for
+the end of a scan by polling the status register, so the bus does nothing
+useful while a scan runs.  The scheduler splits every scan into its bus
+transactions (buffer load, start, status poll, buffer read) and runs them
+from one thread, giving the bus to a buffer load or read of the other port
+before it spends a transaction on a status poll.  Scans are queued per port
+and submitting one returns a concurrent.futures.Future.
+
+The scheduler works with any ATE object with the write(), read() and
+get_value() methods: the telnet driver ATE or hdl.ate.ate.ATE in process.
+
+Example:
+    scheduler = JTAGScheduler(ate_inst)
+    f1 = scheduler.scan_dr("JTAG", 32, "00000000")
+    f2 = scheduler.scan_dr("JTAG2", 32, "FFFFFFFF")
+    print(f1.result(), f2.result())
+    scheduler.close()
+
+Usage: python -m drivers.Python.atesim.scheduler [<board>] [<scans>] [<ip>:<port>]
+Runs the same scans on both ports one after the other with JTAGController
+and JTAGController2, then through the scheduler, and prints both times.
+The board defaults to DualJTAGTest, simulated in process unless an ATE
+server is given.
+"""
+import sys
+import threading
+import time
+import random
+from concurrent.futures import Future
+from collections import deque
+from drivers.Python.atesim.atesim import ATE, AcknowledgeError, JTAGController, JTAGController2
+from hdl.hosts.jtaghost.tapsim import SCAN
+
+# bus operations yielded by a scan job
+OP_WRITE, OP_READ, OP_POLL = range(3)
+
+
+class JTAGPort:
+    """
+    Register map of one JTAG host of the ioslave.
+    """
+    def __init__(self, name, base, controller, command=None):
+        """
+        :param name: Port name used to submit scans
+        :param base: Wishbone address of the vector buffer
+        :param controller: Controller class of the port, for the state encoding
+        :param command: Value written to the command register before a scan, None if there is none
+        """
+        self.name = name
+        self.base = base
+        self.states = controller.STATES
+        self.shift_states = (controller.STATES["IRSHIFT"], controller.STATES["DRSHIFT"])
+        self.max_scan_bits = controller.MAX_SCAN_BITS
+        self.command = command
+
+
+PORTS = {
+    "JTAG": JTAGPort("JTAG", 0x00001000, JTAGController),
+    "JTAG2": JTAGPort("JTAG2", 0x00003000, JTAGController2, SCAN),
+}
+
+
+def scan_job(port, tdi_vector, count, start, end):
+    """
+    Bus transactions of one scan, as done by JTAGController.__scan_vector().
+    The generator yields (operation, address, data) and is sent the value of every read.
+    :return: tdo_vector as a bytearray (value of the StopIteration)
+    """
+    size = (count + 7) // 8
+    for addr in range(size):
+        yield OP_WRITE, port.base + addr, tdi_vector[addr] & 0xFF
+    yield OP_WRITE, port.base + 0x402, count & 0xFFFF
+    yield OP_WRITE, port.base + 0x400, start & 0xF
+    yield OP_WRITE, port.base + 0x401, end & 0xF
+    if port.command is not None:
+        yield OP_WRITE, port.base + 0x405, port.command & 0xF
+    yield OP_WRITE, port.base + 0x403, 0x1
+    while (yield OP_POLL, port.base + 0x404, 0) != 0:
+        pass
+    yield OP_WRITE, port.base + 0x403, 0x0
+    tdo_vector = bytearray(size)
+    for addr in range(size):
+        tdo_vector[addr] = (yield OP_READ, port.base + addr, 0) & 0xFF
+    return tdo_vector
+
+
+class ScanRequest:
+    __slots__ = ("port", "job", "future", "pending", "convert")
+
+    def __init__(self, port, job, future, convert):
+        self.port = port
+        self.job = job
+        self.future = future
+        self.pending = None
+        self.convert = convert
+
+
+def to_bytes(count, tdi_string):
+    """
+    :return: bytearray of a hex TDI string, first byte shifted first, as JTAGController.scan_dr() does
+    """
+    if len(tdi_string) % 2:
+        tdi_string = '0' + tdi_string
+    tdi_vector = bytearray.fromhex(tdi_string)
+    tdi_vector.reverse()
+    size = (count + 7) // 8
+    return tdi_vector[:size] + bytearray(max(0, size - len(tdi_vector)))
+
+
+def to_string(count, tdo_vector):
+    """
+    :return: hex string of a captured bytearray, as JTAGController.scan_dr() returns it
+    """
+    tdo_vector = bytearray(tdo_vector)
+    tdo_vector.reverse()
+    tdo_string = tdo_vector.hex().upper()
+    if len(tdo_string) * 4 > count:
+        tdo_string = tdo_string[1:]
+    return tdo_string
+
+
+class JTAGScheduler:
+    def __init__(self, ate_inst, ports=None):
+        """
+        :param ate_inst: ATE with write(addr, data), read(addr) and get_value()
+        :param ports: dict name -> JTAGPort, both hosts of the ioslave by default
+        """
+        self.ate_inst = ate_inst
+        self.ports = dict(PORTS) if ports is None else ports
+        self.queues = {name: deque() for name in self.ports}
+        self.condition = threading.Condition()
+        self.closing = False
+        self.transactions = 0
+        self.polls = 0
+        self.thread = threading.Thread(target=self.__worker, daemon=True)
+        self.thread.start()
+
+    def submit(self, port, tdi_vector, count, start, end, convert=None):
+        """
+        Queue a scan.
+        :param port: Port name ("JTAG" or "JTAG2")
+        :param tdi_vector: bytearray shifted in, first byte first
+        :param count: Number of bits
+        :param start: Shift state of the port (STATES["IRSHIFT"] or STATES["DRSHIFT"])
+        :param end: State the TAP ends in
+        :param convert: Optional function applied to the captured bytearray before it is the Future result
+        :return: Future of the captured bytearray
+        """
+        spec = self.__port(port)
+        if count > spec.max_scan_bits:
+            raise ValueError("{:s}: {:d} bits do not fit the {:d} bit buffer.".format(port, count, spec.max_scan_bits))
+        if len(tdi_vector) < (count + 7) // 8:
+            raise ValueError("{:s}: {:d} bytes of TDI are too few for {:d} bits.".format(port, len(tdi_vector), count))
+        future = Future()
+        future.set_running_or_notify_cancel()
+        request = ScanRequest(port, scan_job(spec, tdi_vector, count, start, end), future, convert)
+        with self.condition:
+            if self.closing:
+                raise RuntimeError("The scheduler is closed.")
+            self.queues[port].append(request)
+            self.condition.notify()
+        return future
+
+    def __port(self, port):
+        if port not in self.ports:
+            raise ValueError("Unknown JTAG port {!s}.".format(port))
+        return self.ports[port]
+
+    def ba_scan_ir(self, port, tdi_vector, count, end=None):
+        states = self.__port(port).states
+        return self.submit(port, tdi_vector, count, states["IRSHIFT"], states["IDLE"] if end is None else end)
+
+    def ba_scan_dr(self, port, tdi_vector, count, end=None):
+        states = self.__port(port).states
+        return self.submit(port, tdi_vector, count, states["DRSHIFT"], states["IDLE"] if end is None else end)
+
+    def scan_ir(self, port, count, tdi_string):
+        """
+        :return: Future of the captured hex string, the same string JTAGController.scan_ir() returns
+        """
+        states = self.__port(port).states
+        return self.submit(port, to_bytes(count, tdi_string), count, states["IRSHIFT"], states["IDLE"],
+                           lambda tdo: to_string(count, tdo))
+
+    def scan_dr(self, port, count, tdi_string):
+        """
+        :return: Future of the captured hex string, the same string JTAGController.scan_dr() returns
+        """
+        states = self.__port(port).states
+        return self.submit(port, to_bytes(count, tdi_string), count, states["DRSHIFT"], states["IDLE"],
+                           lambda tdo: to_string(count, tdo))
+
+    def controller(self, port):
+        """
+        :return: object with the scan_ir/scan_dr methods of JTAGController for one port, blocking on the
+                 result, so sequential code (e.g. the Retargeter) can run on a port next to other work
+        """
+        return PortController(self, port)
+
+    def close(self):
+        """
+        Finish the queued scans and stop the scheduler thread.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+
+    def __next_operation(self, active):
+        """
+        Pick the request to advance: a load or read first, a status poll only when no port has anything else.
+        """
+        for request in active:
+            if request.pending[0] != OP_POLL:
+                return request
+        return active[0]
+
+    def __bus(self, operation, address, data):
+        self.transactions += 1
+        if operation == OP_WRITE:
+            if not self.ate_inst.write(address, data):
+                raise AcknowledgeError("Write Error at 0x{:X}".format(address))
+            return None
+        if operation == OP_POLL:
+            self.polls += 1
+        if not self.ate_inst.read(address):
+            raise AcknowledgeError("Read Error at 0x{:X}".format(address))
+        return self.ate_inst.get_value()
+
+    @staticmethod
+    def __finish(request, result):
+        try:
+            request.future.set_result(result if request.convert is None else request.convert(result))
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def __worker(self):
+        active = []
+        while True:
+            with self.condition:
+                for name, queue in self.queues.items():
+                    if queue and all(request.port != name for request in active):
+                        active.append(queue.popleft())
+                if not active:
+                    if self.closing:
+                        return
+                    self.condition.wait()
+                    continue
+            for request in list(active):
+                if request.pending is None:
+                    # a job failing on its first operation fails its own Future, not the worker
+                    try:
+                        request.pending = next(request.job)
+                    except Exception as e:
+                        active.remove(request)
+                        request.future.set_exception(e)
+            if not active:
+                continue
+            request = self.__next_operation(active)
+            try:
+                value = self.__bus(*request.pending)
+                request.pending = request.job.send(value)
+            except StopIteration as stop:
+                active.remove(request)
+                self.__finish(request, stop.value)
+                continue
+            except Exception as e:
+                active.remove(request)
+                request.future.set_exception(e)
+                continue
+            # the port that just used the bus goes last
+            if request in active:
+                active.remove(request)
+                active.append(request)
+
+
+class PortController:
+    """
+    Blocking scan_ir/scan_dr of one port of a JTAGScheduler.
+    """
+    def __init__(self, scheduler, port):
+        self.scheduler = scheduler
+        self.port = port
+        self.STATES = scheduler.ports[port].states
+        self.MAX_SCAN_BITS = scheduler.ports[port].max_scan_bits
+
+    def scan_ir(self, count, tdi_string):
+        return self.scheduler.scan_ir(self.port, count, tdi_string).result()
+
+    def scan_dr(self, count, tdi_string):
+        return self.scheduler.scan_dr(self.port, count, tdi_string).result()
+
+    def ba_scan_ir(self, tdi_vector, count, end=None):
+        return self.scheduler.ba_scan_ir(self.port, tdi_vector, count, end).result()
+
+    def ba_scan_dr(self, tdi_vector, count, end=None):
+        return self.scheduler.ba_scan_dr(self.port, tdi_vector, count, end).result()
+
+
+def main():
+    args = sys.argv[1:]
+    server = [arg for arg in args if ":" in arg]
+    args = [arg for arg in args if ":" not in arg]
+    board_name = args[0] if args else "DualJTAGTest"
+    scans = int(args[1]) if len(args) > 1 else 8
+    if server:
+        ip, _, port = server[0].partition(":")
+        ate_inst = ATE(ip, int(port))
+        ate_inst.connect(board_name)
+    else:
+        from hdl.ate.replay import make_ate
+        ate_inst = make_ate(board_name)
+        if ate_inst is None:
+            print("Board {:s} cannot be found!".format(board_name))
+            return 2
+        ate_inst.start_simulation()
+    rand = random.Random(2654)
+    vectors = ["{:08X}".format(rand.getrandbits(32)) for _ in range(scans)]
+    try:
+        start = time.perf_counter()
+        sequential = [(JTAGController(ate_inst).scan_dr(32, v), JTAGController2(ate_inst).scan_dr(32, v))
+                      for v in vectors]
+        sequential_time = time.perf_counter() - start
+        scheduler = JTAGScheduler(ate_inst)
+        start = time.perf_counter()
+        futures = [(scheduler.scan_dr("JTAG", 32, v), scheduler.scan_dr("JTAG2", 32, v)) for v in vectors]
+        scheduled = [(f1.result(), f2.result()) for f1, f2 in futures]
+        scheduled_time = time.perf_counter() - start
+        scheduler.close()
+    finally:
+        ate_inst.terminate()
+    print("sequential: {:.3f} s, scheduled: {:.3f} s, {:d} bus transactions, {:d} status polls".format(
+        sequential_time, scheduled_time, scheduler.transactions, scheduler.polls))
+    if scheduled != sequential:
+        print("The scheduled scans captured different data!")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
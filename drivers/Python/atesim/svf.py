@@ -0,0 +1,351 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Serial Vector Format (SVF) player for the JTAG hosts of the simulator.
+
+The SVF source is read as a pipeline of generators (lines -> statements ->
+SVFCommand), so only the statement being parsed is held in memory.  The
+parser runs in its own thread and fills a bounded queue of commands that the
+player takes from, so the next scans are parsed while the simulator is busy
+with the current one.
+
+Supported statements: SDR, SIR, HDR, TDR, HIR, TIR, ENDDR, ENDIR, RUNTEST,
+STATE, FREQUENCY and TRST (ignored, the hosts have no TRST control).
+Scans longer than the host buffer are split, pausing the TAP in
+Pause-DR/Pause-IR between the segments.
+
+Usage:
+    python -m drivers.Python.atesim.svf <svf file> <board> [<ip>:<port>] [JTAG2]
+"""
+import re
+import sys
+import threading
+from queue import Queue
+
+
+class SVFError(Exception):
+    def __init__(self, message):
+        super(SVFError, self).__init__(message)
+
+
+class SVFCommand:
+    __slots__ = ("name", "args", "line")
+
+    def __init__(self, name, args, line):
+        self.name = name
+        self.args = args
+        self.line = line
+
+    def __repr__(self):
+        return "{:d}: {:s} {:s}".format(self.line, self.name, " ".join(self.args))
+
+
+class SVFMismatch:
+    def __init__(self, command, expected, captured, mask, length):
+        self.command = command
+        self.expected = expected
+        self.captured = captured
+        self.mask = mask
+        self.length = length
+
+    def __repr__(self):
+        digits = (self.length + 3) // 4
+        return "line {:d} {:s}: expected {:0{d}X} mask {:0{d}X} captured {:0{d}X}".format(
+            self.command.line, self.command.name, self.expected, self.mask, self.captured, d=digits)
+
+
+def svf_lines(source):
+    """
+    :param source: File name or an iterable of lines (e.g. an open file or a socket file)
+    :return: generator of (line number, line)
+    """
+    if isinstance(source, str):
+        with open(source, "r") as f:
+            for number, line in enumerate(f, 1):
+                yield number, line
+    else:
+        for number, line in enumerate(source, 1):
+            yield number, line
+
+
+def svf_statements(lines):
+    """
+    Join the lines into statements, dropping the comments.
+    :param lines: generator of (line number, line)
+    :return: generator of (line number of the statement start, statement text)
+    """
+    parts = []
+    start = None
+    for number, line in lines:
+        for marker in ("!", "//"):
+            position = line.find(marker)
+            if position >= 0:
+                line = line[:position]
+        while line:
+            text, semicolon, line = line.partition(";")
+            if text.strip():
+                if start is None:
+                    start = number
+                parts.append(text)
+            if semicolon:
+                if parts:
+                    yield start, " ".join(parts)
+                parts = []
+                start = None
+    if parts and " ".join(parts).strip():
+        raise SVFError("line {:d}: statement is not terminated by ';'".format(start))
+
+
+TOKEN_RE = re.compile(r"\([^)]*\)|[^\s()]+")
+
+
+def svf_commands(statements):
+    """
+    :param statements: generator of (line number, statement text)
+    :return: generator of SVFCommand, the (hex data) arguments keep their parentheses
+    """
+    for number, text in statements:
+        tokens = TOKEN_RE.findall(text)
+        yield SVFCommand(tokens[0].upper(), tokens[1:], number)
+
+
+def parse(source):
+    """
+    :param source: File name or an iterable of lines
+    :return: generator of SVFCommand
+    """
+    return svf_commands(svf_statements(svf_lines(source)))
+
+
+class ScanSpec:
+    """
+    Sticky parameters of one of the SDR, SIR, HDR, TDR, HIR and TIR commands.
+    """
+    __slots__ = ("length", "tdi", "mask", "smask")
+
+    def __init__(self):
+        self.length = 0
+        self.tdi = 0
+        self.mask = 0
+        self.smask = 0
+
+    def update(self, command):
+        """
+        Apply the arguments of a command, SVF keeps TDI, MASK and SMASK while the length is unchanged.
+        :return: tuple of (tdi, tdo or None, mask)
+        """
+        args = command.args
+        if not args:
+            raise SVFError("line {:d}: {:s} needs a length".format(command.line, command.name))
+        length = int(args[0])
+        values = {}
+        for i in range(1, len(args) - 1, 2):
+            key = args[i].upper()
+            data = args[i + 1]
+            if not (data.startswith("(") and data.endswith(")")):
+                raise SVFError("line {:d}: {:s} value must be in parentheses".format(command.line, key))
+            values[key] = int("".join(data[1:-1].split()) or "0", 16)
+        if len(args) % 2 == 0:
+            raise SVFError("line {:d}: {:s} has an incomplete argument".format(command.line, command.name))
+        all_ones = (1 << length) - 1
+        if length != self.length:
+            if length and "TDI" not in values:
+                raise SVFError("line {:d}: {:s} length changed without TDI".format(command.line, command.name))
+            self.length = length
+            self.mask = all_ones
+            self.smask = all_ones
+        if "TDI" in values:
+            self.tdi = values["TDI"] & all_ones
+        if "MASK" in values:
+            self.mask = values["MASK"] & all_ones
+        if "SMASK" in values:
+            self.smask = values["SMASK"] & all_ones
+        tdo = values["TDO"] & all_ones if "TDO" in values else None
+        return self.tdi, tdo, self.mask
+
+
+class SVFPlayer:
+    def __init__(self, controller, frequency=1.0e6, lookahead=64, stop_on_mismatch=False):
+        """
+        :param controller: JTAGController or JTAGController2 of the atesim driver
+        :param frequency: TCK frequency used to turn RUNTEST times into clock cycles until a FREQUENCY statement
+        :param lookahead: Number of commands parsed ahead of the player
+        :param stop_on_mismatch: True to stop at the first TDO mismatch
+        """
+        self.controller = controller
+        self.frequency = frequency
+        self.lookahead = lookahead
+        self.stop_on_mismatch = stop_on_mismatch
+        self.specs = {name: ScanSpec() for name in ("SDR", "SIR", "HDR", "TDR", "HIR", "TIR")}
+        self.end_dr = controller.STATES["IDLE"]
+        self.end_ir = controller.STATES["IDLE"]
+        self.run_state = controller.STATES["IDLE"]
+        self.run_end = controller.STATES["IDLE"]
+        self.mismatches = []
+        self.commands = 0
+        self.scans = 0
+        self.bits = 0
+
+    def state(self, command, name):
+        if name.upper() not in self.controller.STATES:
+            raise SVFError("line {:d}: state {:s} is not supported".format(command.line, name))
+        return self.controller.STATES[name.upper()]
+
+    def play(self, source):
+        """
+        Play an SVF file or stream.
+        :param source: File name or an iterable of lines
+        :return: list of SVFMismatch
+        """
+        queue = Queue(maxsize=self.lookahead)
+        failure = []
+
+        def producer():
+            try:
+                for command in parse(source):
+                    queue.put(command)
+            except (SVFError, OSError, ValueError) as e:
+                failure.append(e)
+            queue.put(None)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        command = None
+        try:
+            while True:
+                command = queue.get()
+                if command is None:
+                    break
+                self.execute(command)
+                if self.stop_on_mismatch and self.mismatches:
+                    break
+        finally:
+            # let the parser run to its end so the thread does not block on a full queue
+            while command is not None:
+                command = queue.get()
+        if failure:
+            raise SVFError(str(failure[0]))
+        return self.mismatches
+
+    def execute(self, command):
+        self.commands += 1
+        name = command.name
+        if name in ("HDR", "TDR", "HIR", "TIR"):
+            self.specs[name].update(command)
+        elif name == "SDR":
+            self.scan(command, self.specs["HDR"], self.specs["SDR"], self.specs["TDR"], False)
+        elif name == "SIR":
+            self.scan(command, self.specs["HIR"], self.specs["SIR"], self.specs["TIR"], True)
+        elif name == "ENDDR":
+            self.end_dr = self.state(command, command.args[0])
+        elif name == "ENDIR":
+            self.end_ir = self.state(command, command.args[0])
+        elif name == "STATE":
+            # the host moves through the path on its own, only the final state matters
+            end = self.state(command, command.args[-1])
+            self.controller.runtest(0, end, end)
+        elif name == "RUNTEST":
+            self.runtest(command)
+        elif name == "FREQUENCY":
+            if command.args:
+                self.frequency = float(command.args[0])
+        elif name == "TRST":
+            pass
+        else:
+            raise SVFError("line {:d}: {:s} is not supported".format(command.line, name))
+
+    def runtest(self, command):
+        args = [arg.upper() for arg in command.args]
+        if "ENDSTATE" in args:
+            index = args.index("ENDSTATE")
+            self.run_end = self.state(command, args[index + 1])
+            args = args[:index]
+        if "MAXIMUM" in args:
+            args = args[:args.index("MAXIMUM")]
+        if args and args[0] in self.controller.STATES:
+            self.run_state = self.state(command, args[0])
+            args = args[1:]
+        ticks = 0
+        while args:
+            if len(args) < 2:
+                raise SVFError("line {:d}: RUNTEST argument is incomplete".format(command.line))
+            value, unit = args[0], args[1]
+            if unit in ("TCK", "SCK"):
+                ticks = max(ticks, int(float(value)))
+            elif unit == "SEC":
+                ticks = max(ticks, int(float(value) * self.frequency + 0.999999))
+            else:
+                raise SVFError("line {:d}: RUNTEST unit {:s} is not supported".format(command.line, unit))
+            args = args[2:]
+        self.controller.runtest(ticks, self.run_state, self.run_end)
+
+    def scan(self, command, header, spec, trailer, ir):
+        tdi, tdo, mask = spec.update(command)
+        length = header.length + spec.length + trailer.length
+        if length == 0:
+            return
+        vector = (trailer.tdi << (spec.length + header.length)) | (tdi << header.length) | header.tdi
+        captured = self.shift(vector, length, self.end_ir if ir else self.end_dr, ir)
+        self.scans += 1
+        self.bits += length
+        if tdo is not None:
+            captured = (captured >> header.length) & ((1 << spec.length) - 1)
+            if (captured ^ tdo) & mask:
+                self.mismatches.append(SVFMismatch(command, tdo, captured, mask, spec.length))
+
+    def shift(self, vector, length, end, ir):
+        """
+        Shift a vector, in segments when it does not fit the host buffer.
+        :return: captured vector as an int
+        """
+        controller = self.controller
+        pause = controller.STATES["IRPAUSE" if ir else "DRPAUSE"]
+        scan = controller.ba_scan_ir if ir else controller.ba_scan_dr
+        captured = 0
+        done = 0
+        while done < length:
+            count = min(length - done, controller.MAX_SCAN_BITS)
+            segment = (vector >> done) & ((1 << count) - 1)
+            tdi_vector = bytearray(segment.to_bytes((count + 7) // 8, "little"))
+            tdo_vector = scan(tdi_vector, count, end if done + count == length else pause)
+            captured |= (int.from_bytes(bytes(tdo_vector), "little") & ((1 << count) - 1)) << done
+            done += count
+        return captured
+
+
+def main():
+    args = sys.argv[1:]
+    jtag2 = "JTAG2" in args
+    if jtag2:
+        args.remove("JTAG2")
+    if len(args) not in (2, 3):
+        print(__doc__)
+        return 2
+    from drivers.Python.atesim.atesim import JTAGController, JTAGController2
+    if len(args) == 3:
+        from drivers.Python.atesim.atesim import ATE
+        ip, _, port = args[2].partition(":")
+        ate_inst = ATE(ip, int(port))
+        ate_inst.connect(args[1])
+    else:
+        from hdl.ate.replay import make_ate
+        ate_inst = make_ate(args[1])
+        if ate_inst is None:
+            print("Board {:s} cannot be found!".format(args[1]))
+            return 2
+        ate_inst.start_simulation()
+    player = SVFPlayer(JTAGController2(ate_inst) if jtag2 else JTAGController(ate_inst))
+    try:
+        mismatches = player.play(args[0])
+    finally:
+        ate_inst.terminate()
+    for mismatch in mismatches:
+        print(mismatch)
+    print("{:d} statements, {:d} scans, {:d} bits, {:d} mismatches.".format(player.commands, player.scans,
+                                                                            player.bits, len(mismatches)))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
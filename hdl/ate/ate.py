@@ -16,11 +16,23 @@ from hdl.boards.common.BoardI2CInterface import BoardI2CInterface
 from hdl.boards.common.BoardJTAGInterface import BoardJTAGInterface
 from hdl.boards.common.BoardSPIInterface import BoardSPIInterface
 from hdl.boards.common.BoardTPSPInterface import BoardTPSPInterface
+from hdl.ate import checkpoint
+from hdl.ate import faults as fault_injection
+from hdl.ate.profiler import Profile
+from hdl.buses.wishbone.wishbone_log import TransactionRecorder
 
 
 class ATE:
-    def __init__(self, board_inst):
+    def __init__(self, board_inst, board_name=None):
         self.board_inst = board_inst
+        self.board_name = type(board_inst).__name__ if board_name is None else board_name
+        self.tb = None
+        self.recorder = None
+        self.profile = None
+        self.trace = False
+        self.start_time = 0
+        self.end_time = 0
+        self.sim_thread = None
         # Wishbone SYSCON signals
         self.clk_o = Signal(bool(0))
         self.rst_o = Signal(bool(0))
@@ -98,10 +110,152 @@ class ATE:
     def configure_tpsp(self, tp_if):
         self.tp_if = tp_if
 
-    def start_simulation(self):
-        x = threading.Thread(target=self.__worker)
-        x.start()
-        sleep(10)
+    def start_simulation(self, checkpoint_file=None, trace=True, settle=10):
+        """
+        Elaborate the design and start the simulation thread.
+        :param checkpoint_file: Optional checkpoint made by checkpoint() to restore instead of starting from reset.
+                                A CheckpointError is raised if it belongs to another board or an older design.
+        :param trace: True to write a VCD trace of the session (__rtl.vcd in the working directory), False for
+                      in-process clients measuring or repeating runs
+        :param settle: Seconds to wait for the simulation thread before returning
+        """
+        self.tb = self.__rtl()
+        self.start_time = 0
+        if checkpoint_file is not None:
+            snapshot = checkpoint.load(checkpoint_file)
+            checkpoint.restore(self.tb, self.board_name, snapshot)
+            self.start_time = snapshot["time"]
+        self.trace = trace
+        self.sim_thread = threading.Thread(target=self.__worker)
+        self.sim_thread.start()
+        sleep(settle)
+
+    def checkpoint(self, filename):
+        """
+        Save the state of the running simulation, taken between two Wishbone transactions.
+        :param filename: File to write the checkpoint to
+        """
+        while self.master_inst is None:
+            print("wb checkpoint: master task has not started yet!")
+            sleep(1)
+        snapshot = self.master_inst.call(lambda: checkpoint.capture(self.tb, self.board_name, now()))
+        checkpoint.save(snapshot, filename)
+        return True
+
+    def elaborate(self):
+        """
+        Elaborate the design without simulating it, e.g. to list its Signals (see hdl/ate/faults.py).
+        :return: The top level block of the design
+        """
+        self.tb = self.__rtl()
+        return self.tb
+
+    def run_batch(self, commands, trace=False, faults=None, profile=None, duration=None):
+        """
+        Run a list of Wishbone transactions back to back in the calling thread, without a telnet client.
+        The simulation ends after the last transaction.
+        :param commands: iterable of WishboneMaster commands ("write"|"read"|"reset", address, data),
+                         ("wait", time, 0) leaves the bus idle until the given simulation time
+        :param trace: True to write a VCD trace of the run
+        :param faults: Optional list of faults (see hdl/ate/faults.py) injected into the design before it runs
+        :param profile: Optional dict of the arguments of Profile (see hdl/ate/profiler.py) to profile the run,
+                        the Profile is left in self.profile
+        :param duration: Optional limit of the simulation time of the run, for a design that may never finish
+                         a transaction (e.g. with a stuck clock): the run stops there, the transactions not
+                         completed get no response
+        :return: list of WishboneMaster responses, one per command other than "wait" completed, the simulation
+                 time of the end of the run is left in self.end_time
+        """
+        self.tb = self.__rtl()
+        if faults:
+            fault_injection.inject(self.tb, faults)
+        self.profile = None if profile is None else Profile(self.tb, **profile)
+        count = 0
+        for cmd in commands:
+            self.master_inst.Q.put(cmd)
+            if cmd[0] != "wait":
+                count += 1
+        self.master_inst.Q.put(("terminate", 0, 0))
+        self.tb.config_sim(trace=trace)
+        if self.profile is not None:
+            self.profile.enable()
+        try:
+            self.tb.run_sim(duration, quiet=int(duration is not None))
+        finally:
+            if self.profile is not None:
+                self.profile.disable()
+        self.end_time = now()
+        if not self.tb.sim._finished:
+            # stopped at the time limit
+            self.tb.quit_sim()
+        results = []
+        while len(results) < count and not self.master_inst.R.empty():
+            results.append(self.master_inst.R.get())
+        self.master_inst = None
+        return results
+
+    def start_recording(self, filename):
+        """
+        Log every following Wishbone transaction to filename (see hdl/buses/wishbone/wishbone_log.py).
+        :param filename: Name of the transaction log file
+        """
+        while self.master_inst is None:
+            print("wb start_recording: master task has not started yet!")
+            sleep(1)
+        self.stop_recording()
+        self.recorder = TransactionRecorder(filename, self.board_name)
+        self.master_inst.recorder = self.recorder
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            if self.master_inst is not None:
+                self.master_inst.recorder = None
+            self.recorder.close()
+            self.recorder = None
+
+    def start_profiling(self, processes=True, python=False):
+        """
+        Start profiling the running simulation (see hdl/ate/profiler.py), from a new Profile.
+        :param processes: True to count the activations and the wall time of every process
+        :param python: True to profile the Python code of the simulation with cProfile too
+        """
+        while self.master_inst is None:
+            print("wb start_profiling: master task has not started yet!")
+            sleep(1)
+        self.stop_profiling()
+        self.profile = Profile(self.tb, processes, python)
+        self.master_inst.call(self.profile.enable)
+
+    def stop_profiling(self):
+        """
+        :return: The Profile of the simulation, None when it was not profiled
+        """
+        if self.profile is not None and self.profile.enabled and self.master_inst is not None:
+            self.master_inst.call(self.profile.disable)
+        return self.profile
+
+    def profile_call(self, func):
+        """
+        Run func on the Profile in the simulation thread while it is profiled, the counters keep changing.
+        :param func: function taking the Profile
+        :return: the value returned by func
+        """
+        if self.profile is None:
+            return None
+        if not self.profile.enabled or self.master_inst is None:
+            return func(self.profile)
+
+        def run():
+            # an exception must not end the simulation thread, it is raised again in the caller
+            try:
+                return func(self.profile), None
+            except Exception as e:
+                return None, e
+
+        value, error = self.master_inst.call(run)
+        if error is not None:
+            raise error
+        return value
 
     def sim_status(self):
         if self.master_inst is None:
@@ -125,7 +279,14 @@ class ATE:
         while self.master_inst is None:
             print("wb terminate: master task has not started yet!")
             sleep(1)
-        return self.master_inst.terminate()
+        self.stop_recording()
+        self.stop_profiling()
+        ret = self.master_inst.terminate()
+        if self.sim_thread is not None and self.sim_thread is not threading.current_thread():
+            # the next simulation may only start once this one has been finalized
+            self.sim_thread.join()
+            self.sim_thread = None
+        return ret
 
     def get_value(self):
         while self.master_inst is None:
@@ -139,6 +300,20 @@ class ATE:
             sleep(1)
         return self.master_inst.get_error()
 
+    def get_last_response(self):
+        """
+        Counterpart of the telnet driver ATE.get_last_response() so the driver controllers
+        (e.g. JTAGController) can run on this ATE in the same process.
+        """
+        return str(self.get_error())
+
+    def jtag_scheduler(self):
+        """
+        :return: JTAGScheduler running scans on both JTAG ports of this ATE at the same time
+        """
+        from drivers.Python.atesim.scheduler import JTAGScheduler
+        return JTAGScheduler(self)
+
     def reset_bus(self):
         while self.master_inst is None:
             print("wb reset_bus: master task has not started yet!")
@@ -146,8 +321,10 @@ class ATE:
         return self.master_inst.reset_bus()
 
     def __worker(self):
-        tb = self.__rtl()
-        tb.config_sim(trace=True)
+        tb = self.tb
+        tb.config_sim(trace=self.trace)
+        if self.start_time:
+            checkpoint.resume(tb, self.start_time)
         tb.run_sim()
         self.master_inst = None
 
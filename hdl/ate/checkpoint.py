@@ -0,0 +1,241 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Checkpoint (snapshot) and restore of the state of an elaborated simulation.
+
+A checkpoint holds the value of every Signal and every memory (list of Signals,
+e.g. the JTAG bram or a RAMCore) found in the block hierarchy of the design.
+The finite state machines of this project keep their state in Signals, so
+restoring the Signals before the simulation starts puts the design back in
+the state it was captured in.  Python locals of @instance generators are not
+captured: they restart from the top, so checkpoints should be taken while the
+bus is idle (ATE.checkpoint() takes them between two Wishbone transactions).
+The power-on resets of the design (the @instance processes named
+power_on_reset_gen, e.g. in wbsyscon) would reset the restored state again,
+so restore() removes them, and resume() starts the simulation at the time
+the checkpoint was taken instead of 0.
+
+Each checkpoint is keyed by the board name and a hash of the design (the
+hierarchy of Signals with their types and the source files of every block).
+Restoring a checkpoint made with another board or a modified design raises
+a CheckpointError.
+"""
+import gzip
+import hashlib
+import inspect
+import pickle
+from myhdl import intbv, EnumItemType, Simulation, delay
+from myhdl import _simulator
+from myhdl._Signal import _Signal
+from myhdl._block import _Block
+from myhdl._instance import _Instantiator
+
+CHECKPOINT_VERSION = 1
+POWER_ON_RESET = "power_on_reset_gen"
+
+
+class CheckpointError(Exception):
+    def __init__(self, message):
+        super(CheckpointError, self).__init__(message)
+
+
+def _is_list_of_signals(obj):
+    return isinstance(obj, list) and len(obj) > 0 and all(isinstance(s, _Signal) for s in obj)
+
+
+def _block_names(subs):
+    """
+    Name the sub-blocks of a block by function name and occurrence so the names are the same in every
+    elaboration of the design (myhdl instance names depend on how many times a block was elaborated).
+    """
+    names = []
+    counts = {}
+    for sub in subs:
+        if isinstance(sub, _Block):
+            base = sub.func.__name__
+            names.append((base + str(counts.get(base, 0)), sub))
+            counts[base] = counts.get(base, 0) + 1
+    return names
+
+
+def design_state(top):
+    """
+    Collect the Signals and memories of an elaborated design.
+    :param top: The top level _Block of the design
+    :return: tuple of (signals, memories, sources) where signals maps a hierarchical name to a Signal,
+             memories maps a hierarchical name to a list of Signals and sources is the set of source files.
+    """
+    signals = {}
+    memories = {}
+    sources = set()
+    seen = set()
+
+    def add(path, obj):
+        if isinstance(obj, _Signal):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                signals[path] = obj
+        elif _is_list_of_signals(obj):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                memories[path] = obj
+
+    def walk(blk, path):
+        try:
+            sources.add(inspect.getsourcefile(blk.func))
+        except TypeError:
+            pass
+        for name in sorted(blk.symdict):
+            add(path + '.' + name, blk.symdict[name])
+        for sub in blk.subs:
+            if isinstance(sub, _Instantiator):
+                for name in sorted(sub.sigdict):
+                    add(path + '.' + name, sub.sigdict[name])
+                for name in sorted(sub.losdict):
+                    add(path + '.' + name, sub.losdict[name])
+        for name, sub in _block_names(blk.subs):
+            walk(sub, path + '.' + name)
+
+    walk(top, top.func.__name__)
+    return signals, memories, sources
+
+
+def _type_of(value):
+    if isinstance(value, intbv):
+        return "intbv[{:d}]".format(len(value))
+    elif isinstance(value, EnumItemType):
+        return "enum" + str(value._type)
+    return type(value).__name__
+
+
+def design_hash(top, state=None):
+    """
+    Hash the structure and the source code of an elaborated design.
+    :param top: The top level _Block of the design
+    :param state: Result of design_state(top) if already computed
+    :return: hex digest string
+    """
+    signals, memories, sources = design_state(top) if state is None else state
+    h = hashlib.sha256()
+    for path in sorted(signals):
+        h.update("{:s}:{:s}\n".format(path, _type_of(signals[path]._init)).encode())
+    for path in sorted(memories):
+        mem = memories[path]
+        h.update("{:s}:{:s}[{:d}]\n".format(path, _type_of(mem[0]._init), len(mem)).encode())
+    for source in sorted(s for s in sources if s is not None):
+        with open(source, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def _get(sig):
+    value = sig._val
+    if isinstance(value, intbv):
+        return int(value)
+    elif isinstance(value, EnumItemType):
+        return value._name
+    return value
+
+
+def _set(sig, value):
+    if isinstance(sig._val, intbv):
+        sig._val._val = value
+        sig._next = sig._val.__copy__()
+    elif isinstance(sig._val, EnumItemType):
+        sig._val = getattr(sig._val._type, value)
+        sig._next = sig._val
+    else:
+        sig._val = value
+        sig._next = value
+
+
+def capture(top, board_name, sim_time=0):
+    """
+    Capture the state of a design.  Must be called from the simulation thread while it is between
+    time steps, or before the simulation is started.
+    :param top: The top level _Block of the design
+    :param board_name: Name of the board being simulated
+    :param sim_time: Simulation time of the capture, recorded for information
+    :return: checkpoint dictionary
+    """
+    state = design_state(top)
+    signals, memories, sources = state
+    return {
+        "version": CHECKPOINT_VERSION,
+        "board": board_name,
+        "design_hash": design_hash(top, state),
+        "time": sim_time,
+        "signals": {path: _get(sig) for path, sig in signals.items()},
+        "memories": {path: [_get(sig) for sig in mem] for path, mem in memories.items()}
+    }
+
+
+def restore(top, board_name, checkpoint):
+    """
+    Load the state held in a checkpoint into an elaborated design that has not started simulating.
+    :param top: The top level _Block of the design
+    :param board_name: Name of the board being simulated
+    :param checkpoint: checkpoint dictionary made by capture() or load()
+    """
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise CheckpointError("Unsupported checkpoint version {}.".format(checkpoint.get("version")))
+    if checkpoint["board"] != board_name:
+        raise CheckpointError("Checkpoint was made for board {:s}, not {:s}.".format(checkpoint["board"],
+                                                                                    board_name))
+    state = design_state(top)
+    if checkpoint["design_hash"] != design_hash(top, state):
+        raise CheckpointError("Checkpoint is stale: the design of {:s} has changed.".format(board_name))
+    signals, memories, sources = state
+    for path, value in checkpoint["signals"].items():
+        _set(signals[path], value)
+    for path, values in checkpoint["memories"].items():
+        for sig, value in zip(memories[path], values):
+            _set(sig, value)
+    skip_power_on_resets(top)
+
+
+def _idle():
+    # never yields; MyHDL infers the waiter of a process from its yield statements
+    return
+    yield delay(1)
+
+
+def skip_power_on_resets(top):
+    """
+    Replace the power-on reset processes of a design that has not started simulating by processes doing nothing.
+    :param top: The top level _Block of the design
+    :return: number of processes replaced
+    """
+    skipped = 0
+    pending = [top]
+    while pending:
+        blk = pending.pop()
+        for sub in blk.subs:
+            if isinstance(sub, _Block):
+                pending.append(sub)
+            elif isinstance(sub, _Instantiator) and sub.name == POWER_ON_RESET:
+                sub.gen = _idle()
+                skipped += 1
+    return skipped
+
+
+def resume(top, sim_time):
+    """
+    Create the Simulation of a restored design, starting at the simulation time of its checkpoint.
+    Call config_sim() first, then run_sim() runs this Simulation.
+    :param top: The top level _Block of the design
+    :param sim_time: The "time" of the checkpoint
+    """
+    top.sim = Simulation(top)
+    _simulator._time = sim_time
+
+
+def save(checkpoint, filename):
+    with gzip.open(filename, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(filename):
+    with gzip.open(filename, "rb") as f:
+        return pickle.load(f)
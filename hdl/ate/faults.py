@@ -0,0 +1,196 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Stuck-at and bridge faults injected into an elaborated design.
+
+Faults name Signals by their hierarchical name in checkpoint.design_state()
+(e.g. __rtl.ioslave0.i_gpio) or by a unique tail of it (ioslave0.i_gpio).
+inject() must be called after the design is elaborated and before it starts
+simulating (see ATE.run_batch()):
+  - a stuck-at fault holds a Signal, or one bit of it, at 0 or 1.  The value
+    the drivers of the Signal assign is overridden whenever the Signal is
+    updated, so the faulty bits never change,
+  - a bridge fault shorts two bool Signals, both take the AND (or the OR) of
+    the values their drivers assign.
+Faults are written as
+    sa0:<signal>  sa1:<signal>  sa0:<signal>[<bit>]  and:<signal>,<signal>  or:<signal>,<signal>
+on the command line and in the reports of faultsim.py.
+"""
+import fnmatch
+import re
+from myhdl import intbv
+from myhdl._simulator import _siglist
+from hdl.ate.checkpoint import design_state, _get, _set
+
+
+class FaultError(Exception):
+    def __init__(self, message):
+        super(FaultError, self).__init__(message)
+
+
+def find_signal(signals, name):
+    """
+    Find a Signal by its full hierarchical name or by a unique tail of it.
+    :param signals: dict hierarchical name -> Signal from design_state()
+    :param name: Name of the Signal
+    :return: tuple of the full name and the Signal
+    """
+    if name in signals:
+        return name, signals[name]
+    matches = [path for path in signals if path.endswith("." + name)]
+    if len(matches) == 1:
+        return matches[0], signals[matches[0]]
+    if len(matches) > 1:
+        raise FaultError("Signal name {:s} is ambiguous.".format(name))
+    raise FaultError("Signal {:s} is not in the design.".format(name))
+
+
+def _faulty(sig, **methods):
+    """
+    Change the class of a Signal to a subclass overriding some of its methods.  Signals have __slots__, so
+    their methods cannot be replaced on the instance.
+    """
+    sig.__class__ = type("Faulty" + type(sig).__name__, (type(sig),), dict(__slots__=(), **methods))
+
+
+class StuckAt:
+    def __init__(self, signal, value, bit=None):
+        """
+        :param signal: Name of the Signal
+        :param value: 0 or 1
+        :param bit: Index of the stuck bit of an intbv Signal, None for every bit
+        """
+        self.signal = signal
+        self.value = int(value)
+        self.bit = bit
+
+    def __repr__(self):
+        return "sa{:d}:{:s}{:s}".format(self.value, self.signal, "" if self.bit is None else
+                                        "[{:d}]".format(self.bit))
+
+    def inject(self, signals):
+        path, sig = find_signal(signals, self.signal)
+        if isinstance(sig._val, intbv):
+            width = len(sig._val)
+            if self.bit is not None and not 0 <= self.bit < width:
+                raise FaultError("{:s} has no bit {:d}.".format(path, self.bit))
+            mask = ((1 << width) - 1) if self.bit is None else 1 << self.bit
+            stuck = mask if self.value else 0
+
+            def force(value):
+                return (value & ~mask) | stuck
+
+            def update(this):
+                this._next._val = force(this._next._val)
+                return super(type(this), this)._update()
+        elif isinstance(sig._val, (bool, int)) and sig._nrbits == 1 and self.bit in (None, 0):
+            def force(value):
+                return bool(self.value)
+
+            def update(this):
+                this._next = bool(self.value)
+                return super(type(this), this)._update()
+        else:
+            raise FaultError("Cannot hold {:s} at {:d}, it is not a bool or intbv Signal.".format(path, self.value))
+        _set(sig, force(_get(sig)))
+        _faulty(sig, _update=update)
+
+
+class Bridge:
+    KINDS = ("and", "or")
+
+    def __init__(self, first, second, kind="and"):
+        """
+        :param first: Name of the first Signal
+        :param second: Name of the second Signal
+        :param kind: "and" for a wired-AND short, "or" for a wired-OR short
+        """
+        if kind not in self.KINDS:
+            raise FaultError("A bridge is an and or an or, not {:s}.".format(kind))
+        self.first = first
+        self.second = second
+        self.kind = kind
+
+    def __repr__(self):
+        return "{:s}:{:s},{:s}".format(self.kind, self.first, self.second)
+
+    def inject(self, signals):
+        shorted = [find_signal(signals, name) for name in (self.first, self.second)]
+        for path, sig in shorted:
+            if sig._nrbits != 1 or isinstance(sig._val, intbv):
+                raise FaultError("Cannot bridge {:s}, it is not a bool Signal.".format(path))
+        sigs = [sig for _, sig in shorted]
+        driven = [bool(_get(sig)) for sig in sigs]
+        combine = all if self.kind == "and" else any
+
+        def drive(index):
+            def set_next(value):
+                if isinstance(value, intbv):
+                    value = value._val
+                driven[index] = bool(value)
+                for sig in sigs:
+                    sig._next = combine(driven)
+                # the setter of next only schedules the Signal assigned
+                _siglist.append(sigs[1 - index])
+            return set_next
+
+        for index, sig in enumerate(sigs):
+            _set(sig, combine(driven))
+            sig._setNextVal = drive(index)
+
+
+def parse_fault(text):
+    """
+    :param text: Fault in the form sa0:<signal>[<bit>], sa1:..., and:<signal>,<signal> or or:<signal>,<signal>
+    :return: StuckAt or Bridge
+    """
+    kind, _, names = text.partition(":")
+    if kind in ("sa0", "sa1"):
+        match = re.match(r"^(.+?)(?:\[(\d+)\])?$", names)
+        if match is None:
+            raise FaultError("Bad stuck-at fault {:s}.".format(text))
+        return StuckAt(match.group(1), int(kind[2]), None if match.group(2) is None else int(match.group(2)))
+    if kind in Bridge.KINDS:
+        first, _, second = names.partition(",")
+        if not first or not second:
+            raise FaultError("A bridge needs two Signals: {:s}.".format(text))
+        return Bridge(first, second, kind)
+    raise FaultError("Unknown fault {:s}, expected sa0, sa1, and or or.".format(text))
+
+
+def fault_list(top, patterns):
+    """
+    Stuck-at-0 and stuck-at-1 faults on every bit of the bool and intbv Signals matching the patterns.
+    :param top: The top level _Block of the elaborated design
+    :param patterns: list of fnmatch patterns of hierarchical Signal names (e.g. "*.SIB1.update_bit")
+    :return: list of StuckAt
+    """
+    signals, _, _ = design_state(top)
+    faults = []
+    for path in sorted(signals):
+        if not any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns):
+            continue
+        value = signals[path]._val
+        if isinstance(value, intbv):
+            bits = [None] if len(value) == 1 else list(range(len(value)))
+        elif isinstance(value, (bool, int)) and signals[path]._nrbits == 1:
+            bits = [None]
+        else:
+            continue
+        for bit in bits:
+            faults += [StuckAt(path, 0, bit), StuckAt(path, 1, bit)]
+    return faults
+
+
+def inject(top, faults):
+    """
+    Inject faults into an elaborated design that has not started simulating.
+    :param top: The top level _Block of the design
+    :param faults: list of StuckAt, Bridge or fault strings
+    """
+    signals, _, _ = design_state(top)
+    for fault in faults:
+        if isinstance(fault, str):
+            fault = parse_fault(fault)
+        fault.inject(signals)
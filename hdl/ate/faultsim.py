@@ -0,0 +1,194 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Fault injection campaign: run a test against faulty copies of a board.
+
+The test is a list of Wishbone transactions, usually a transaction log
+recorded with the RECORD command of simservice while a test script ran (see
+hdl/ate/replay.py).  It is first run against the fault free board, then
+against one board per fault (see hdl/ate/faults.py), each in a worker
+process of a process pool using all the cores.  A fault is detected when a
+transaction returns another status or value than in the fault free run.
+A faulty run is stopped at TIMEOUT_MARGIN times the simulation time of the
+fault free run: a fault that keeps a transaction from ever finishing (e.g.
+a stuck bus clock) is detected by the timeout, as a tester would.  A fault
+making the simulation fail is reported as an error.
+
+Every faulty run builds and elaborates its board again, the parsed
+description files (BSDL, ICL) come from the file cache: the fault free run
+fills the cache in memory before the workers are forked, or on disk for
+the workers of platforms without fork.  A checkpoint of the fault free run
+cannot be reused, the faults are present from time 0.
+
+Usage: python -m hdl.ate.faultsim [-j <processes>] [-b <board name>] <log file> <fault|pattern> ...
+A fault is sa0:<signal>, sa1:<signal>, sa0:<signal>[<bit>], and:<signal>,<signal> or or:<signal>,<signal>,
+a pattern (e.g. "*SIB1.update_bit") adds the stuck-at faults of every bit of the matching Signals.
+The board is the one the log was recorded on unless -b gives another one.
+Prints one line per fault and the fault coverage.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from hdl.ate.faults import FaultError, fault_list, parse_fault
+from hdl.ate.replay import make_ate, replay_commands
+from hdl.buses.wishbone.wishbone_log import read_log
+
+DETECTED = "detected"
+UNDETECTED = "undetected"
+ERROR = "error"
+# limit of the simulation time of a faulty run, in fault free run times
+TIMEOUT_MARGIN = 2
+
+
+class FaultResult:
+    def __init__(self, fault, status, index=None, message="", seconds=0.0):
+        """
+        :param fault: The fault as a string
+        :param status: DETECTED, UNDETECTED or ERROR
+        :param index: Index of the first transaction that differed from the fault free run
+        :param message: Difference or error seen
+        :param seconds: Run time of the faulty board
+        """
+        self.fault = fault
+        self.status = status
+        self.index = index
+        self.message = message
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "{:s}: {:s}{:s}".format(self.fault, self.status, " " + self.message if self.message else "")
+
+
+def simulate(board_name, commands, faults=None, duration=None):
+    """
+    Run the transactions on a new board, quietly.
+    :param duration: Optional limit of the simulation time of the run
+    :return: tuple of the list of WishboneMaster responses and the simulation time of the end of the run
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        ate_inst = make_ate(board_name)
+        if ate_inst is None:
+            raise FaultError("Unknown board {:s}.".format(board_name))
+        responses = ate_inst.run_batch(commands, faults=faults, duration=duration)
+        return responses, ate_inst.end_time
+
+
+def run_fault(job):
+    """
+    Worker of the campaign.
+    :param job: tuple of (board name, commands, fault free responses, fault string, simulation time limit)
+    :return: FaultResult
+    """
+    board_name, commands, golden, fault, duration = job
+    start = perf_counter()
+    try:
+        responses, _ = simulate(board_name, commands, [fault], duration)
+    except FaultError:
+        raise
+    except Exception as e:
+        return FaultResult(fault, ERROR, message="{:s}: {:s}".format(type(e).__name__, str(e)),
+                           seconds=perf_counter() - start)
+    seconds = perf_counter() - start
+    for index, (good, bad) in enumerate(zip(golden, responses)):
+        if good != bad:
+            return FaultResult(fault, DETECTED, index, "#{:d} {!r} instead of {!r}".format(index, bad, good),
+                               seconds)
+    if len(responses) != len(golden):
+        return FaultResult(fault, DETECTED, len(responses), "timeout, {:d} responses instead of {:d}".format(
+            len(responses), len(golden)), seconds)
+    return FaultResult(fault, UNDETECTED, seconds=seconds)
+
+
+def expand_faults(board_name, specs):
+    """
+    :param specs: list of fault strings and fnmatch patterns of Signal names
+    :return: list of fault strings
+    """
+    faults = []
+    patterns = []
+    for spec in specs:
+        if ":" in spec:
+            faults.append(repr(parse_fault(spec)))
+        else:
+            patterns.append(spec)
+    if patterns:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ate_inst = make_ate(board_name)
+            if ate_inst is None:
+                raise FaultError("Unknown board {:s}.".format(board_name))
+            top = ate_inst.elaborate()
+        faults += [repr(fault) for fault in fault_list(top, patterns)]
+    return faults
+
+
+def campaign(board_name, commands, faults, processes=None):
+    """
+    Run the transactions against the fault free board and against one board per fault.
+    :param board_name: Board name for the BoardFactory
+    :param commands: list of WishboneMaster commands
+    :param faults: list of fault strings
+    :param processes: Number of worker processes, the number of cores by default
+    :return: tuple of the fault free responses and the list of FaultResult in the order of the faults
+    """
+    commands = list(commands)
+    golden, end_time = simulate(board_name, commands)
+    if not faults:
+        return golden, []
+    jobs = [(board_name, commands, golden, fault, TIMEOUT_MARGIN * end_time) for fault in faults]
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes == 1:
+        return golden, [run_fault(job) for job in jobs]
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        return golden, list(executor.map(run_fault, jobs))
+
+
+def coverage(results):
+    """
+    :return: detected faults / faults, 0.0 without faults
+    """
+    return sum(1 for result in results if result.status == DETECTED) / len(results) if results else 0.0
+
+
+def report(results, out=sys.stdout):
+    for result in results:
+        print("{:10s} {:8.2f} s  {:s}  {:s}".format(result.status, result.seconds, result.fault, result.message),
+              file=out)
+    counts = {status: sum(1 for r in results if r.status == status) for status in (DETECTED, UNDETECTED, ERROR)}
+    print("{:d} faults, {:d} detected, {:d} undetected, {:d} errors, fault coverage {:.1f}%".format(
+        len(results), counts[DETECTED], counts[UNDETECTED], counts[ERROR], 100.0 * coverage(results)), file=out)
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for option in ("-j", "-b"):
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) < 2:
+        print(__doc__)
+        return 2
+    board_name, records = read_log(args[0])
+    board_name = options.get("-b", board_name)
+    commands = replay_commands(records)
+    try:
+        faults = expand_faults(board_name, args[1:])
+        start = perf_counter()
+        golden, results = campaign(board_name, commands, faults, int(options.get("-j", 0)) or None)
+    except FaultError as e:
+        print(str(e))
+        return 2
+    report(results)
+    print("{:d} transactions, {:.2f} s".format(len(golden), perf_counter() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Profiling of the processes of an elaborated simulation.
+
+A Profile counts the activations (wake-ups) of every @always, @always_comb,
+@always_seq and @instance generator of the block hierarchy and accumulates
+the wall time spent in each of them, including the functions they call.
+The processes are named by their hierarchical path, the blocks named as in
+checkpoint.design_state() followed by the name of the generator function and
+its occurrence in the block (e.g. __rtl.ioslave0.wb_slave0.seq0).  Processes
+outside the block hierarchy (the generators of ShadowSignals and of a
+Cosimulation) are not counted.
+
+On Python 3.12 and later the processes are timed with sys.monitoring
+events (PY_START, PY_RESUME, PY_YIELD and PY_RETURN) set on the code objects
+of the processes only, so the rest of the simulation runs at full speed.
+Before 3.12 they are timed with a trace function (sys.settrace) which Python
+calls for every call made in the thread: it ignores the frames that are not
+processes, but each call still costs the call of the trace function, under
+a microsecond, which can double the run time of the simulation.  The calls
+a process makes are counted and the overhead of the trace function,
+measured by calibrate() when profiling starts, is subtracted from its wall
+time.  Optionally the whole Python code of the simulation is profiled with
+cProfile.  The trace function and cProfile belong to the thread that calls
+enable() and disable(), which must be the simulation thread: ATE runs them
+in it through WishboneMaster.call() while a session is running (PROFILE
+command of simservice) and around run_sim() for ATE.run_batch().
+
+report() prints the hottest processes, write_folded() writes the folded
+stacks read by flamegraph.pl and speedscope ("__rtl;ioslave0;seq0 1234",
+the wall time in microseconds) and write_stats() writes the cProfile
+statistics for pstats or snakeviz, save() writes both.
+"""
+import cProfile
+import sys
+from time import perf_counter
+from myhdl._instance import _Instantiator
+from hdl.ate.checkpoint import _block_names
+
+MONITORING = hasattr(sys, "monitoring")
+# sys.monitoring tools ids left free by the debugger, coverage, cProfile (PROFILER_ID) and optimizer tools
+TOOL_IDS = (3, 4)
+
+
+class ProfileError(Exception):
+    def __init__(self, message):
+        super(ProfileError, self).__init__(message)
+
+
+def _process_names(subs):
+    """
+    Name the generators of a block by function name and occurrence, like the sub-blocks in _block_names().
+    """
+    names = []
+    counts = {}
+    for sub in subs:
+        if isinstance(sub, _Instantiator):
+            base = sub.name
+            names.append((base + str(counts.get(base, 0)), sub))
+            counts[base] = counts.get(base, 0) + 1
+    return names
+
+
+def design_processes(top):
+    """
+    Collect the processes of an elaborated design.
+    :param top: The top level _Block of the design
+    :return: dict hierarchical name -> generator of the process
+    """
+    processes = {}
+
+    def walk(blk, path):
+        for name, sub in _process_names(blk.subs):
+            processes[path + '.' + name] = sub.gen
+        for name, sub in _block_names(blk.subs):
+            walk(sub, path + '.' + name)
+
+    walk(top, top.func.__name__)
+    return processes
+
+
+class ProcessStats:
+    def __init__(self, path, activations=0, seconds=0.0):
+        """
+        :param path: Hierarchical name of the process
+        :param activations: Number of times the process woke up
+        :param seconds: Wall time spent in the process
+        """
+        self.path = path
+        self.activations = activations
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "{:s}: {:d} activations, {:.6f} s".format(self.path, self.activations, self.seconds)
+
+
+class Profile:
+    def __init__(self, top, processes=True, python=False):
+        """
+        :param top: The top level _Block of the elaborated design
+        :param processes: True to count the activations and the wall time of every process
+        :param python: True to profile the Python code of the simulation with cProfile too
+        """
+        if not processes and not python:
+            raise ProfileError("Nothing to profile, enable the processes, cProfile or both.")
+        self.processes = processes
+        self.python = python
+        self.enabled = False
+        self.frames = {}
+        self.codes = set()
+        self.stats = {}
+        for path, gen in design_processes(top).items():
+            self.stats[path] = ProcessStats(path)
+            if gen.gi_frame is not None:
+                self.frames[gen.gi_frame] = self.stats[path]
+                self.codes.add(gen.gi_code)
+        self.cprofile = cProfile.Profile() if python else None
+        self.overhead = None
+        self._tool = None
+        self._running = None
+        self._started = 0.0
+        self._calls = 0
+
+    def _trace(self, frame, event, arg):
+        if event != "call":
+            return None
+        stats = self.frames.get(frame)
+        if stats is None:
+            self._calls += 1
+            return None
+        stats.activations += 1
+        self._running = stats
+        frame.f_trace_lines = False
+        self._calls = 0
+        self._started = perf_counter()
+        return self._trace_process
+
+    def _trace_process(self, frame, event, arg):
+        if event == "return" and self._running is not None:
+            self._running.seconds += max(0.0, perf_counter() - self._started - self._calls * self.overhead)
+            self._running = None
+        return self._trace_process
+
+    def calibrate(self, calls=20000):
+        """
+        Measure the overhead of the trace function on a call, subtracted from the wall time of the processes
+        for every call they make when sys.monitoring is not available.
+        :param calls: Number of calls timed
+        :return: seconds per call
+        """
+        def probe():
+            pass
+
+        def run():
+            start = perf_counter()
+            for _ in range(calls):
+                probe()
+            return perf_counter() - start
+
+        plain = min(run() for _ in range(3))
+        sys.settrace(self._trace)
+        try:
+            traced = min(run() for _ in range(3))
+        finally:
+            sys.settrace(None)
+        return max(0.0, (traced - plain) / calls)
+
+    def _resume(self, code, offset):
+        stats = self.frames.get(sys._getframe(1))
+        if stats is not None:
+            stats.activations += 1
+            self._running = stats
+            self._started = perf_counter()
+
+    def _suspend(self, code, offset, value):
+        if self._running is not None:
+            self._running.seconds += perf_counter() - self._started
+            self._running = None
+
+    def _monitor(self, enable):
+        monitoring = sys.monitoring
+        events = monitoring.events
+        if enable:
+            tool = next((t for t in TOOL_IDS if monitoring.get_tool(t) is None), None)
+            if tool is None:
+                raise ProfileError("No free sys.monitoring tool id for the profiler.")
+            monitoring.use_tool_id(tool, "profiler")
+            monitoring.register_callback(tool, events.PY_START, self._resume)
+            monitoring.register_callback(tool, events.PY_RESUME, self._resume)
+            monitoring.register_callback(tool, events.PY_YIELD, self._suspend)
+            monitoring.register_callback(tool, events.PY_RETURN, self._suspend)
+            self._tool = tool
+        for code in self.codes:
+            monitoring.set_local_events(self._tool, code, events.PY_START | events.PY_RESUME | events.PY_YIELD |
+                                        events.PY_RETURN if enable else events.NO_EVENTS)
+        if not enable:
+            for event in (events.PY_START, events.PY_RESUME, events.PY_YIELD, events.PY_RETURN):
+                monitoring.register_callback(self._tool, event, None)
+            monitoring.free_tool_id(self._tool)
+            self._tool = None
+
+    def enable(self):
+        """
+        Start profiling the calling thread, the simulation thread.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        if self.processes:
+            self._running = None
+            if MONITORING:
+                self._monitor(True)
+            else:
+                if self.overhead is None:
+                    self.overhead = self.calibrate()
+                sys.settrace(self._trace)
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.processes:
+            if MONITORING:
+                self._monitor(False)
+            else:
+                sys.settrace(None)
+            self._running = None
+        self.enabled = False
+
+    def hot(self, n=20):
+        """
+        :param n: Number of processes, all of them when None
+        :return: list of the ProcessStats of the n processes with the most wall time
+        """
+        ranked = sorted(self.stats.values(), key=lambda s: (-s.seconds, -s.activations, s.path))
+        return ranked if n is None else ranked[:n]
+
+    def report(self, n=20, out=sys.stdout):
+        total = sum(s.seconds for s in self.stats.values())
+        print("{:>12s} {:>10s} {:>6s} {:>10s}  {:s}".format("activations", "seconds", "%", "us/act", "process"),
+              file=out)
+        for s in self.hot(n):
+            if s.activations == 0:
+                break
+            print("{:12d} {:10.4f} {:6.1f} {:10.2f}  {:s}".format(
+                s.activations, s.seconds, 100.0 * s.seconds / total if total else 0.0,
+                1e6 * s.seconds / s.activations, s.path), file=out)
+        print("{:d} processes, {:d} activations, {:.4f} s".format(
+            len(self.stats), sum(s.activations for s in self.stats.values()), total), file=out)
+
+    def folded(self, activations=False):
+        """
+        :param activations: True to weigh the stacks by activations instead of microseconds of wall time
+        :return: list of the lines of the folded stacks, one per process that ran
+        """
+        lines = []
+        for path in sorted(self.stats):
+            s = self.stats[path]
+            value = s.activations if activations else int(round(1e6 * s.seconds))
+            if value:
+                lines.append("{:s} {:d}".format(path.replace(".", ";"), value))
+        return lines
+
+    def write_folded(self, filename, activations=False):
+        with open(filename, "w") as f:
+            for line in self.folded(activations):
+                f.write(line + "\n")
+
+    def write_stats(self, filename):
+        """
+        Write the cProfile statistics, read them with "python -m pstats <file>".
+        """
+        if self.cprofile is None:
+            raise ProfileError("cProfile was not enabled for this profile.")
+        enabled = self.enabled
+        # create_stats() disables the profiler
+        self.cprofile.dump_stats(filename)
+        if enabled:
+            self.cprofile.enable()
+
+    def save(self, filename):
+        """
+        Write the folded stacks of the processes to filename and the cProfile statistics to filename.prof.
+        """
+        if self.processes:
+            self.write_folded(filename)
+        if self.cprofile is not None:
+            self.write_stats(filename + ".prof")
@@ -0,0 +1,141 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Replay engine for Wishbone transaction logs recorded by simservice (RECORD command).
+
+The transactions of the log are run back to back against a freshly built board
+with ATE.run_batch(), so no telnet client is involved and the simulator runs as
+fast as it can.  The status of every transaction and the data of every read is
+compared against the log and the differences are reported.
+
+Back to back replay removes the idle time the telnet session left between
+transactions.  Logic that depends on that time (e.g. the GPIO input
+synchronizers) may then read different data.  With --timed every transaction
+is issued at the simulation time it was recorded at, which reproduces the
+session exactly at the cost of simulating the idle time.
+
+With --profile the processes of the board are profiled during the replay
+(see hdl/ate/profiler.py): the hottest ones are printed, their folded stacks
+are written to the profile file and the cProfile statistics to <file>.prof.
+
+Usage:
+    python -m hdl.ate.replay [--timed] [--profile <profile file>] <log file> [<board name>]
+"""
+import sys
+from time import perf_counter
+from hdl.ate.ate import ATE
+from hdl.boards.common.BoardFactory import BoardFactory
+from hdl.buses.wishbone.wishbone_log import read_log, OP_READ, STATUS_OK, STATUS_ERROR
+
+
+class ReplayDifference:
+    def __init__(self, index, record, status, result):
+        self.index = index
+        self.record = record
+        self.status = status
+        self.result = result
+
+    def __repr__(self):
+        return "#{:d} {!r}: replay gave {:s} 0x{:08X}".format(self.index, self.record,
+                                                               "OK" if self.status == STATUS_OK else "ERR",
+                                                               self.result)
+
+
+def make_ate(board_name):
+    factory = BoardFactory()
+    board = factory.make_board(board_name)
+    if board is None:
+        return None
+    ate = ATE(board, board_name)
+    ate.configure_gpio(factory.get_gpio_if())
+    ate.configure_i2c(factory.get_i2c_if())
+    ate.configure_spi(factory.get_spi_if())
+    ate.configure_jtag(factory.get_jtag_if())
+    ate.configure_jtag2(factory.get_jtag2_if())
+    return ate
+
+
+def compare(records, responses):
+    """
+    Compare the logged transactions against the responses of the replay.
+    :param records: list of TransactionRecord from the log
+    :param responses: list of WishboneMaster responses from ATE.run_batch()
+    :return: list of ReplayDifference
+    """
+    differences = []
+    for index, (record, response) in enumerate(zip(records, responses)):
+        status = STATUS_ERROR if response[0] == "ERR" else STATUS_OK
+        result = response[1] if response[0] == "VAL" else 0
+        if status != record.status or (record.op == OP_READ and result != record.result):
+            differences.append(ReplayDifference(index, record, status, result))
+    return differences
+
+
+def replay_commands(records, timed=False):
+    """
+    Build the WishboneMaster commands that reproduce the logged transactions.
+    :param records: list of TransactionRecord
+    :param timed: True to issue each transaction at its recorded simulation time
+    :return: list of commands for ATE.run_batch()
+    """
+    commands = []
+    for record in records:
+        if timed:
+            # The master waits one time step between taking a command and issuing it
+            commands.append(("wait", record.time - 1, 0))
+        commands.append(record.command())
+    return commands
+
+
+def replay(log_file, board_name=None, timed=False, profile=None):
+    """
+    Replay a transaction log.
+    :param log_file: Name of the log file
+    :param board_name: Board to replay against, defaults to the board the log was recorded with
+    :param timed: True to issue each transaction at its recorded simulation time
+    :param profile: Optional file name, profile the processes and the Python code of the replay, print the
+                    hottest processes and save the profile (see Profile.save())
+    :return: tuple of (list of TransactionRecord, list of ReplayDifference, wall time in seconds)
+    """
+    logged_board, records = read_log(log_file)
+    records = list(records)
+    ate = make_ate(logged_board if board_name is None else board_name)
+    if ate is None:
+        raise ValueError("Board {:s} cannot be found!".format(logged_board if board_name is None else board_name))
+    commands = replay_commands(records, timed)
+    start = perf_counter()
+    responses = ate.run_batch(commands, profile=None if profile is None else dict(processes=True, python=True))
+    elapsed = perf_counter() - start
+    if profile is not None:
+        ate.profile.report()
+        ate.profile.save(profile)
+    return records, compare(records, responses), elapsed
+
+
+def main():
+    args = sys.argv[1:]
+    timed = "--timed" in args
+    if timed:
+        args.remove("--timed")
+    profile = None
+    if "--profile" in args:
+        i = args.index("--profile")
+        if i + 1 == len(args):
+            print(__doc__)
+            return 2
+        profile = args[i + 1]
+        del args[i:i + 2]
+    if len(args) not in (1, 2):
+        print(__doc__)
+        return 2
+    records, differences, elapsed = replay(args[0], args[1] if len(args) == 2 else None, timed, profile)
+    for difference in differences:
+        print(difference)
+    print("Replayed {:d} transactions in {:.3f} s, {:d} differences.".format(len(records), elapsed,
+                                                                           len(differences)))
+    return 1 if differences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -34,7 +34,7 @@ __version__ = "0.0.1"
 from myhdl import *
 
 # from hdl.experimental.pseudo_led import pseudo_led
-from hdl.boards.i2ctest.i2cdevice import I2CDevice
+from hdl.devices.JeffBBEx.jeffbbex import JeffBBDevice
 from hdl.boards.common.AbstractBoard import AbstractBoard
 
 
@@ -69,7 +69,7 @@ class jeffbbexbrd(AbstractBoard):
         # self.led2 = pseudo_led(self.clk, self.state2, color="GREEN")
         # self.led3 = pseudo_led(self.clk, self.state3, color="YELLOW")
         # self.led4 = pseudo_led(self.clk, self.state4, color="BLUE")
-        self.i2c_device = I2CDevice(self.clk_o, self.rst_o)
+        self.i2c_device = JeffBBDevice(self.clk_o, self.rst_o)
         self.i2c_device.configure_i2c(self.scl_o, self.scl_i, self.scl_e, self.sda_o, self.sda_i, self.sda_e)
 
         # build up the netlist for the board here
@@ -87,4 +87,4 @@ class jeffbbexbrd(AbstractBoard):
 
         # return self.led0, self.led1, self.led2, self.led3, self.led4, netlist, \
         #        self.i2c_device.rtl()
-        return netlist, self.i2c_device.rtl()
+        return netlist, self.i2c_device.rtl(monitor=False)
@@ -7,6 +7,7 @@ from hdl.boards.common.AbstractBoard import AbstractBoard
 from hdl.devices.SN74ABT8244A.SN74ABT8244A import SN74ABT8244A
 # from hdl.instruments.led.led import LED
 from hdl.instruments.PseudoLED.PseudoLED import PseudoLED
+import os.path
 
 
 class P2654Board1(AbstractBoard):
@@ -76,6 +77,28 @@ class P2654Board1(AbstractBoard):
         self.clk_o = clk_o
         self.rst_o = rst_o
 
+    def interconnect_netlist(self):
+        """
+        Boundary scan view of the netlist built by rtl() for hdl/standards/s1149dot1/interconnect.py.
+        The ATE GPIO outputs drive A1/A2 and the Y1/Y2 outputs are read back on the ATE GPIO inputs.
+        :return: tuple of the scan chain [(instance, BSDLDevice)] and the list of Net
+        """
+        from hdl.standards.s1149dot1.bsdl import parse_file
+        from hdl.standards.s1149dot1.interconnect import Net
+        device = parse_file(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                         "devices", "SN74ABT8244A", "sn74abt8244a.bsm"))
+        nets = []
+        for i in range(self.width):
+            nets.append(Net("Y1_{:d}".format(i + 1), [("U1", "Y1({:d})".format(i + 1))],
+                            [("ATE", "GPI({:d})".format(i))]))
+            nets.append(Net("Y2_{:d}".format(i + 1), [("U1", "Y2({:d})".format(i + 1))],
+                            [("ATE", "GPI({:d})".format(i + 4))]))
+            nets.append(Net("A1_{:d}".format(i + 1), [("ATE", "GPO({:d})".format(i))],
+                            [("U1", "A1({:d})".format(i + 1))]))
+            nets.append(Net("A2_{:d}".format(i + 1), [("ATE", "GPO({:d})".format(i + 4))],
+                            [("U1", "A2({:d})".format(i + 1))]))
+        return [("U1", device)], nets
+
     # def configure_gpio(self, i_gpio, o_gpio):
     #     self.i_gpio = i_gpio
     #     self.o_gpio = o_gpio
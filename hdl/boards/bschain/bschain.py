@@ -0,0 +1,263 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Board with a daisy chain of SN74ABT8244A/SN74ABT8245A boundary scan devices
+on the JTAG port, for measuring how the simulation scales with the length of
+the chain (see bschain_bench.py).
+
+TDI -> U1 -> U2 -> ... -> UN -> TDO.  The 8 outputs of every device drive
+the 8 inputs of the next one.  With loads, the ATE GPIO outputs drive the
+inputs of U1 and the outputs of UN are read back on the ATE GPIO inputs and
+shown on 8 LEDs.
+
+The board takes its arguments from STARTSIM (see BoardFactory):
+    STARTSIM BSChain:<count>[,<devices>[,loads|noloads]]
+<devices> is 8244, 8245 or mixed (8244 and 8245 alternating from U1), e.g.
+STARTSIM BSChain:32,8244,noloads
+With the icarus backend the cores of the devices, their TAP and boundary
+scan register, run under Icarus Verilog as one cosimulated block
+(device_cores), the pads, the nets, the GPIO and the LEDs stay in MyHDL.
+MyHDL exchanges the Signals with vvp once per time step, so the
+combinational A to Y path of a device in its normal mode settles later than
+with the myhdl backend, the scans clocked by TCK are not affected.  The
+icarus backend has not been run against Icarus Verilog yet, so STARTSIM does
+not offer it: only bschain_bench (icarus option) and test_cosim enable it,
+with BSChain.enable_icarus(), to compare it with the myhdl backend.
+"""
+from myhdl import *
+from hdl.boards.common.AbstractBoard import AbstractBoard
+from hdl.devices.SN74ABT8244A.SN74ABT8244A import SN74ABT8244A
+from hdl.devices.SN74ABT8245A.SN74ABT8245A import SN74ABT8245A
+from hdl.instruments.PseudoLED.PseudoLED import PseudoLED
+from hdl.common.cosim import cosimulation
+import os.path
+
+DEVICE_KINDS = ("8244", "8245", "mixed")
+LED_COLORS = ("RED", "GREEN", "YELLOW", "ORANGE", "BLUE", "VIOLET", "INDIGO", "WHITE")
+# boundary scan pins of the 8 inputs and 8 outputs of each device, in net order
+PINS = {
+    "8244": (["A1({:d})".format(i) for i in range(1, 5)] + ["A2({:d})".format(i) for i in range(1, 5)],
+             ["Y1({:d})".format(i) for i in range(1, 5)] + ["Y2({:d})".format(i) for i in range(1, 5)]),
+    "8245": (["A({:d})".format(i) for i in range(1, 9)], ["B({:d})".format(i) for i in range(1, 9)]),
+}
+BSDL_FILES = {
+    "8244": os.path.join("SN74ABT8244A", "sn74abt8244a.bsm"),
+    "8245": os.path.join("SN74ABT8245A", "sn74abt8245a.bsm"),
+}
+
+
+@block
+def net_receiver(nets, inputs):
+    """
+    Input buffers of a device: a net nobody drives reads as 0.
+    :param nets: list of TristateSignal
+    :param inputs: list of Signal(bool) to the device
+    """
+    @always(*nets)
+    def receive():
+        for i in range(len(nets)):
+            inputs[i].next = nets[i].val is not None and bool(nets[i].val)
+
+    return receive
+
+
+@block
+def gpio_driver(o_gpio, nets):
+    """
+    ATE GPIO outputs 0..len(nets)-1 driving nets of the board.
+    """
+    drivers = [net.driver() for net in nets]
+
+    @always(o_gpio)
+    def drive():
+        for i in range(len(drivers)):
+            drivers[i].next = bool(o_gpio[i])
+
+    return drive
+
+
+@block
+def gpio_sense(nets, i_gpio, states):
+    """
+    Nets of the board read back on the ATE GPIO inputs 0..len(nets)-1 and shown on the LEDs.
+    """
+    @always(*nets)
+    def sense():
+        value = 0
+        for i in range(len(nets)):
+            bit = nets[i].val is not None and bool(nets[i].val)
+            states[i].next = bit
+            value |= int(bit) << i
+        i_gpio.next = value
+
+    return sense
+
+
+@block
+def device_cores(devices, ins, outs, tdi, tck, tms, tdo):
+    """
+    The cores of the devices in series from tdi to tdo, on vectors of all their inputs and outputs so the block
+    has Signal ports only and converts to one Verilog module.
+    :param devices: list of SN74ABT8244A and SN74ABT8245A, from tdi
+    :param ins: Signal(intbv) of the inputs of the core_ports() of every device, the first device in the low bits
+    :param outs: Signal(intbv) of the outputs of the core_ports() of every device
+    """
+    scan = [tdi] + [Signal(bool(0)) for _ in range(len(devices) - 1)] + [tdo]
+    outputs = [Signal(bool(0)) for _ in range(len(outs))]
+    instances = []
+    first_in = 0
+    first_out = 0
+    for k, device in enumerate(devices):
+        in_count, out_count = [len(ports) for ports in device.core_ports()]
+        core = device.core([ins(i) for i in range(first_in, first_in + in_count)],
+                           outputs[first_out:first_out + out_count], scan[k], tck, tms, scan[k + 1])
+        instances.append(core.rtl())
+        first_in += in_count
+        first_out += out_count
+    packed = ConcatSignal(*reversed(outputs))
+
+    @always_comb
+    def pack():
+        outs.next = packed
+
+    return instances, pack
+
+
+@block
+def cosim_cores(devices, tdi, tck, tms, tdo):
+    """
+    device_cores under Icarus Verilog, connected to the core_ports() of the devices.
+    """
+    inputs = []
+    outputs = []
+    for device in devices:
+        device_inputs, device_outputs = device.core_ports()
+        inputs += device_inputs
+        outputs += device_outputs
+    packed = ConcatSignal(*reversed(inputs))
+    ins = Signal(intbv(0)[len(inputs):])
+    outs = Signal(intbv(0)[len(outputs):])
+    ports = dict(ins=ins, outs=outs, tdi=tdi, tck=tck, tms=tms, tdo=tdo)
+    cores_inst = cosimulation(device_cores(devices, **ports), "BSChainCores{:d}".format(len(devices)), **ports)
+
+    @always_comb
+    def pack():
+        ins.next = packed
+
+    @always(outs)
+    def unpack():
+        for i in range(len(outputs)):
+            outputs[i].next = outs[i]
+
+    return cores_inst, pack, unpack
+
+
+class BSChain(AbstractBoard):
+    BACKENDS = ("myhdl",)
+
+    @classmethod
+    def enable_icarus(cls):
+        """
+        Accept the icarus backend, not offered by STARTSIM until it has been measured against the myhdl backend.
+        """
+        if "icarus" not in cls.BACKENDS:
+            cls.BACKENDS = cls.BACKENDS + ("icarus",)
+
+    def __init__(self, parent, name, count=4, devices="mixed", loads="loads"):
+        """
+        :param parent: Dot path of the parent of the board
+        :param name: Instance name of the board
+        :param count: Number of devices in the chain (int or the string given to STARTSIM)
+        :param devices: "8244", "8245" or "mixed"
+        :param loads: "loads" to wire the ATE GPIO and the LEDs, "noloads" to leave them off
+        """
+        super().__init__()
+        self.parent = parent
+        self.name = name
+        self.count = int(count)
+        if self.count < 1:
+            raise ValueError("A chain needs at least one device.")
+        if devices not in DEVICE_KINDS:
+            raise ValueError("devices must be one of {:s}.".format(", ".join(DEVICE_KINDS)))
+        if loads not in ("loads", "noloads"):
+            raise ValueError("loads must be loads or noloads.")
+        self.loads = loads == "loads"
+        if devices == "mixed":
+            self.kinds = [("8244", "8245")[i % 2] for i in range(self.count)]
+        else:
+            self.kinds = [devices] * self.count
+        self.instances = ["U{:d}".format(i + 1) for i in range(self.count)]
+        self.devices = []
+        self.leds = []
+
+    def configure_syscon(self, clk_o, rst_o):
+        self.clk_o = clk_o
+        self.rst_o = rst_o
+
+    def chain(self):
+        """
+        :return: list of (instance name, device kind), first the device next to TDO
+        """
+        return list(reversed(list(zip(self.instances, self.kinds))))
+
+    def interconnect_netlist(self):
+        """
+        Boundary scan view of the netlist built by rtl() for hdl/standards/s1149dot1/interconnect.py.
+        :return: tuple of the scan chain [(instance, BSDLDevice)] and the list of Net
+        """
+        from hdl.standards.s1149dot1.bsdl import parse_file
+        from hdl.standards.s1149dot1.interconnect import Net
+        directory = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 "devices")
+        bsdl = {kind: parse_file(os.path.join(directory, BSDL_FILES[kind])) for kind in set(self.kinds)}
+        nets = []
+        for k in range(self.count - 1):
+            outputs = PINS[self.kinds[k]][1]
+            inputs = PINS[self.kinds[k + 1]][0]
+            for j in range(8):
+                nets.append(Net("{:s}_{:s}".format(self.instances[k], outputs[j]),
+                                [(self.instances[k], outputs[j])], [(self.instances[k + 1], inputs[j])]))
+        if self.loads:
+            for j in range(8):
+                nets.append(Net("GPO{:d}".format(j), [("ATE", "GPO({:d})".format(j))],
+                                [(self.instances[0], PINS[self.kinds[0]][0][j])]))
+                nets.append(Net("GPI{:d}".format(j), [(self.instances[-1], PINS[self.kinds[-1]][1][j])],
+                                [("ATE", "GPI({:d})".format(j))]))
+        return [(instance, bsdl[kind]) for instance, kind in self.chain()], nets
+
+    @block
+    def rtl(self, monitor=False):
+        # nets[k] are the 8 inputs of device k, nets[count] the outputs of the last device
+        nets = [[TristateSignal(False) for _ in range(8)] for _ in range(self.count + 1)]
+        scan = [self.tdi] + [Signal(bool(0)) for _ in range(self.count - 1)] + [self.tdo]
+        instances = []
+        self.devices = []
+        for k, (instance, kind) in enumerate(zip(self.instances, self.kinds)):
+            tdo_padoe_o = Signal(bool(0))
+            if kind == "8244":
+                inputs = [Signal(bool(0)) for _ in range(8)]
+                instances.append(net_receiver(nets[k], inputs))
+                device = SN74ABT8244A(self.parent + "." + self.name, instance, Signal(bool(0)),
+                                      nets[k + 1][:4], nets[k + 1][4:], inputs[:4], inputs[4:], Signal(bool(0)),
+                                      tdo_padoe_o, scan[k], self.tck, self.tms, scan[k + 1])
+            else:
+                device = SN74ABT8245A(self.parent + "." + self.name, instance, Signal(bool(1)),
+                                      nets[k], nets[k + 1], Signal(bool(0)),
+                                      tdo_padoe_o, scan[k], self.tck, self.tms, scan[k + 1])
+            device.configure_jtag(scan[k], self.tck, self.tms, self.trst, scan[k + 1])
+            self.devices.append(device)
+            instances.append(device.rtl(monitor=monitor, core=self.backend != "icarus"))
+        if self.backend == "icarus":
+            instances.append(cosim_cores(self.devices, self.tdi, self.tck, self.tms, self.tdo))
+
+        if self.loads:
+            states = [Signal(bool(0)) for _ in range(8)]
+            self.leds = [PseudoLED(self.parent + "." + self.name, "LED{:d}".format(i), states[i],
+                                   color=LED_COLORS[i]) for i in range(8)]
+            instances.append(gpio_driver(self.o_gpio, nets[0]))
+            instances.append(gpio_sense(nets[self.count], self.i_gpio, states))
+            for led in self.leds:
+                instances.append(led.rtl())
+
+        return instances
@@ -0,0 +1,182 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Throughput of IDCODE, BYPASS and EXTEST scans on BSChain boards of growing
+length.
+
+For every chain length the board is simulated in this process (or started on
+an ATE server), then each kind of scan is run a few times through the
+JTAGController:
+  - IDCODE: IDCODE in every 8244 (the 8245 has none and is left in BYPASS),
+    the captured identification codes are checked,
+  - BYPASS: BYPASS in every device,
+  - EXTEST: EXTEST in every device, the safe vector in all boundary registers.
+Every data register scan shifts 8 marker bits more than the chain holds and
+checks that they come out at the end of the chain, which verifies its length.
+
+Usage: python -m hdl.boards.bschain.bschain_bench [<count>,<count>,...] [8244|8245|mixed] [noloads]
+                                                  [icarus] [<scans>] [<ip>:<port>]
+Prints one line per chain length with the start up time of the simulation
+(the elaboration of the board, without a VCD trace) and the scan bits per
+second of each kind of scan.  icarus measures every chain length with the
+myhdl backend and with the device cores cosimulated under Icarus Verilog
+(see bschain.py), one line per backend, in this process only: STARTSIM does
+not offer the icarus backend.
+"""
+import sys
+import time
+from drivers.Python.atesim.atesim import JTAGController
+from hdl.devices.SN74ABT8244A.tap import tap_defines as tap8244
+from hdl.devices.SN74ABT8245A.tap import tap_defines as tap8245
+
+MARKER = 0xA5
+MARKER_BITS = 8
+# opcode of each kind of scan, the 8245 has no IDCODE register
+OPCODES = {
+    "8244": {"IDCODE": int(tap8244.IDCODE), "BYPASS": int(tap8244.BYPASS), "EXTEST": int(tap8244.EXTEST)},
+    "8245": {"IDCODE": int(tap8245.BYPASS), "BYPASS": int(tap8245.BYPASS), "EXTEST": int(tap8245.EXTEST)},
+}
+IDCODE_VALUE = int(tap8244.IDCODE_VALUE)
+SCAN_KINDS = ("IDCODE", "BYPASS", "EXTEST")
+
+
+class ChainError(Exception):
+    def __init__(self, message):
+        super(ChainError, self).__init__(message)
+
+
+class ChainScans:
+    """
+    IR and DR vectors of the scans of a BSChain board, from its interconnect netlist.
+    """
+    def __init__(self, board):
+        chain, _ = board.interconnect_netlist()
+        kinds = dict(board.chain())
+        self.devices = [(instance, kinds[instance], device) for instance, device in chain]
+        self.ir_length = sum(device.instruction_length for _, _, device in self.devices)
+        self.captured = []
+
+    def instruction(self, scan):
+        value = 0
+        shift = 0
+        for _, kind, device in self.devices:
+            value |= OPCODES[kind][scan] << shift
+            shift += device.instruction_length
+        return value
+
+    def data(self, scan):
+        """
+        :return: tuple of the DR length and the expected captured value
+        """
+        length = 0
+        expected = 0
+        for _, kind, device in self.devices:
+            if scan == "EXTEST":
+                length += device.boundary_length
+            elif scan == "IDCODE" and kind == "8244":
+                expected |= IDCODE_VALUE << length
+                length += 32
+            else:
+                length += 1
+        return length, expected
+
+    def run(self, jtag, scan):
+        """
+        Run one scan of the given kind and append (scan, TDO) to captured.
+        :return: number of bits shifted
+        """
+        jtag.scan_ir(self.ir_length, "{:0{:d}X}".format(self.instruction(scan), (self.ir_length + 3) // 4))
+        length, expected = self.data(scan)
+        count = length + MARKER_BITS
+        tdi = MARKER
+        if scan == "EXTEST":
+            vector = 0
+            shift = 0
+            for _, _, device in self.devices:
+                vector |= device.safe_vector() << shift
+                shift += device.boundary_length
+            tdi |= vector << MARKER_BITS
+        tdo = int(jtag.scan_dr(count, "{:0{:d}X}".format(tdi, (count + 3) // 4)) or "0", 16)
+        self.captured.append((scan, tdo))
+        if (tdo >> length) & ((1 << MARKER_BITS) - 1) != MARKER:
+            raise ChainError("{:s}: the marker did not come out after {:d} bits.".format(scan, length))
+        if scan == "IDCODE" and tdo & ((1 << length) - 1) != expected:
+            raise ChainError("IDCODE: captured 0x{:X}, expected 0x{:X}.".format(tdo & ((1 << length) - 1),
+                                                                                 expected))
+        return self.ir_length + count
+
+
+def benchmark(count, devices="mixed", loads="loads", scans=2, server=None, backend="myhdl"):
+    """
+    Measure one chain length.
+    :param backend: Simulation backend of the board, "myhdl" or "icarus"
+    :return: dict of the start up time, the bits per second of each kind of scan and the list of (scan, TDO)
+             of the data register scans
+    """
+    from hdl.boards.bschain.bschain import BSChain
+    if backend == "icarus":
+        BSChain.enable_icarus()
+    board_name = "BSChain:{:d},{:s},{:s}@{:s}".format(count, devices, loads, backend)
+    row = {"count": count, "backend": backend}
+    start = time.perf_counter()
+    if server is not None:
+        from drivers.Python.atesim.atesim import ATE
+        ip, _, port = server.partition(":")
+        ate_inst = ATE(ip, int(port))
+        ate_inst.connect(board_name)
+    else:
+        from hdl.ate.replay import make_ate
+        ate_inst = make_ate(board_name)
+        if ate_inst is None:
+            raise ChainError("Unable to make the board {:s}.".format(board_name))
+        ate_inst.start_simulation(trace=False, settle=0)
+    row["start_s"] = time.perf_counter() - start
+    chain = ChainScans(BSChain("TOP", "BSChain", count, devices, loads))
+    jtag = JTAGController(ate_inst)
+    try:
+        for scan in SCAN_KINDS:
+            bits = 0
+            start = time.perf_counter()
+            for _ in range(scans):
+                bits += chain.run(jtag, scan)
+            row[scan] = bits / (time.perf_counter() - start)
+    finally:
+        ate_inst.terminate()
+    row["tdo"] = chain.captured
+    return row
+
+
+def format_row(row):
+    return "{count:6d} {backend:>7s} {start_s:9.2f} {IDCODE:12.1f} {BYPASS:12.1f} {EXTEST:12.1f}".format(**row)
+
+
+def main():
+    args = sys.argv[1:]
+    server = [arg for arg in args if ":" in arg]
+    args = [arg for arg in args if ":" not in arg]
+    loads = "noloads" if "noloads" in args else "loads"
+    backends = ("myhdl", "icarus") if "icarus" in args else ("myhdl",)
+    args = [arg for arg in args if arg not in ("noloads", "icarus")]
+    devices = "mixed"
+    for kind in ("8244", "8245", "mixed"):
+        if kind in args:
+            devices = kind
+            args.remove(kind)
+    counts = [int(c) for c in args[0].split(",")] if args else [1, 2, 4, 8, 16]
+    scans = int(args[1]) if len(args) > 1 else 2
+    print("{:>6s} {:>7s} {:>9s} {:>12s} {:>12s} {:>12s}".format("N", "backend", "start s", "IDCODE b/s",
+                                                                "BYPASS b/s", "EXTEST b/s"))
+    for count in counts:
+        for backend in backends:
+            try:
+                row = benchmark(count, devices, loads, scans, server[0] if server else None, backend)
+            except ChainError as e:
+                print("{:6d} {:>7s} {:s}".format(count, backend, str(e)))
+                return 1
+            print(format_row(row))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,11 @@
 
 
 class AbstractBoard:
+    # simulation backends of the board (see hdl/common/cosim.py)
+    BACKENDS = ("myhdl",)
+
     def __init__(self):
+        self.backend = "myhdl"
         # Default ports
         # SYSCON Signals
         self.clk_o = None
@@ -41,6 +45,19 @@ class AbstractBoard:
         self.tp_o = None
         self.tp_e = None
 
+    def configure_backend(self, backend):
+        """
+        :param backend: "myhdl" to simulate the whole board in MyHDL, "icarus" to cosimulate its convertible
+                        blocks under Icarus Verilog when the board supports it
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError("Backend {:s} is not supported by this board, use {:s}.".format(
+                backend, " or ".join(self.BACKENDS)))
+        if backend == "icarus":
+            from hdl.common import cosim
+            cosim.check()
+        self.backend = backend
+
     def configure_syscon(self, clk_o, rst_o):
         self.clk_o = clk_o
         self.rst_o = rst_o
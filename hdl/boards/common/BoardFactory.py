@@ -1,23 +1,179 @@
 """
+Factory used by the simulation service to construct a board by name.
 
+Boards are kept in a registry keyed by board name.  Each entry records the
+module and class implementing the board, the constructor arguments and the
+host interfaces that must be wired to it.  The module of a board is not
+imported until the first call to make_board() for that board, so starting
+the simulation service only pays for the boards actually used.
+
+Boards that live outside of this project may be added in three ways:
+    1) calling BoardFactory.register_board() before make_board() is used,
+    2) publishing a "p2654sim.boards" entry point ("Name = package.module:Class"),
+    3) listing them in an INI style configuration file named by the
+       P2654SIM_BOARDS environment variable (or passed to BoardFactory()):
+
+        [MyBoard]
+        module = mypackage.myboard
+        class = MyBoard
+        args = TOP, MyBoard
+        interfaces = gpio, jtag
+
+Arguments may be appended to the name of a board after a colon, separated by
+commas, e.g. "STARTSIM BSChain:32,8244,noloads".  They are passed as strings
+after the registered constructor arguments.  A simulation backend among the
+BACKENDS of the board may end the name after an @ (see hdl/common/cosim.py),
+"@myhdl" or no backend simulates it all in MyHDL.
+
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
 """
+import configparser
+import importlib
+import os
+from time import perf_counter
+
 from myhdl import *
 
 from hdl.boards.common.BoardGPIOInterface import BoardGPIOInterface
 from hdl.boards.common.BoardI2CInterface import BoardI2CInterface
 from hdl.boards.common.BoardSPIInterface import BoardSPIInterface
 from hdl.boards.common.BoardJTAGInterface import BoardJTAGInterface
-from hdl.boards.gpiotest.gpiotest import GPIOTest
-from hdl.boards.i2ctest.i2ctest import I2CTest
-from hdl.boards.spitest.spitest import SPITest
-from hdl.boards.jtagtest.jtagtest import JTAGTest
-from hdl.boards.jtagtest.jtag2test import JTAG2Test
-from hdl.boards.P2654Board1.P2654Board1 import P2654Board1
-from hdl.boards.P2654Board1.P2654Board1_2 import P2654Board1_2
+from hdl.common.cosim import CosimError
+
+BOARD_ENTRY_POINT_GROUP = "p2654sim.boards"
+BOARD_CONFIG_ENV = "P2654SIM_BOARDS"
+ALL_INTERFACES = ("gpio", "i2c", "spi", "jtag", "jtag2")
+
+
+def split_backend(board_name):
+    """
+    :param board_name: Name given to STARTSIM, with optional arguments and backend ("Name:arg1,arg2@backend")
+    :return: tuple of the name without the backend and the backend, None when not given
+    """
+    name, at, backend = board_name.rpartition("@")
+    return (name, backend.strip()) if at else (board_name, None)
+
+
+def split_board_name(board_name):
+    """
+    :param board_name: Name given to STARTSIM, with optional arguments ("Name:arg1,arg2")
+    :return: tuple of the registered board name and the list of extra constructor arguments
+    """
+    name, _, args = board_name.partition(":")
+    return name, [arg.strip() for arg in args.split(",") if arg.strip()]
+
+
+class BoardRegistration:
+    def __init__(self, name, module, cls, args=(), interfaces=ALL_INTERFACES, origin="builtin"):
+        """
+        Description of a board that may be constructed by the BoardFactory
+        :param name: Name of the board as given to STARTSIM
+        :param module: Dotted path of the python module defining the board
+        :param cls: Name of the board class inside module
+        :param args: Positional arguments passed to the board constructor
+        :param interfaces: Names of the host interfaces to configure on the board (see ALL_INTERFACES)
+        :param origin: Where the registration came from (builtin, entry point, config file, API)
+        """
+        self.name = name
+        self.module = module
+        self.cls = cls
+        self.args = tuple(args)
+        self.interfaces = tuple(interfaces)
+        self.origin = origin
+        self.board_class = None
+        self.import_time = None
+
+    def load(self):
+        """
+        Import the module of the board the first time it is needed.
+        :return: The board class
+        """
+        if self.board_class is None:
+            start = perf_counter()
+            mod = importlib.import_module(self.module)
+            self.board_class = getattr(mod, self.cls)
+            self.import_time = perf_counter() - start
+            print("BoardFactory: imported {:s} from {:s} in {:.3f} s".format(self.name, self.module,
+                                                                             self.import_time))
+        return self.board_class
 
 
 class BoardFactory:
-    def __init__(self):
+    registry = {}
+    discovered = False
+
+    @classmethod
+    def register_board(cls, name, module, board_class, args=(), interfaces=ALL_INTERFACES, origin="api"):
+        """
+        Add or replace a board in the registry.  The module is not imported until the board is made.
+        :param name: Name of the board as given to STARTSIM
+        :param module: Dotted path of the python module defining the board
+        :param board_class: Name of the board class inside module
+        :param args: Positional arguments passed to the board constructor
+        :param interfaces: Names of the host interfaces to configure on the board
+        :param origin: Where the registration came from
+        """
+        for interface in interfaces:
+            if interface not in ALL_INTERFACES:
+                raise ValueError("Unknown interface {:s} for board {:s}.".format(interface, name))
+        cls.registry[name] = BoardRegistration(name, module, board_class, args, interfaces, origin)
+
+    @classmethod
+    def discover_entry_points(cls):
+        """
+        Register the boards published by installed packages under the BOARD_ENTRY_POINT_GROUP group.
+        Only the entry point text is inspected so discovery does not import the boards.
+        """
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return
+        eps = entry_points()
+        if hasattr(eps, "select"):
+            group = eps.select(group=BOARD_ENTRY_POINT_GROUP)
+        else:
+            group = eps.get(BOARD_ENTRY_POINT_GROUP, [])
+        for ep in group:
+            module, _, attr = ep.value.partition(":")
+            cls.register_board(ep.name, module.strip(), attr.strip(), origin="entry point")
+
+    @classmethod
+    def load_config(cls, config_file):
+        """
+        Register the boards described in an INI style configuration file.
+        :param config_file: Path to the configuration file
+        """
+        parser = configparser.ConfigParser()
+        if not parser.read(config_file):
+            print("BoardFactory: unable to read board configuration {:s}".format(config_file))
+            return
+        for name in parser.sections():
+            section = parser[name]
+            args = [a.strip() for a in section.get("args", "").split(",") if a.strip()]
+            interfaces = section.get("interfaces", None)
+            if interfaces is None:
+                interfaces = ALL_INTERFACES
+            else:
+                interfaces = [i.strip() for i in interfaces.split(",") if i.strip()]
+            cls.register_board(name, section["module"], section["class"], args, interfaces,
+                               origin=config_file)
+
+    @classmethod
+    def discover(cls, config_file=None):
+        """
+        Look for out of tree boards once per process.
+        :param config_file: Optional board configuration file, defaults to $P2654SIM_BOARDS
+        """
+        if config_file is None:
+            config_file = os.environ.get(BOARD_CONFIG_ENV)
+        if not cls.discovered:
+            cls.discovered = True
+            cls.discover_entry_points()
+        if config_file is not None:
+            cls.load_config(config_file)
+
+    def __init__(self, config_file=None):
         self.clk_o = Signal(bool(0))
         self.rst_o = Signal(bool(0))
         self.gpio_if = BoardGPIOInterface()
@@ -25,6 +181,7 @@ class BoardFactory:
         self.spi_if = BoardSPIInterface()
         self.jtag_if = BoardJTAGInterface()
         self.jtag2_if = BoardJTAGInterface()
+        BoardFactory.discover(config_file)
 
     def get_gpio_if(self):
         return self.gpio_if
@@ -47,39 +204,76 @@ class BoardFactory:
     def get_rst_o(self):
         return self.rst_o
 
-    def make_board(self, board_name):
-        board = None
-        if board_name == "GPIOTest":
-            board = GPIOTest()
-            board.configure_gpio(self.gpio_if)
-        elif board_name == "I2CTest":
-            board = I2CTest()
-            board.configure_gpio(self.gpio_if)
-            board.configure_i2c(self.i2c_if)
-        elif board_name == "SPITest":
-            board = SPITest()
+    def get_board_names(self):
+        return sorted(self.registry.keys())
+
+    def get_import_times(self):
+        """
+        Report the time spent importing each board module that has been loaded so far.
+        :return: dict of board name to import time in seconds
+        """
+        return {name: reg.import_time for name, reg in self.registry.items() if reg.import_time is not None}
+
+    def __configure(self, board, interfaces):
+        if "gpio" in interfaces:
             board.configure_gpio(self.gpio_if)
+        if "i2c" in interfaces:
             board.configure_i2c(self.i2c_if)
+        if "spi" in interfaces:
             board.configure_spi(self.spi_if)
+        if "jtag" in interfaces:
             board.configure_jtag(self.jtag_if)
-        elif board_name == "JTAGTest":
-            board = JTAGTest()
-            board.configure_gpio(self.gpio_if)
-            board.configure_jtag(self.jtag_if)
-        elif board_name == "JTAG2Test":
-            board = JTAG2Test()
-            board.configure_gpio(self.gpio_if)
-            board.configure_jtag2(self.jtag2_if)
-        elif board_name == "P2654Board1":
-            board = P2654Board1("TOP", "P2654Board1")
-            board.configure_gpio(self.gpio_if)
-            board.configure_jtag(self.jtag_if)
-        elif board_name == "P2654Board1_2":
-            board = P2654Board1_2("TOP", "P2654Board1_2")
-            board.configure_gpio(self.gpio_if)
+        if "jtag2" in interfaces:
             board.configure_jtag2(self.jtag2_if)
-        else:
-            board = None
-        if board is not None:
-            board.configure_syscon(self.clk_o, self.rst_o)
+
+    def make_board(self, board_name):
+        board_name, backend = split_backend(board_name)
+        name, args = split_board_name(board_name)
+        reg = self.registry.get(name)
+        if reg is None:
+            return None
+        try:
+            board_class = reg.load()
+        except (ImportError, AttributeError) as e:
+            print("BoardFactory: unable to load board {:s}: {:s}".format(board_name, str(e)))
+            return None
+        try:
+            board = board_class(*(reg.args + tuple(args)))
+        except (TypeError, ValueError) as e:
+            print("BoardFactory: bad arguments for board {:s}: {:s}".format(board_name, str(e)))
+            return None
+        if backend is not None:
+            if not hasattr(board, "configure_backend"):
+                print("BoardFactory: board {:s} has no simulation backends.".format(board_name))
+                return None
+            try:
+                board.configure_backend(backend)
+            except (ValueError, CosimError) as e:
+                print("BoardFactory: unable to use backend {:s} for board {:s}: {:s}".format(backend, board_name,
+                                                                                            str(e)))
+                return None
+        self.__configure(board, reg.interfaces)
+        board.configure_syscon(self.clk_o, self.rst_o)
         return board
+
+
+BoardFactory.register_board("GPIOTest", "hdl.boards.gpiotest.gpiotest", "GPIOTest",
+                            interfaces=("gpio",), origin="builtin")
+BoardFactory.register_board("I2CTest", "hdl.boards.i2ctest.i2ctest", "I2CTest",
+                            interfaces=("gpio", "i2c"), origin="builtin")
+BoardFactory.register_board("SPITest", "hdl.boards.spitest.spitest", "SPITest",
+                            interfaces=("gpio", "i2c", "spi", "jtag"), origin="builtin")
+BoardFactory.register_board("JTAGTest", "hdl.boards.jtagtest.jtagtest", "JTAGTest",
+                            interfaces=("gpio", "jtag"), origin="builtin")
+BoardFactory.register_board("JTAG2Test", "hdl.boards.jtagtest.jtag2test", "JTAG2Test",
+                            interfaces=("gpio", "jtag2"), origin="builtin")
+BoardFactory.register_board("DualJTAGTest", "hdl.boards.jtagtest.dualjtagtest", "DualJTAGTest",
+                            interfaces=("gpio", "jtag", "jtag2"), origin="builtin")
+BoardFactory.register_board("JeffBBExBrd", "hdl.boards.JeffBBExBrd.jeffbbexbrd", "jeffbbexbrd",
+                            interfaces=("gpio", "i2c"), origin="builtin")
+BoardFactory.register_board("P2654Board1", "hdl.boards.P2654Board1.P2654Board1", "P2654Board1",
+                            args=("TOP", "P2654Board1"), interfaces=("gpio", "jtag"), origin="builtin")
+BoardFactory.register_board("P2654Board1_2", "hdl.boards.P2654Board1.P2654Board1_2", "P2654Board1_2",
+                            args=("TOP", "P2654Board1_2"), interfaces=("gpio", "jtag2"), origin="builtin")
+BoardFactory.register_board("BSChain", "hdl.boards.bschain.bschain", "BSChain",
+                            args=("TOP", "BSChain"), interfaces=("gpio", "jtag"), origin="builtin")
@@ -0,0 +1,49 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Loopback board wired to both JTAG hosts of the ioslave, for exercising the
+two ports at the same time (see drivers/Python/atesim/scheduler.py).
+"""
+
+from myhdl import *
+
+from hdl.instruments.PseudoLED.PseudoLED import PseudoLED
+from hdl.boards.common.AbstractBoard import AbstractBoard
+
+
+class DualJTAGTest(AbstractBoard):
+    def __init__(self):
+        super().__init__()
+
+        self.clk = Signal(bool(0))
+        self.state0 = Signal(bool(0))
+        self.state1 = Signal(bool(0))
+
+        self.led0 = None
+        self.led1 = None
+
+    def configure_syscon(self, clk_o, rst_o):
+        self.clk_o = clk_o
+        self.rst_o = rst_o
+
+    @block
+    def rtl(self):
+
+        self.led0 = PseudoLED("DualJTAGTest", "LED0", self.state0, color="WHITE")
+        self.led1 = PseudoLED("DualJTAGTest", "LED1", self.state1, color="RED")
+
+        # build up the netlist for the board here
+        @always_comb
+        def netlist():
+            # Wire the LEDs to the GPIO Signals
+            self.state0.next = self.o_gpio[0]
+            self.state1.next = self.o_gpio[1]
+            self.i_gpio.next = self.o_gpio
+            # Wire the LED controller clock to the WB clock
+            self.clk.next = self.clk_o
+            # JTAG loopbacks
+            self.tdo.next = self.tdi
+            self.tdo2.next = self.tdi2
+
+        return self.led0.rtl(), self.led1.rtl(), netlist
@@ -0,0 +1,115 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Compact binary log of the transactions handled by a WishboneMaster.
+
+File layout:
+    header: MAGIC, 2 byte board name length, board name (utf-8)
+    records: RECORD_FORMAT repeated, one per transaction
+        op      1 byte  (OP_WRITE, OP_READ, OP_RESET)
+        status  1 byte  (STATUS_OK, STATUS_ERROR)
+        address 4 bytes
+        data    4 bytes (data written, 0 for a read)
+        result  4 bytes (data read, 0 for a write)
+        time    8 bytes (simulation time when the transaction was issued)
+"""
+import struct
+
+MAGIC = b"P2654WB\x01"
+RECORD_FORMAT = struct.Struct("<BBIIIQ")
+
+OP_WRITE = 0
+OP_READ = 1
+OP_RESET = 2
+OP_NAMES = {OP_WRITE: "write", OP_READ: "read", OP_RESET: "reset"}
+OP_CODES = {name: op for op, name in OP_NAMES.items()}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class WishboneLogError(Exception):
+    def __init__(self, message):
+        super(WishboneLogError, self).__init__(message)
+
+
+class TransactionRecord:
+    __slots__ = ("op", "status", "address", "data", "result", "time")
+
+    def __init__(self, op, status, address, data, result, time):
+        self.op = op
+        self.status = status
+        self.address = address
+        self.data = data
+        self.result = result
+        self.time = time
+
+    def command(self):
+        """
+        :return: the WishboneMaster queue command that reproduces this transaction
+        """
+        return OP_NAMES[self.op], self.address, self.data
+
+    def __repr__(self):
+        return "{:s}(0x{:08X}, 0x{:08X}) -> {:s} 0x{:08X} @ {:d}".format(
+            OP_NAMES[self.op], self.address, self.data, "OK" if self.status == STATUS_OK else "ERR",
+            self.result, self.time)
+
+
+class TransactionRecorder:
+    def __init__(self, filename, board_name):
+        """
+        Open a log file for writing
+        :param filename: Name of the log file
+        :param board_name: Name of the board the transactions are run against
+        """
+        self.filename = filename
+        self.board_name = board_name
+        self.count = 0
+        self.f = open(filename, "wb")
+        name = board_name.encode("utf-8")
+        self.f.write(MAGIC + struct.pack("<H", len(name)) + name)
+
+    def record(self, cmd, response, time):
+        """
+        Append one transaction to the log.
+        :param cmd: Command taken from the WishboneMaster queue (op name, address, data)
+        :param response: Response put on the WishboneMaster result queue (kind, value)
+        :param time: Simulation time the transaction was issued at
+        """
+        status = STATUS_ERROR if response[0] == "ERR" else STATUS_OK
+        result = response[1] if response[0] == "VAL" else 0
+        self.f.write(RECORD_FORMAT.pack(OP_CODES[cmd[0]], status, cmd[1] & 0xFFFFFFFF, cmd[2] & 0xFFFFFFFF,
+                                        result & 0xFFFFFFFF, time))
+        self.count += 1
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def read_log(filename):
+    """
+    Read back a transaction log.
+    :param filename: Name of the log file
+    :return: tuple of (board name, generator of TransactionRecord)
+    """
+    f = open(filename, "rb")
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        f.close()
+        raise WishboneLogError("{:s} is not a Wishbone transaction log.".format(filename))
+    length, = struct.unpack("<H", f.read(2))
+    board_name = f.read(length).decode("utf-8")
+
+    def records():
+        with f:
+            while True:
+                chunk = f.read(RECORD_FORMAT.size)
+                if len(chunk) < RECORD_FORMAT.size:
+                    break
+                yield TransactionRecord(*RECORD_FORMAT.unpack(chunk))
+
+    return board_name, records()
@@ -4,7 +4,6 @@ See the licence file in the top directory
 """
 
 from myhdl import *
-from time import sleep
 try:
     from Queue import Queue as pyQueue
 except ImportError:
@@ -39,6 +38,13 @@ class WishboneMaster:
         self.done = Signal(bool(0))
         # bus transaction timeout in clock ticks
         self.timeout = 10000
+        # optional TransactionRecorder logging every transaction (see wishbone_log.py)
+        self.recorder = None
+
+    def _respond(self, cmd, response, start):
+        if self.recorder is not None:
+            self.recorder.record(cmd, response, start)
+        self.R.put(response)
 
     @block
     def rtl(self, monitor=False):
@@ -100,12 +106,22 @@ class WishboneMaster:
                 # yield self.Q.get()
                 # cmd = self.Q.item
                 cmd = self.Q.get()
+                if cmd[0] == "call":
+                    # Run a function in the simulation thread while the bus is idle
+                    self.R.put(("VAL", cmd[1]()))
+                    continue
+                elif cmd[0] == "wait":
+                    # Leave the bus idle until the given simulation time (replay of a recorded session)
+                    if cmd[1] > now():
+                        yield delay(cmd[1] - now())
+                    continue
+                start = now()
                 print("cmd = (", cmd[0], " ", hex(cmd[1]), " ",  hex(cmd[2]), ")")
                 if cmd[0] == "reset":
                     self.localReset.next = bool(1)
                     yield self.wb_interface.rst_i.posedge
                     self.localReset.next = bool(0)
-                    self.R.put(("DONE", 0))
+                    self._respond(cmd, ("DONE", 0), start)
                 elif cmd[0] == "write":
                     print("Processing Write")
                     self._write.next = True
@@ -123,12 +139,16 @@ class WishboneMaster:
                     while not self.done and to < self.timeout:
                         yield self.wb_interface.clk_i.posedge
                         to += 1
+                    # The registered acknowledge of the slaves lags the strobe: let it drop before the next cycle starts
+                    while self.wb_interface.ack and to < self.timeout:
+                        yield self.wb_interface.clk_i.posedge
+                        to += 1
                     print("to = ", to)
                     if to == self.timeout:
-                        self.R.put(("ERR", "TIMEOUT"))
+                        self._respond(cmd, ("ERR", "TIMEOUT"), start)
                     else:
                         # Return status
-                        self.R.put(("OK", 0))
+                        self._respond(cmd, ("OK", 0), start)
                 elif cmd[0] == "read":
                     print("Processing Read")
                     self._write.next = False
@@ -147,14 +167,17 @@ class WishboneMaster:
                         self._read_data = int(self.wb_interface.dat_o)
                     self._write.next = False
                     self._read.next = False
+                    while self.wb_interface.ack and to < self.timeout:
+                        yield self.wb_interface.clk_i.posedge
+                        to += 1
                     if to == self.timeout:
-                        self.R.put(("ERR", "TIMEOUT"))
+                        self._respond(cmd, ("ERR", "TIMEOUT"), start)
                     else:
                         # Return value
                         # print("ReadQueue: value read = ", hex(self._read_data))
                         # print("self.wb_interface.adr = ", hex(self.wb_interface.adr))
                         # print("self.wb_interface.dat_o = ", hex(self.wb_interface.dat_o))
-                        self.R.put(("VAL", self._read_data))
+                        self._respond(cmd, ("VAL", self._read_data), start)
                 elif cmd[0] == "terminate":
                     # print("Processing terminate")
                     self.R.put(("DONE", 0))
@@ -177,8 +200,6 @@ class WishboneMaster:
     def write(self, addr, data):
         print("Entering wb write.")
         self.Q.put(("write", addr, data))
-        while not self.Q.empty():
-            sleep(0.1)
         ret = self.R.get()
         if ret[0] == "ERR":
             self.error = ret[1]
@@ -192,8 +213,6 @@ class WishboneMaster:
     def read(self, addr):
         print("Entering wb read!")
         self.Q.put(("read", addr, 0))
-        while not self.Q.empty():
-            sleep(0.1)
         ret = self.R.get()
         if ret[0] == "ERR":
             self.error = ret[1]
@@ -208,8 +227,6 @@ class WishboneMaster:
 
     def terminate(self):
         self.Q.put(("terminate", 0, 0))
-        while not self.Q.empty():
-            sleep(0.1)
         ret = self.R.get()
         if ret[0] == "ERR":
             self.error = ret[1]
@@ -220,6 +237,16 @@ class WishboneMaster:
             self.error = "UNKNOWN"
             return False
 
+    def call(self, func):
+        """
+        Run func in the simulation thread between two bus transactions.
+        :param func: function taking no arguments
+        :return: the value returned by func
+        """
+        self.Q.put(("call", func, 0))
+        ret = self.R.get()
+        return ret[1]
+
     def get_value(self):
         return self.value
 
@@ -228,8 +255,6 @@ class WishboneMaster:
 
     def reset_bus(self):
         self.Q.put(("reset", 0, 0))
-        while not self.Q.empty():
-            sleep(0.1)
         ret = self.R.get()
         if ret[0] == "ERR":
             self.error = ret[1]
@@ -8,7 +8,7 @@ from myhdl import *
 
 
 @block
-def i2cslave_RW(scl_i, sda_i, sda_oen, reset_n, dataIn, dataOut, regAddr, writeEn, autoincrement=False):
+def i2cslave_RW(scl_i, sda_i, sda_oen, reset_n, dataIn, dataOut, regAddr, writeEn, autoincrement=False, hold=()):
     """
     :param scl_i: I2C Clock pin
     :param sda_i: I2C data input
@@ -18,7 +18,10 @@ def i2cslave_RW(scl_i, sda_i, sda_oen, reset_n, dataIn, dataOut, regAddr, writeE
     :param dataOut: Signal(intbv(0)[8:]) data bus to be written to by the I2C bus
     :param regAddr: Signal(modbv(0)[8:]) register address to be read or written to
     :param writeEn: Write enable signal triggering the writing to a register
+    :param autoincrement: True to step regAddr after every byte of a multi-byte transfer
+    :param hold: Register addresses autoincrement stops at, so a multi-byte write streams into one register
     """
+    HOLD = tuple(int(i in hold) for i in range(256))
     # Start detector logic
     start_detect = Signal(bool(0))
     start_resetter = Signal(bool(1))
@@ -181,7 +184,7 @@ def i2cslave_RW(scl_i, sda_i, sda_oen, reset_n, dataIn, dataOut, regAddr, writeE
         elif ack_bit:
             if state == STATE_IDX_PTR:
                 regAddr.next = dataOut
-            elif autoincrement:
+            elif autoincrement and not HOLD[int(regAddr)]:
                 regAddr.next = regAddr + 1
 
     # Read of registers needs to be done with an dataIn register
@@ -0,0 +1,296 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Conversion of the myHDL blocks to VHDL and Verilog, skipping the unchanged ones.
+
+Most modules of hdl have a convert() function writing the VHDL and Verilog
+of the block and of its test bench into the vhdl and verilog directories
+beside the module.  convert_all() finds these modules and calls their
+convert() functions in a process pool, each module in its own worker
+process.  Each conversion is keyed by the SHA-256 hash of
+  - the source of the module and of every hdl module it imports, directly
+    or through other hdl modules,
+  - the conversion parameters: the myHDL version and VERSION of this driver.
+The manifest records the key of every module and the files its convert()
+wrote with their hashes.  A module is converted again only when its key
+changed or when one of its files was removed or edited since.  A conversion
+that fails is recorded in the manifest with its error and retried on the
+next run.
+
+Usage: python -m hdl.common.convertcache [-j <processes>] [-m <manifest>] [-f] [<module|pattern> ...]
+Converts the modules matching the fnmatch patterns (e.g. "hdl.standards.s1500.*"), every module with a
+convert() function by default.  -f converts the modules even when they did not change.
+Prints one line per module and writes the manifest, convert_manifest.json in the top directory by default.
+"""
+import ast
+import contextlib
+import fnmatch
+import glob
+import hashlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import os.path
+import sys
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import myhdl
+from myhdl._block import _Block
+from hdl.common.filecache import file_hash
+
+VERSION = 1
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MANIFEST = os.path.join(ROOT, "convert_manifest.json")
+
+CONVERTED = "converted"
+UNCHANGED = "unchanged"
+ERROR = "error"
+
+
+class ConvertError(Exception):
+    def __init__(self, message):
+        super(ConvertError, self).__init__(message)
+
+
+class ConversionResult:
+    def __init__(self, module, key, status, outputs=None, message="", seconds=0.0):
+        """
+        :param module: Dotted name of the module
+        :param key: Hex hash of the sources and parameters of the conversion
+        :param status: CONVERTED, UNCHANGED or ERROR
+        :param outputs: dict file name relative to ROOT -> hex SHA-256 of the file written
+        :param message: Error of a failed conversion
+        :param seconds: Run time of convert()
+        """
+        self.module = module
+        self.key = key
+        self.status = status
+        self.outputs = outputs or {}
+        self.message = message
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "{:s}: {:s}{:s}".format(self.module, self.status, " " + self.message if self.message else "")
+
+    def entry(self):
+        return dict(key=self.key, status=self.status, outputs=self.outputs, message=self.message,
+                    seconds=round(self.seconds, 3))
+
+
+def module_file(module):
+    return os.path.join(ROOT, *module.split(".")) + ".py"
+
+
+def _tree(module):
+    with open(module_file(module), "rb") as f:
+        return ast.parse(f.read(), module_file(module))
+
+
+def find_converters(patterns=None):
+    """
+    :param patterns: list of fnmatch patterns of dotted module names, every module by default
+    :return: sorted list of the dotted names of the hdl modules with a top level convert() function
+    """
+    modules = []
+    for directory, _, files in os.walk(os.path.join(ROOT, "hdl")):
+        for filename in files:
+            if not filename.endswith(".py"):
+                continue
+            module = os.path.relpath(os.path.join(directory, filename[:-3]), ROOT).replace(os.sep, ".")
+            if patterns and not any(fnmatch.fnmatchcase(module, pattern) for pattern in patterns):
+                continue
+            try:
+                tree = _tree(module)
+            except SyntaxError:
+                continue
+            if any(isinstance(node, ast.FunctionDef) and node.name == "convert" for node in tree.body):
+                modules.append(module)
+    return sorted(modules)
+
+
+def dependencies(module):
+    """
+    :return: sorted list of the module and of the hdl modules it imports, directly or not
+    """
+    found = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        if name in found or not os.path.isfile(module_file(name)):
+            continue
+        found.add(name)
+        for node in ast.walk(_tree(name)):
+            if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module] + [node.module + "." + alias.name for alias in node.names]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                continue
+            pending += [imported for imported in names if imported.split(".")[0] == "hdl"]
+    return sorted(found)
+
+
+def conversion_key(module):
+    """
+    :return: hex SHA-256 of the sources of the module and its dependencies and of the conversion parameters
+    """
+    digest = hashlib.sha256()
+    digest.update("{:d} {:s}\n".format(VERSION, myhdl.__version__).encode())
+    for name in dependencies(module):
+        digest.update("{:s} {:s}\n".format(name, file_hash(module_file(name))).encode())
+    return digest.hexdigest()
+
+
+def _outputs(calls):
+    """
+    :param calls: list of (hdl, directory, name) of the _Block.convert calls
+    :return: dict file name relative to ROOT -> hex SHA-256 of the files written by the calls, without the
+             pck_myhdl package every VHDL conversion of a directory writes again
+    """
+    outputs = {}
+    for hdl, directory, name in calls:
+        for pattern in (name + ".*", "tb_" + name + ".*"):
+            for filename in glob.glob(os.path.join(glob.escape(directory), pattern)):
+                outputs[os.path.relpath(filename, ROOT)] = file_hash(filename)
+    return outputs
+
+
+def convert_module(job):
+    """
+    Worker of convert_all: call the convert() function of a module, quietly, in a temporary working directory
+    receiving the files the test benches open when they are elaborated.
+    :param job: tuple of (module, key)
+    :return: ConversionResult
+    """
+    module, key = job
+    calls = []
+    block_convert = _Block.convert
+
+    def recording_convert(self, hdl="Verilog", **kwargs):
+        calls.append((hdl, os.path.abspath(kwargs.get("directory") or "."), kwargs.get("name") or self.func.__name__))
+        return block_convert(self, hdl, **kwargs)
+
+    start = perf_counter()
+    cwd = os.getcwd()
+    _Block.convert = recording_convert
+    try:
+        with tempfile.TemporaryDirectory() as directory, warnings.catch_warnings(), \
+                contextlib.redirect_stdout(io.StringIO()):
+            warnings.simplefilter("ignore")
+            os.chdir(directory)
+            try:
+                importlib.import_module(module).convert()
+            finally:
+                os.chdir(cwd)
+    except Exception as e:
+        return ConversionResult(module, key, ERROR, _outputs(calls), "{:s}: {:s}".format(type(e).__name__, str(e)),
+                                perf_counter() - start)
+    finally:
+        _Block.convert = block_convert
+    return ConversionResult(module, key, CONVERTED, _outputs(calls), seconds=perf_counter() - start)
+
+
+def read_manifest(manifest):
+    """
+    :return: dict module -> manifest entry, empty when there is no manifest
+    """
+    try:
+        with open(manifest) as f:
+            return json.load(f)["modules"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_manifest(manifest, entries):
+    tmp = manifest + ".{:d}".format(os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(dict(version=VERSION, myhdl=myhdl.__version__, modules=entries), f, indent=2, sort_keys=True)
+    os.replace(tmp, manifest)
+
+
+def unchanged(entry, key):
+    """
+    :return: True when the manifest entry was converted with the key and its files are still the ones written
+    """
+    if entry is None or entry.get("key") != key or entry.get("status") == ERROR or not entry.get("outputs"):
+        return False
+    for filename, digest in entry["outputs"].items():
+        path = os.path.join(ROOT, filename)
+        if not os.path.isfile(path) or file_hash(path) != digest:
+            return False
+    return True
+
+
+def convert_all(patterns=None, manifest=MANIFEST, processes=None, force=False):
+    """
+    Convert the modules that changed since the conversion recorded in the manifest.
+    :param patterns: list of fnmatch patterns of dotted module names, every module with a convert() by default
+    :param manifest: File name of the manifest, read then written back
+    :param processes: Number of worker processes, the number of cores by default
+    :param force: True to convert the unchanged modules too
+    :return: list of ConversionResult in the order of the module names
+    """
+    modules = find_converters(patterns)
+    if patterns and not modules:
+        raise ConvertError("No module with a convert() function matches {:s}.".format(" ".join(patterns)))
+    entries = read_manifest(manifest)
+    results = {}
+    jobs = []
+    for module in modules:
+        key = conversion_key(module)
+        if not force and unchanged(entries.get(module), key):
+            results[module] = ConversionResult(module, key, UNCHANGED, entries[module]["outputs"])
+        else:
+            jobs.append((module, key))
+    processes = max(1, min(processes or os.cpu_count() or 1, len(jobs)))
+    if processes == 1:
+        converted = [convert_module(job) for job in jobs]
+    else:
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            converted = list(executor.map(convert_module, jobs))
+    for result in converted:
+        results[result.module] = result
+        entries[result.module] = result.entry()
+    if converted:
+        write_manifest(manifest, entries)
+    return [results[module] for module in modules]
+
+
+def report(results, out=sys.stdout):
+    for result in results:
+        print("{:10s} {:8.2f} s  {:s}  {:s}".format(result.status, result.seconds, result.module, result.message),
+              file=out)
+    counts = {status: sum(1 for r in results if r.status == status) for status in (CONVERTED, UNCHANGED, ERROR)}
+    print("{:d} modules, {:d} converted, {:d} unchanged, {:d} errors".format(
+        len(results), counts[CONVERTED], counts[UNCHANGED], counts[ERROR]), file=out)
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for option in ("-j", "-m"):
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    force = "-f" in args
+    args = [arg for arg in args if arg != "-f"]
+    start = perf_counter()
+    try:
+        results = convert_all(args or None, options.get("-m", MANIFEST), int(options.get("-j", 0)) or None, force)
+    except ConvertError as e:
+        print(str(e))
+        return 2
+    report(results)
+    print("{:.2f} s".format(perf_counter() - start))
+    return 1 if any(result.status == ERROR for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Cosimulation of convertible blocks with a locally installed Icarus Verilog.
+
+cosimulation() converts a block to Verilog with the test bench MyHDL writes
+for it, compiles them with iverilog and returns the MyHDL Cosimulation
+running the result under vvp, connected to the Signals of the ports of the
+block.  The Python side keeps everything that is not convertible.  MyHDL
+allows a single Cosimulation per simulation, so a board puts all its
+convertible blocks under one top level block (see BSChain).
+
+The compiled files are kept in CACHE_DIR/cosim when P2654SIM_CACHE names a
+directory (see filecache.py), else in a temporary directory for the life of
+the process, keyed by the SHA-256 hash of the Verilog, so a board that did
+not change is not compiled again.  Icarus needs the myhdl.vpi module built from the
+cosimulation/icarus directory of the MyHDL sources, found in the usual
+Icarus module directories or named by the MYHDL_VPI environment variable.
+"""
+import hashlib
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+from myhdl import Cosimulation
+from hdl.common.filecache import CACHE_DIR
+
+VPI_ENV = "MYHDL_VPI"
+VPI_DIRS = (os.path.join(sys.prefix, "lib", "ivl"), "/usr/local/lib/ivl", "/usr/lib/ivl",
+            "/usr/lib/x86_64-linux-gnu/ivl")
+
+_build_dir = None
+
+
+class CosimError(Exception):
+    def __init__(self, message):
+        super(CosimError, self).__init__(message)
+
+
+def find_vpi():
+    """
+    :return: path of myhdl.vpi, None when it is not found
+    """
+    if os.environ.get(VPI_ENV):
+        return os.environ[VPI_ENV] if os.path.isfile(os.environ[VPI_ENV]) else None
+    for directory in VPI_DIRS:
+        vpi = os.path.join(directory, "myhdl.vpi")
+        if os.path.isfile(vpi):
+            return vpi
+    return None
+
+
+def check():
+    """
+    Check that Icarus Verilog and myhdl.vpi are installed.
+    :return: path of myhdl.vpi
+    """
+    missing = [tool for tool in ("iverilog", "vvp") if shutil.which(tool) is None]
+    if missing:
+        raise CosimError("The icarus backend needs Icarus Verilog, {:s} not found.".format(" and ".join(missing)))
+    vpi = find_vpi()
+    if vpi is None:
+        raise CosimError("The icarus backend needs myhdl.vpi, build it from the cosimulation/icarus directory of "
+                         "the MyHDL sources and set {:s} to its path.".format(VPI_ENV))
+    return vpi
+
+
+def build_dir():
+    """
+    :return: directory of the compiled files, a temporary one for the process when the cache is off
+    """
+    global _build_dir
+    if _build_dir is None:
+        if CACHE_DIR.lower() == "off":
+            _build_dir = tempfile.mkdtemp(prefix="p2654cosim")
+        else:
+            _build_dir = os.path.join(CACHE_DIR, "cosim")
+            os.makedirs(_build_dir, exist_ok=True)
+    return _build_dir
+
+
+def compile_block(block_inst, name):
+    """
+    Convert a block to Verilog with its test bench and compile them, unless the same Verilog was compiled before.
+    :param block_inst: Elaborated block with Signal ports only
+    :param name: Name of the Verilog module
+    :return: path of the compiled vvp file
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        block_inst.convert(hdl="Verilog", directory=directory, name=name, initial_values=True)
+        sources = [os.path.join(directory, name + ".v"), os.path.join(directory, "tb_" + name + ".v")]
+        digest = hashlib.sha256()
+        for source in sources:
+            with open(source) as f:
+                # the header holds the date of the conversion
+                digest.update("".join(line for line in f if not line.startswith("// Date:")).encode())
+        vvp = os.path.join(build_dir(), "{:s}-{:s}.vvp".format(name, digest.hexdigest()))
+        if os.path.isfile(vvp):
+            return vvp
+        tmp = vvp + ".{:d}".format(os.getpid())
+        result = subprocess.run(["iverilog", "-o", tmp] + sources, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+        if result.returncode != 0:
+            raise CosimError("iverilog failed on {:s}:\n{:s}".format(name, result.stdout))
+        os.replace(tmp, vvp)
+    return vvp
+
+
+def cosimulation(block_inst, name, **ports):
+    """
+    :param block_inst: Elaborated block with Signal ports only, built on the Signals of ports
+    :param name: Name of the Verilog module
+    :param ports: Signals of the ports of the block by the names of its arguments
+    :return: Cosimulation of the block under vvp
+    """
+    vpi = check()
+    vvp = compile_block(block_inst, name)
+    print("cosim: {:s} runs under vvp ({:s})".format(name, os.path.basename(vvp)))
+    return Cosimulation(["vvp", "-m", vpi, vvp], **ports)
@@ -0,0 +1,74 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Cache of the objects built from description files (ICL, BSDL, ...).
+
+Entries are keyed by the SHA-256 hash of the file content, so an edited file
+is rebuilt automatically and a renamed or copied file is not.  Built objects
+are kept in memory for the life of the process.  Set P2654SIM_CACHE to a
+directory to also pickle them to it, so later processes can skip the
+parsing.  The pickles are loaded back without any check, so only name a
+directory that nobody else writes to.  The default, "off", keeps the cache
+in memory only.
+"""
+import hashlib
+import os
+import os.path
+import pickle
+
+CACHE_ENV = "P2654SIM_CACHE"
+CACHE_DIR = os.environ.get(CACHE_ENV, "off")
+
+_memory = {}
+
+
+def file_hash(filename):
+    """
+    :param filename: Name of the file to hash
+    :return: hex SHA-256 digest of the file content
+    """
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cached(filename, kind, version, builder):
+    """
+    Return the object built from a file, building it only when the file content is new.
+    :param filename: Name of the description file
+    :param kind: Short name of the kind of object built (used for the cache sub-directory)
+    :param version: Version of the builder, bump it when the built object changes shape
+    :param builder: function(filename) building the object
+    :return: the built object
+    """
+    key = (kind, version, file_hash(filename))
+    if key in _memory:
+        return _memory[key]
+    disk = None
+    if CACHE_DIR.lower() != "off":
+        disk = os.path.join(CACHE_DIR, kind, "{:d}-{:s}.pickle".format(version, key[2]))
+        try:
+            with open(disk, "rb") as f:
+                _memory[key] = pickle.load(f)
+                return _memory[key]
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+    obj = builder(filename)
+    _memory[key] = obj
+    if disk is not None:
+        try:
+            os.makedirs(os.path.dirname(disk), exist_ok=True)
+            tmp = disk + ".{:d}".format(os.getpid())
+            with open(tmp, "wb") as f:
+                pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, disk)
+        except OSError:
+            pass
+    return obj
+
+
+def clear():
+    """
+    Forget the objects held in memory.  The files in CACHE_DIR are kept.
+    """
+    _memory.clear()
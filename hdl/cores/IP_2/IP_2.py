@@ -21,7 +21,7 @@ period = 20  # clk frequency = 50 MHz
 def IP_2(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
          fast_ck, ck,
          pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-         monitor=False):
+         monitor=False, change_driven=False):
     """
     Logic core IP_2 for Rearick use case model.  This IP defines the 1687 network topology for the IP_2 network.
     :param path: Dot path of the parent of this instance
@@ -48,6 +48,7 @@ def IP_2(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
             that changes over time depending on the operation being performed.  The power monitor would
             monitor this value and report how much total power in the system is being used.
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate the monitoring instruments only after their inputs changed
     :return: list of generators for the IP_2 logic for simulation.
     """
     noise = Signal(intbv(0, min=0, max=MAX_TOGGLES*MAX_STAGES))
@@ -89,7 +90,7 @@ def IP_2(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
                                 sib2_from_so, num_stages, num_stages, dr_width=4, monitor=monitor)
     psm_inst = power_supply_monitor(path + "." + name, "PSM0", reference, delta, fast_ck, over, under,
                                     noise, pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-                                    noise_flag, monitor=monitor)
+                                    noise_flag, monitor=monitor, change_driven=change_driven)
     nm_inst = noise_maker(path + "." + name, "NM0", num_toggles, num_stages, ck, noise, monitor=monitor)
 
     @always_comb
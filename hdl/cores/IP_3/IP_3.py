@@ -15,6 +15,9 @@ from hdl.standards.s1500.wby import wby
 from hdl.standards.s1500.WSReg import WSReg
 from hdl.standards.s1500.wdrmux import WDRmux
 from hdl.standards.s1500.wirmux import WIRmux
+from hdl.standards.s1500.wrapper import wrapper
+from hdl.standards.s1687.icl_network import load_network
+from hdl.standards.s1687.behavioural import behavioural_network
 from hdl.instruments.power_supply_monitor.power_supply_monitor import power_supply_monitor
 from hdl.instruments.noise_maker.noise_maker import noise_maker
 from hdl.instruments.noise_maker.noise_maker import MAX_STAGES, MAX_TOGGLES
@@ -33,7 +36,8 @@ period = 20  # clk frequency = 50 MHz
 def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
          fast_ck, ck,
          pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-         monitor=False):
+         monitor=False, change_driven=False, behavioural_wrapper=False, time_skip=False,
+         behavioural=False):
     """
     Logic core IP_3 for Rearick use case model.  This IP defines the 1687 network topology for the IP_3 network.
     :param path: Dot path of the parent of this instance
@@ -60,9 +64,17 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
             that changes over time depending on the operation being performed.  The power monitor would
             monitor this value and report how much total power in the system is being used.
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate the monitoring instruments only after their inputs changed
+    :param behavioural_wrapper: True to simulate the 1500 wrapper of the MBISTs with the behavioural wrapper
+                    instead of the wir, wby, WSReg, WDRmux and WIRmux blocks
+    :param time_skip: True to run the MBISTs with the time_skip model of simulatedmbist
+    :param behavioural: True to simulate the whole 1687 network (SIBs, SELWIR, wrapper and SRegs) with
+                    behavioural_network built from the ICL model of IP_3 instead of the RTL
     :return: list of generators for the IP_3 logic for simulation.
     """
-    sib1_to_ijtag_interface = IJTAGInterface()
+    # the SIBs pass RESET, CLOCK, CAPTURE, SHIFT and UPDATE through, only SELECT which the instruments
+    # do not use is gated
+    sib1_to_ijtag_interface = from_ijtag_interface if behavioural else IJTAGInterface()
     sib1_to_sib2_so = Signal(bool(0))
     sib2_to_sib3_so = Signal(bool(0))
     sib1_to_si = Signal(bool(0))
@@ -100,40 +112,47 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
     select_mbist2 = Signal(bool(0))
     select_mbist3 = Signal(bool(0))
 
-    sib1_inst = sib_mux_post(path + "." + name, "SIB1", ijtag_si, from_ijtag_interface, sib1_to_sib2_so,
-                             sib1_to_si, sib1_to_ijtag_interface, sib1_from_so, monitor=monitor)
-    selwir_inst = SELWIR(path + "." + name, "SELWIR", sib1_to_si, sib1_to_ijtag_interface, selwir_to_wdr_so,
-                         select_wir, monitor=False)
-    wir_inst = wir(path + "." + name, "WIR", selwir_to_wdr_so, wsp_interface, wir_so, wr_list, user_list,
-                   wr_select_list, dr_select_list, monitor=False)
-    wdrmux_inst = WDRmux(path + "." + name, "WDRMux", wby_wso, mbist1_out, mbist2_out, mbist3_out,
-                         wr_select_list, dr_select_list, wdr_so, monitor=False)
-    wirmux_inst = WIRmux(path + "." + name, "WIRMux", wdr_so, wir_so, select_wir, sib1_from_so, monitor=False)
-    wby_inst = wby(path + "." + name, "WBY", selwir_to_wdr_so, wsp_interface,
-                   select_wby, wby_wso, monitor=False)
-    mbist1_inst = WSReg(path + "." + name, 'MBIST_WSReg1', selwir_to_wdr_so, wsp_interface,
-                        select_mbist1, mbist1_out, sr1, cr1, dr_width=8, monitor=False)
-    mbist2_inst = WSReg(path + "." + name, 'MBIST_WSReg2', selwir_to_wdr_so, wsp_interface,
-                        select_mbist2, mbist2_out, sr2, cr2, dr_width=8, monitor=False)
-    mbist3_inst = WSReg(path + "." + name, 'MBIST_WSReg3', selwir_to_wdr_so, wsp_interface,
-                        select_mbist3, mbist3_out,sr3, cr3, dr_width=8, monitor=False)
+    if not behavioural:
+        sib1_inst = sib_mux_post(path + "." + name, "SIB1", ijtag_si, from_ijtag_interface, sib1_to_sib2_so,
+                                 sib1_to_si, sib1_to_ijtag_interface, sib1_from_so, monitor=monitor)
+        selwir_inst = SELWIR(path + "." + name, "SELWIR", sib1_to_si, sib1_to_ijtag_interface, selwir_to_wdr_so,
+                             select_wir, monitor=False)
+        if behavioural_wrapper:
+            wrapper_insts = wrapper(path + "." + name, "WRAPPER", selwir_to_wdr_so, wsp_interface, sib1_from_so,
+                                    wr_list, user_list, wr_select_list, dr_select_list,
+                                    [(sr1, cr1), (sr2, cr2), (sr3, cr3)], select_wir=select_wir, monitor=False)
+        else:
+            wir_inst = wir(path + "." + name, "WIR", selwir_to_wdr_so, wsp_interface, wir_so, wr_list, user_list,
+                           wr_select_list, dr_select_list, monitor=False)
+            wdrmux_inst = WDRmux(path + "." + name, "WDRMux", wby_wso, mbist1_out, mbist2_out, mbist3_out,
+                                 wr_select_list, dr_select_list, wdr_so, monitor=False)
+            wirmux_inst = WIRmux(path + "." + name, "WIRMux", wdr_so, wir_so, select_wir, sib1_from_so, monitor=False)
+            wby_inst = wby(path + "." + name, "WBY", selwir_to_wdr_so, wsp_interface,
+                           select_wby, wby_wso, monitor=False)
+            mbist1_inst = WSReg(path + "." + name, 'MBIST_WSReg1', selwir_to_wdr_so, wsp_interface,
+                                select_mbist1, mbist1_out, sr1, cr1, dr_width=8, monitor=False)
+            mbist2_inst = WSReg(path + "." + name, 'MBIST_WSReg2', selwir_to_wdr_so, wsp_interface,
+                                select_mbist2, mbist2_out, sr2, cr2, dr_width=8, monitor=False)
+            mbist3_inst = WSReg(path + "." + name, 'MBIST_WSReg3', selwir_to_wdr_so, wsp_interface,
+                                select_mbist3, mbist3_out,sr3, cr3, dr_width=8, monitor=False)
+            wrapper_insts = wir_inst, wdrmux_inst, wirmux_inst, wby_inst, mbist1_inst, mbist2_inst, mbist3_inst
     simbist1_inst = simulatedmbist(path + "." + name, 'SMBIST1', sib1_to_ijtag_interface.CLOCK, reset1_n,
                                    cr1, cr_latch1, sr1, pu_mbist1, thermal_register1,
                                    initialize_delay=10, test_delay=40,
                                    analyze_delay=30,
-                                   monitor=monitor)
+                                   monitor=monitor, time_skip=time_skip)
     simbist2_inst = simulatedmbist(path + "." + name, 'SMBIST2', sib1_to_ijtag_interface.CLOCK, reset1_n,
                                    cr2, cr_latch1, sr2, pu_mbist2, thermal_register2,
                                    initialize_delay=10, test_delay=40,
                                    analyze_delay=30,
-                                   monitor=monitor)
+                                   monitor=monitor, time_skip=time_skip)
     simbist3_inst = simulatedmbist(path + "." + name, 'SMBIST3', sib1_to_ijtag_interface.CLOCK, reset1_n,
                                    cr3, cr_latch1, sr3, pu_mbist3, thermal_register3,
                                    initialize_delay=10, test_delay=40,
                                    analyze_delay=30,
-                                   monitor=monitor)
+                                   monitor=monitor, time_skip=time_skip)
 
-    sib2_to_ijtag_interface = IJTAGInterface()
+    sib2_to_ijtag_interface = from_ijtag_interface if behavioural else IJTAGInterface()
     sib2_to_si = Signal(bool(0))
     sib2_from_so = Signal(bool(0))
     temp_to_comp_so = Signal(bool(0))
@@ -147,27 +166,28 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
     compsr_register = Signal(intbv(0)[8:])
     led_signal = Signal(intbv(0)[1:])
 
-    sib2_inst = sib_mux_post(path + "." + name, "SIB2", sib1_to_sib2_so, from_ijtag_interface, sib2_to_sib3_so,
-                             sib2_to_si, sib2_to_ijtag_interface, sib2_from_so, monitor=monitor)
-
-    temp_SReg_inst = SReg(path + "." + name, "temperature", sib2_to_si, sib2_to_ijtag_interface, temp_to_comp_so,
-                          temperature, dummy_temperature, dr_width=9, monitor=monitor)
+    if not behavioural:
+        sib2_inst = sib_mux_post(path + "." + name, "SIB2", sib1_to_sib2_so, from_ijtag_interface, sib2_to_sib3_so,
+                                 sib2_to_si, sib2_to_ijtag_interface, sib2_from_so, monitor=monitor)
+        temp_SReg_inst = SReg(path + "." + name, "temperature", sib2_to_si, sib2_to_ijtag_interface, temp_to_comp_so,
+                              temperature, dummy_temperature, dr_width=9, monitor=monitor)
+        comp_SReg_inst = SReg(path + "." + name, "comparator", temp_to_comp_so, sib2_to_ijtag_interface,
+                              comp_to_low_so, compsr_register, compsr_register, dr_width=8, monitor=monitor)
+        low_SReg_inst = SReg(path + "." + name, "low", comp_to_low_so, sib2_to_ijtag_interface, low_to_high_so,
+                             low_register, low_register, dr_width=9, monitor=monitor)
+        high_SReg_inst = SReg(path + "." + name, "high", low_to_high_so, sib2_to_ijtag_interface, high_to_led_so,
+                              high_register, high_register, dr_width=9, monitor=monitor)
+        led_SReg_inst = SReg(path + "." + name, "LEDS0", high_to_led_so, sib2_to_ijtag_interface, sib2_from_so,
+                             led_signal, led_signal, dr_width=1, monitor=monitor)
+        sib2_insts = sib2_inst, temp_SReg_inst, comp_SReg_inst, low_SReg_inst, high_SReg_inst, led_SReg_inst
     temp_inst = thermometer(path + "." + name, 'TEMP0', sib2_to_ijtag_interface.CLOCK, reset2_n, temperature,
                             thermal_register1, thermal_register2, thermal_register3,
-                            thermal_register4, thermal_register5, monitor=monitor)
-    comp_SReg_inst = SReg(path + "." + name, "comparator", temp_to_comp_so, sib2_to_ijtag_interface, comp_to_low_so,
-                          compsr_register, compsr_register, dr_width=8, monitor=monitor)
-    low_SReg_inst = SReg(path + "." + name, "low", comp_to_low_so, sib2_to_ijtag_interface, low_to_high_so,
-                         low_register, low_register, dr_width=9, monitor=monitor)
-    high_SReg_inst = SReg(path + "." + name, "high", low_to_high_so, sib2_to_ijtag_interface, high_to_led_so,
-                          high_register, high_register, dr_width=9, monitor=monitor)
+                            thermal_register4, thermal_register5, monitor=monitor, change_driven=change_driven)
     comp_inst = comparator(path + "." + name, 'COMP0', sib2_to_ijtag_interface.CLOCK, reset2_n, temperature,
-                           low_register, high_register, compsr_register, monitor=monitor)
-    led_SReg_inst = SReg(path + "." + name, "LEDS0", high_to_led_so, sib2_to_ijtag_interface, sib2_from_so,
-                          led_signal, led_signal, dr_width=1, monitor=monitor)
+                           low_register, high_register, compsr_register, monitor=monitor, change_driven=change_driven)
     led_inst = LED(path + "." + name, "LED0", led_signal)
 
-    sib3_to_ijtag_interface = IJTAGInterface()
+    sib3_to_ijtag_interface = from_ijtag_interface if behavioural else IJTAGInterface()
     sib3_to_si = Signal(bool(0))
     sib3_from_so = Signal(bool(0))
     cr4 = Signal(intbv(0)[8:])
@@ -180,24 +200,26 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
     mbist4_to_mux_so = Signal(bool(0))
     mbist5_to_mux_so = Signal(bool(0))
 
-    sib3_inst = sib_mux_post(path + "." + name, "SIB3", sib2_to_sib3_so, from_ijtag_interface, ijtag_so,
-                             sib3_to_si, sib3_to_ijtag_interface, sib3_from_so, monitor=monitor)
-    mbist4_inst = SReg(path + "." + name, "MBIST_SReg4", sib3_to_si, sib2_to_ijtag_interface, mbist4_to_mux_so,
-                       thermal_register4, thermal_register4, dr_width=8, monitor=monitor)
+    if not behavioural:
+        sib3_inst = sib_mux_post(path + "." + name, "SIB3", sib2_to_sib3_so, from_ijtag_interface, ijtag_so,
+                                 sib3_to_si, sib3_to_ijtag_interface, sib3_from_so, monitor=monitor)
+        mbist4_inst = SReg(path + "." + name, "MBIST_SReg4", sib3_to_si, sib3_to_ijtag_interface, mbist4_to_mux_so,
+                           thermal_register4, thermal_register4, dr_width=8, monitor=monitor)
+        mbist5_inst = SReg(path + "." + name, "MBIST_SReg5", sib3_to_si, sib3_to_ijtag_interface, mbist5_to_mux_so,
+                           thermal_register5, thermal_register5, dr_width=8, monitor=monitor)
+        muxsr_inst = SReg(path + "." + name, "MUX0", mux_so, sib3_to_ijtag_interface, sib3_from_so,
+                          mux_select, mux_select, dr_width=1, monitor=monitor)
+        sib3_insts = sib3_inst, mbist4_inst, mbist5_inst, muxsr_inst
     simbist4_inst = simulatedmbist(path + "." + name, 'SMBIST4', sib3_to_ijtag_interface.CLOCK, reset3_n,
                                    cr4, cr_latch3, sr4, pu_mbist4, thermal_register4,
                                    initialize_delay=10, test_delay=40,
                                    analyze_delay=30,
-                                   monitor=monitor)
-    mbist5_inst = SReg(path + "." + name, "MBIST_SReg5", sib3_to_si, sib2_to_ijtag_interface, mbist5_to_mux_so,
-                       thermal_register5, thermal_register5, dr_width=8, monitor=monitor)
+                                   monitor=monitor, time_skip=time_skip)
     simbist5_inst = simulatedmbist(path + "." + name, 'SMBIST5', sib3_to_ijtag_interface.CLOCK, reset3_n,
                                    cr5, cr_latch3, sr5, pu_mbist5, thermal_register5,
                                    initialize_delay=10, test_delay=40,
                                    analyze_delay=30,
-                                   monitor=monitor)
-    muxsr_inst = SReg(path + "." + name, "MUX0", mux_so, sib3_to_ijtag_interface, sib3_from_so,
-                      mux_select, mux_select, dr_width=1, monitor=monitor)
+                                   monitor=monitor, time_skip=time_skip)
 
     @always_comb
     def reset_logic():
@@ -209,32 +231,46 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
     def latch1():
         cr_latch1.next = sib1_to_ijtag_interface.UPDATE
         
-    @always_comb
-    def mux():
-        if mux_select[0]:
-            mux_so.next = mbist5_to_mux_so
-        else:
-            mux_so.next = mbist4_to_mux_so
-
-    @always_comb
-    def bridge():
-        wsp_interface.SelectWIR.next = select_wir and sib1_to_ijtag_interface.SELECT
-        wsp_interface.WRCK.next = sib1_to_ijtag_interface.CLOCK
-        wsp_interface.WRSTN.next = not sib1_to_ijtag_interface.RESET
-        wsp_interface.UpdateWR.next = sib1_to_ijtag_interface.UPDATE
-        wsp_interface.CaptureWR.next = sib1_to_ijtag_interface.CAPTURE
-        wsp_interface.ShiftWR.next = sib1_to_ijtag_interface.SHIFT
-        select_wby.next = wr_select_list[0]
-        select_mbist1.next = dr_select_list[0]
-        select_mbist2.next = dr_select_list[1]
-        select_mbist3.next = dr_select_list[2]
+    if behavioural:
+        data = {"MBIST_WSReg1.SR": (sr1, cr1),
+                "MBIST_WSReg2.SR": (sr2, cr2),
+                "MBIST_WSReg3.SR": (sr3, cr3),
+                "temperature.SR": (temperature, dummy_temperature),
+                "comparator.SR": (compsr_register, compsr_register),
+                "low.SR": (low_register, low_register),
+                "high.SR": (high_register, high_register),
+                "LEDS0.SR": (led_signal, led_signal),
+                "MBIST_SReg4.SR": (thermal_register4, thermal_register4),
+                "MBIST_SReg5.SR": (thermal_register5, thermal_register5),
+                "MUX0.SR": (mux_select, mux_select)}
+        network_insts = behavioural_network(path, name, load_network("IP_3", name), ijtag_si, from_ijtag_interface,
+                                            ijtag_so, data={name + "." + r: ports for r, ports in data.items()},
+                                            monitor=monitor)
+    else:
+        @always_comb
+        def mux():
+            if mux_select[0]:
+                mux_so.next = mbist5_to_mux_so
+            else:
+                mux_so.next = mbist4_to_mux_so
+
+        @always_comb
+        def bridge():
+            wsp_interface.SelectWIR.next = select_wir and sib1_to_ijtag_interface.SELECT
+            wsp_interface.WRCK.next = sib1_to_ijtag_interface.CLOCK
+            wsp_interface.WRSTN.next = not sib1_to_ijtag_interface.RESET
+            wsp_interface.UpdateWR.next = sib1_to_ijtag_interface.UPDATE
+            wsp_interface.CaptureWR.next = sib1_to_ijtag_interface.CAPTURE
+            wsp_interface.ShiftWR.next = sib1_to_ijtag_interface.SHIFT
+            select_wby.next = wr_select_list[0]
+            select_mbist1.next = dr_select_list[0]
+            select_mbist2.next = dr_select_list[1]
+            select_mbist3.next = dr_select_list[2]
+        network_insts = sib1_inst, selwir_inst, wrapper_insts, bridge, sib2_insts, sib3_insts, mux
 
     if monitor == False:
-        return sib1_inst, selwir_inst, wir_inst, wdrmux_inst, wirmux_inst, wby_inst, \
-               mbist1_inst, mbist2_inst, mbist3_inst, simbist1_inst, simbist2_inst, simbist3_inst, \
-               sib2_inst, temp_SReg_inst, temp_inst, comp_SReg_inst, low_SReg_inst, high_SReg_inst, comp_inst, \
-               led_SReg_inst, led_inst.rtl(), bridge, reset_logic, latch1, mux, \
-               sib3_inst, mbist4_inst, simbist4_inst, mbist5_inst, simbist5_inst, muxsr_inst
+        return network_insts, simbist1_inst, simbist2_inst, simbist3_inst, temp_inst, comp_inst, \
+               led_inst.rtl(), reset_logic, latch1, simbist4_inst, simbist5_inst
     else:
         @instance
         def monitor_ijtag_si():
@@ -299,11 +335,8 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
                 yield from_ijtag_interface.CLOCK
                 print("\t\tIP_3({:s}): from_ijtag_interface.CLOCK".format(path + '.' + name), from_ijtag_interface.CLOCK)
 
-        return sib1_inst, selwir_inst, wir_inst, wdrmux_inst, wirmux_inst, wby_inst, \
-               mbist1_inst, mbist2_inst, mbist3_inst, simbist1_inst, simbist2_inst, simbist3_inst, \
-               sib2_inst, temp_SReg_inst, temp_inst, comp_SReg_inst, low_SReg_inst, high_SReg_inst, comp_inst, \
-               led_SReg_inst, led_inst.rtl(), bridge, reset_logic, latch1, mux, \
-               sib3_inst, mbist4_inst, simbist4_inst, mbist5_inst, simbist5_inst, muxsr_inst, \
+        return network_insts, simbist1_inst, simbist2_inst, simbist3_inst, temp_inst, comp_inst, \
+               led_inst.rtl(), reset_logic, latch1, simbist4_inst, simbist5_inst, \
                monitor_ijtag_si, monitor_ijtag_so, monitor_mux_select, monitor_from_ijtag_interface_SELECT, \
                monitor_from_ijtag_interface_CAPTURE, monitor_from_ijtag_interface_SHIFT, \
                monitor_from_ijtag_interface_UPDATE, monitor_from_ijtag_interface_RESET, \
@@ -311,10 +344,12 @@ def IP_3(path, name, ijtag_si, ijtag_so, from_ijtag_interface,
 
 
 @block
-def IP_3_tb(monitor=False):
+def IP_3_tb(monitor=False, behavioural_wrapper=False, time_skip=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param behavioural_wrapper: True to run IP_3 with the behavioural 1500 wrapper
+    :param time_skip: True to run the MBISTs of IP_3 with the time_skip model
     :return: A list of generators for this logic
     """
     H = bool(1)
@@ -399,7 +434,7 @@ def IP_3_tb(monitor=False):
     ip3_inst = IP_3("TOP", "IP_3", ijtag_si, ijtag_so, from_ijtag_interface,
          fast_ck, ck,
          pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-         monitor=monitor)
+         monitor=monitor, behavioural_wrapper=behavioural_wrapper, time_skip=time_skip)
 
     # print simulation data to file
     file_data = open("IP_3.csv", 'w')  # file for saving data
@@ -949,6 +984,10 @@ def main():
     tb = IP_3_tb(monitor=False)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    tb = IP_3_tb(monitor=False, behavioural_wrapper=True)
+    tb.run_sim()
+    tb.quit_sim()
     convert()
 
 
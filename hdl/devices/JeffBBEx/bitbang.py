@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+    Bit-bang macro compiler for the IJTAG network of the JeffBBEx device.
+
+    The device drives CLOCK/SI/SELECT/CAPTURE/SHIFT/UPDATE/RESET from the bits
+    of its control register and the host reads SO back over I2C.  Writing one
+    register per edge and reading SO before each rising edge costs about four
+    I2C transactions per scan bit.  The compiler turns a whole IJTAG scan into
+    the shortest sequence of control register values instead:
+      - values that do not change are not written,
+      - the falling edge and the set up of the next cycle share one write when
+        the signals sampled at the falling edge (SELECT, UPDATE and RESET) stay
+        the same, so a shift costs two bytes,
+      - the bytes go out as one multi-byte write into the control register (the
+        I2C client holds its address there, see i2cslave_RW hold),
+      - SO is not read per bit: the device keeps the SO of the last 16 shift
+        clocks in its history registers, read with one 2 byte transfer through
+        the autoincrement path after every 16 shifts.
+    Through the telnet server every register access of the I2C host is still a
+    round trip, so RemoteBitBangScanner sends the whole program with the
+    BITBANG command of simservice, which runs it inside the server.
+
+   Copyright 2024 VT Enterprises Consulting Services
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2024, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2024/01/17"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "Apache 2.0"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+from hdl.devices.JeffBBEx.jeffbbex import BB_CONTROL, BB_HISTORY, HISTORY_BITS
+from hdl.devices.JeffBBEx.jeffbbex import BB_CLOCK, BB_SI, BB_SELECT, BB_CAPTURE, BB_SHIFT, BB_UPDATE, BB_RESET
+
+# signals the network samples at the falling edge of CLOCK
+NEGEDGE_BITS = BB_SELECT | BB_UPDATE | BB_RESET
+# I2C address of the JeffBBEx device, the one i2cslave_RW answers to
+DEVICE_ADDRESS = 0x3C
+
+
+class BitBangProgram:
+    """
+    Compiled control register values, cut into segments.  Each segment is written with one multi-byte write
+    and is followed by a read of the SO history when it contains shift clocks.
+    """
+    def __init__(self, history_bits=HISTORY_BITS):
+        self.history_bits = history_bits
+        self.segments = []     # [(bytearray of control values, number of shift clocks)]
+        self.data = bytearray()
+        self.shifts = 0
+        self.state = 0         # value of the control register once the program has been written
+        self.pending = None    # state whose falling edge has not been written yet
+        self.edges = 0         # number of rising edges
+
+    def __write(self, value):
+        if value != self.state:
+            self.data.append(value)
+            self.state = value
+
+    def __flush(self):
+        if self.data or self.shifts:
+            self.segments.append((self.data, self.shifts))
+        self.data = bytearray()
+        self.shifts = 0
+
+    def cycle(self, control, si=0):
+        """
+        One CLOCK period with the given control bits.
+        :param control: BB_SELECT | BB_CAPTURE ... bits held during the period
+        :param si: Value of SI sampled at the rising edge
+        """
+        setup = (control & ~(BB_CLOCK | BB_SI)) | (BB_SI if si else 0)
+        if self.pending is not None:
+            if (self.pending ^ setup) & NEGEDGE_BITS:
+                # the falling edge still needs the old SELECT/UPDATE/RESET
+                self.__write(self.pending)
+        self.pending = None
+        self.__write(setup)
+        self.__write(setup | BB_CLOCK)
+        self.edges += 1
+        self.pending = setup
+        if setup & BB_SHIFT:
+            self.shifts += 1
+            if self.shifts == self.history_bits:
+                self.__flush()
+
+    def finish(self, idle=0):
+        """
+        Close the last period and leave the control register at idle.
+        """
+        if self.pending is not None:
+            if (self.pending ^ idle) & NEGEDGE_BITS:
+                self.__write(self.pending)
+            self.pending = None
+        self.__write(idle)
+        self.__flush()
+        return self
+
+    def byte_count(self):
+        return sum(len(data) for data, _ in self.segments)
+
+    def transaction_count(self):
+        """
+        :return: I2C transactions needed to run the program
+        """
+        return sum((1 if data else 0) + (1 if shifts else 0) for data, shifts in self.segments)
+
+
+def compile_reset():
+    """
+    :return: BitBangProgram pulsing RESET of the network
+    """
+    program = BitBangProgram()
+    program.cycle(BB_RESET)
+    return program.finish()
+
+
+def compile_scan(length, tdi, capture=True, update=True, program=None):
+    """
+    Compile a Capture-Shift-Update scan of the network.
+    :param length: Number of bits to shift
+    :param tdi: int shifted in, bit 0 first
+    :param capture: False to skip the capture period
+    :param update: False to skip the update period
+    :param program: BitBangProgram to append to, a new one when None
+    :return: BitBangProgram, finished
+    """
+    if program is None:
+        program = BitBangProgram()
+    if capture:
+        program.cycle(BB_SELECT | BB_CAPTURE)
+    for i in range(length):
+        program.cycle(BB_SELECT | BB_SHIFT, (tdi >> i) & 1)
+    if update:
+        program.cycle(BB_SELECT | BB_UPDATE)
+    return program.finish()
+
+
+def decode_history(program, histories):
+    """
+    Put the SO bits read from the history registers back in scan order.
+    :param program: BitBangProgram that was run
+    :param histories: History register value read after each segment with shift clocks
+    :return: int of the SO bits, first shifted out in bit 0
+    """
+    tdo = 0
+    done = 0
+    values = iter(histories)
+    for data, shifts in program.segments:
+        if not shifts:
+            continue
+        value = next(values)
+        for j in range(shifts):
+            tdo |= ((value >> (shifts - 1 - j)) & 1) << (done + j)
+        done += shifts
+    return tdo
+
+
+def format_program(program):
+    """
+    :return: list of "<hex control values>:<shift clocks>" strings, one per segment, as the BITBANG command of
+             simservice takes them
+    """
+    return ["{:s}:{:d}".format(data.hex().upper(), shifts) for data, shifts in program.segments]
+
+
+def parse_program(segments, history_bits=HISTORY_BITS):
+    """
+    :param segments: Result of format_program()
+    :return: BitBangProgram with the segments
+    """
+    program = BitBangProgram(history_bits)
+    for segment in segments:
+        data, _, shifts = segment.partition(":")
+        shifts = int(shifts)
+        if not 0 <= shifts <= history_bits:
+            raise ValueError("{:d} shift clocks do not fit the {:d} bit history.".format(shifts, history_bits))
+        program.segments.append((bytearray.fromhex(data), shifts))
+    return program
+
+
+def naive_transaction_count(length, capture=True, update=True):
+    """
+    :return: I2C register transactions of driving every edge with its own write and reading SO for every bit
+    """
+    cycles = length + (1 if capture else 0) + (1 if update else 0)
+    return 4 * cycles + length
+
+
+class BitBangScanner:
+    """
+    Runs compiled scans on the JeffBBEx device through the I2C host of the ATE.
+    """
+    def __init__(self, i2c, dev_address=DEVICE_ADDRESS):
+        """
+        :param i2c: I2CController of drivers.Python.atesim.atesim
+        :param dev_address: I2C address of the device
+        """
+        self.i2c = i2c
+        self.dev_address = dev_address
+
+    def run(self, program):
+        """
+        :return: int of the SO bits of the shift clocks of the program
+        """
+        histories = []
+        for data, shifts in program.segments:
+            if data:
+                self.i2c.i2c_stream_write(self.dev_address, BB_CONTROL, data)
+            if shifts:
+                low, high = self.i2c.i2c_stream_read(self.dev_address, BB_HISTORY, 2)
+                histories.append((high << 8) | low)
+        return decode_history(program, histories)
+
+    def reset(self):
+        self.run(compile_reset())
+
+    def scan(self, length, tdi, capture=True, update=True):
+        """
+        :param length: Number of bits to shift
+        :param tdi: int shifted in, bit 0 first
+        :return: int shifted out, bit 0 first
+        """
+        return self.run(compile_scan(length, tdi, capture, update))
+
+
+class RemoteBitBangScanner(BitBangScanner):
+    """
+    Runs compiled scans in the simulation server with its BITBANG command, one telnet round trip per program
+    instead of one per I2C host register access.
+    """
+    def __init__(self, ate_inst, dev_address=DEVICE_ADDRESS):
+        """
+        :param ate_inst: ATE of drivers.Python.atesim.atesim connected to the server
+        :param dev_address: I2C address of the device
+        """
+        super(RemoteBitBangScanner, self).__init__(None, dev_address)
+        self.ate_inst = ate_inst
+
+    def run(self, program):
+        return self.ate_inst.bitbang(self.dev_address, format_program(program))
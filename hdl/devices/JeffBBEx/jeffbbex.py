@@ -45,6 +45,21 @@ from hdl.standards.s1687.sib_mux_pre import sib_mux_pre
 
 period = 20  # clk frequency = 50 MHz
 
+# I2C registers of the bit-bang interface
+BB_CONTROL = 0x00   # myReg0: IJTAG control bits below, a multi-byte write streams into it
+BB_STATUS = 0x01    # myReg1: bit 0 is the live SO
+BB_HISTORY = 0x04   # myReg4 (low byte), myReg5 (high byte): SO sampled at the last 16 shift clocks
+HISTORY_BITS = 16
+
+# Bits of the control register
+BB_CLOCK = 0x01
+BB_SI = 0x02
+BB_SELECT = 0x04
+BB_CAPTURE = 0x08
+BB_SHIFT = 0x10
+BB_UPDATE = 0x20
+BB_RESET = 0x40
+
 
 @block
 def jeffbbexnetwork(path: str,
@@ -132,7 +147,7 @@ def jeffbbexnetwork(path: str,
                           )
 
     if monitor == False:
-        return i_reg_inst, o_reg_inst, jeffbbexinstr, other_reg_inst, sib_inst
+        return i_reg_inst, o_reg_inst, instr_inst, other_reg_inst, sib_inst
     else:
         @instance
         def monitor_si():
@@ -199,7 +214,41 @@ def jeffbbexnetwork(path: str,
         return (monitor_si, monitor_so, monitor_instr_input, monitor_instr_output,
                 monitor_i_reg_so, monitor_o_reg_so, monitor_instr_reg_so, monitor_other_reg_si,
                 monitor_other_reg_so,
-                i_reg_inst, o_reg_inst, jeffbbexinstr, other_reg_inst, sib_inst)
+                i_reg_inst, o_reg_inst, instr_inst, other_reg_inst, sib_inst)
+
+
+@block
+def bitbang_bridge(control, status, history, ijtag_interface, si, so):
+    """
+    Drives the IJTAG network from the bits of the control register and reports SO back.
+    Besides the live SO, the SO seen at each rising CLOCK with SHIFT set is shifted into history (newest in
+    bit 0), so a host can clock up to len(history) bits with one multi-byte write and read them back after.
+    :param control: Signal(intbv(0)[8:]) control register (BB_CLOCK ... BB_RESET)
+    :param status: Signal(intbv(0)[8:]) status register, bit 0 is SO
+    :param history: Signal(intbv(0)[HISTORY_BITS:]) SO history
+    :param ijtag_interface: IJTAGInterface of the network
+    :param si: ScanInPort of the network
+    :param so: ScanOutPort of the network
+    """
+    width = len(history)
+
+    @always_comb
+    def bb_ijtag():
+        ijtag_interface.CLOCK.next = control[0]
+        si.next = control[1]
+        ijtag_interface.SELECT.next = control[2]
+        ijtag_interface.CAPTURE.next = control[3]
+        ijtag_interface.SHIFT.next = control[4]
+        ijtag_interface.UPDATE.next = control[5]
+        ijtag_interface.RESET.next = control[6]
+        status.next[0] = so
+
+    @always(ijtag_interface.CLOCK.posedge)
+    def so_capture():
+        if ijtag_interface.SHIFT:
+            history.next = concat(history[width - 1:0], so)
+
+    return bb_ijtag, so_capture
 
 
 class JeffBBDevice:
@@ -240,8 +289,8 @@ class JeffBBDevice:
         myReg1 = Signal(intbv(0)[8:])
         myReg2 = Signal(intbv(0)[8:])
         myReg3 = Signal(intbv(0)[8:])
-        myReg4 = Signal(intbv(0x12)[8:])
-        myReg5 = Signal(intbv(0x34)[8:])
+        myReg4 = Signal(intbv(0)[8:])
+        myReg5 = Signal(intbv(0)[8:])
         myReg6 = Signal(intbv(0x56)[8:])
         myReg7 = Signal(intbv(0x78)[8:])
         writeEn = Signal(bool(0))
@@ -249,7 +298,7 @@ class JeffBBDevice:
         dataOut = Signal(intbv(0)[8:])
         regAddr = Signal(modbv(0)[8:])
         i2c_client_inst = i2cslave_RW(i2c_interface_c.scl_i, i2c_interface_c.sda_i, i2c_interface_c.sda_e, self.reset_n,
-                                      dataIn, dataOut, regAddr, writeEn, autoincrement=True)
+                                      dataIn, dataOut, regAddr, writeEn, autoincrement=True, hold=(BB_CONTROL,))
         register_interface_inst = registerInterface(self.clk_o, regAddr, dataOut, writeEn, dataIn,
                                                     myReg0, myReg1, myReg2, myReg3, myReg4, myReg5, myReg6, myReg7)
 
@@ -263,16 +312,13 @@ class JeffBBDevice:
                                       so,
                                       monitor=monitor)
 
+        so_history = Signal(intbv(0)[HISTORY_BITS:])
+        bb_ijtag = bitbang_bridge(myReg0, myReg1, so_history, ijtag_interface, si, so)
+
         @always_comb
-        def bb_ijtag():
-            ijtag_interface.CLOCK.next = myReg0[0]
-            si.next = myReg0[1]
-            ijtag_interface.SELECT.next = myReg0[2]
-            ijtag_interface.CAPTURE.next = myReg0[3]
-            ijtag_interface.SHIFT.next = myReg0[4]
-            ijtag_interface.UPDATE.next = myReg0[5]
-            ijtag_interface.RESET.next = myReg0[6]
-            myReg1.next[0] = so
+        def history_regs():
+            myReg4.next = so_history[8:]
+            myReg5.next = so_history[16:8]
 
         @instance
         def power_on_reset_gen():
@@ -302,5 +348,5 @@ class JeffBBDevice:
             self.scl_i.next = True
 
         return (netlist, i2c_client_inst, power_on_reset_gen, register_interface_inst,
-                chain1_inst, bb_ijtag)
+                chain1_inst, bb_ijtag, history_regs)
 
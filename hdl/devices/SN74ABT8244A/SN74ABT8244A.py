@@ -16,7 +16,7 @@ period = 20  # clk frequency = 50 MHz
 class SN74ABT8244A:
     def __init__(self, parent, name,
                  OE_NEG1, Y1, Y2, A1, A2, OE_NEG2,
-                 tdo_padoe_o, tdi, tck, tms, tdo
+                 tdo_padoe_o, tdi, tck, tms, tdo, compact=False
                  ):
         """
 
@@ -29,6 +29,7 @@ class SN74ABT8244A:
         :param A2: Array of Signals as inputs
         :param OE_NEG2: Input signal to control the A2/Y2 output enable
         :param tdo_padoe_o: tdo_padoe_o = Signal(bool(0)) Output enable for TDO
+        :param compact: True to use the BSR generated from the BSDL file (registers/compact_bsr.py)
         """
         self.parent = parent
         self.name = name
@@ -55,6 +56,7 @@ class SN74ABT8244A:
         self.tdi = tdi
         self.tdo = tdo
         self.trst = None
+        self.compact = compact
 
     def configure_jtag(self, tdi, tck, tms, trst, tdo):
         self.tck = tck
@@ -63,11 +65,31 @@ class SN74ABT8244A:
         self.tdi = tdi
         self.tdo = tdo
 
+    def core_ports(self):
+        """
+        :return: tuple of the lists of the input and output Signals of the core, in the order of core()
+        """
+        return [self.OE_NEG1, self.OE_NEG2] + list(self.A1) + list(self.A2), \
+            self.Y1_o + self.Y1_e + self.Y2_o + self.Y2_e + [self.tdo_padoe_o]
+
+    def core(self, inputs, outputs, tdi, tck, tms, tdo):
+        """
+        Core of the device on other Signals, the cosimulation backend converts the cores of a board to Verilog.
+        :param inputs: list of Signals in the order of the inputs of core_ports()
+        :param outputs: list of Signals in the order of the outputs of core_ports()
+        :return: SN74ABT8244ACore
+        """
+        return SN74ABT8244ACore(self.parent + "." + self.name, "SN74ABT8244Core", inputs[0],
+                                outputs[0:4], outputs[4:8], outputs[8:12], outputs[12:16], inputs[2:6], inputs[6:10],
+                                inputs[1], outputs[16], tdi, tck, tms, tdo, compact=self.compact)
+
     @block
-    def rtl(self, monitor=False):
-        core_inst = SN74ABT8244ACore(self.parent + "." + self.name, "SN74ABT8244Core", self.OE_NEG1,
-                                     self.Y1_o, self.Y1_e, self.Y2_o, self.Y2_e, self.A1, self.A2,
-                                     self.OE_NEG2, self.tdo_padoe_o, self.tdi, self.tck, self.tms, self.tdo)
+    def rtl(self, monitor=False, core=True):
+        """
+        :param core: False to leave out the core, for a board simulating it elsewhere (see core())
+        """
+        inputs, outputs = self.core_ports()
+        core_inst = self.core(inputs, outputs, self.tdi, self.tck, self.tms, self.tdo) if core else None
         print("SN74ABT8244A: self.tdo => ", hex(id(self.tdo)))
 
         @always_comb
@@ -90,6 +112,8 @@ class SN74ABT8244A:
 
         # core_inst.configure_jtag(self.tdi, self.tck, self.tms, self.tdo)
 
+        if not core:
+            return output_process
         return core_inst.rtl(), output_process
 
 
@@ -9,6 +9,7 @@ from myhdl import *
 from hdl.devices.SN74ABT8244A.tap.tap_defines import *
 from hdl.devices.SN74ABT8244A.tap.tap_top import *
 from hdl.devices.SN74ABT8244A.registers.bsr import bsr
+from hdl.devices.SN74ABT8244A.registers.compact_bsr import compact_bsr
 import os
 
 period = 20  # clk frequency = 50 MHz
@@ -17,7 +18,7 @@ period = 20  # clk frequency = 50 MHz
 class SN74ABT8244ACore:
     def __init__(self, parent, name,
                  OE_NEG1, Y1_o, Y1_e, Y2_o, Y2_e, A1, A2, OE_NEG2,
-                 tdo_padoe_o, tdi, tck, tms, tdo
+                 tdo_padoe_o, tdi, tck, tms, tdo, compact=False
                  ):
         """
 
@@ -32,6 +33,7 @@ class SN74ABT8244ACore:
         :param A2: Array of Signals as inputs
         :param OE_NEG2: Input signal to control the A2/Y2 output enable
         :param tdo_padoe_o: tdo_padoe_o = Signal(bool(0)) Output enable for TDO
+        :param compact: True to use the BSR generated from the BSDL file (registers/compact_bsr.py)
         """
         self.parent = parent
         self.name = name
@@ -53,6 +55,7 @@ class SN74ABT8244ACore:
         self.tms = tms
         self.tdi = tdi
         self.tdo = tdo
+        self.compact = compact
 
     def configure_jtag(self, tdi, tck, tms, tdo):
         self.tck = tck
@@ -115,9 +118,10 @@ class SN74ABT8244ACore:
             mbist_tdi_i     # from Mbist Chain
             )
         # bypass_reg = bypass(tdo_o, select_bypass, capture_dr_o, shift_dr_o, self.jtag_interface.TCK, bypass_so)
-        bsr_reg = bsr(tdo_o, bsr_select, capture_dr_o, shift_dr_o, update_dr_o, self.tck, bs_chain_tdi_i,
-                      extest_select_o, self.OE_NEG1, self.Y1_o, self.Y1_e, self.Y2_o, self.Y2_e,
-                      self.A1, self.A2, self.OE_NEG2)
+        bsr_class = compact_bsr if self.compact else bsr
+        bsr_reg = bsr_class(tdo_o, bsr_select, capture_dr_o, shift_dr_o, update_dr_o, self.tck, bs_chain_tdi_i,
+                            extest_select_o, self.OE_NEG1, self.Y1_o, self.Y1_e, self.Y2_o, self.Y2_e,
+                            self.A1, self.A2, self.OE_NEG2)
         # tap_inst.configure_jtag(self.tdi, self.tck, self.tms, trst, self.tdo)
         bsr_reg.configure_jtag(tdo_o, self.tck, self.tms, trst, self.tdo)
         print("SN74ABT8244ACore: self.tdo => ", hex(id(self.tdo)))
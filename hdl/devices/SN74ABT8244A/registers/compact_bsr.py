@@ -0,0 +1,114 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Boundary scan register of the SN74ABT8244A built from its BSDL file with the
+vector backed BSR of hdl/standards/s1149dot1/BSR.py.  It has the ports and
+the behaviour of registers/bsr.py with a handful of processes instead of one
+instance per cell.
+"""
+from myhdl import *
+import os.path
+from hdl.standards.s1149dot1.BSR import BSR
+from hdl.standards.s1149dot1.bsdl import parse_file
+
+BSDL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sn74abt8244a.bsm")
+
+# The buffers drive Yn(i) from An(i), so that is what the output cells capture
+CORE = {"Y1": "A1", "Y2": "A2"}
+
+
+class compact_bsr:
+    def __init__(self, si, select, capturedr, shiftdr, updatedr, tck, so, extest,
+                 OE_NEG1, Y1_o, Y1_e, Y2_o, Y2_e, A1, A2, OE_NEG2):
+        self.tdi = si
+        self.select = select
+        self.capturedr = capturedr
+        self.shiftdr = shiftdr
+        self.updatedr = updatedr
+        self.tck = tck
+        self.tdo = so
+        self.extest = extest
+        self.OE_NEG1 = OE_NEG1
+        self.Y1_o = Y1_o
+        self.Y1_e = Y1_e
+        self.Y2_o = Y2_o
+        self.Y2_e = Y2_e
+        self.A1 = A1
+        self.A2 = A2
+        self.OE_NEG2 = OE_NEG2
+        self.tms = None
+        self.trst = None
+        self.device = parse_file(BSDL_FILE)
+
+    def configure_jtag(self, tdi, tck, tms, trst, tdo):
+        self.tms = tms
+        self.trst = trst
+
+    def pin(self, port, suffix=""):
+        """
+        :param port: BSDL pin name, e.g. OE_NEG1 or Y2(4)
+        :param suffix: Suffix of the attribute holding the signals, e.g. "_o"
+        :return: Signal of the pin
+        """
+        name, _, index = port.partition("(")
+        signal = getattr(self, name + suffix)
+        if index:
+            index = int(index.rstrip(")"))
+            return signal[self.device.ports[name][1].index(index)]
+        return signal
+
+    @block
+    def rtl(self):
+        device = self.device
+        width = device.boundary_length
+        pins_in = Signal(intbv(0)[width:])
+        pins_out = Signal(intbv(0)[width:])
+
+        sources = [None] * width
+        outputs = []
+        for cell in device.cells:
+            function = cell.function.lower()
+            if function == "input":
+                sources[cell.number] = self.pin(cell.port)
+            elif function == "output3":
+                name, _, index = cell.port.partition("(")
+                sources[cell.number] = self.pin(CORE[name] + "(" + index)
+                outputs.append((cell.number, cell.ccell, cell.disval, self.pin(cell.port, "_o"),
+                                self.pin(cell.port, "_e")))
+        cells = tuple(output[0] for output in outputs)
+        ccells = tuple(output[1] for output in outputs)
+        disvals = tuple(output[2] for output in outputs)
+        pads_o = [output[3] for output in outputs]
+        pads_e = [output[4] for output in outputs]
+        # a signal may feed several cells, the process watches each one once
+        inputs = []
+        for source in sources:
+            if all(source is not s for s in inputs):
+                inputs.append(source)
+
+        bsr_inst = BSR("SN74ABT8244A", "BSR", self.tdi, self.select, self.capturedr, self.shiftdr, self.updatedr,
+                       self.extest, self.tck, self.tdo, pins_in, pins_out)
+
+        @instance
+        def capture_process():
+            while True:
+                value = intbv(0)[width:]
+                for i in range(width):
+                    value[i] = sources[i]
+                pins_in.next = value
+                yield inputs
+
+        @instance
+        def pad_process():
+            while True:
+                for i in range(len(cells)):
+                    if pins_out[ccells[i]] != disvals[i]:
+                        pads_o[i].next = pins_out[cells[i]]
+                        pads_e[i].next = True
+                    else:
+                        pads_o[i].next = False
+                        pads_e[i].next = False
+                yield pins_out
+
+        return bsr_inst, capture_process, pad_process
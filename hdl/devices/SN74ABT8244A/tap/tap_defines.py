@@ -53,10 +53,10 @@
 //
 //
 """
-from myhdl import intbv
+# The values are ints, the converters only accept int constants from the module globals
 
 # Define IDCODE Value
-IDCODE_VALUE = intbv(val=0x149511c3, _nrbits=32)
+IDCODE_VALUE = 0x149511c3
 # 0001             version
 # 0100100101010001 part number (IQ)
 # 00011100001      manufacturer id (flextronics)
@@ -66,9 +66,9 @@ IDCODE_VALUE = intbv(val=0x149511c3, _nrbits=32)
 IR_LENGTH = 8
 
 # Supported Instructions
-EXTEST = intbv('00000000')
-SAMPLE_PRELOAD = intbv('00000010')
-IDCODE = intbv('00000011')
-DEBUG = intbv('00001000')
-MBIST = intbv('00001001')
-BYPASS = intbv('11111111')
+EXTEST = 0b00000000
+SAMPLE_PRELOAD = 0b00000010
+IDCODE = 0b00000011
+DEBUG = 0b00001000
+MBIST = 0b00001001
+BYPASS = 0b11111111
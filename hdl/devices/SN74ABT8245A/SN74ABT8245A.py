@@ -64,12 +64,32 @@ class SN74ABT8245A:
         self.tdi = tdi
         self.tdo = tdo
 
+    def core_ports(self):
+        """
+        :return: tuple of the lists of the input and output Signals of the core, in the order of core()
+        """
+        return [self.DIR, self.OE_NEG] + self.A_i + self.B_i, self.A_o + self.A_e + self.B_o + self.B_e + \
+            [self.tdo_padoe_o]
+
+    def core(self, inputs, outputs, tdi, tck, tms, tdo):
+        """
+        Core of the device on other Signals, the cosimulation backend converts the cores of a board to Verilog.
+        :param inputs: list of Signals in the order of the inputs of core_ports()
+        :param outputs: list of Signals in the order of the outputs of core_ports()
+        :return: SN74ABT8245ACore
+        """
+        return SN74ABT8245ACore(self.parent + "." + self.name, "SN74ABT8245ACore",
+                                inputs[0], inputs[2:10], outputs[0:8], outputs[8:16],
+                                inputs[10:18], outputs[16:24], outputs[24:32], inputs[1],
+                                outputs[32], tdi, tck, tms, tdo)
+
     @block
-    def rtl(self, monitor=False):
-        core_inst = SN74ABT8245ACore(self.parent + "." + self.name, "SN74ABT8245ACore",
-                                     self.DIR, self.A_i, self.A_o, self.A_e,
-                                     self.B_i, self.B_o, self.B_e, self.OE_NEG,
-                                     self.tdo_padoe_o, self.tdi, self.tck, self.tms, self.tdo)
+    def rtl(self, monitor=False, core=True):
+        """
+        :param core: False to leave out the core, for a board simulating it elsewhere (see core())
+        """
+        inputs, outputs = self.core_ports()
+        core_inst = self.core(inputs, outputs, self.tdi, self.tck, self.tms, self.tdo) if core else None
 
         @always_comb
         def input_process():
@@ -101,6 +121,8 @@ class SN74ABT8245A:
                 else:
                     self.BDriver[i].next = None
 
+        if not core:
+            return input_process, output_process
         return core_inst.rtl(), input_process, output_process
 
 
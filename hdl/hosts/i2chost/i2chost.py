@@ -50,13 +50,13 @@ def i2chost(clk, reset, tx, rx, control, status, scl_i, scl_o, scl_oen, sda_i, s
     def data_cycle():
         if data_state == idle_wait:
             done.next = True
-            ack_error.next = False
             scl_oen.next = False
             scl_o.next = False
             sda_oen.next = False
             sda_o.next = False
             if execute_latched:
                 done.next = False
+                ack_error.next = False
                 busy.next = True
                 if start:
                     data_state.next = start1
@@ -221,10 +221,8 @@ def i2chost(clk, reset, tx, rx, control, status, scl_i, scl_o, scl_oen, sda_i, s
             sda_oen.next = True
             scl_o.next = True
             sda_o.next = True
-            if not sda_i:
-                ack_error.next = True
-            else:
-                ack_error.next = False
+            # the slave acknowledges by pulling SDA low, the error holds until the next command
+            ack_error.next = sda_i
             if stop:
                 data_state.next = stop1
             else:
@@ -66,6 +66,7 @@ def jeffbbexinstr(path: str,
     instr_out_reg = Signal(intbv(0xF)[4:])
     data_reg_in = Signal(intbv(0)[16:])
     data_reg_out = Signal(intbv(0)[16:])
+    reset_n = Signal(bool(1))
     instr_reg_inst = SReg(path + '.' + name,
                           'INSTR_REG',
                           si,
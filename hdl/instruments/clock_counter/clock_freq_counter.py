@@ -4,16 +4,37 @@ See the licence file in the top directory
 
 Clock Frequency Counter
 Based on the VHDL design at https://surf-vhdl.com/compute-frequency-clock/.
+
+With analytic=True and the periods of both clocks known, the edges of the
+clocks are not counted: the count of each measurement is computed from the
+periods and o_clock_freq changes at the edge of i_clk_test where the
+counting model would change it.  As in the time_skip mode of
+simulatedmbist, the measurement goes on on the virtual clocks when the
+clocks are stopped, so a test bench can stop them once the counter has seen
+their phases and jump to the result.
 """
 from myhdl import *
+from math import gcd
 import os
+import time
 import os.path
 
 period = 20  # clk frequency = 50 MHz
+REF_CYCLE = 1 << 13  # clk cycles of one measurement, the period of r1_counter_ref
+COUNT_WINDOW = (0, 0x1000)  # r1_counter_ref values enabling the test counter
+STROBE_WINDOW = (0x1101, 0x1500)  # r1_counter_ref values storing the test counter into o_clock_freq
+RESET_WINDOW = (0x1901, 0x1D00)  # r1_counter_ref values resetting the test counter
+MAX_TEST_PERIOD = 256  # slowest i_clk_test of the analytic model, in clk periods
+
+
+class ClockFreqCounterError(Exception):
+    def __init__(self, message):
+        super(ClockFreqCounterError, self).__init__(message)
 
 
 @block
-def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monitor=False):
+def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monitor=False, analytic=False,
+                       clk_period=period, test_period=None):
     """
     Clock Frequency Counter
     Variables and processes with prefix r1_ are with clk reference domain
@@ -25,6 +46,11 @@ def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monit
     :param i_clk_test: The clock to be tested
     :param o_clock_freq: Signal(intbv(0)[16:]) The count of ticks on i_clk_test
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param analytic: True to compute o_clock_freq from the periods of clk and i_clk_test (simulation only).
+            The edges are counted when test_period is None (i_clk_test has no fixed period) or longer than
+            MAX_TEST_PERIOD clk periods.
+    :param clk_period: Period of clk for analytic=True
+    :param test_period: Period of i_clk_test for analytic=True
     """
     # CLOCK REFERENCE signal declaration
     r1_counter_ref = Signal(modbv(0)[13:])  # 12+1 bit: extra bit used for test counter control
@@ -84,8 +110,13 @@ def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monit
             if r2_counter_test_strobe == bool(1):
                 o_clock_freq.next = r2_counter_test
 
+    if analytic and test_period is not None and test_period < MAX_TEST_PERIOD * clk_period:
+        counter = analytic_counter(clk, reset_n, i_clk_test, o_clock_freq, clk_period, test_period)
+    else:
+        counter = p_counter_ref, p_clk_test_resync, p_counter_test, p_counter_test_out
+
     if not monitor:
-        return p_counter_ref, p_clk_test_resync, p_counter_test, p_counter_test_out
+        return counter
     else:
         @instance
         def monitor_clk():
@@ -171,7 +202,7 @@ def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monit
                 yield r2_counter_test_rstb
                 print("\t\tclock_freq_counter({:s}): r2_counter_test_rstb".format(path + '.' + name), r2_counter_test_rstb)
 
-        return p_counter_ref, p_clk_test_resync, p_counter_test, p_counter_test_out,\
+        return counter,\
             monitor_clk, monitor_i_clk_test, monitor_o_clock_freq, monitor_r1_counter_ref,\
             monitor_r1_counter_test_ena, monitor_r1_counter_test_rstb, monitor_r1_counter_test_strobe,\
             monitor_r2_counter_test, monitor_r2_counter_test_ena, monitor_r2_counter_test_rstb,\
@@ -179,10 +210,99 @@ def clock_freq_counter(path, name, clk, reset_n, i_clk_test, o_clock_freq, monit
 
 
 @block
-def clock_freq_counter_tb(monitor=False):
+def analytic_counter(clk, reset_n, i_clk_test, o_clock_freq, clk_period, test_period):
+    """
+    clock_freq_counter for analytic=True.
+    After a reset the first edge of clk with reset_n high starts r1_counter_ref at 0 and the next two edges of
+    i_clk_test give its phase.  From there every measurement is computed: the count is the number of edges of
+    i_clk_test while the enable of the test counter is seen high, o_clock_freq takes it at the edge after the
+    first one that sees the strobe.  An edge of i_clk_test at the time of an edge of clk sees the registers of the
+    clk domain from before that edge when both clocks change in the same delta (clocks of a test bench), from
+    after it when i_clk_test changes later (a clock made from clk); the first such edge tells which.
+    reset_n must not fall in the delta of an edge of i_clk_test, the counting model would see that edge.
+    """
+    timing = {"r0": 0, "phase": 0, "late": False}
+
+    def edge_time(k):
+        """
+        :return: time of the edge k of clk, 0 is the edge starting the reference counter
+        """
+        return timing["r0"] + k * clk_period
+
+    def window(first, last):
+        """
+        Edges of i_clk_test seeing what clk edges first to last - 1 set.
+        :return: tuple of the number of edges and the time of the first one
+        """
+        start = edge_time(first) - timing["phase"]
+        end = edge_time(last) - timing["phase"]
+        if timing["late"]:
+            # [start, end)
+            low, high = -(-start // test_period), -(-end // test_period)
+        else:
+            # (start, end]
+            low, high = start // test_period + 1, end // test_period + 1
+        return high - low, timing["phase"] + low * test_period
+
+    @instance
+    def reset_out():
+        while True:
+            if reset_n:
+                yield reset_n.negedge
+            yield i_clk_test.posedge, reset_n.posedge
+            if reset_n == bool(0):
+                o_clock_freq.next = intbv(0xFFFF)[16:]
+
+    @instance
+    def measure():
+        while True:
+            yield clk.posedge
+            if reset_n == bool(0):
+                continue
+            timing["r0"] = now()
+            yield i_clk_test.posedge
+            first = now()
+            yield i_clk_test.posedge
+            if now() - first != test_period:
+                raise ClockFreqCounterError("i_clk_test has a period of {:d}, not {:d}.".format(now() - first,
+                                                                                             test_period))
+            timing["phase"] = now()
+            timing["late"] = False
+            coincident = clk_period // gcd(clk_period, test_period)
+            for m in range(1, min(coincident, 64) + 1):
+                t = now() + m * test_period
+                if (t - timing["r0"]) % clk_period == 0:
+                    # the first edges of both clocks at the same time, before either changed
+                    yield delay(t - now())
+                    yield clk.posedge, i_clk_test.posedge
+                    timing["late"] = bool(clk) and not i_clk_test
+                    break
+            count = 0
+            k = 0
+            while True:
+                value, _ = window(k + COUNT_WINDOW[0], k + COUNT_WINDOW[1])
+                count += value
+                _, strobe = window(k + STROBE_WINDOW[0], k + STROBE_WINDOW[1])
+                yield delay(max(strobe + test_period - now(), 0)), reset_n.negedge
+                if reset_n == bool(0):
+                    break
+                # at the edge of a running i_clk_test, at once when it is stopped
+                yield i_clk_test.posedge, delay(0)
+                o_clock_freq.next = intbv(count % (1 << 16))[16:]
+                cleared, _ = window(k + RESET_WINDOW[0], k + RESET_WINDOW[1])
+                if cleared:
+                    count = 0
+                k += REF_CYCLE
+
+    return reset_out, measure
+
+
+@block
+def clock_freq_counter_tb(monitor=False, analytic=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param analytic: True to use the analytic counter and stop the clocks while it measures
     :return: A list of generators for this logic
     """
     H = bool(1)
@@ -191,18 +311,24 @@ def clock_freq_counter_tb(monitor=False):
     reset_n = Signal(bool(1))
     o_clock_freq = Signal(modbv(0)[16:])
     i_clk_test = Signal(bool(0))
+    clock_enable = Signal(bool(1))
 
-    cfc_inst = clock_freq_counter('TOP', 'CFC0', clk, reset_n, i_clk_test, o_clock_freq, monitor=monitor)
+    cfc_inst = clock_freq_counter('TOP', 'CFC0', clk, reset_n, i_clk_test, o_clock_freq, monitor=monitor,
+                                  analytic=analytic, test_period=200)
 
     @instance
     def clkgen():
         while True:
+            if not clock_enable:
+                yield clock_enable.posedge
             clk.next = not clk
             yield delay(period // 2)
 
     @instance
     def testclkgen():
         while True:
+            if not clock_enable:
+                yield clock_enable.posedge
             # 5 MHz clock, 200 nsec period
             i_clk_test.next = not i_clk_test
             yield delay(100)
@@ -217,7 +343,10 @@ def clock_freq_counter_tb(monitor=False):
         reset_n.next = bool(0)
         yield delay(10)
         reset_n.next = bool(1)
-        yield delay(100000)
+        # the analytic counter needs the clocks until it has seen their phases
+        yield delay(1000)
+        clock_enable.next = not analytic
+        yield delay(99000)
         # print("o_clock_freq = ", o_clock_freq)
         assert(o_clock_freq == 0x0199)
         # tfreq = (o_clock_freq/4096)*50
@@ -259,6 +388,13 @@ def main():
     tb = clock_freq_counter_tb(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    for analytic in (False, True):
+        tb = clock_freq_counter_tb(monitor=False, analytic=analytic)
+        start = time.perf_counter()
+        tb.run_sim()
+        print("analytic={}: {:.3f} s".format(analytic, time.perf_counter() - start))
+        tb.quit_sim()
     convert()
 
 
@@ -14,7 +14,7 @@ period = 20  # clk frequency = 50 MHz
 @block
 def comparator(path, name, clock, reset_n, temperature,
                low_register, high_register,
-               status_register, monitor=False):
+               status_register, monitor=False, change_driven=False):
     """
 
     :param path: Dot path of the path of this instance
@@ -29,6 +29,7 @@ def comparator(path, name, clock, reset_n, temperature,
             Bit1: 1=Temperature above high value, 0=Temperature at or below high value
             Bits2-7: Reserved (default to 0)
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate only at the first clock edge after an input changed (simulation only)
     """
     @always(clock.posedge)
     def compare_temp():
@@ -45,8 +46,23 @@ def comparator(path, name, clock, reset_n, temperature,
             else:
                 status_register.next[1] = bool(0)
 
+    if change_driven:
+        @instance
+        def compare_temp_on_change():
+            """
+            compare_temp at the first clock edge after reset_n, the temperature or a limit changed instead of
+            at every edge.  The inputs are registers that change after a clock edge, not with it.
+            """
+            while True:
+                yield clock.posedge
+                compare_temp.func()
+                yield reset_n, temperature, low_register, high_register
+        evaluate = compare_temp_on_change
+    else:
+        evaluate = compare_temp
+
     if not monitor:
-        return compare_temp
+        return evaluate
     else:
         @instance
         def monitor_temperature():
@@ -76,16 +92,17 @@ def comparator(path, name, clock, reset_n, temperature,
                 yield status_register
                 print("\t\tcomparator({:s}): status_register".format(path + '.' + name), status_register)
 
-        return compare_temp, monitor_temperature, monitor_low_register, monitor_high_register, \
+        return evaluate, monitor_temperature, monitor_low_register, monitor_high_register, \
             monitor_status_register
 
 
 
 @block
-def comparator_tb(monitor=False):
+def comparator_tb(monitor=False, change_driven=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate the comparator only after its inputs changed
     :return: A list of generators for this logic
     """
     clock = Signal(bool(0))
@@ -96,7 +113,8 @@ def comparator_tb(monitor=False):
     status_register = Signal(intbv(0)[8:])
 
     comp_inst = comparator('TOP', 'COMP0', clock, reset_n, temperature,
-                           low_register, high_register, status_register, monitor=monitor)
+                           low_register, high_register, status_register, monitor=monitor,
+                           change_driven=change_driven)
 
     @instance
     def clkgen():
@@ -193,6 +211,10 @@ def main():
     tb = comparator_tb(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    tb = comparator_tb(monitor=False, change_driven=True)
+    tb.run_sim()
+    tb.quit_sim()
     convert()
 
 
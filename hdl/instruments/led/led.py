@@ -5,192 +5,251 @@ See the licence file in the top directory
 Simulation of an LED
 """
 import os
-import os.path
-import queue
 import threading
 import time
-import tkinter as tk
-from PIL import ImageTk, Image
+from socket import create_connection
 from myhdl import *
-from socket import *
 
 HEADER_LENGTH = 10
+DISPLAY_ENV = "P2654SIM_DISPLAY"  # "1" or "<host>:<port>" turns on the link to the DisplayPanel
+DISPLAY_HOST = 'localhost'
+DISPLAY_PORT = 285
+CONNECT_TIMEOUT = 0.5
+FLUSH_INTERVAL = 0.05  # seconds between LED snapshots sent to the DisplayPanel (at most 20 per second)
 
 
 class LEDDisplay:
+    """
+    Optional link from the simulation to a running DisplayPanel.
+    The link is off unless enabled through the P2654SIM_DISPLAY environment variable or LEDDisplay.enable().
+    When it is on, LED changes only update a table of LED states.  A background thread connects to the
+    DisplayPanel and, at most every FLUSH_INTERVAL seconds, sends one message holding the new LEDs and the
+    latest state of every LED that changed since the previous message.  The simulation therefore never
+    waits on the socket, and an LED toggling at clock rate costs one entry per flush, not one message per edge.
+    The link is shared by every LED: each LED attaches to it and releases it when stopped, the link closes
+    when the last one is released and opens again for the next LED created.
+    """
     display_instance = None
-    client = socket(AF_INET, SOCK_STREAM)
-    ip = 'localhost'
-    server = (ip, 285)
-    try:
-        client.connect(server)
-        print("Connected to server!")
-    except:
-        client = None
 
     @staticmethod
     def display_factory():
         if LEDDisplay.display_instance is None:
-            LEDDisplay.display_instance = LEDDisplay()
+            LEDDisplay.display_instance = LEDDisplay.from_environment()
+        return LEDDisplay.display_instance
+
+    @staticmethod
+    def from_environment():
+        setting = os.environ.get(DISPLAY_ENV, "")
+        if setting == "" or setting == "0":
+            return LEDDisplay(enabled=False)
+        ip, _, port = setting.rpartition(":")
+        if ip and port.isdigit():
+            return LEDDisplay(ip, int(port), enabled=True)
+        return LEDDisplay(enabled=True)
+
+    @staticmethod
+    def enable(ip=DISPLAY_HOST, port=DISPLAY_PORT, interval=FLUSH_INTERVAL):
+        """
+        Turn on the display link for the LEDs created after this call
+        :param ip: Host name of the DisplayPanel
+        :param port: TCP port the DisplayPanel listens on
+        :param interval: Minimum time in seconds between two messages to the DisplayPanel
+        """
+        LEDDisplay.display_instance = LEDDisplay(ip, port, enabled=True, interval=interval)
         return LEDDisplay.display_instance
 
-    def __init__(self):
-        pass
+    def __init__(self, ip=DISPLAY_HOST, port=DISPLAY_PORT, enabled=False, interval=FLUSH_INTERVAL):
+        self.ip = ip
+        self.port = port
+        self.enabled = enabled
+        self.interval = interval
+        self.client = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.flush_thread = None
+        self.new_leds = []
+        self.states = {}
+        self.changed = []
+        self.users = 0
+
+    def attach(self):
+        """
+        Count an LED using the link.
+        """
+        with self.lock:
+            self.users += 1
+
+    def release(self):
+        """
+        Uncount an LED, the link is closed when no LED uses it anymore.
+        """
+        with self.lock:
+            self.users = max(self.users - 1, 0)
+            last = self.users == 0
+        if last:
+            self.quit()
+            with self.lock:
+                self.states = {}
+                self.new_leds = []
+                self.changed = []
+
+    def start(self):
+        """
+        Start the background thread that connects to and updates the DisplayPanel if not already done.
+        """
+        with self.lock:
+            if not self.enabled or self.flush_thread is not None:
+                return
+            # a new DisplayPanel connection has to learn the LEDs created before
+            self.new_leds = list(self.states)
+            self.changed = list(self.states)
+            self.flush_thread = threading.Thread(target=self.__run, args=(self.stop_event,), daemon=True)
+        self.flush_thread.start()
+
+    def __connect(self):
+        try:
+            self.client = create_connection((self.ip, self.port), timeout=CONNECT_TIMEOUT)
+        except OSError:
+            print("LEDDisplay: no DisplayPanel at {:s}:{:d}, display disabled.".format(self.ip, self.port))
+            return False
+        print("Connected to server!")
+        return True
+
+    def __run(self, stop_event):
+        if not self.__connect():
+            with self.lock:
+                self.enabled = False
+            return
+        while not stop_event.wait(self.interval):
+            if not self.flush():
+                break
+        self.flush()
+        self.send_message("QUIT")
+        self.client.close()
+        self.client = None
+
+    def __take_batch(self):
+        with self.lock:
+            lines = ["NEW_LED " + name for name in self.new_leds]
+            if self.changed:
+                lines.append("LEDS " + " ".join("{:s}:{:d}".format(name, self.states[name])
+                                                for name in self.changed))
+            self.new_leds = []
+            self.changed = []
+        return lines
+
+    def flush(self):
+        """
+        Send the pending LED changes as a single message.
+        :return: False if the DisplayPanel went away
+        """
+        lines = self.__take_batch()
+        if lines:
+            return self.send_message("\n".join(lines))
+        return True
 
     def send_message(self, message):
-        print("Sending message: ", message)
         message = message.encode('utf-8')
         message_header = f"{len(message):<{HEADER_LENGTH}}".encode('utf-8')
-        self.client.send(message_header + message)
+        try:
+            self.client.sendall(message_header + message)
+        except OSError:
+            print("LEDDisplay: DisplayPanel connection lost, display disabled.")
+            with self.lock:
+                self.enabled = False
+            return False
+        return True
 
     def create_led(self, name):
-        try:
-            if self.client is not None:
-                text = "NEW_LED " + name
-                print(text)
-                self.send_message(text)
-        except:
-            pass
+        if not self.enabled:
+            return
+        self.start()
+        with self.lock:
+            if name not in self.new_leds:
+                self.new_leds.append(name)
+            self.states[name] = 0
+
+    def set_led(self, name, state):
+        """
+        Record the new state of an LED.  Only the last state before a flush is sent.
+        :param name: Name of the LED given to create_led()
+        :param state: True for on, False for off
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.states.get(name) != state:
+                if name not in self.changed:
+                    self.changed.append(name)
+                self.states[name] = int(state)
 
     def led_on(self, name):
-        try:
-            if self.client is not None:
-                text = "LED_ON " + name
-                print(text)
-                self.send_message(text)
-        except:
-            pass
+        self.set_led(name, True)
 
     def led_off(self, name):
-        try:
-            if self.client is not None:
-                text = "LED_OFF " + name
-                print(text)
-                self.send_message(text)
-        except:
-            pass
+        self.set_led(name, False)
 
     def quit(self):
-        try:
-            if self.client is not None:
-                text = "QUIT"
-                print(text)
-                self.send_message(text)
-                self.client.close()
-        except:
-            pass
-
-
-class LEDThread (threading.Thread):
-    def __init__(self, threadID, qlock, name, q):
-        threading.Thread.__init__(self)
-        self.threadID = threadID
-        self.qlock = qlock
-        self.name = name
-        self.q = q
-        self.display = LEDDisplay.display_factory()
-        self.display.create_led(name)
-        self.thread1 = None
-        self.running = False
-
-    def run(self):
-        print("Starting " + self.name)
-        self.display_led(self.name, self.q)
-        print("Exiting " + self.name)
-
-    def display_led(self, name, q):
-        # start background thread
-        self.running = True
-        self.thread1 = threading.Thread(target=self.control_led)
-        self.thread1.start()
-        self.thread1.join()
-        print("After join")
-
-    def stop(self):
-        self.running = False
-
-    def control_led(self):
-        while self.running:
-            if self.q.qsize():
-                try:
-                    print("In control_led()")
-                    self.qlock.acquire()
-                    msg = self.q.get(0)
-                    self.qlock.release()
-                    time.sleep(1)
-                    if msg == "ON":
-                        self.display.led_on(self.name)
-                    elif msg == "OFF":
-                        self.display.led_off(self.name)
-                    else:
-                        print("Stop message received")
-                        self.running = False
-                except queue.Empty:
-                    pass
-        self.display.quit()
-        print("After window.quit")
-        print("Exiting control_led")
+        """
+        Send the pending changes and close the link.  The next LED created opens it again.
+        """
+        self.stop_event.set()
+        if self.flush_thread is not None:
+            self.flush_thread.join(CONNECT_TIMEOUT + self.interval + 1.0)
+        with self.lock:
+            self.flush_thread = None
+            self.stop_event = threading.Event()
 
 
 class LED:
     """
-
+    LED instrument.  The state of the LED is shown on the DisplayPanel when the display link is enabled.
     """
     def __init__(self, parent, name,  di):
         """
 
-        :param parent:
-        :param name:
-        :param di:
+        :param parent: Dot path of the parent of this instance
+        :param name: Instance name of the LED
+        :param di: Signal(bool(0)) driving the LED
         """
         self.parent = parent
         self.name = name
         self.di = di
-        self.queueLock = threading.Lock()
-        self.workQueue = queue.Queue(10)
-        self.threadID = 1
-        self.display_thread = LEDThread(self.threadID, self.queueLock, self.parent + '.' + self.name, self.workQueue)
-        self.display_thread.start()
-        print("past display_thread.start")
+        self.display = LEDDisplay.display_factory()
+        self.display.attach()
+        self.stopped = False
+        self.display.create_led(self.parent + '.' + self.name)
 
     def stop(self):
-        print("Entering stop()")
-        self.queueLock.acquire()
-        self.workQueue.put("STOP")
-        self.queueLock.release()
+        """
+        Release the display link, it closes when every LED has been stopped
+        """
+        if not self.stopped:
+            self.stopped = True
+            self.display.release()
 
     def _turn_on(self):
         """
         Turn LED on
         :return:
         """
-        print("Entering _turn_on()")
-        self.queueLock.acquire()
-        self.workQueue.put("ON")
-        self.queueLock.release()
-        print("Exiting _turn_on()")
+        self.display.led_on(self.parent + '.' + self.name)
 
     def _turn_off(self):
         """
         Turn LED off
         :return:
         """
-        print("Entering _turn_off()")
-        self.queueLock.acquire()
-        self.workQueue.put("OFF")
-        self.queueLock.release()
-        print("Exiting _turn_off()")
+        self.display.led_off(self.parent + '.' + self.name)
 
     @block
     def rtl(self):
         @always_comb
         def on_or_off():
-            print("Entering on_or_off()")
             if self.di == bool(0):
                 self._turn_off()
             else:
                 self._turn_on()
-            print("Exiting on_or_off()")
 
         return on_or_off
 
@@ -228,6 +287,7 @@ class LED:
 
 
 if __name__ == '__main__':
+    LEDDisplay.enable()
     tb = LED.testbench(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
@@ -16,7 +16,7 @@ period = 20  # clk frequency = 50 MHz
 @block
 def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
                          noise, pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-                         noise_flag, monitor=False):
+                         noise_flag, monitor=False, change_driven=False):
     """
     Instrument to monitor the power supply stability over time to determine of the voltage is in range, over range,
     or under range.  Normal operating conditions is where under == 0 and over == 0.
@@ -40,6 +40,8 @@ def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
     :param pu_mbist5: Power Usage value coming from the mbist5 instrument. Signal(intbv(0, min=0, max=101)) type.
     :param noise_flag: 0=Disable noise influence. 1=Enable noise influence. Signal(bool(1)) type.
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to sample the noise only at the first fast_ck edge after it changed
+                    (simulation only)
     :return: list of generators for the power_supply_monitor logic for simulation.
     """
     VDD = Signal(intbv(48000)[16:])  # voltage value in milli-volts simulating the power supply voltage being monitored
@@ -70,6 +72,23 @@ def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
                 noise_min.next = VDD - noise
                 noise_max.next = VDD
 
+    if change_driven:
+        @instance
+        def fast_ck_detect_on_change():
+            """
+            fast_ck_detect at the first fast_ck edge after the noise or noise_reset changed instead of at every
+            edge, noise_min and noise_max do not change in between.  The noise is a register of the
+            noise_maker and noise_reset follows the reference register, they change after a clock edge, not
+            with one.
+            """
+            while True:
+                yield fast_ck.posedge
+                fast_ck_detect.func()
+                yield noise, noise_reset, VDD
+        detect = fast_ck_detect_on_change
+    else:
+        detect = fast_ck_detect
+
     @always_comb
     def noise_bounds_check():
         if noise_max > VDD + (delta >> 1):
@@ -112,7 +131,7 @@ def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
             mbist_under.next = bool(0)
 
     if monitor == False:
-        return fast_ck_detect, noise_bounds_check, noise_reset_cond, over_cond, under_cond, mbist_cond
+        return detect, noise_bounds_check, noise_reset_cond, over_cond, under_cond, mbist_cond
     else:
         @instance
         def monitor_fast_ck():
@@ -240,7 +259,7 @@ def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
                 yield pu_mbist5
                 print("\t\tpower_supply_monitor({:s}): pu_mbist5".format(path + '.' + name), pu_mbist5)
 
-        return fast_ck_detect, noise_bounds_check, noise_reset_cond, over_cond, under_cond, mbist_cond, \
+        return detect, noise_bounds_check, noise_reset_cond, over_cond, under_cond, mbist_cond, \
                monitor_over, monitor_under, monitor_mbist_under, monitor_noise_over, \
                monitor_noise_under, monitor_noise_reset, monitor_VDD, monitor_noise_min, monitor_noise_max, \
                monitor_reference, monitor_delta, monitor_pu_mbist1, monitor_pu_mbist2, monitor_pu_mbist3, \
@@ -249,10 +268,11 @@ def power_supply_monitor(path, name, reference, delta, fast_ck, over, under,
                # monitor_fast_ck
 
 @block
-def power_supply_monitor_tb(monitor=False):
+def power_supply_monitor_tb(monitor=False, change_driven=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to sample the noise only after it changed
     :return: A list of generators for this logic
     """
     fast_ck = Signal(bool(0))
@@ -270,7 +290,7 @@ def power_supply_monitor_tb(monitor=False):
 
     psm_inst = power_supply_monitor('TOP', 'PSM00', reference, delta, fast_ck, over, under,
                                     noise, pu_mbist1, pu_mbist2, pu_mbist3, pu_mbist4, pu_mbist5,
-                                    noise_flag, monitor=monitor)
+                                    noise_flag, monitor=monitor, change_driven=change_driven)
 
     @instance
     def clkgen():
@@ -355,6 +375,10 @@ def main():
     tb = power_supply_monitor_tb(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    tb = power_supply_monitor_tb(monitor=False, change_driven=True)
+    tb.run_sim()
+    tb.quit_sim()
     convert()
 
 
@@ -0,0 +1,180 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Simulation time of the monitoring instruments of the Rearick use case with
+five MBISTs, clocked and change driven.
+
+The five simulatedmbist instruments of IP_3 heat the thermometer, the
+comparator checks the temperature and the power_supply_monitor of IP_2 sees
+their power usage and the noise of the noise_maker.  The thermometer and the
+comparator run on the IJTAG clock with the MBISTs, the power supply monitor
+on the fast sampling clock.  The MBISTs are started one after the other and
+the benchmark runs the same stimulus with change_driven off and on, checks
+that the outputs change at the same times and prints the run times.
+
+Usage: python -m hdl.instruments.rearick_bench [<test_delay>] [skip]
+skip also runs the MBISTs with time_skip.
+"""
+import sys
+import time
+from myhdl import *
+from hdl.instruments.simulatedmbist.simulatedmbist import simulatedmbist, period
+from hdl.instruments.thermometer.thermometer import thermometer, AMBIENT, OVERTEMP
+from hdl.instruments.comparator.comparator import comparator
+from hdl.instruments.power_supply_monitor.power_supply_monitor import power_supply_monitor
+from hdl.instruments.noise_maker.noise_maker import noise_maker, MAX_STAGES, MAX_TOGGLES
+
+MBISTS = 5
+
+
+@block
+def rearick_instruments(trace, change_driven, time_skip=False, test_delay=2000, start=400, spacing=None,
+                        initialize_delay=10, analyze_delay=30, toggles=(4, 15), stages=(3, 9), reference=48000,
+                        delta=200, low=70, high=240, controls=None):
+    """
+    The instruments with their clocks and a stimulus starting the MBISTs.
+    :param trace: list receiving (time, temperature, comparator status, over, under, MBIST status registers)
+                  at every change
+    :param change_driven: Value of change_driven of the thermometer, comparator and power_supply_monitor
+    :param time_skip: Value of time_skip of the MBISTs
+    :param test_delay: test_delay of the MBISTs in clock cycles
+    :param start: Time the first MBIST is started
+    :param spacing: Time between the starts of the MBISTs, a quarter of the test by default
+    :param initialize_delay: initialize_delay of the MBISTs in clock cycles
+    :param analyze_delay: analyze_delay of the MBISTs in clock cycles
+    :param toggles: num_toggles of the noise_maker before and after the third MBIST is started
+    :param stages: num_stages of the noise_maker before and after the third MBIST is started
+    :param reference: reference register of the power_supply_monitor
+    :param delta: delta register of the power_supply_monitor
+    :param low: low register of the comparator
+    :param high: high register of the comparator
+    :param controls: list of the control register values starting each MBIST, 0x01 (start) by default
+    """
+    if spacing is None:
+        spacing = test_delay * period // 4
+    if controls is None:
+        controls = [0x01] * MBISTS
+    clock = Signal(bool(0))
+    fast_ck = Signal(bool(0))
+    ck = Signal(bool(0))
+    reset_n = ResetSignal(1, 0, True)
+    crs = [Signal(intbv(0)[8:]) for _ in range(MBISTS)]
+    srs = [Signal(intbv(0)[8:]) for _ in range(MBISTS)]
+    cr_latches = [Signal(bool(0)) for _ in range(MBISTS)]
+    power = [Signal(intbv(0, min=0, max=101)) for _ in range(MBISTS)]
+    thermal = [Signal(intbv(0, min=0, max=101)) for _ in range(MBISTS)]
+    temperature = Signal(intbv(AMBIENT, min=0, max=OVERTEMP))
+    low_register = Signal(intbv(low, min=0, max=451))
+    high_register = Signal(intbv(high, min=0, max=451))
+    compsr_register = Signal(intbv(0)[8:])
+    num_toggles = Signal(intbv(0, min=0, max=MAX_TOGGLES))
+    num_stages = Signal(intbv(0, min=0, max=MAX_STAGES))
+    noise = Signal(intbv(0, min=0, max=MAX_TOGGLES * MAX_STAGES))
+    reference_register = Signal(intbv(reference)[16:])
+    delta_register = Signal(intbv(delta)[8:])
+    over = Signal(bool(0))
+    under = Signal(bool(0))
+    noise_flag = Signal(bool(1))
+
+    mbist_insts = [simulatedmbist("TOP", "SMBIST{:d}".format(i + 1), clock, reset_n, crs[i], cr_latches[i],
+                                  srs[i], power[i], thermal[i], initialize_delay=initialize_delay,
+                                  test_delay=test_delay, analyze_delay=analyze_delay, time_skip=time_skip)
+                  for i in range(MBISTS)]
+    temp_inst = thermometer("TOP", "TEMP0", clock, reset_n, temperature, *thermal, change_driven=change_driven)
+    comp_inst = comparator("TOP", "COMP0", clock, reset_n, temperature, low_register, high_register,
+                           compsr_register, change_driven=change_driven)
+    psm_inst = power_supply_monitor("TOP", "PSM0", reference_register, delta_register, fast_ck, over, under, noise,
+                                    *power, noise_flag, change_driven=change_driven)
+    nm_inst = noise_maker("TOP", "NM0", num_toggles, num_stages, ck, noise)
+
+    @instance
+    def clkgen():
+        while True:
+            clock.next = not clock
+            yield delay(period // 2)
+
+    @instance
+    def fast_ckgen():
+        while True:
+            fast_ck.next = not fast_ck
+            yield delay(period // 10)
+
+    @instance
+    def ckgen():
+        while True:
+            ck.next = not ck
+            yield delay(period)
+
+    @instance
+    def stimulus():
+        reset_n.next = bool(0)
+        yield delay(period)
+        # the inputs of the change driven instruments must not change with a clock edge
+        yield clock.negedge
+        reset_n.next = bool(1)
+        num_toggles.next = toggles[0]
+        num_stages.next = stages[0]
+        for i in range(MBISTS):
+            yield delay(start + i * spacing - now())
+            yield clock.negedge
+            crs[i].next = controls[i]
+            cr_latches[i].next = True
+            yield clock.negedge
+            cr_latches[i].next = False
+            if i == 2:
+                # more noise while three MBISTs run
+                num_toggles.next = toggles[1]
+                num_stages.next = stages[1]
+        # passed, aborted or failed in the test or analyze state
+        while not all(sr & 0x1D for sr in srs):
+            yield tuple(srs)
+        yield delay(10 * period)
+        raise StopSimulation()
+
+    @always(temperature, compsr_register, over, under, *srs)
+    def record():
+        trace.append((now(), int(temperature), int(compsr_register), bool(over), bool(under),
+                      tuple(int(sr) for sr in srs)))
+
+    return mbist_insts, temp_inst, comp_inst, psm_inst, nm_inst, clkgen, fast_ckgen, ckgen, stimulus, record
+
+
+def run(change_driven, time_skip=False, test_delay=2000):
+    """
+    :return: tuple of the trace and the run time in seconds
+    """
+    trace = []
+    tb = rearick_instruments(trace, change_driven, time_skip, test_delay)
+    start = time.perf_counter()
+    tb.run_sim(quiet=1)
+    elapsed = time.perf_counter() - start
+    tb.quit_sim()
+    return trace, elapsed
+
+
+def main():
+    args = sys.argv[1:]
+    time_skip = "skip" in args
+    args = [arg for arg in args if arg != "skip"]
+    test_delay = int(args[0]) if args else 2000
+    clocked, clocked_s = run(False, time_skip, test_delay)
+    driven, driven_s = run(True, time_skip, test_delay)
+    if clocked != driven:
+        print("The change driven instruments differ from the clocked ones:")
+        for c, d in zip(clocked, driven):
+            if c != d:
+                print("  clocked {}, change driven {}".format(c, d))
+                break
+        return 1
+    print("{:d} MBISTs, test_delay {:d}, time_skip {}, {:d} ns simulated, {:d} changes".format(
+        MBISTS, test_delay, time_skip, clocked[-1][0], len(clocked)))
+    print("{:>16s} {:>9s}".format("", "run s"))
+    print("{:>16s} {:9.2f}".format("clocked", clocked_s))
+    print("{:>16s} {:9.2f}".format("change driven", driven_s))
+    print("{:>16s} {:9.2f}x".format("speed up", clocked_s / driven_s))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,15 @@ See the licence file in the top directory
 MBIST Simulated Instrument
 Used to simulate a real MBIST instrument for the purposes of testing the IEEE 1687 or IEEE 1149.1-2013 networks
 
+With time_skip=True the instrument runs on a virtual free running clock of
+clock_period instead of counting the edges of clock in the delay states.  A
+delay state schedules one wake-up at the time the count would reach zero, so
+the clock of the board may be stopped while the test runs and the simulation
+jumps to the end of the delay.  Edges of clock still latch the control
+register and reach the state machine, so a start, an abort or a status scan
+behaves as in the counting model with a free running clock of clock_period.
+The time_skip model is for simulation only and is not converted.
+
 """
 from myhdl import *
 import os
@@ -46,7 +55,8 @@ def int_to_list(ival):
 
 @block
 def simulatedmbist(path, name, clock, reset_n, control_register, cr_latch, status_register, power_usage_register,
-                   thermal_register, initialize_delay=10, test_delay=30, analyze_delay=20, monitor=False):
+                   thermal_register, initialize_delay=10, test_delay=30, analyze_delay=20, monitor=False,
+                   time_skip=False, clock_period=period):
     """
     Constructor to create an instance of the MBIST Simulated Instrument
     :param path: Dot path of the parent of this instance
@@ -82,6 +92,8 @@ def simulatedmbist(path, name, clock, reset_n, control_register, cr_latch, statu
     :param test_delay: Keyword argument to specify the number of clock ticks to spin in the test state
     :param analyze_delay: Keyword argument to specify the number of clock ticks to spin in the analyze state
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param time_skip: True to wait for the end of the delay states with one wake-up instead of counting clock edges
+    :param clock_period: Period of the virtual clock of the time_skip model
     """
     state = Signal(t_State.IDLE)
     id_count = Signal(intbv(0, min=0, max=initialize_delay*2 + 1))
@@ -241,8 +253,17 @@ def simulatedmbist(path, name, clock, reset_n, control_register, cr_latch, statu
             else:
                 raise ValueError("Undefined state")
 
+    if time_skip:
+        # the counting processes are replaced by one process stepping at the edges of clock and at the
+        # times the virtual clock would make the state machine move
+        state_machine = skipping_state_machine(clock, reset_n, control_register, cr_latch, status_register,
+                                               power_usage_register, thermal_register, state,
+                                               internal_control_register, initialize_delay, test_delay,
+                                               analyze_delay, clock_period)
+        cr_process = None
+
     if not monitor:
-        return state_machine, cr_process
+        return [inst for inst in (state_machine, cr_process) if inst is not None]
     else:
         @instance
         def monitor_power_usage():
@@ -293,15 +314,164 @@ def simulatedmbist(path, name, clock, reset_n, control_register, cr_latch, statu
                 yield status_register
                 print("\t\tsimulatedmbist({:s}).status_register:".format(path + '.' + name), status_register)
 
-        return state_machine, monitor_reset_n, monitor_clock, monitor_internal_control_register, monitor_status_register,\
-            monitor_state, monitor_power_usage, monitor_tempurature, cr_process
+        return [inst for inst in (state_machine, monitor_reset_n, monitor_clock, monitor_internal_control_register,
+                                  monitor_status_register, monitor_state, monitor_power_usage, monitor_tempurature,
+                                  cr_process) if inst is not None]
 
 
 @block
-def simulatedmbist_tb(monitor=False):
+def skipping_state_machine(clock, reset_n, control_register, cr_latch, status_register, power_usage_register,
+                           thermal_register, state, internal_control_register, initialize_delay, test_delay,
+                           analyze_delay, clock_period):
+    """
+    State machine and control register latch of simulatedmbist for time_skip=True.
+    A step is what one edge of the counting model does; steps happen at the edges of the virtual clock while
+    the instrument is busy and at the edges of clock only while cr_latch or a synchronous reset is set, so the
+    process does not wake up at every edge of a running clock.  The delay states sleep until their last edge.
+    """
+    DELAYS = {int(t_State.INITIALIZE_DELAY): (initialize_delay, 4, None),
+              int(t_State.TEST_DELAY): (test_delay, 5, 2),
+              int(t_State.ANALYZE_DELAY): (analyze_delay, 6, 3)}
+    timing = {"wake": None, "entry": 0, "count": 0, "last": None}
+
+    def go(next_state, power, temp, status=None):
+        state.next = next_state
+        power_usage_register.next = power
+        thermal_register.next = temp
+        if status is not None:
+            status_register.next = intbv(status)[8:]
+
+    def enter_delay(t, next_state, icr):
+        count, double_bit, _ = DELAYS[int(next_state)]
+        timing["entry"] = t
+        timing["count"] = count + count if icr[double_bit] else count
+
+    def delay_wake(current, icr):
+        """
+        :return: time of the edge that ends the delay: the count reaches 0 one edge after count edges, an
+                 injected error happens on the edge where the count is 1
+        """
+        _, _, error_bit = DELAYS[int(current)]
+        count = timing["count"]
+        if error_bit is not None and icr[error_bit] and count > 0:
+            return timing["entry"] + count * clock_period
+        return timing["entry"] + (count + 1) * clock_period
+
+    def step(t):
+        icr = intbv(int(internal_control_register.val))[8:]
+        current = state.val
+        # control register latch, as cr_process
+        if cr_latch:
+            icr_next = intbv(int(control_register.val))[8:]
+        elif current == t_State.ANALYZE_DELAY or icr[1]:
+            icr_next = intbv(0)[8:]
+        else:
+            icr_next = icr
+        internal_control_register.next = icr_next
+
+        if current == t_State.IDLE:
+            if icr[0]:
+                status_register.next[0] = bool(0)
+                go(t_State.START, START_POWER, START_TEMP)
+                return t + clock_period
+            return t + clock_period if icr_next[0] else None
+        if icr[1]:  # Abort
+            go(t_State.IDLE, IDLE_POWER, IDLE_TEMP, '00000100')
+            return t + clock_period if icr_next[0] else None
+        if current == t_State.START:
+            go(t_State.INITIALIZE, START_POWER, START_TEMP)
+        elif current == t_State.INITIALIZE:
+            go(t_State.INITIALIZE_DELAY, INIT_POWER, INIT_TEMP)
+            enter_delay(t, t_State.INITIALIZE_DELAY, icr)
+        elif current == t_State.TEST:
+            go(t_State.TEST_DELAY, TEST_POWER, TEST_TEMP)
+            enter_delay(t, t_State.TEST_DELAY, icr)
+        elif current == t_State.ANALYZE:
+            go(t_State.ANALYZE_DELAY, ANALYZE_POWER, ANALYZE_TEMP)
+            enter_delay(t, t_State.ANALYZE_DELAY, icr)
+        else:
+            _, _, error_bit = DELAYS[int(current)]
+            count = timing["count"]
+            if error_bit is not None and icr[error_bit] and count > 0 and \
+                    t >= timing["entry"] + count * clock_period:
+                # Introduce error on the edge where the count is 1
+                go(t_State.IDLE, IDLE_POWER, IDLE_TEMP, '00001000' if error_bit == 2 else '00010000')
+                return t + clock_period if icr_next[0] else None
+            if t >= timing["entry"] + (count + 1) * clock_period:
+                if current == t_State.INITIALIZE_DELAY:
+                    go(t_State.TEST, INIT_POWER, INIT_TEMP)
+                elif current == t_State.TEST_DELAY:
+                    go(t_State.ANALYZE, TEST_POWER, TEST_TEMP)
+                else:
+                    go(t_State.IDLE, IDLE_POWER, IDLE_TEMP, '00000001')
+                    return t + clock_period if icr_next[0] else None
+                return t + clock_period
+            if cr_latch or icr_next != icr:
+                # the control register changes, the next edge sees it
+                return t + clock_period
+            return delay_wake(current, icr_next)
+        # the first edge of a delay state still updates the control register (cleared in ANALYZE_DELAY)
+        return t + clock_period
+
+    armed = Signal(bool(0))  # toggled when the time of the next virtual edge changes
+    virtual_edge = Signal(bool(0))  # toggled at the time of the next virtual edge
+
+    @instance
+    def timer():
+        # one timer per wake time, a delay per clock edge would pile up in the event list of the simulator
+        while True:
+            wake = timing["wake"]
+            if wake is None or wake <= now():
+                yield armed
+            else:
+                yield armed, delay(wake - now())
+                if timing["wake"] == now():
+                    virtual_edge.next = not virtual_edge
+
+    @instance
+    def run():
+        edges = (clock.posedge, reset_n.negedge) if reset_n.isasync else (clock.posedge,)
+        while True:
+            if cr_latch or reset_n == reset_n.active:
+                # the next edge of clock latches the control register or samples the reset
+                yield edges + (virtual_edge,)
+            else:
+                # nothing happens at an edge of clock until cr_latch or reset_n change, the steps of a busy
+                # instrument fall on the virtual edges, at the edges of a clock running at clock_period
+                yield cr_latch.posedge, reset_n, virtual_edge
+                if timing["wake"] != now() and (reset_n != reset_n.active or not reset_n.isasync):
+                    continue
+            t = now()
+            if timing["wake"] == t and not clock and reset_n != reset_n.active:
+                # a virtual edge before the edge of a running clock at this time (a clock derived from another
+                # one is late by a delta), step at that edge so the outputs change after it as in the
+                # counting model
+                yield clock.posedge, delay(0)
+            if reset_n == reset_n.active:
+                # always_seq puts the registers back to their initial values
+                for sig in (status_register, internal_control_register, state, power_usage_register,
+                            thermal_register):
+                    sig.next = sig._init
+                wake = None
+            elif timing["last"] == t:
+                # an edge of clock at the time of a virtual edge that has been stepped already
+                continue
+            else:
+                wake = step(t)
+            timing["last"] = t
+            if wake != timing["wake"]:
+                timing["wake"] = wake
+                armed.next = not armed
+
+    return timer, run
+
+
+@block
+def simulatedmbist_tb(monitor=False, time_skip=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param time_skip: True to use the time_skip model and stop the clock while the test runs
     :return: A list of generators for this logic
     """
     cr = Signal(intbv(0)[8:])
@@ -311,15 +481,18 @@ def simulatedmbist_tb(monitor=False):
     reset_n = ResetSignal(1, 0, True)
     power_usage = Signal(intbv(0, min=0, max=101))
     thermal = Signal(intbv(0, min=0, max=101))
+    clock_enable = Signal(bool(1))
 
     mbist_inst = simulatedmbist('TOP', 'SMBIST0', clock, reset_n, cr, cr_latch, sr, power_usage, thermal,
                                 initialize_delay=10, test_delay=40,
                                 analyze_delay=30,
-                                monitor=monitor)
+                                monitor=monitor, time_skip=time_skip)
 
     @instance
     def clkgen():
         while True:
+            if not clock_enable:
+                yield clock_enable.posedge
             clock.next = not clock
             yield delay(period // 2)
 
@@ -339,7 +512,12 @@ def simulatedmbist_tb(monitor=False):
         cr_latch.next = bool(1)
         yield delay(10)
         cr_latch.next = bool(0)
+        yield delay(period)
+        # nothing needs the clock while the test runs
+        clock_enable.next = not time_skip
         yield delay(10000)
+        clock_enable.next = bool(1)
+        yield delay(period)
         assert (sr[0] == bool(1))
         assert (sr[1] == bool(0))
         assert (sr[2] == bool(0))
@@ -386,6 +564,10 @@ def main():
     tb = simulatedmbist_tb(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    tb = simulatedmbist_tb(monitor=True, time_skip=True)
+    tb.run_sim()
+    tb.quit_sim()
     convert()
 
 
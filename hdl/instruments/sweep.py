@@ -0,0 +1,218 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Monte Carlo sweep of the monitoring instruments of the Rearick use case.
+
+Every run simulates rearick_instruments (see rearick_bench.py) with its
+parameters drawn from distributions: the delays of the MBISTs, the noise of
+the noise_maker before and after the third MBIST starts, the reference and
+delta registers of the power_supply_monitor and the control register starting
+each MBIST, which may inject a test or analyze error.  A distribution is
+  - a constant,
+  - ("uniform", low, high), an int from low to high inclusive,
+  - ("normal", mean, sigma, low, high), rounded and clipped to low..high,
+  - ("choice", values), one of the values,
+  - ("bernoulli", p), 1 with the probability p else 0.
+Run i draws its parameters from a generator seeded with "<seed>:<i>", a run
+has the same parameters and outcome whatever the number of processes or the
+batch size, and a single run can be repeated with run(seed, i).
+
+The runs are simulated in a process pool, a batch of runs at a time, and the
+rows of every batch are appended to the results file as soon as it is done,
+so an interrupted sweep keeps the rows of its finished batches.  The results
+file is a CSV table with one column per parameter and per outcome.
+
+Usage: python -m hdl.instruments.sweep [-j <processes>] [-s <seed>] [-b <batch size>] <runs> <results.csv>
+"""
+import csv
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from hdl.instruments.rearick_bench import rearick_instruments, MBISTS
+from hdl.instruments.noise_maker.noise_maker import MAX_STAGES, MAX_TOGGLES
+
+START = 0x01
+TEST_ERROR = 0x05
+ANALYZE_ERROR = 0x09
+
+PARAMETERS = {
+    "initialize_delay": ("uniform", 5, 40),
+    "test_delay": ("uniform", 100, 400),
+    "analyze_delay": ("uniform", 10, 60),
+    "toggles_before": ("uniform", 0, MAX_TOGGLES - 1),
+    "stages_before": ("uniform", 0, MAX_STAGES - 1),
+    "toggles_after": ("uniform", 0, MAX_TOGGLES - 1),
+    "stages_after": ("uniform", 0, MAX_STAGES - 1),
+    "reference": ("normal", 48000, 100, 47500, 48500),
+    "delta": ("uniform", 50, 255),
+}
+PARAMETERS.update({"control{:d}".format(i + 1): ("choice", (START,) * 8 + (TEST_ERROR, ANALYZE_ERROR))
+                   for i in range(MBISTS)})
+OUTCOMES = ("passed", "failed", "max_temperature", "final_temperature", "comparator_status", "overs", "unders",
+            "end_ns", "seconds")
+
+
+class SweepError(Exception):
+    def __init__(self, message):
+        super(SweepError, self).__init__(message)
+
+
+def draw(generator, distribution):
+    """
+    :param generator: random.Random of the run
+    :param distribution: A constant or a tuple of the kind of distribution and its parameters
+    :return: the value drawn
+    """
+    if not isinstance(distribution, tuple):
+        return distribution
+    kind, arguments = distribution[0], distribution[1:]
+    if kind == "uniform":
+        low, high = arguments
+        return generator.randint(low, high)
+    if kind == "normal":
+        mean, sigma, low, high = arguments
+        return min(max(int(round(generator.gauss(mean, sigma))), low), high)
+    if kind == "choice":
+        return generator.choice(arguments[0])
+    if kind == "bernoulli":
+        return 1 if generator.random() < arguments[0] else 0
+    raise SweepError("Unknown distribution {:s}.".format(repr(distribution)))
+
+
+def parameters(seed, index, distributions=None):
+    """
+    :param seed: Seed of the sweep
+    :param index: Index of the run in the sweep
+    :param distributions: dict parameter name -> distribution, PARAMETERS by default
+    :return: dict parameter name -> value of the run
+    """
+    if distributions is None:
+        distributions = PARAMETERS
+    generator = random.Random("{}:{:d}".format(seed, index))
+    return {name: draw(generator, distributions[name]) for name in distributions}
+
+
+def simulate(values, change_driven=True, time_skip=True):
+    """
+    Simulate the instruments with the parameters of a run.
+    :param values: dict parameter name -> value, the parameters missing keep the defaults of rearick_instruments
+    :return: dict outcome name -> value
+    """
+    values = dict(values)
+    keywords = {name: values.pop(name) for name in ("initialize_delay", "test_delay", "analyze_delay", "reference",
+                                                     "delta", "low", "high") if name in values}
+    if "toggles_before" in values or "toggles_after" in values:
+        keywords["toggles"] = (values.pop("toggles_before", 4), values.pop("toggles_after", 15))
+    if "stages_before" in values or "stages_after" in values:
+        keywords["stages"] = (values.pop("stages_before", 3), values.pop("stages_after", 9))
+    controls = [values.pop("control{:d}".format(i + 1), START) for i in range(MBISTS)]
+    if values:
+        raise SweepError("Unknown parameters {:s}.".format(", ".join(sorted(values))))
+    trace = []
+    tb = rearick_instruments(trace, change_driven, time_skip, controls=controls, **keywords)
+    start = perf_counter()
+    try:
+        tb.run_sim(quiet=1)
+    finally:
+        tb.quit_sim()
+    seconds = perf_counter() - start
+    _, temperature, status, _, _, srs = trace[-1]
+    return {
+        "passed": sum(1 for sr in srs if sr & 0x01),
+        "failed": sum(1 for sr in srs if sr & 0x1C),
+        "max_temperature": max(entry[1] for entry in trace),
+        "final_temperature": temperature,
+        "comparator_status": status,
+        "overs": sum(1 for previous, entry in zip(trace, trace[1:]) if entry[3] and not previous[3]),
+        "unders": sum(1 for previous, entry in zip(trace, trace[1:]) if entry[4] and not previous[4]),
+        "end_ns": trace[-1][0],
+        "seconds": round(seconds, 3),
+    }
+
+
+def run(seed, index, distributions=None):
+    """
+    :return: dict of the index, the parameters and the outcome of run index of the sweep
+    """
+    values = parameters(seed, index, distributions)
+    row = dict(run=index)
+    row.update(values)
+    row.update(simulate(values))
+    return row
+
+
+def _run_job(job):
+    return run(*job)
+
+
+def sweep(seed, runs, results, processes=None, batch=None, distributions=None):
+    """
+    Simulate the runs in batches and append the rows of every batch to the results file.
+    :param seed: Seed of the sweep
+    :param runs: Number of runs
+    :param results: File name of the CSV results file, its header is written first
+    :param processes: Number of worker processes, the number of cores by default
+    :param batch: Number of runs per batch, 4 per process by default
+    :param distributions: dict parameter name -> distribution, PARAMETERS by default
+    :return: list of the rows
+    """
+    if distributions is None:
+        distributions = PARAMETERS
+    processes = max(1, min(processes or os.cpu_count() or 1, runs))
+    batch = batch or 4 * processes
+    columns = ["run"] + list(distributions) + list(OUTCOMES)
+    rows = []
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=context) if processes > 1 else None
+    try:
+        with open(results, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            for first in range(0, runs, batch):
+                jobs = [(seed, index, distributions) for index in range(first, min(first + batch, runs))]
+                done = list(executor.map(_run_job, jobs)) if executor else [_run_job(job) for job in jobs]
+                writer.writerows(done)
+                f.flush()
+                rows += done
+                print("{:d}/{:d} runs".format(len(rows), runs))
+    finally:
+        if executor:
+            executor.shutdown()
+    return rows
+
+
+def summary(rows, out=sys.stdout):
+    if not rows:
+        return
+    print("{:d} runs, {:d} MBISTs passed, {:d} failed, {:d} runs with over voltage, {:d} with under voltage".format(
+        len(rows), sum(row["passed"] for row in rows), sum(row["failed"] for row in rows),
+        sum(1 for row in rows if row["overs"]), sum(1 for row in rows if row["unders"])), file=out)
+    print("temperature max {:d}, simulation {:.2f} s per run".format(
+        max(row["max_temperature"] for row in rows), sum(row["seconds"] for row in rows) / len(rows)), file=out)
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for option in ("-j", "-s", "-b"):
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 2:
+        print(__doc__)
+        return 2
+    start = perf_counter()
+    rows = sweep(options.get("-s", "2654"), int(args[0]), args[1], int(options.get("-j", 0)) or None,
+                 int(options.get("-b", 0)) or None)
+    summary(rows)
+    print("{:.2f} s".format(perf_counter() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,7 +23,7 @@ HEAT_EXCHANGE = 150
 @block
 def thermometer(parent, name, clock, reset_n, temperature,
                 thermal_register1, thermal_register2, thermal_register3,
-                thermal_register4, thermal_register5, monitor=False):
+                thermal_register4, thermal_register5, monitor=False, change_driven=False):
     """
 
     :param path: Dot path of the parent of this instance
@@ -37,6 +37,7 @@ def thermometer(parent, name, clock, reset_n, temperature,
     :param thermal_register4: Proportion of total temperature of MBIST4
     :param thermal_register5: Proportion of total temperature of MBIST5
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate only at the first clock edge after an input changed (simulation only)
     """
     @always(clock.posedge)
     def calc_temp():
@@ -57,8 +58,25 @@ def thermometer(parent, name, clock, reset_n, temperature,
             # print("hot = ", hot)
             temperature.next = hot
 
+    if change_driven:
+        @instance
+        def calc_temp_on_change():
+            """
+            calc_temp at the first clock edge after reset_n or a thermal register changed instead of at every
+            edge, the temperature does not change in between.  The inputs must change after a clock edge, not
+            with it, as the thermal registers of the MBISTs do.
+            """
+            while True:
+                yield clock.posedge
+                calc_temp.func()
+                yield reset_n, thermal_register1, thermal_register2, thermal_register3, \
+                    thermal_register4, thermal_register5
+        evaluate = calc_temp_on_change
+    else:
+        evaluate = calc_temp
+
     if not monitor:
-        return calc_temp
+        return evaluate
     else:
         @instance
         def monitor_temperature():
@@ -102,15 +120,16 @@ def thermometer(parent, name, clock, reset_n, temperature,
                 yield thermal_register5
                 print("\t\tthermometer({:s}): thermal_register5".format(parent + '.' + name), thermal_register5)
 
-        return calc_temp, monitor_temperature, monitor_thermal_register1, monitor_thermal_register2, \
+        return evaluate, monitor_temperature, monitor_thermal_register1, monitor_thermal_register2, \
             monitor_thermal_register3, monitor_thermal_register4, monitor_thermal_register5
 
 
 @block
-def thermometer_tb(monitor=False):
+def thermometer_tb(monitor=False, change_driven=False):
     """
     Test bench interface for a quick test of the operation of the design
     :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :param change_driven: True to evaluate the thermometer only after its inputs changed
     :return: A list of generators for this logic
     """
     clock = Signal(bool(0))
@@ -124,7 +143,7 @@ def thermometer_tb(monitor=False):
 
     temp_inst = thermometer('TOP', 'TEMP0', clock, reset_n, temperature,
                             thermal_register1, thermal_register2, thermal_register3,
-                            thermal_register4, thermal_register5, monitor=monitor)
+                            thermal_register4, thermal_register5, monitor=monitor, change_driven=change_driven)
 
     @instance
     def clkgen():
@@ -916,6 +935,10 @@ def main():
     tb = thermometer_tb(monitor=True)
     tb.config_sim(trace=True)
     tb.run_sim()
+    tb.quit_sim()
+    tb = thermometer_tb(monitor=False, change_driven=True)
+    tb.run_sim()
+    tb.quit_sim()
     convert()
 
 
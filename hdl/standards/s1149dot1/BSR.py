@@ -0,0 +1,224 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Boundary scan register and instruction decode generated from a BSDL description
+(see hdl/standards/s1149dot1/bsdl.py).
+
+BSR keeps the whole register in two intbv vectors, the capture/shift stage
+and the update stage, instead of one instance per cell, so a register of any
+length is three processes.  Bit n of the vectors is cell n of the BSDL
+BOUNDARY_REGISTER, cell 0 being next to TDO.  The device wires its pins to
+the pins_in vector (the value each cell captures) and takes the cell outputs
+from pins_out, which holds the update stage under EXTEST and follows
+pins_in otherwise, as the BC_1 cells of the hand written registers do.
+"""
+
+from myhdl import *
+from hdl.standards.s1149dot1.bsdl import parse_file
+import os
+import os.path
+
+period = 20  # clk frequency = 50 MHz
+
+
+@block
+def BSR(path, name, si, select, capturedr, shiftdr, updatedr, extest, tck, so, pins_in, pins_out, monitor=False):
+    """
+    :param path: Dot path of the parent of this instance
+    :param name: Instance name for debug logging (path instance)
+    :param si: Scan input of the register (from TDI)
+    :param select: Signal selecting the register (EXTEST or SAMPLE/PRELOAD decoded)
+    :param capturedr: TAP Capture-DR state
+    :param shiftdr: TAP Shift-DR state
+    :param updatedr: TAP Update-DR state
+    :param extest: EXTEST decoded, the cells drive the update stage to the pins
+    :param tck: TAP TCK
+    :param so: Scan output of the register (to TDO)
+    :param pins_in: Signal(intbv(0)[length:]) value captured by each cell
+    :param pins_out: Signal(intbv(0)[length:]) value driven by each cell
+    :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    """
+    width = len(pins_in)
+    shift_reg = Signal(intbv(0)[width:])
+    update_reg = Signal(intbv(0)[width:])
+
+    @always(tck.posedge)
+    def shift_logic():
+        if select and capturedr:
+            shift_reg.next = pins_in
+        elif select and shiftdr:
+            if width == 1:
+                shift_reg.next[0] = si
+            else:
+                shift_reg.next = concat(si, shift_reg[width:1])
+
+    @always(tck.negedge)
+    def update_logic():
+        so.next = shift_reg[0]
+        if select and updatedr:
+            update_reg.next = shift_reg
+
+    @always_comb
+    def output_process():
+        if extest:
+            pins_out.next = update_reg
+        else:
+            pins_out.next = pins_in
+
+    if not monitor:
+        return shift_logic, update_logic, output_process
+    else:
+        @instance
+        def monitor_update():
+            print("\t\tBSR({:s}): update".format(path + '.' + name), update_reg)
+            while 1:
+                yield update_reg
+                print("\t\tBSR({:s}): update".format(path + '.' + name), update_reg)
+
+        return shift_logic, update_logic, output_process, monitor_update
+
+
+@block
+def IRDecode(device, ir, selects):
+    """
+    Instruction decode of a BSDL device.  Opcodes that are not listed select BYPASS.
+    :param device: BSDLDevice
+    :param ir: Signal(intbv(0)[device.instruction_length:]) holding the latched instruction
+    :param selects: dict instruction name -> Signal(bool(0)) set while the instruction is active,
+                    instructions without a Signal are not decoded
+    """
+    table = [(value, mask, name) for value, mask, name in device.decode_table() if name in selects]
+    values = tuple(value for value, mask, name in table)
+    masks = tuple(mask for value, mask, name in table)
+    names = list(selects)
+    indexes = tuple(names.index(name) for value, mask, name in table)
+    outputs = [selects[name] for name in names]
+    bypass = names.index("BYPASS") if "BYPASS" in names else len(names)
+
+    @always_comb
+    def decode_process():
+        found = len(outputs)
+        for i in range(len(values)):
+            if found == len(outputs) and (ir & masks[i]) == values[i]:
+                found = indexes[i]
+        if found == len(outputs):
+            found = bypass
+        for i in range(len(outputs)):
+            outputs[i].next = i == found
+
+    return decode_process
+
+
+@block
+def BSR_tb(monitor=False):
+    """
+    Test bench interface for a quick test of the operation of the design
+    :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :return: A list of generators for this logic
+    """
+    device = parse_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "devices",
+                                     "SN74ABT8244A", "sn74abt8244a.bsm"))
+    width = device.boundary_length
+    tck = Signal(bool(0))
+    si = Signal(bool(0))
+    so = Signal(bool(0))
+    select = Signal(bool(0))
+    capturedr = Signal(bool(0))
+    shiftdr = Signal(bool(0))
+    updatedr = Signal(bool(0))
+    extest = Signal(bool(0))
+    pins_in = Signal(intbv(0x0A5F5)[width:])
+    pins_out = Signal(intbv(0)[width:])
+    ir = Signal(intbv(0)[device.instruction_length:])
+    sample = Signal(bool(0))
+    selects = {"EXTEST": extest, "SAMPLE": sample, "BYPASS": Signal(bool(0))}
+
+    bsr_inst = BSR("TOP", "BSR0", si, select, capturedr, shiftdr, updatedr, extest, tck, so, pins_in, pins_out,
+                   monitor=monitor)
+    decode_inst = IRDecode(device, ir, selects)
+
+    @instance
+    def clkgen():
+        while True:
+            tck.next = not tck
+            yield delay(period // 2)
+
+    @always_comb
+    def select_process():
+        select.next = extest or sample
+
+    @instance
+    def stimulus():
+        ir.next = device.instruction("SAMPLE")
+        yield delay(1)
+        assert selects["SAMPLE"] and not extest
+        assert pins_out == pins_in
+        yield tck.negedge
+        capturedr.next = True
+        yield tck.negedge
+        capturedr.next = False
+        shiftdr.next = True
+        vector = device.drive_vector({"Y1(1)": 1, "Y1(2)": 0})
+        captured = 0
+        for i in range(width):
+            si.next = (vector >> i) & 1
+            yield tck.posedge
+            yield tck.negedge
+            captured |= int(so) << i
+        shiftdr.next = False
+        updatedr.next = True
+        yield tck.negedge
+        updatedr.next = False
+        assert captured == 0x0A5F5
+        ir.next = device.instruction("EXTEST")
+        yield delay(1)
+        assert extest and not selects["SAMPLE"]
+        assert pins_out == vector
+        ir.next = 0x55
+        yield delay(1)
+        assert selects["BYPASS"] and not extest
+
+        raise StopSimulation()
+
+    return bsr_inst, decode_inst, clkgen, select_process, stimulus
+
+
+def convert():
+    """
+    Convert the myHDL design into VHDL and Verilog
+    :return:
+    """
+    width = 18
+    tck = Signal(bool(0))
+    si = Signal(bool(0))
+    so = Signal(bool(0))
+    select = Signal(bool(0))
+    capturedr = Signal(bool(0))
+    shiftdr = Signal(bool(0))
+    updatedr = Signal(bool(0))
+    extest = Signal(bool(0))
+    pins_in = Signal(intbv(0)[width:])
+    pins_out = Signal(intbv(0)[width:])
+    bsr_inst = BSR("TOP", "BSR0", si, select, capturedr, shiftdr, updatedr, extest, tck, so, pins_in, pins_out,
+                   monitor=False)
+
+    vhdl_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vhdl')
+    if not os.path.exists(vhdl_dir):
+        os.mkdir(vhdl_dir, mode=0o777)
+    bsr_inst.convert(hdl="VHDL", initial_values=True, directory=vhdl_dir, name="BSR")
+    verilog_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verilog')
+    if not os.path.exists(verilog_dir):
+        os.mkdir(verilog_dir, mode=0o777)
+    bsr_inst.convert(hdl="Verilog", initial_values=True, directory=verilog_dir, name="BSR")
+
+
+def main():
+    tb = BSR_tb(monitor=False)
+    tb.config_sim(trace=False)
+    tb.run_sim()
+    convert()
+
+
+if __name__ == '__main__':
+    main()
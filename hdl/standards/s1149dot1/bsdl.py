@@ -0,0 +1,332 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Parser for IEEE 1149.1 Boundary Scan Description Language (BSDL) files.
+
+The parser reads the entity, port and attribute statements of a BSDL file
+into a BSDLDevice holding what the simulator and the test side need: the
+instruction length and opcodes, the register access, the boundary register
+cell table and the IDCODE/USERCODE when the device has them.  Other
+statements (use, generic, constants other than pin maps, ...) are skipped.
+
+BSDLDevice also composes and decodes boundary register vectors, so test
+vectors are generated from the same description the hardware model is built
+from (see hdl/standards/s1149dot1/BSR.py).  Bit n of a vector is cell n, the
+cell next to TDO, which is the first bit shifted out.
+
+Parsed files are cached by the hash of their content (see hdl.common.filecache).
+"""
+import re
+from hdl.common import filecache
+
+CACHE_KIND = "bsdl"
+CACHE_VERSION = 1
+
+ENTITY_RE = re.compile(r"\bentity\s+(\w+)\s+is\b", re.IGNORECASE)
+PORT_RE = re.compile(r"\bport\s*\(", re.IGNORECASE)
+PORT_DECL_RE = re.compile(r"^\s*([\w\s,]+?)\s*:\s*(\w+)\s+(\w+)\s*(?:\(\s*(\d+)\s+(to|downto)\s+(\d+)\s*\))?\s*$",
+                          re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r"\battribute\s+(\w+)\s+of\s+(\w+)\s*:\s*\w+\s+is\s+(.*?);", re.IGNORECASE | re.DOTALL)
+CONSTANT_RE = re.compile(r"\bconstant\s+(\w+)\s*:\s*PIN_MAP_STRING\s*:=\s*(.*?);", re.IGNORECASE | re.DOTALL)
+STRING_RE = re.compile(r'"([^"]*)"')
+OPCODE_RE = re.compile(r"(\w+)\s*\(([^)]*)\)")
+CELL_RE = re.compile(r"(\d+)\s*\(((?:[^()]|\([^()]*\))*)\)")
+
+OUTPUT_FUNCTIONS = ("output2", "output3", "bidir")
+INPUT_FUNCTIONS = ("input", "clock", "observe_only", "bidir")
+
+
+class BSDLError(Exception):
+    def __init__(self, message):
+        super(BSDLError, self).__init__(message)
+
+
+class BSDLCell:
+    """
+    One entry of the BOUNDARY_REGISTER attribute.  A merged cell (e.g. an input that is also a
+    control) has one BSDLCell per entry, all with the same number.
+    """
+    __slots__ = ("number", "cell", "port", "function", "safe", "ccell", "disval", "rslt")
+
+    def __init__(self, number, cell, port, function, safe, ccell=None, disval=None, rslt=None):
+        self.number = number
+        self.cell = cell
+        self.port = port
+        self.function = function
+        self.safe = safe
+        self.ccell = ccell
+        self.disval = disval
+        self.rslt = rslt
+
+    def __repr__(self):
+        text = "{:d} ({:s}, {:s}, {:s}, {:s}".format(self.number, self.cell, self.port, self.function, self.safe)
+        if self.ccell is not None:
+            text += ", {:d}, {:d}, {:s}".format(self.ccell, self.disval, self.rslt)
+        return text + ")"
+
+
+class BSDLDevice:
+    def __init__(self, entity, filename=None):
+        self.entity = entity
+        self.filename = filename
+        self.ports = {}
+        self.attributes = {}
+        self.pin_maps = {}
+        self.instruction_length = 0
+        self.opcodes = {}
+        self.instruction_capture = None
+        self.registers = {}
+        self.boundary_length = 0
+        self.cells = []
+        self.idcode = None
+        self.usercode = None
+
+    def pins(self):
+        """
+        :return: list of the scalar pin names, vector ports expanded as name(index)
+        """
+        names = []
+        for name, (direction, indices) in self.ports.items():
+            if indices is None:
+                names.append(name)
+            else:
+                names.extend("{:s}({:d})".format(name, i) for i in indices)
+        return names
+
+    def instruction(self, name):
+        """
+        :param name: Instruction name
+        :return: int opcode of the instruction, the first one listed with x bits as 0
+        """
+        if name not in self.opcodes:
+            raise BSDLError("{:s}: instruction {:s} is not defined.".format(self.entity, name))
+        return int(self.opcodes[name][0].replace("X", "0").replace("x", "0"), 2)
+
+    def decode_table(self):
+        """
+        :return: list of (value, mask, instruction name) for every opcode, x bits cleared in mask
+        """
+        table = []
+        for name, opcodes in self.opcodes.items():
+            for opcode in opcodes:
+                value = int(opcode.replace("X", "0").replace("x", "0"), 2)
+                mask = int("".join("0" if c in "Xx" else "1" for c in opcode), 2)
+                table.append((value, mask, name))
+        return table
+
+    def decode(self, value):
+        """
+        :param value: Content of the instruction register
+        :return: Name of the instruction, an opcode that is not listed is BYPASS as IEEE 1149.1 requires
+        """
+        for opcode_value, mask, name in self.decode_table():
+            if value & mask == opcode_value:
+                return name
+        return "BYPASS"
+
+    def register_for(self, instruction):
+        """
+        :param instruction: Instruction name
+        :return: Name of the data register the instruction selects
+        """
+        for register, (length, instructions) in self.registers.items():
+            if instruction in instructions:
+                return register
+        if instruction in ("BYPASS", "HIGHZ", "CLAMP"):
+            return "BYPASS"
+        if instruction in ("EXTEST", "SAMPLE", "PRELOAD", "INTEST"):
+            return "BOUNDARY"
+        if instruction == "IDCODE":
+            return "DEVICE_ID"
+        if instruction == "USERCODE":
+            return "DEVICE_ID"
+        raise BSDLError("{:s}: no register is accessed by {:s}.".format(self.entity, instruction))
+
+    def register_length(self, register):
+        if register == "BOUNDARY":
+            return self.boundary_length
+        if register == "BYPASS":
+            return 1
+        if register == "DEVICE_ID":
+            return 32
+        if register in self.registers and self.registers[register][0] is not None:
+            return self.registers[register][0]
+        raise BSDLError("{:s}: length of register {:s} is not known.".format(self.entity, register))
+
+    def cells_of(self, port, functions):
+        return [cell for cell in self.cells if cell.port == port and cell.function.lower() in functions]
+
+    def output_cell(self, port):
+        cells = self.cells_of(port, OUTPUT_FUNCTIONS)
+        if not cells:
+            raise BSDLError("{:s}: {:s} has no output cell.".format(self.entity, port))
+        return cells[0]
+
+    def input_cell(self, port):
+        cells = self.cells_of(port, INPUT_FUNCTIONS)
+        if not cells:
+            raise BSDLError("{:s}: {:s} has no input cell.".format(self.entity, port))
+        return cells[0]
+
+    def safe_vector(self):
+        """
+        :return: Boundary register vector holding the safe value of every cell (x as 0)
+        """
+        vector = 0
+        for cell in self.cells:
+            if cell.safe == "1":
+                vector |= 1 << cell.number
+        return vector
+
+    def drive_vector(self, drive, vector=None):
+        """
+        Compose the boundary register vector that drives output pins for EXTEST or PRELOAD.
+        :param drive: dict pin -> 0/1 to drive the pin, None to disable its driver
+        :param vector: Vector to start from, defaults to the safe vector
+        :return: Boundary register vector as an int
+        """
+        if vector is None:
+            vector = self.safe_vector()
+        for port, value in drive.items():
+            cell = self.output_cell(port)
+            if cell.ccell is not None:
+                enable = cell.disval if value is None else 1 - cell.disval
+                vector = (vector & ~(1 << cell.ccell)) | (enable << cell.ccell)
+            if value is not None:
+                vector = (vector & ~(1 << cell.number)) | ((value & 1) << cell.number)
+        return vector
+
+    def sense(self, vector, pins=None):
+        """
+        Decode the pin values captured in a boundary register vector.
+        :param vector: Captured boundary register vector
+        :param pins: Pins to decode, defaults to every pin with an input cell
+        :return: dict pin -> captured bit
+        """
+        if pins is None:
+            pins = [cell.port for cell in self.cells if cell.function.lower() in INPUT_FUNCTIONS]
+        return {pin: (vector >> self.input_cell(pin).number) & 1 for pin in pins}
+
+    def __repr__(self):
+        return "BSDLDevice({:s}: IR {:d}, {:d} instructions, BSR {:d})".format(
+            self.entity, self.instruction_length, len(self.opcodes), self.boundary_length)
+
+
+def strip_comments(text):
+    return "\n".join(line.split("--", 1)[0] for line in text.splitlines())
+
+
+def string_value(text):
+    """
+    :param text: Attribute value, either a number/name or concatenated "..." & "..." strings
+    :return: the value as a string
+    """
+    strings = STRING_RE.findall(text)
+    if strings:
+        return "".join(strings)
+    return text.strip()
+
+
+def parse_ports(text, device):
+    match = PORT_RE.search(text)
+    if match is None:
+        return
+    depth = 1
+    end = match.end()
+    while depth and end < len(text):
+        depth += {"(": 1, ")": -1}.get(text[end], 0)
+        end += 1
+    for declaration in text[match.end():end - 1].split(";"):
+        if not declaration.strip():
+            continue
+        decl = PORT_DECL_RE.match(declaration)
+        if decl is None:
+            raise BSDLError("{:s}: cannot parse port {:s}".format(device.entity, declaration.strip()))
+        names, direction, kind, left, order, right = decl.groups()
+        indices = None
+        if left is not None:
+            left, right = int(left), int(right)
+            indices = list(range(left, right + 1)) if order.lower() == "to" else list(range(left, right - 1, -1))
+        for name in names.split(","):
+            device.ports[name.strip()] = (direction.lower(), indices)
+
+
+def parse_opcodes(device, value):
+    for name, opcodes in OPCODE_RE.findall(value):
+        codes = [code.strip() for code in opcodes.split(",") if code.strip()]
+        for code in codes:
+            if len(code) != device.instruction_length:
+                raise BSDLError("{:s}: opcode {:s} of {:s} is not {:d} bits.".format(
+                    device.entity, code, name, device.instruction_length))
+        device.opcodes[name.upper()] = codes
+
+
+def parse_register_access(device, value):
+    for entry in re.finditer(r"(\w+)\s*(?:\[\s*(\d+)\s*\])?\s*\(([^)]*)\)", value):
+        name, length, instructions = entry.groups()
+        device.registers[name.upper()] = (int(length) if length else None,
+                                          [i.strip().upper() for i in instructions.split(",") if i.strip()])
+
+
+def parse_boundary_register(device, value):
+    for number, fields in CELL_RE.findall(value):
+        parts = [part.strip() for part in re.split(r",(?![^(]*\))", fields)]
+        if len(parts) not in (4, 7):
+            raise BSDLError("{:s}: cannot parse boundary cell {:s} ({:s})".format(device.entity, number, fields))
+        cell = BSDLCell(int(number), parts[0], parts[1].replace(" ", ""), parts[2], parts[3].upper())
+        if len(parts) == 7:
+            cell.ccell = int(parts[4])
+            cell.disval = int(parts[5])
+            cell.rslt = parts[6].upper()
+        device.cells.append(cell)
+    numbers = set(cell.number for cell in device.cells)
+    if numbers != set(range(device.boundary_length)):
+        raise BSDLError("{:s}: BOUNDARY_REGISTER cells do not match BOUNDARY_LENGTH {:d}.".format(
+            device.entity, device.boundary_length))
+
+
+def parse_string(text, filename=None):
+    """
+    :param text: BSDL source
+    :param filename: Name of the file the source comes from, for the messages
+    :return: BSDLDevice
+    """
+    text = strip_comments(text)
+    match = ENTITY_RE.search(text)
+    if match is None:
+        raise BSDLError("{!s}: no entity found.".format(filename))
+    device = BSDLDevice(match.group(1), filename)
+    parse_ports(text, device)
+    for name, value in CONSTANT_RE.findall(text):
+        device.pin_maps[name] = string_value(value)
+    for name, target, value in ATTRIBUTE_RE.findall(text):
+        device.attributes[name.upper()] = string_value(value)
+    attributes = device.attributes
+    if "INSTRUCTION_LENGTH" not in attributes:
+        raise BSDLError("{:s}: INSTRUCTION_LENGTH is missing.".format(device.entity))
+    device.instruction_length = int(attributes["INSTRUCTION_LENGTH"])
+    parse_opcodes(device, attributes.get("INSTRUCTION_OPCODE", ""))
+    if "BYPASS" not in device.opcodes:
+        device.opcodes["BYPASS"] = ["1" * device.instruction_length]
+    device.instruction_capture = attributes.get("INSTRUCTION_CAPTURE")
+    parse_register_access(device, attributes.get("REGISTER_ACCESS", ""))
+    device.boundary_length = int(attributes.get("BOUNDARY_LENGTH", "0"))
+    parse_boundary_register(device, attributes.get("BOUNDARY_REGISTER", ""))
+    device.idcode = attributes.get("IDCODE_REGISTER")
+    device.usercode = attributes.get("USERCODE_REGISTER")
+    return device
+
+
+def _parse_file(filename):
+    with open(filename, "r") as f:
+        return parse_string(f.read(), filename)
+
+
+def parse_file(filename):
+    """
+    Parse a BSDL file, reusing the result of an earlier parse of the same content.
+    :param filename: Name of the BSDL file
+    :return: BSDLDevice
+    """
+    return filecache.cached(filename, CACHE_KIND, CACHE_VERSION, _parse_file)
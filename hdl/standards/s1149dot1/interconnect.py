@@ -0,0 +1,350 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Boundary scan interconnect test generation and diagnosis.
+
+Every net of the board gets a code, a column of the pattern matrix, from a
+counting sequence (codes 1..N, no net is all 0 or all 1, log2(N+2) patterns)
+or from walking ones (N patterns).  With complement=True the complemented
+patterns are appended, which keeps wired-AND and wired-OR shorts apart.
+
+The drivers of a net are boundary scan output cells of the chain or tester
+channels (e.g. the ATE GPIO), the receivers are input cells or tester
+channels.  The EXTEST vectors, the expected responses and the diagnosis of
+the captured responses are NumPy matrices with one row per pattern, computed
+with array operations only, so the cost does not grow with a Python loop per
+bit.  Bit n of a chain vector is bit n of the scan, the first device of the
+chain being the one next to TDO.
+
+Usage:
+    python -m hdl.standards.s1149dot1.interconnect <board> [counting|walking] [complement] [<ip>:<port>]
+Without <ip>:<port> the board is simulated in this process.
+"""
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ALGORITHMS = ("counting", "walking")
+# wbgpio returns the GPIO inputs in the upper 16 bits of the data word
+GPI_SHIFT = 16
+
+
+class InterconnectError(Exception):
+    def __init__(self, message):
+        super(InterconnectError, self).__init__(message)
+
+
+class Net:
+    __slots__ = ("name", "drivers", "receivers")
+
+    def __init__(self, name, drivers, receivers):
+        """
+        :param name: Name of the net
+        :param drivers: list of (device instance, pin) driving the net
+        :param receivers: list of (device instance, pin) receiving the net
+        """
+        self.name = name
+        self.drivers = drivers
+        self.receivers = receivers
+
+    def __repr__(self):
+        return "Net({:s})".format(self.name)
+
+
+class Fault:
+    __slots__ = ("kind", "nets", "receivers")
+
+    def __init__(self, kind, nets, receivers):
+        """
+        :param kind: "stuck-at-0", "stuck-at-1", "open", "short" or "unknown"
+        :param nets: list of the names of the nets involved
+        :param receivers: list of the (device instance, pin) seeing the fault
+        """
+        self.kind = kind
+        self.nets = nets
+        self.receivers = receivers
+
+    def __repr__(self):
+        return "{:s}: {:s} at {:s}".format(self.kind, ", ".join(self.nets),
+                                           ", ".join("{:s}.{:s}".format(d, p) for d, p in self.receivers))
+
+
+def pattern_codes(count, algorithm="counting", complement=False):
+    """
+    :param count: Number of nets
+    :param algorithm: "counting" or "walking"
+    :param complement: True to append the complemented patterns
+    :return: uint8 matrix (patterns x nets), column n is the code of net n
+    """
+    if algorithm == "counting":
+        width = max(1, int(np.ceil(np.log2(count + 2))))
+        codes = np.arange(1, count + 1, dtype=np.int64)
+        matrix = ((codes[None, :] >> np.arange(width)[:, None]) & 1).astype(np.uint8)
+    elif algorithm == "walking":
+        matrix = np.eye(count, dtype=np.uint8)
+    else:
+        raise InterconnectError("Unknown algorithm {:s}, use one of {:s}.".format(algorithm, ", ".join(ALGORITHMS)))
+    if complement:
+        matrix = np.vstack((matrix, 1 - matrix))
+    return matrix
+
+
+def pack(matrix):
+    """
+    :param matrix: uint8 bit matrix, one vector per row, bit 0 first
+    :return: list of the rows as ints
+    """
+    packed = np.packbits(matrix, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+def column_keys(matrix):
+    """
+    :param matrix: uint8 bit matrix
+    :return: array with one comparable and sortable key per column
+    """
+    packed = np.ascontiguousarray(np.packbits(matrix, axis=0).T)
+    return packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+
+
+def unpack(values, length):
+    """
+    :param values: list of ints
+    :param length: Number of bits of each value
+    :return: uint8 bit matrix, one value per row
+    """
+    size = (length + 7) // 8
+    data = np.frombuffer(b"".join(v.to_bytes(size, "little") for v in values), dtype=np.uint8)
+    return np.unpackbits(data.reshape(len(values), size), axis=1, count=length, bitorder="little")
+
+
+class InterconnectTest:
+    def __init__(self, chain, nets, algorithm="counting", complement=False):
+        """
+        :param chain: list of (device instance name, BSDLDevice), first the device next to TDO
+        :param nets: list of Net, pins of devices that are not in the chain are tester channels
+        :param algorithm: "counting" or "walking"
+        :param complement: True to append the complemented patterns
+        """
+        if np is None:
+            raise InterconnectError("The interconnect test needs NumPy.")
+        self.chain = chain
+        self.nets = [net for net in nets if net.drivers and net.receivers]
+        self.devices = {}
+        self.offsets = {}
+        offset = 0
+        for name, device in chain:
+            self.devices[name] = device
+            self.offsets[name] = offset
+            offset += device.boundary_length
+        self.length = offset
+        self.safe = np.zeros(self.length, dtype=np.uint8)
+        for name, device in chain:
+            for cell in device.cells:
+                if cell.safe == "1":
+                    self.safe[self.offsets[name] + cell.number] = 1
+
+        drivers, controls, enables, driver_nets = [], [], [], []
+        external_drivers, external_driver_nets = [], []
+        receivers, receiver_nets, receiver_names = [], [], []
+        external_receivers, external_receiver_nets = [], []
+        for index, net in enumerate(self.nets):
+            device, pin = net.drivers[0]
+            if device in self.devices:
+                cell = self.devices[device].output_cell(pin)
+                drivers.append(self.offsets[device] + cell.number)
+                driver_nets.append(index)
+                if cell.ccell is not None:
+                    controls.append(self.offsets[device] + cell.ccell)
+                    enables.append(1 - cell.disval)
+            else:
+                external_drivers.append((device, pin))
+                external_driver_nets.append(index)
+            for device, pin in net.receivers:
+                if device in self.devices:
+                    receivers.append(self.offsets[device] + self.devices[device].input_cell(pin).number)
+                    receiver_nets.append(index)
+                    receiver_names.append((device, pin))
+                else:
+                    external_receivers.append((device, pin))
+                    external_receiver_nets.append(index)
+        self.driver_cells = np.array(drivers, dtype=np.int64)
+        self.driver_nets = np.array(driver_nets, dtype=np.int64)
+        self.control_cells = np.array(controls, dtype=np.int64)
+        self.control_values = np.array(enables, dtype=np.uint8)
+        self.external_drivers = external_drivers
+        self.external_driver_nets = np.array(external_driver_nets, dtype=np.int64)
+        self.receiver_cells = np.array(receivers, dtype=np.int64)
+        self.receiver_nets = np.array(receiver_nets + external_receiver_nets, dtype=np.int64)
+        self.receiver_names = receiver_names + external_receivers
+        self.external_receivers = external_receivers
+        self.codes = pattern_codes(len(self.nets), algorithm, complement)
+
+    def pattern_count(self):
+        return self.codes.shape[0]
+
+    def vectors(self):
+        """
+        :return: uint8 matrix (patterns x chain length) of the EXTEST vectors
+        """
+        vectors = np.tile(self.safe, (self.pattern_count(), 1))
+        vectors[:, self.control_cells] = self.control_values
+        vectors[:, self.driver_cells] = self.codes[:, self.driver_nets]
+        return vectors
+
+    def external_drive(self):
+        """
+        :return: uint8 matrix (patterns x external drivers) of the values the tester channels drive
+        """
+        return self.codes[:, self.external_driver_nets]
+
+    def expected(self):
+        """
+        :return: tuple of the uint8 matrix (patterns x chain length + external receivers) of the expected
+                 responses and the mask of the compared bits
+        """
+        count = self.pattern_count()
+        expected = np.zeros((count, self.length + len(self.external_receivers)), dtype=np.uint8)
+        mask = np.zeros(self.length + len(self.external_receivers), dtype=bool)
+        columns = np.concatenate((self.receiver_cells, self.length + np.arange(len(self.external_receivers))))
+        expected[:, columns] = self.codes[:, self.receiver_nets]
+        mask[columns] = True
+        return expected, mask
+
+    def diagnose(self, captured, external=None):
+        """
+        Diagnose the captured responses.
+        :param captured: uint8 matrix (patterns x chain length) of the captured chain vectors
+        :param external: uint8 matrix (patterns x external receivers) of the tester channel responses
+        :return: list of Fault
+        """
+        if external is None:
+            external = np.zeros((self.pattern_count(), len(self.external_receivers)), dtype=np.uint8)
+        received = np.hstack((captured[:, self.receiver_cells], external)).astype(np.uint8)
+        wanted = self.codes[:, self.receiver_nets]
+        failing = np.flatnonzero((received != wanted).any(axis=0))
+        if failing.size == 0:
+            return []
+        signatures = received[:, failing]
+        nets = self.receiver_nets[failing]
+        ones = signatures.sum(axis=0)
+        constant = (ones == 0) | (ones == signatures.shape[0])
+        # a constant seen by every receiver of the net is a stuck net, by some of them an open
+        receivers_per_net = np.bincount(self.receiver_nets, minlength=len(self.nets))
+        failing_per_net = np.bincount(nets, minlength=len(self.nets))
+        whole_net = failing_per_net[nets] == receivers_per_net[nets]
+        # code of another net seen on a receiver (wired-dominant short), the codes are unique
+        code_keys = column_keys(self.codes)
+        signature_keys = column_keys(signatures)
+        order = np.argsort(code_keys)
+        position = np.minimum(np.searchsorted(code_keys[order], signature_keys), order.size - 1)
+        aliases = np.where(code_keys[order][position] == signature_keys, order[position], nets)
+        groups, group_of = np.unique(signature_keys, return_inverse=True)
+        group_of = group_of.reshape(-1)
+
+        faults = []
+        for group in range(groups.size):
+            members = np.flatnonzero(group_of == group)
+            member_nets = np.unique(np.concatenate((nets[members], aliases[members])))
+            names = [self.nets[n].name for n in member_nets]
+            receivers = [self.receiver_names[failing[m]] for m in members]
+            if constant[members[0]] and member_nets.size == 1:
+                value = 1 if ones[members[0]] else 0
+                if whole_net[members].all():
+                    faults.append(Fault("stuck-at-{:d}".format(value), names, receivers))
+                else:
+                    faults.append(Fault("open", names, receivers))
+            elif member_nets.size > 1:
+                faults.append(Fault("short", names, receivers))
+            else:
+                faults.append(Fault("unknown", names, receivers))
+        return faults
+
+    def run(self, jtag, gpio=None, sample="SAMPLE", extest="EXTEST"):
+        """
+        Apply the test to a board through the atesim controllers.
+        :param jtag: JTAGController with scan_ir(count, hex) and scan_dr(count, hex)
+        :param gpio: GPIOController for the tester channels named GPO(n) and GPI(n)
+        :param sample: Instruction preloading the boundary registers
+        :param extest: Instruction applying the vectors
+        :return: list of Fault
+        """
+        ir_length = sum(device.instruction_length for name, device in self.chain)
+
+        def instruction(name):
+            value = 0
+            shift = 0
+            for instance, device in self.chain:
+                value |= device.instruction(name) << shift
+                shift += device.instruction_length
+            return "{:0{:d}X}".format(value, (ir_length + 3) // 4)
+
+        def scan(vector):
+            tdo = jtag.scan_dr(self.length, "{:0{:d}X}".format(vector, (self.length + 3) // 4))
+            return int(tdo, 16) if tdo else 0
+
+        vectors = pack(self.vectors())
+        drive = self.external_drive()
+        gpo = np.array([int(pin[pin.index("(") + 1:-1]) for device, pin in self.external_drivers], dtype=np.int64)
+        gpi = np.array([int(pin[pin.index("(") + 1:-1]) for device, pin in self.external_receivers], dtype=np.int64)
+        captured = []
+        external = np.zeros((len(vectors), gpi.size), dtype=np.uint8)
+        jtag.scan_ir(ir_length, instruction(sample))
+        scan(vectors[0])
+        jtag.scan_ir(ir_length, instruction(extest))
+        for index in range(len(vectors)):
+            if gpio is not None and gpo.size:
+                gpio.write(int((drive[index].astype(np.int64) << gpo).sum()))
+            if gpio is not None and gpi.size:
+                gpio.read()
+                external[index] = (gpio.get_value() >> (gpi + GPI_SHIFT)) & 1
+            captured.append(scan(vectors[min(index + 1, len(vectors) - 1)]))
+        return self.diagnose(unpack(captured, self.length), external)
+
+
+def main():
+    args = sys.argv[1:]
+    complement = "complement" in args
+    if complement:
+        args.remove("complement")
+    algorithm = "counting"
+    for name in ALGORITHMS:
+        if name in args:
+            algorithm = name
+            args.remove(name)
+    if len(args) not in (1, 2):
+        print(__doc__)
+        return 2
+    from hdl.boards.common.BoardFactory import BoardFactory
+    from drivers.Python.atesim.atesim import GPIOController, JTAGController
+    board = BoardFactory().make_board(args[0])
+    if board is None or not hasattr(board, "interconnect_netlist"):
+        print("Board {:s} has no interconnect netlist!".format(args[0]))
+        return 2
+    chain, nets = board.interconnect_netlist()
+    test = InterconnectTest(chain, nets, algorithm, complement)
+    if len(args) == 2:
+        from drivers.Python.atesim.atesim import ATE
+        ip, _, port = args[1].partition(":")
+        ate_inst = ATE(ip, int(port))
+        ate_inst.connect(args[0])
+    else:
+        from hdl.ate.replay import make_ate
+        ate_inst = make_ate(args[0])
+        ate_inst.start_simulation()
+    try:
+        faults = test.run(JTAGController(ate_inst), GPIOController(ate_inst))
+    finally:
+        ate_inst.terminate()
+    for fault in faults:
+        print(fault)
+    print("{:d} nets, {:d} patterns, {:d} faults.".format(len(test.nets), test.pattern_count(), len(faults)))
+    return 1 if faults else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
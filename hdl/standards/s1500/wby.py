@@ -98,10 +98,10 @@ def wby_tb(monitor=False):
     lo = bool(0)
     width = 1
     # data = [hi, lo, hi, hi, lo]
-    data = Signal(intbv('01101'))
+    data = Signal(intbv('01101')[5:])
     ldata = 5
     # expect = [lo, hi, lo, hi, hi, lo]
-    expect = Signal(intbv('011010'))
+    expect = Signal(intbv('011010')[6:])
     wsi = Signal(bool(0))
     wby_wso = Signal(bool(0))
     select = Signal(bool(0))
@@ -0,0 +1,266 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Behavioural model of an IEEE Std 1500 wrapper.
+
+wrapper replaces the wir, wby, WSReg, WDRmux and WIRmux blocks of a wrapper
+with a single process on the WSP interface.  The wrapper is described by the
+lists of wir (wr_list, user_list), the WBY width and one (di, do) pair of
+data ports per user instruction, the WDR selected by the instruction.  The
+WIR and every WDR are kept as ints which shift one bit per WRCK, with the
+timing of the blocks: capture and shift on the rising edge of WRCK, update,
+reset and the WSO output on the falling edge.
+
+Usage: python -m hdl.standards.s1500.wrapper [<scans>]
+Runs wrapper_tb with the blocks and the behavioural model side by side on
+random scans, then each of them alone, and prints the run times.
+"""
+
+import random
+import sys
+import time
+from myhdl import *
+from hdl.standards.s1500.wsp import wsp
+from hdl.standards.s1500.wir import wir
+from hdl.standards.s1500.wby import wby
+from hdl.standards.s1500.WSReg import WSReg
+from hdl.standards.s1500.wdrmux import WDRmux
+from hdl.standards.s1500.wirmux import WIRmux
+
+period = 20  # clk frequency = 50 MHz
+MODELS = ("rtl", "behavioural")
+
+
+@block
+def wrapper(path, name, wsi, wsp_interface, wso, wr_list, user_list, wr_select_list, dr_select_list, wdrs,
+            wby_width=1, select_wir=None, monitor=False):
+    """
+    Behavioural 1500 wrapper with the ports of the wir, wby, WSReg, WDRmux and WIRmux blocks
+    :param path: Dot path of the parent of this instance
+    :param name: Instance name for debug logger (path instance)
+    :param wsi: Wrapper Scan In Port
+    :param wsp_interface: Wrapper Scan Port instance
+    :param wso: Wrapper Scan Out Port
+    :param wr_list: A list of strings defining the Wrapper 1500 instructions as per the standard
+    :param user_list: A list of strings defining the instructions for the user defined data registers
+    :param wr_select_list: Signal(intbv(0)[len(wr_list):]) driven with the 1500 wrapper instruction signals
+    :param dr_select_list: Signal(intbv(0)[len(user_list):]) driven with the user instruction signals
+    :param wdrs: list of (di, do) Signal(intbv(0)[width:]) pairs of the WDR of each user instruction
+    :param wby_width: The number of scan bits implemented by the WBY
+    :param select_wir: Select Signal of the WIRmux, wsp_interface.SelectWIR when None
+    :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    """
+    if len(wr_select_list) != len(wr_list):
+        raise AssertionError("The len of the wr_select_list does not match the len of the wr_list!")
+    if len(dr_select_list) != len(user_list):
+        raise AssertionError("The len of the dr_select_list does not match the len of the user_list!")
+    if len(wdrs) != len(user_list):
+        raise AssertionError("The len of the wdrs does not match the len of the user_list!")
+    if 'WS_BYPASS' not in wr_list:
+        raise AssertionError("Required WS_BYPASS instruction was not provided!")
+    width = len(bin(intbv(0, min=0, max=(len(wr_list) + len(user_list))).max))
+    if select_wir is None:
+        select_wir = wsp_interface.SelectWIR
+    # scan register selected by each instruction: 0 is the WBY, i + 1 the WDR of user_list[i]
+    registers = {wr_list.index('WS_BYPASS'): 0}
+    widths = [wby_width]
+    for i, (di, do) in enumerate(wdrs):
+        registers[len(wr_list) + i] = i + 1
+        widths.append(len(do))
+
+    def decode(instruction):
+        if instruction >= len(wr_list) + len(user_list):
+            raise AssertionError("decode_instr: Invalid instruction detected!", bin(instruction, width))
+        wr_select = intbv(0)[len(wr_list):]
+        dr_select = intbv(0)[len(user_list):]
+        if instruction < len(wr_list):
+            wr_select[instruction] = 1
+        else:
+            dr_select[instruction - len(wr_list)] = 1
+        wr_select_list.next = wr_select
+        dr_select_list.next = dr_select
+        if monitor:
+            print("\t\twrapper({:s}): instruction".format(path + '.' + name), bin(instruction, width))
+
+    @instance
+    def engine():
+        instruction = 0
+        wir_isr = 0
+        isr = [0] * len(widths)
+        wir_out = False
+        out = [False] * len(widths)
+        clock = bool(wsp_interface.WRCK)
+        decode(instruction)
+        while True:
+            yield wsp_interface.WRCK, wsp_interface.SelectWIR, select_wir
+            selected = registers.get(instruction)
+            if bool(wsp_interface.WRCK) != clock:
+                clock = bool(wsp_interface.WRCK)
+                if clock:
+                    if wsp_interface.SelectWIR:
+                        if wsp_interface.CaptureWR:
+                            wir_isr = instruction
+                        elif wsp_interface.ShiftWR:
+                            wir_isr = (wir_isr >> 1) | (int(wsi) << (width - 1))
+                    elif selected is not None:
+                        if wsp_interface.CaptureWR:
+                            isr[selected] = int(wdrs[selected - 1][0].val) if selected else 0
+                        elif wsp_interface.ShiftWR:
+                            isr[selected] = (isr[selected] >> 1) | (int(wsi) << (widths[selected] - 1))
+                    continue
+                wir_out = bool(wir_isr & 1)
+                out = [bool(value & 1) for value in isr]
+                if not wsp_interface.WRSTN:
+                    for di, do in wdrs:
+                        do.next = 0
+                    if instruction != 0:
+                        instruction = 0
+                        decode(instruction)
+                elif wsp_interface.UpdateWR:
+                    if wsp_interface.SelectWIR:
+                        if wir_isr != instruction:
+                            instruction = wir_isr
+                            decode(instruction)
+                    elif selected:
+                        wdrs[selected - 1][1].next = isr[selected]
+                selected = registers.get(instruction)
+            if select_wir:
+                wso.next = wir_out
+            else:
+                wso.next = out[selected] if selected is not None else False
+
+    return engine
+
+
+@block
+def wrapper_tb(models=MODELS, scans=200, seed=1500, monitor=False):
+    """
+    Test bench running the wir, wby, WSReg, WDRmux and WIRmux blocks and the behavioural wrapper on the same
+    random scans of the WIR and the WDRs, with random capture values, asserting that their wso and WDR outputs
+    are the same.
+    :param models: the wrappers to run, "rtl" for the blocks and "behavioural" for wrapper
+    :param scans: Number of scans
+    :param seed: Seed of the random scans
+    :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :return: A list of generators for this logic
+    """
+    H = bool(1)
+    L = bool(0)
+    wsi = Signal(L)
+    wsp_inst = wsp()
+    wr_list = ['WS_BYPASS', 'WS_EXTEST', 'WS_INTEST']
+    user_list = ['MBIST1', 'MBIST2', 'MBIST3']
+    width = len(bin(intbv(0, min=0, max=(len(wr_list) + len(user_list))).max))
+    dis = [Signal(intbv(0)[8:]) for _ in user_list]
+    wsos = {}
+    dos = {}
+    instances = []
+    for model in models:
+        wso = Signal(L)
+        wr_select_list = Signal(intbv(0)[len(wr_list):])
+        dr_select_list = Signal(intbv(0)[len(user_list):])
+        do = [Signal(intbv(0)[8:]) for _ in user_list]
+        wsos[model] = wso
+        dos[model] = do
+        if model == "behavioural":
+            instances.append(wrapper('TOP', 'WRAPPER', wsi, wsp_inst, wso, wr_list, user_list, wr_select_list,
+                                     dr_select_list, list(zip(dis, do)), monitor=monitor))
+            continue
+        wir_so = Signal(L)
+        wdr_so = Signal(L)
+        wby_wso = Signal(L)
+        mbist_out = [Signal(L) for _ in user_list]
+        select_wby = Signal(L)
+        select_mbist = [Signal(L) for _ in user_list]
+        instances.append(wir('TOP', 'WIR', wsi, wsp_inst, wir_so, wr_list, user_list, wr_select_list,
+                             dr_select_list, monitor=monitor))
+        instances.append(wby('TOP', 'WBY', wsi, wsp_inst, select_wby, wby_wso, monitor=monitor))
+        for i in range(len(user_list)):
+            instances.append(WSReg('TOP', 'MBIST_WSReg{:d}'.format(i + 1), wsi, wsp_inst, select_mbist[i],
+                                   mbist_out[i], dis[i], do[i], dr_width=8, monitor=monitor))
+        instances.append(WDRmux('TOP', 'WDRMux', wby_wso, mbist_out[0], mbist_out[1], mbist_out[2],
+                                wr_select_list, dr_select_list, wdr_so, monitor=monitor))
+        instances.append(WIRmux('TOP', 'WIRMux', wdr_so, wir_so, wsp_inst.SelectWIR, wso, monitor=monitor))
+
+        @always_comb
+        def select_logic():
+            select_wby.next = wr_select_list[0]
+            for i in range(len(select_mbist)):
+                select_mbist[i].next = dr_select_list[i]
+
+        instances.append(select_logic)
+
+    generator = random.Random(seed)
+
+    @instance
+    def clkgen():
+        while True:
+            wsp_inst.WRCK.next = not wsp_inst.WRCK
+            yield delay(period // 2)
+
+    def check():
+        values = set(bool(wso) for wso in wsos.values())
+        assert len(values) == 1, "wso differs at {:d} ns".format(now())
+
+    @instance
+    def stimulus():
+        wsp_inst.WRSTN.next = L
+        yield wsp_inst.WRCK.negedge
+        wsp_inst.WRSTN.next = H
+        for _ in range(scans):
+            yield wsp_inst.WRCK.negedge
+            if generator.random() < 0.05:
+                wsp_inst.WRSTN.next = L
+                yield wsp_inst.WRCK.negedge
+                wsp_inst.WRSTN.next = H
+            select = generator.random() < 0.4
+            wsp_inst.SelectWIR.next = select
+            for di in dis:
+                di.next = generator.getrandbits(8)
+            wsp_inst.CaptureWR.next = H
+            yield wsp_inst.WRCK.negedge
+            wsp_inst.CaptureWR.next = L
+            wsp_inst.ShiftWR.next = H
+            if select:
+                # only valid instructions, wir asserts on the others
+                instruction = generator.randrange(len(wr_list) + len(user_list))
+                bits = [(instruction >> i) & 1 for i in range(width)]
+            else:
+                bits = [generator.getrandbits(1) for _ in range(generator.randrange(12))]
+            for bit in bits:
+                wsi.next = bit
+                yield wsp_inst.WRCK.posedge
+                check()
+                yield wsp_inst.WRCK.negedge
+            wsp_inst.ShiftWR.next = L
+            wsp_inst.UpdateWR.next = H
+            yield wsp_inst.WRCK.negedge
+            wsp_inst.UpdateWR.next = L
+            yield wsp_inst.WRCK.posedge
+            check()
+            for i in range(len(user_list)):
+                values = set(int(do[i]) for do in dos.values())
+                assert len(values) == 1, "{:s} differs at {:d} ns".format(user_list[i], now())
+        raise StopSimulation()
+
+    return instances, clkgen, stimulus
+
+
+def main():
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tb = wrapper_tb(scans=scans)
+    tb.run_sim(quiet=1)
+    tb.quit_sim()
+    print("{:d} random scans, the blocks and the behavioural wrapper agree".format(scans))
+    for model in MODELS:
+        tb = wrapper_tb(models=(model,), scans=scans)
+        start = time.perf_counter()
+        tb.run_sim(quiet=1)
+        print("{:>12s} {:9.2f} s".format(model, time.perf_counter() - start))
+        tb.quit_sim()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Behavioural model of a whole IEEE 1687 network built from its ICL model.
+
+The RTL of a network instantiates every SIB and SReg with its own capture,
+update and output processes, and a deep network spends most of its
+simulation time scheduling them.  behavioural_network has the same ports as
+the RTL (si, the IJTAGInterface signals and so) but a single process for the
+whole network: it keeps the update value of every register in a
+configuration dict and the capture flip-flops of the active scan path
+(ICLNetwork.scan_path) in one int, and per TCK
+  - on the rising edge captures or shifts the path by one bit,
+  - on the falling edge resets the update values or copies the shifted
+    bits of the path into them, then recomputes the path,
+  - drives so with the bit at the scan output end of the path.
+so is valid from the falling edge, like the SIBs and SRegs which change
+their outputs on the falling edge of the clock.  The capture flip-flops of
+the registers leaving the path keep their value, as in the RTL.
+
+The instruments are connected through data, a dict register path ->
+(di, do) Signals like the DI and DO ports of an SReg: do is driven with the
+update value of the register on a reset or an update of the register, and
+di is sampled on capture.  A register without di captures its own update
+value, as in ModelNetwork.  IP_3(behavioural=True) runs its instruments
+this way.
+
+For a whole scan per step use ModelNetwork of netgen.py, which works on the
+same ICL model.
+"""
+from myhdl import *
+
+
+@block
+def behavioural_network(path, name, network, si, ijtag_interface, so, data=None, monitor=False):
+    """
+    Behavioural model of a network with the ports of its RTL.
+    :param path: Dot path of the parent of this instance
+    :param name: Instance name for debug logging (path instance)
+    :param network: ICLNetwork of the network
+    :param si: ScanInPort
+    :param ijtag_interface: IJTAGInterface of the network
+    :param so: ScanOutPort
+    :param data: dict register path -> (di, do), the Signals of the instrument, either may be None
+    :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+    :return: the generator of the network
+    """
+    path = path + "." + name
+    configuration = network.reset_configuration()
+    captured = {register: 0 for register in network.registers}
+    data = data if data is not None else {}
+    for register in data:
+        if register not in network.registers:
+            raise ValueError("Register {:s} is not in the network {:s}.".format(register, network.name))
+    inputs = [(register, di) for register, (di, do) in data.items() if di is not None]
+    outputs = {register: do for register, (di, do) in data.items() if do is not None}
+
+    def drive(registers):
+        for register in registers:
+            if register in outputs:
+                outputs[register].next = configuration[register]
+
+    @instance
+    def engine():
+        scan_path = network.scan_path(configuration)
+        vector = scan_path.vector(captured)
+        top = scan_path.length - 1
+        while True:
+            yield ijtag_interface.CLOCK
+            if ijtag_interface.CLOCK:
+                if ijtag_interface.SELECT and ijtag_interface.CAPTURE:
+                    vector = scan_path.vector({register: int(di) for register, di in inputs}, configuration)
+                elif ijtag_interface.SELECT and ijtag_interface.SHIFT and top >= 0:
+                    vector = (vector >> 1) | (int(si) << top)
+                continue
+            if ijtag_interface.RESET:
+                for register in scan_path.registers:
+                    captured[register.path] = scan_path.extract(vector, register.path)
+                configuration.update(network.reset_configuration())
+                drive(outputs)
+            elif ijtag_interface.SELECT and ijtag_interface.UPDATE:
+                for register in scan_path.registers:
+                    captured[register.path] = configuration[register.path] = \
+                        scan_path.extract(vector, register.path)
+                drive(register.path for register in scan_path.registers)
+            else:
+                so.next = bool(vector & 1) if top >= 0 else si
+                continue
+            scan_path = network.scan_path(configuration)
+            vector = scan_path.vector(captured)
+            top = scan_path.length - 1
+            so.next = bool(vector & 1) if top >= 0 else si
+            if monitor:
+                print("\t\tbehavioural_network({:s}): {:s}".format(path, repr(scan_path)))
+
+    return engine
@@ -0,0 +1,413 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+In-memory model of an IEEE 1687 scan network elaborated from ICL.
+
+ICLNetwork flattens the instance hierarchy of a top module into ScanRegister
+and ScanMux nodes named by their hierarchical path (e.g. IP_2.SIB1.SR).  Ports
+are only wires and are resolved away while elaborating, so every node points
+straight at the node feeding its scan input.  The active scan path for a
+configuration (the update values of the registers) is found by walking back
+from the scan output through the selected mux inputs, which only visits the
+nodes on the path.
+
+Bit offsets are counted from the scan output end of the path, the order the
+bits come out of TDO and the order JTAGController.scan_dr() expects them:
+bit i of a register at offset n is bit n + i of the scan vector.
+"""
+import os
+import os.path
+from hdl.standards.s1687.icl_parser import ICLError, parse_file
+
+ICL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "icl"))
+
+
+class ICLLibrary:
+    def __init__(self, directories=None):
+        """
+        Collect the modules of every .icl file found below the directories.
+        :param directories: list of directories to search, defaults to the icl/ directory of the project
+        """
+        self.modules = {}
+        self.files = []
+        for directory in directories if directories is not None else [ICL_DIR]:
+            for root, dirs, files in os.walk(directory):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.endswith(".icl"):
+                        self.add_file(os.path.join(root, filename))
+
+    def add_file(self, filename):
+        self.files.append(filename)
+        self.modules.update(parse_file(filename))
+
+    def module(self, name):
+        if name not in self.modules:
+            raise ICLError("Module {:s} is not defined in the ICL library.".format(name))
+        return self.modules[name]
+
+
+class Register:
+    """
+    ScanRegister of an elaborated network.
+    """
+    __slots__ = ("path", "width", "reset", "upstream")
+
+    def __init__(self, path, width, reset):
+        self.path = path
+        self.width = width
+        self.reset = reset
+        self.upstream = None
+
+    def __repr__(self):
+        return "Register({:s}[{:d}])".format(self.path, self.width)
+
+
+class Mux:
+    """
+    ScanMux of an elaborated network.  select is a list of (Register, bit) from msb to lsb.
+    """
+    __slots__ = ("path", "select", "inputs")
+
+    def __init__(self, path):
+        self.path = path
+        self.select = []
+        self.inputs = []  # list of (list of ICLNumber, upstream node)
+
+    def selected(self, configuration):
+        value = 0
+        for register, bit in self.select:
+            value = (value << 1) | ((configuration.get(register.path, register.reset) >> bit) & 1)
+        for numbers, upstream in self.inputs:
+            for number in numbers:
+                if number.matches(value):
+                    return upstream
+        raise ICLError("ScanMux {:s} has no input for select value {:d}.".format(self.path, value))
+
+    def __repr__(self):
+        return "Mux({:s})".format(self.path)
+
+
+class ScanIn:
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return "ScanIn({:s})".format(self.path)
+
+
+class ScanPath:
+    """
+    Active scan path of a network.
+    registers: list of Register in scan order from the scan input to the scan output
+    offsets: dict register path -> bit offset from the scan output end
+    length: number of bits of the path
+    """
+    def __init__(self, registers):
+        self.registers = registers
+        self.offsets = {}
+        self.widths = {}
+        offset = 0
+        for register in reversed(registers):
+            self.offsets[register.path] = offset
+            self.widths[register.path] = register.width
+            offset += register.width
+        self.length = offset
+
+    def __contains__(self, path):
+        return path in self.offsets
+
+    def vector(self, values, default=None):
+        """
+        Build the scan vector loading the given values.
+        :param values: dict register path -> value
+        :param default: dict register path -> value for the registers not in values (e.g. the
+                        current configuration), the reset value is used for registers in neither
+        :return: scan vector as an int
+        """
+        vector = 0
+        for register in self.registers:
+            if register.path in values:
+                value = values[register.path]
+            elif default is not None and register.path in default:
+                value = default[register.path]
+            else:
+                value = register.reset
+            vector |= (value & ((1 << register.width) - 1)) << self.offsets[register.path]
+        return vector
+
+    def extract(self, vector, path):
+        """
+        :param vector: scan vector as an int (e.g. the captured TDO data)
+        :param path: register path
+        :return: the bits of the register in the vector
+        """
+        return (vector >> self.offsets[path]) & ((1 << self.widths[path]) - 1)
+
+    def __repr__(self):
+        return "ScanPath({:d} bits: {:s})".format(self.length, " -> ".join(r.path for r in self.registers))
+
+
+def evaluate(tokens, parameters):
+    """
+    Evaluate an ICL integer expression of numbers, $parameters, + - * / and parentheses.
+    :param tokens: token list
+    :param parameters: dict of parameter name -> int
+    :return: int
+    """
+    pos = [0]
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def atom():
+        token = tokens[pos[0]]
+        pos[0] += 1
+        if token == "(":
+            value = expression()
+            pos[0] += 1
+            return value
+        if token == "-":
+            return -atom()
+        if token.startswith("$"):
+            if token[1:] not in parameters:
+                raise ICLError("Parameter {:s} is not defined.".format(token[1:]))
+            return parameters[token[1:]]
+        return int(token.replace("_", ""))
+
+    def term():
+        value = atom()
+        while peek() in ("*", "/"):
+            op = tokens[pos[0]]
+            pos[0] += 1
+            value = value * atom() if op == "*" else value // atom()
+        return value
+
+    def expression():
+        value = term()
+        while peek() in ("+", "-"):
+            op = tokens[pos[0]]
+            pos[0] += 1
+            value = value + term() if op == "+" else value - term()
+        return value
+
+    return expression()
+
+
+class _Scope:
+    """
+    One module instance while elaborating.
+    """
+    def __init__(self, path, module, parameters, parent=None, instance=None):
+        self.path = path
+        self.module = module
+        self.parameters = parameters
+        self.parent = parent
+        self.instance = instance
+        self.children = {}
+
+
+class ICLNetwork:
+    def __init__(self, library, top, name=None, parameters=None):
+        """
+        Elaborate the network of a top module.
+        :param library: ICLLibrary holding the modules
+        :param top: Name of the top module
+        :param name: Name of the top instance, defaults to the module name
+        :param parameters: dict of parameter name -> int overriding the top module parameters
+        """
+        self.library = library
+        self.name = top if name is None else name
+        self.registers = {}
+        self.muxes = {}
+        self.inputs = {}
+        self.instances = {}
+        self.top = self.__scope(self.name, library.module(top), parameters or {})
+        self.__elaborate(self.top)
+        self.outputs = {}
+        for port in self.top.module.ports.values():
+            if port.kind == "ScanOutPort":
+                self.outputs[port.name] = self.__resolve(self.top, port.source[0])
+
+    def __scope(self, path, module, overrides, parent=None, instance=None):
+        parameters = {}
+        for name, tokens in module.parameters.items():
+            parameters[name] = evaluate(tokens, parameters)
+        parameters.update(overrides)
+        self.instances[path] = module.name
+        return _Scope(path, module, parameters, parent, instance)
+
+    def __child(self, scope, name):
+        if name not in scope.children:
+            if name not in scope.module.instances:
+                raise ICLError("{:s} has no Instance {:s}.".format(scope.path, name))
+            instance = scope.module.instances[name]
+            overrides = {p: evaluate(tokens, scope.parameters) for p, tokens in instance.parameters.items()}
+            scope.children[name] = self.__scope(scope.path + "." + name, self.library.module(instance.module),
+                                                overrides, scope, instance)
+        return scope.children[name]
+
+    def __width(self, scope, msb, lsb):
+        if msb is None:
+            return 1
+        if lsb is None:
+            return 1
+        return abs(evaluate(msb, scope.parameters) - evaluate(lsb, scope.parameters)) + 1
+
+    def __register(self, scope, name):
+        path = scope.path + "." + name
+        if path not in self.registers:
+            definition = scope.module.registers[name]
+            width = self.__width(scope, definition.msb, definition.lsb)
+            reset = definition.reset.value if definition.reset is not None else 0
+            self.registers[path] = Register(path, width, reset & ((1 << width) - 1))
+        return self.registers[path]
+
+    def __elaborate(self, scope):
+        for name, definition in scope.module.registers.items():
+            register = self.__register(scope, name)
+            register.upstream = self.__resolve(scope, definition.scan_in)
+        for name, definition in scope.module.muxes.items():
+            mux = self.__mux(scope, name)
+            mux.select = []
+            for ref in definition.select:
+                mux.select.extend(self.__data_bits(scope, ref))
+            mux.inputs = [(numbers, self.__resolve(scope, ref)) for numbers, ref in definition.inputs]
+        for name in scope.module.instances:
+            self.__elaborate(self.__child(scope, name))
+
+    def __mux(self, scope, name):
+        path = scope.path + "." + name
+        if path not in self.muxes:
+            self.muxes[path] = Mux(path)
+        return self.muxes[path]
+
+    def __lookup(self, scope, ref):
+        """
+        Find the scope and the local name of a reference, descending into inst.port references.
+        """
+        if "." in ref.name:
+            instance, _, port = ref.name.partition(".")
+            return self.__child(scope, instance), port
+        return scope, ref.name
+
+    def __resolve(self, scope, ref):
+        """
+        Resolve a scan source reference to the Register, Mux or ScanIn node driving it.
+        """
+        scope, name = self.__lookup(scope, ref)
+        module = scope.module
+        if name in module.registers:
+            return self.__register(scope, name)
+        if name in module.muxes:
+            return self.__mux(scope, name)
+        if name in module.ports:
+            port = module.ports[name]
+            if port.kind == "ScanOutPort":
+                if not port.source:
+                    raise ICLError("ScanOutPort {:s}.{:s} has no Source.".format(scope.path, name))
+                return self.__resolve(scope, port.source[0])
+            if port.kind == "ScanInPort":
+                if scope.parent is None:
+                    path = scope.path + "." + name
+                    if path not in self.inputs:
+                        self.inputs[path] = ScanIn(path)
+                    return self.inputs[path]
+                connection = scope.instance.connections.get(name)
+                if not connection:
+                    raise ICLError("ScanInPort {:s}.{:s} is not connected.".format(scope.path, name))
+                return self.__resolve(scope.parent, connection[0])
+        raise ICLError("{:s} cannot be resolved in {:s}.".format(ref.name, scope.path))
+
+    def __data_bits(self, scope, ref):
+        """
+        Resolve a select or data reference to the list of (Register, bit) it is made of, msb first.
+        """
+        scope, name = self.__lookup(scope, ref)
+        module = scope.module
+        if name in module.registers:
+            register = self.__register(scope, name)
+            if ref.msb is None:
+                bits = range(register.width - 1, -1, -1)
+            elif ref.lsb is None:
+                bits = [evaluate(ref.msb, scope.parameters)]
+            else:
+                msb = evaluate(ref.msb, scope.parameters)
+                lsb = evaluate(ref.lsb, scope.parameters)
+                bits = range(msb, lsb - 1, -1) if msb >= lsb else range(msb, lsb + 1)
+            return [(register, bit) for bit in bits]
+        if name in module.ports:
+            port = module.ports[name]
+            if port.kind == "DataOutPort" and port.source:
+                bits = []
+                for source in port.source:
+                    bits.extend(self.__data_bits(scope, source))
+                return bits
+            if port.kind in ("DataInPort", "SelectPort") and scope.parent is not None:
+                connection = scope.instance.connections.get(name)
+                if connection:
+                    bits = []
+                    for source in connection:
+                        bits.extend(self.__data_bits(scope.parent, source))
+                    return bits
+        raise ICLError("{:s} in {:s} is not driven by a ScanRegister.".format(ref.name, scope.path))
+
+    def reset_configuration(self):
+        """
+        :return: dict register path -> reset value, the configuration after a reset of the network
+        """
+        return {path: register.reset for path, register in self.registers.items()}
+
+    def register(self, path):
+        """
+        Find a register by its full path or by a unique tail of it (e.g. "delta" or "SIB1.SR").
+        :param path: Register path
+        :return: Register
+        """
+        if path in self.registers:
+            return self.registers[path]
+        for candidate in (path + ".SR", path):
+            matches = [r for p, r in self.registers.items() if p == candidate or p.endswith("." + candidate)]
+            if len(matches) == 1:
+                return matches[0]
+            if len(matches) > 1:
+                raise ICLError("Register name {:s} is ambiguous.".format(path))
+        raise ICLError("Register {:s} is not in the network.".format(path))
+
+    def scan_path(self, configuration=None, output=None):
+        """
+        Compute the active scan path.
+        :param configuration: dict register path -> update value, missing registers use their reset value
+        :param output: Name of the top ScanOutPort, defaults to the first one declared
+        :return: ScanPath
+        """
+        configuration = configuration if configuration is not None else {}
+        node = self.outputs[output] if output is not None else next(iter(self.outputs.values()))
+        registers = []
+        steps = 0
+        while not isinstance(node, ScanIn):
+            if isinstance(node, Register):
+                registers.append(node)
+                node = node.upstream
+            else:
+                node = node.selected(configuration)
+            steps += 1
+            if steps > len(self.registers) + len(self.muxes):
+                raise ICLError("The scan path of {:s} has a loop.".format(self.name))
+        registers.reverse()
+        return ScanPath(registers)
+
+
+def load_network(top, name=None, parameters=None, directories=None):
+    """
+    Elaborate a network from the ICL files of the project.
+    :param top: Name of the top module
+    :param name: Name of the top instance, defaults to the module name
+    :param parameters: dict of parameter name -> int overriding the top module parameters
+    :param directories: list of directories holding the ICL files, defaults to the icl/ directory
+    :return: ICLNetwork
+    """
+    return ICLNetwork(ICLLibrary(directories), top, name, parameters)
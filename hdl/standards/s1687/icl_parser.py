@@ -0,0 +1,437 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Parser for the subset of the IEEE 1687 Instrument Connectivity Language (ICL)
+used by the files in the icl/ directory.
+
+The parser builds one ICLModule per Module statement holding the ports,
+ScanRegisters, ScanMuxes, Instances and Parameters of the module.  Statements
+that do not take part in the scan path (LogicSignal, Alias, Enum, ClockMux,
+Attribute, ...) are skipped.  Ranges and parameter values are kept as token
+lists and are evaluated when a network is elaborated (see icl_network) so a
+module can be instantiated with different Parameter values.
+
+Parsed files are cached by the hash of their content (see hdl.common.filecache).
+"""
+import re
+from hdl.common import filecache
+
+CACHE_KIND = "icl"
+CACHE_VERSION = 1
+
+PORT_KINDS = ("ScanInPort", "ScanOutPort", "ShiftEnPort", "CaptureEnPort", "UpdateEnPort", "SelectPort",
+              "ResetPort", "TCKPort", "ToShiftEnPort", "ToCaptureEnPort", "ToUpdateEnPort", "ToSelectPort",
+              "ToResetPort", "ToTCKPort", "DataInPort", "DataOutPort", "ClockPort", "ToClockPort",
+              "TMSPort", "ToTMSPort", "TRSTPort", "ToTRSTPort", "AddressPort", "ReadEnPort", "WriteEnPort",
+              "ToIRSelectPort")
+
+TOKEN_RE = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<number>(?:\d[\d_]*)?'[sS]?[bBoOdDhH][0-9a-fA-FxXzZ_]+|\d[\d_]*)
+  | (?P<string>"[^"]*")
+  | (?P<name>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<punct>[{}\[\]:;,=().+\-*/~!])
+""", re.VERBOSE | re.DOTALL)
+
+
+class ICLError(Exception):
+    def __init__(self, message):
+        super(ICLError, self).__init__(message)
+
+
+class ICLNumber:
+    """
+    An ICL number.  Bits given as x are don't care and are cleared in mask.
+    """
+    __slots__ = ("value", "mask", "width")
+
+    def __init__(self, value, mask, width):
+        self.value = value
+        self.mask = mask
+        self.width = width
+
+    def matches(self, value):
+        return (value & self.mask) == (self.value & self.mask)
+
+    def __repr__(self):
+        return "ICLNumber({:d}, 0x{:X}, {!r})".format(self.value, self.mask, self.width)
+
+
+def parse_number(text):
+    """
+    Convert an ICL number token (e.g. 9'b000000000, 'hFF, 1'b1, 42) into an ICLNumber.
+    :param text: Number token
+    :return: ICLNumber
+    """
+    text = text.replace("_", "")
+    if "'" not in text:
+        value = int(text)
+        return ICLNumber(value, -1, None)
+    size, _, digits = text.partition("'")
+    if digits[0] in "sS":
+        digits = digits[1:]
+    base = {"b": 2, "o": 8, "d": 10, "h": 16}[digits[0].lower()]
+    digits = digits[1:].lower()
+    width = int(size) if size else None
+    if base == 10:
+        return ICLNumber(int(digits), -1, width)
+    bits_per_digit = {2: 1, 8: 3, 16: 4}[base]
+    value = 0
+    mask = 0
+    digit_mask = (1 << bits_per_digit) - 1
+    for digit in digits:
+        value <<= bits_per_digit
+        mask <<= bits_per_digit
+        if digit in "xz":
+            continue
+        value |= int(digit, base)
+        mask |= digit_mask
+    if width is None:
+        width = len(digits) * bits_per_digit
+    else:
+        value &= (1 << width) - 1
+        mask &= (1 << width) - 1
+    return ICLNumber(value, mask, width)
+
+
+class SignalRef:
+    """
+    Reference to a signal of a module, e.g. SR, SR[0], SIB1.toSI or DO[7:0].
+    The range is kept as unevaluated token lists (msb, lsb), lsb is None for a single bit.
+    """
+    __slots__ = ("name", "msb", "lsb")
+
+    def __init__(self, name, msb=None, lsb=None):
+        self.name = name
+        self.msb = msb
+        self.lsb = lsb
+
+    def __repr__(self):
+        if self.msb is None:
+            return self.name
+        if self.lsb is None:
+            return "{:s}[{:s}]".format(self.name, "".join(self.msb))
+        return "{:s}[{:s}:{:s}]".format(self.name, "".join(self.msb), "".join(self.lsb))
+
+
+class ICLPort:
+    __slots__ = ("kind", "name", "msb", "lsb", "source")
+
+    def __init__(self, kind, name, msb=None, lsb=None, source=None):
+        self.kind = kind
+        self.name = name
+        self.msb = msb
+        self.lsb = lsb
+        self.source = source
+
+
+class ICLScanRegister:
+    __slots__ = ("name", "msb", "lsb", "scan_in", "capture", "reset")
+
+    def __init__(self, name, msb=None, lsb=None):
+        self.name = name
+        self.msb = msb
+        self.lsb = lsb
+        self.scan_in = None
+        self.capture = []
+        self.reset = None
+
+
+class ICLScanMux:
+    __slots__ = ("name", "select", "inputs")
+
+    def __init__(self, name, select):
+        self.name = name
+        self.select = select
+        self.inputs = []  # list of (list of ICLNumber, SignalRef)
+
+
+class ICLInstance:
+    __slots__ = ("name", "module", "connections", "parameters")
+
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+        self.connections = {}  # port name -> list of SignalRef
+        self.parameters = {}  # parameter name -> token list
+
+
+class ICLModule:
+    def __init__(self, name, filename):
+        self.name = name
+        self.filename = filename
+        self.ports = {}
+        self.registers = {}
+        self.muxes = {}
+        self.instances = {}
+        self.parameters = {}
+
+    def __repr__(self):
+        return "ICLModule({:s}: {:d} ports, {:d} registers, {:d} muxes, {:d} instances)".format(
+            self.name, len(self.ports), len(self.registers), len(self.muxes), len(self.instances))
+
+
+def tokenize(text, filename="<string>"):
+    tokens = []
+    pos = 0
+    line = 1
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if m is None:
+            raise ICLError("{:s}:{:d}: unexpected character {!r}".format(filename, line, text[pos]))
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind != "space":
+            tokens.append((value, line))
+        line += value.count("\n")
+        pos = m.end()
+    return tokens
+
+
+class ICLParser:
+    def __init__(self, text, filename="<string>"):
+        self.filename = filename
+        self.tokens = tokenize(text, filename)
+        self.pos = 0
+
+    def error(self, message):
+        line = self.tokens[min(self.pos, len(self.tokens) - 1)][1] if self.tokens else 0
+        return ICLError("{:s}:{:d}: {:s}".format(self.filename, line, message))
+
+    def peek(self, offset=0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset][0]
+        return None
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise self.error("unexpected end of file")
+        token = self.tokens[self.pos][0]
+        self.pos += 1
+        return token
+
+    def expect(self, token):
+        found = self.next()
+        if found != token:
+            self.pos -= 1
+            raise self.error("expected {!r} but found {!r}".format(token, found))
+
+    def accept(self, token):
+        if self.peek() == token:
+            self.pos += 1
+            return True
+        return False
+
+    def skip_statement(self):
+        """
+        Skip an unsupported statement up to its ';' or its closing '}'.
+        """
+        while True:
+            token = self.next()
+            if token == ";":
+                return
+            if token == "{":
+                depth = 1
+                while depth:
+                    token = self.next()
+                    if token == "{":
+                        depth += 1
+                    elif token == "}":
+                        depth -= 1
+                self.accept(";")
+                return
+
+    def parse(self):
+        """
+        :return: dict of module name -> ICLModule
+        """
+        modules = {}
+        while self.peek() is not None:
+            if self.peek() == "Module":
+                module = self.parse_module()
+                modules[module.name] = module
+            else:
+                self.skip_statement()
+        return modules
+
+    def parse_expression(self, stop):
+        """
+        Collect the tokens of an expression up to (not including) one of the stop tokens.
+        """
+        tokens = []
+        depth = 0
+        while True:
+            token = self.peek()
+            if token is None:
+                raise self.error("unexpected end of file")
+            if depth == 0 and token in stop:
+                return tokens
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            tokens.append(self.next())
+
+    def parse_range(self):
+        if not self.accept("["):
+            return None, None
+        msb = self.parse_expression((":", "]"))
+        lsb = None
+        if self.accept(":"):
+            lsb = self.parse_expression(("]",))
+        self.expect("]")
+        return msb, lsb
+
+    def parse_ref(self):
+        name = self.next()
+        while self.accept("."):
+            name += "." + self.next()
+        msb, lsb = self.parse_range()
+        return SignalRef(name, msb, lsb)
+
+    def parse_refs(self, stop):
+        refs = []
+        while True:
+            if self.peek()[0].isdigit() or self.peek()[0] == "'":
+                # constant tied to the port, not part of the scan path
+                self.next()
+            else:
+                refs.append(self.parse_ref())
+            if not self.accept(","):
+                break
+        if self.peek() not in stop:
+            raise self.error("unexpected {!r}".format(self.peek()))
+        return refs
+
+    def parse_module(self):
+        self.expect("Module")
+        module = ICLModule(self.next(), self.filename)
+        self.expect("{")
+        while not self.accept("}"):
+            keyword = self.peek()
+            if keyword in PORT_KINDS:
+                self.parse_port(module)
+            elif keyword == "ScanRegister":
+                self.parse_scan_register(module)
+            elif keyword == "ScanMux":
+                self.parse_scan_mux(module)
+            elif keyword == "Instance":
+                self.parse_instance(module)
+            elif keyword in ("Parameter", "LocalParameter"):
+                self.next()
+                name = self.next()
+                self.expect("=")
+                module.parameters[name] = self.parse_expression((";",))
+                self.expect(";")
+            else:
+                self.skip_statement()
+        return module
+
+    def parse_port(self, module):
+        kind = self.next()
+        name = self.next()
+        msb, lsb = self.parse_range()
+        port = ICLPort(kind, name, msb, lsb)
+        if self.accept("{"):
+            while not self.accept("}"):
+                if self.peek() == "Source":
+                    self.next()
+                    port.source = self.parse_refs((";",))
+                    self.expect(";")
+                else:
+                    self.skip_statement()
+        else:
+            self.expect(";")
+        module.ports[name] = port
+
+    def parse_scan_register(self, module):
+        self.expect("ScanRegister")
+        name = self.next()
+        msb, lsb = self.parse_range()
+        register = ICLScanRegister(name, msb, lsb)
+        self.expect("{")
+        while not self.accept("}"):
+            keyword = self.peek()
+            if keyword == "ScanInSource":
+                self.next()
+                register.scan_in = self.parse_ref()
+                self.expect(";")
+            elif keyword == "CaptureSource":
+                self.next()
+                register.capture = self.parse_refs((";",))
+                self.expect(";")
+            elif keyword == "ResetValue":
+                self.next()
+                register.reset = parse_number(self.next())
+                self.expect(";")
+            else:
+                self.skip_statement()
+        if register.scan_in is None:
+            raise self.error("ScanRegister {:s} has no ScanInSource".format(name))
+        module.registers[name] = register
+
+    def parse_scan_mux(self, module):
+        self.expect("ScanMux")
+        name = self.next()
+        self.expect("SelectedBy")
+        mux = ICLScanMux(name, self.parse_refs(("{",)))
+        self.expect("{")
+        while not self.accept("}"):
+            values = [parse_number(self.next())]
+            while self.accept(","):
+                values.append(parse_number(self.next()))
+            self.expect(":")
+            mux.inputs.append((values, self.parse_ref()))
+            self.expect(";")
+        module.muxes[name] = mux
+
+    def parse_instance(self, module):
+        self.expect("Instance")
+        name = self.next()
+        self.expect("Of")
+        instance = ICLInstance(name, self.next())
+        if self.accept("{"):
+            while not self.accept("}"):
+                keyword = self.peek()
+                if keyword == "InputPort":
+                    self.next()
+                    port = self.next()
+                    self.expect("=")
+                    instance.connections[port] = self.parse_refs((";",))
+                    self.expect(";")
+                elif keyword == "Parameter":
+                    self.next()
+                    parameter = self.next()
+                    self.expect("=")
+                    instance.parameters[parameter] = self.parse_expression((";",))
+                    self.expect(";")
+                else:
+                    self.skip_statement()
+        else:
+            self.expect(";")
+        module.instances[name] = instance
+
+
+def parse_string(text, filename="<string>"):
+    """
+    Parse ICL text.
+    :param text: ICL source
+    :param filename: Name used in error messages
+    :return: dict of module name -> ICLModule
+    """
+    return ICLParser(text, filename).parse()
+
+
+def _parse_file(filename):
+    with open(filename, "r") as f:
+        return parse_string(f.read(), filename)
+
+
+def parse_file(filename):
+    """
+    Parse an ICL file, reusing the result of an earlier parse of the same content.
+    :param filename: Name of the ICL file
+    :return: dict of module name -> ICLModule
+    """
+    return filecache.cached(filename, CACHE_KIND, CACHE_VERSION, _parse_file)
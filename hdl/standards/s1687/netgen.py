@@ -0,0 +1,409 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Generator of synthetic IEEE 1687 networks for benchmarking.
+
+A NetworkSpec describes a tree of SIBs: the top segment holds fanout SIBs in
+series and the segment behind every SIB holds one SReg per entry of widths
+followed, until depth levels are reached, by fanout SIBs of the next level.
+The same spec gives
+  - the ICL of the network (generate_icl / icl_network), one top module
+    instantiating the sib_mux_pre, sib_mux_post and SReg modules of icl/,
+  - the MyHDL model built from the sib_mux_pre, sib_mux_post and SReg blocks
+    (synthetic_network), with the same instance names,
+  - SimulatedNetwork, a scan_dr(count, tdi_string) access running the IJTAG
+    protocol on the MyHDL model, so the Retargeter can drive it.  With
+    model="behavioural" it runs the protocol on behavioural_network (see
+    behavioural.py) instead, the whole network in one process built from the
+    ICL, to cross-check it with the RTL or to simulate larger networks.
+
+Every SReg captures its own update value (DI wired to DO).
+
+Usage: python -m hdl.standards.s1687.netgen [<max depth>] [<fanout>] [<width> ...]
+Builds networks of growing depth (5 levels of 4 SIBs, 1364 SIBs, by default)
+and writes then reads back every SReg with the Retargeter.  Prints the ICL
+elaboration time, the scans and the retargeting time, the scan bits per
+second of the ICL model and, up to HDL_SIB_LIMIT SIBs, the MyHDL elaboration
+time and memory and the simulated scan bits per second, and up to
+BEHAVIOURAL_SIB_LIMIT SIBs the simulated scan bits per second of the
+behavioural model.
+"""
+import sys
+import time
+import tracemalloc
+from myhdl import *
+from hdl.standards.s1687.IJTAGInterface import IJTAGInterface
+from hdl.standards.s1687.SReg import SReg
+from hdl.standards.s1687.sib_mux_pre import sib_mux_pre
+from hdl.standards.s1687.sib_mux_post import sib_mux_post
+from hdl.standards.s1687.behavioural import behavioural_network
+from hdl.standards.s1687.icl_parser import parse_string
+from hdl.standards.s1687.icl_network import ICLLibrary, ICLNetwork, ICL_DIR
+import os.path
+
+SIB_KINDS = ("pre", "post", "mixed")
+period = 20  # clk frequency = 50 MHz
+# MyHDL spends about 0.2 s elaborating each SIB and SReg, larger networks are only run on the ICL model
+HDL_SIB_LIMIT = 100
+# largest network simulated with the behavioural model in main()
+BEHAVIOURAL_SIB_LIMIT = 400
+MODELS = ("rtl", "behavioural")
+
+
+class NetworkSpec:
+    def __init__(self, depth=2, fanout=4, widths=(8,), sib="post"):
+        """
+        :param depth: Number of SIB levels
+        :param fanout: Number of SIBs in series in every segment
+        :param widths: Widths of the SRegs in the segment behind every SIB
+        :param sib: "pre", "post" or "mixed" (post on even levels, pre on odd levels)
+        """
+        if depth < 1 or fanout < 1:
+            raise ValueError("A network needs at least one level and one SIB per segment.")
+        if sib not in SIB_KINDS:
+            raise ValueError("sib must be one of {:s}.".format(", ".join(SIB_KINDS)))
+        self.depth = depth
+        self.fanout = fanout
+        self.widths = tuple(widths)
+        self.sib = sib
+        self.name = "SYNTH_D{:d}_F{:d}".format(depth, fanout)
+
+    def sib_kind(self, level):
+        if self.sib == "mixed":
+            return "post" if level % 2 == 0 else "pre"
+        return self.sib
+
+    def sib_count(self):
+        return sum(self.fanout ** level for level in range(1, self.depth + 1))
+
+    def register_count(self):
+        return self.sib_count() * len(self.widths)
+
+    def bit_count(self):
+        """
+        :return: length of the scan path with every SIB open
+        """
+        return self.sib_count() * (1 + sum(self.widths))
+
+    def register_names(self):
+        """
+        :return: instance names of the SRegs, in the order of the walk
+        """
+        names = []
+
+        def walk(segment):
+            for _, _, registers, children in segment:
+                names.extend(registers)
+                walk(children)
+        walk(self.segments())
+        return names
+
+    def segments(self, prefix="S", level=0):
+        """
+        Walk the tree.
+        :return: list of (sib name, level, register names, child segment list)
+        """
+        items = []
+        for i in range(self.fanout):
+            name = "{:s}_{:d}".format(prefix, i)
+            registers = ["{:s}_R{:d}".format(name, j) for j in range(len(self.widths))]
+            children = self.segments(name, level + 1) if level + 1 < self.depth else []
+            items.append((name, level, registers, children))
+        return items
+
+
+def generate_icl(spec):
+    """
+    :return: ICL text of the top module of the network
+    """
+    lines = ["Module {:s} {{".format(spec.name),
+             "\tScanInPort SI;", "\tCaptureEnPort CE;", "\tShiftEnPort SE;", "\tUpdateEnPort UE;",
+             "\tSelectPort SEL;", "\tResetPort RST;", "\tTCKPort TCK;"]
+    body = []
+
+    def chain(segment, source):
+        for name, level, registers, children in segment:
+            inner = name + ".toSI"
+            for register, width in zip(registers, spec.widths):
+                body.append("\tInstance {:s} Of SReg {{ InputPort SI = {:s}; Parameter DR_WIDTH = {:d}; }}".format(
+                            register, inner, width))
+                inner = register + ".SO"
+            inner = chain(children, inner)
+            body.append("\tInstance {:s} Of sib_mux_{:s} {{ InputPort SI = {:s}; InputPort fromSO = {:s}; }}".format(
+                        name, spec.sib_kind(level), source, inner))
+            source = name + ".SO"
+        return source
+
+    output = chain(spec.segments(), "SI")
+    lines.append("\tScanOutPort SO {{ Source {:s}; }}".format(output))
+    lines.append("\tScanInterface client { port SI; port CE; port SE; port UE; port SEL; port RST; port TCK; "
+                 "port SO; }")
+    lines.extend(body)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def icl_network(spec, icl_text=None):
+    """
+    Elaborate the ICL of the network against the SIB and SReg modules of the project.
+    :return: ICLNetwork
+    """
+    library = ICLLibrary([os.path.join(ICL_DIR, "standards", "s1687")])
+    library.modules.update(parse_string(generate_icl(spec) if icl_text is None else icl_text,
+                                        spec.name + ".icl"))
+    return ICLNetwork(library, spec.name)
+
+
+@block
+def synthetic_network(path, name, spec, si, ijtag_interface, so, monitor=False):
+    """
+    MyHDL model of the network.
+    :param path: Dot path of the parent of this instance
+    :param name: Instance name of the network
+    :param spec: NetworkSpec
+    :param si: ScanInPort
+    :param ijtag_interface: IJTAGInterface of the network
+    :param so: ScanOutPort
+    :return: list of the SIB and SReg instances
+    """
+    # MyHDL wants the sub blocks instantiated in this function, so wire the tree first
+    wiring = []
+
+    def chain(segment, source, interface, sink):
+        for index, (sib_name, level, registers, children) in enumerate(segment):
+            to_interface = IJTAGInterface()
+            to_si = Signal(bool(0))
+            from_so = Signal(bool(0))
+            sib_so = sink if index == len(segment) - 1 else Signal(bool(0))
+            chained = []
+            inner = to_si
+            for position, (register, width) in enumerate(zip(registers, spec.widths)):
+                register_so = from_so if position == len(registers) - 1 and not children else Signal(bool(0))
+                chained.append((register, width, inner, register_so, Signal(intbv(0)[width:])))
+                inner = register_so
+            wiring.append((spec.sib_kind(level), sib_name, source, interface, sib_so, to_si, to_interface,
+                           from_so, chained))
+            if children:
+                chain(children, inner, to_interface, from_so)
+            source = sib_so
+
+    chain(spec.segments(), si, ijtag_interface, so)
+    path = path + "." + name
+    sibs = {"pre": sib_mux_pre, "post": sib_mux_post}
+    instances = []
+    for kind, sib_name, source, interface, sib_so, to_si, to_interface, from_so, chained in wiring:
+        instances.append(sibs[kind](path, sib_name, source, interface, sib_so, to_si, to_interface, from_so,
+                                    monitor=monitor))
+        for register, width, register_si, register_so, data in chained:
+            instances.append(SReg(path, register, register_si, to_interface, register_so, data, data,
+                                  dr_width=width, monitor=monitor))
+    return instances
+
+
+class SimulatedNetwork:
+    """
+    scan_dr(count, tdi_string) access to the MyHDL model of a network.  Every scan runs the
+    Capture-Shift-Update sequence with the simulation paused in between.
+    """
+    def __init__(self, spec, monitor=False, model="rtl", network=None):
+        """
+        :param spec: NetworkSpec
+        :param monitor: False=Do not turn on the signal monitors, True=Turn on the signal monitors
+        :param model: "rtl" for synthetic_network, "behavioural" for behavioural_network
+        :param network: ICLNetwork of the spec used by the behavioural model, elaborated when None
+        """
+        if model not in MODELS:
+            raise ValueError("model must be one of {:s}.".format(", ".join(MODELS)))
+        self.spec = spec
+        self.model = model
+        self.network = network if network is not None or model == "rtl" else icl_network(spec)
+        self.jobs = []
+        self.results = []
+        self.bits = 0
+        self.elapsed = 0.0
+        self.tb = self.__tb(monitor)
+        self.tb.config_sim(trace=False)
+
+    @block
+    def __tb(self, monitor):
+        ijtag_interface = IJTAGInterface()
+        si = Signal(bool(0))
+        so = Signal(bool(0))
+        if self.model == "behavioural":
+            network_inst = behavioural_network("TOP", self.spec.name, self.network, si, ijtag_interface, so,
+                                               monitor=monitor)
+        else:
+            network_inst = synthetic_network("TOP", self.spec.name, self.spec, si, ijtag_interface, so,
+                                             monitor=monitor)
+        jobs = self.jobs
+        results = self.results
+
+        def cycle(capture=False, shift=False, update=False, reset=False):
+            ijtag_interface.SELECT.next = True
+            ijtag_interface.CAPTURE.next = capture
+            ijtag_interface.SHIFT.next = shift
+            ijtag_interface.UPDATE.next = update
+            ijtag_interface.RESET.next = reset
+            yield delay(period // 2)
+            ijtag_interface.CLOCK.next = True
+            yield delay(period // 2)
+            ijtag_interface.CLOCK.next = False
+
+        @instance
+        def engine():
+            for _ in cycle(reset=True):
+                yield _
+            yield delay(period // 2)
+            ijtag_interface.RESET.next = False
+            while True:
+                if not jobs:
+                    yield delay(period)
+                    continue
+                count, tdi = jobs.pop(0)
+                for _ in cycle(capture=True):
+                    yield _
+                tdo = 0
+                for i in range(count):
+                    si.next = (tdi >> i) & 1
+                    ijtag_interface.SHIFT.next = True
+                    ijtag_interface.CAPTURE.next = False
+                    yield delay(period // 2)
+                    tdo |= int(so) << i
+                    ijtag_interface.CLOCK.next = True
+                    yield delay(period // 2)
+                    ijtag_interface.CLOCK.next = False
+                for _ in cycle(update=True):
+                    yield _
+                yield delay(period // 2)
+                ijtag_interface.UPDATE.next = False
+                results.append(tdo)
+
+        return network_inst, engine
+
+    def scan_dr(self, count, tdi_string):
+        start = time.perf_counter()
+        self.jobs.append((count, int(tdi_string, 16) if tdi_string else 0))
+        self.tb.run_sim((count + 3) * period, quiet=1)
+        while not self.results:
+            self.tb.run_sim(period, quiet=1)
+        self.bits += count
+        self.elapsed += time.perf_counter() - start
+        return "{:0{:d}X}".format(self.results.pop(0), (count + 3) // 4)
+
+    def quit(self):
+        self.tb.quit_sim()
+
+
+class ModelNetwork:
+    """
+    scan_dr(count, tdi_string) access to the ICL model of a network whose registers capture their own update
+    value, the reference the MyHDL model is compared with and the access used when it is too large to simulate.
+    """
+    def __init__(self, network):
+        self.network = network
+        self.configuration = network.reset_configuration()
+        self.bits = 0
+        self.elapsed = 0.0
+
+    def scan_dr(self, count, tdi_string):
+        start = time.perf_counter()
+        path = self.network.scan_path(self.configuration)
+        if count != path.length:
+            raise ValueError("Scan of {:d} bits on a {:d} bit path.".format(count, path.length))
+        tdo = path.vector(self.configuration)
+        tdi = int(tdi_string, 16) if tdi_string else 0
+        for register in path.registers:
+            self.configuration[register.path] = path.extract(tdi, register.path)
+        self.bits += count
+        self.elapsed += time.perf_counter() - start
+        return "{:0{:d}X}".format(tdo, (count + 3) // 4)
+
+
+def exercise(spec, network, access, value=0x5A):
+    """
+    Write every SReg of the network with the Retargeter, which opens the SIBs level by level, then read
+    every SReg back.
+    :return: (scans, seconds spent outside the access, True when every register read back its value)
+    """
+    from hdl.standards.s1687.retargeter import Retargeter
+    retargeter = Retargeter(network, access)
+    paths = ["{:s}.{:s}.SR".format(spec.name, register) for register in spec.register_names()]
+    elapsed = access.elapsed
+    start = time.perf_counter()
+    for path in paths:
+        retargeter.write(path, value & ((1 << network.registers[path].width) - 1))
+    retargeter.apply()
+    reads = [retargeter.read(path) for path in paths]
+    retargeter.apply()
+    total = time.perf_counter() - start
+    ok = all(handle.value == value & ((1 << handle.register.width) - 1) for handle in reads)
+    return retargeter.scans, total - (access.elapsed - elapsed), ok
+
+
+def benchmark(spec, hdl=True, behavioural=False):
+    """
+    Measure one network.
+    :param hdl: False to skip the MyHDL model
+    :param behavioural: True to also run the behavioural model
+    :return: dict of the measurements, the MyHDL and behavioural ones are None when skipped
+    """
+    row = {"sibs": spec.sib_count(), "registers": spec.register_count(), "bits": spec.bit_count(),
+           "elaborate_s": None, "memory_mb": None, "hdl_bits_per_s": None, "behavioural_bits_per_s": None}
+    start = time.perf_counter()
+    network = icl_network(spec)
+    row["icl_s"] = time.perf_counter() - start
+    model = ModelNetwork(network)
+    row["scans"], row["retarget_s"], row["ok"] = exercise(spec, network, model)
+    row["model_bits_per_s"] = model.bits / model.elapsed if model.elapsed else 0.0
+    if behavioural:
+        simulated = SimulatedNetwork(spec, model="behavioural", network=network)
+        scans, _, ok = exercise(spec, network, simulated)
+        row["ok"] = row["ok"] and ok and scans == row["scans"]
+        row["behavioural_bits_per_s"] = simulated.bits / simulated.elapsed if simulated.elapsed else 0.0
+        simulated.quit()
+    if not hdl:
+        return row
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    simulated = SimulatedNetwork(spec)
+    simulated.scan_dr(0, "")
+    row["elaborate_s"] = time.perf_counter() - start
+    row["memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    simulated.elapsed = 0.0
+    simulated.bits = 0
+    scans, _, ok = exercise(spec, network, simulated)
+    row["ok"] = row["ok"] and ok and scans == row["scans"]
+    row["hdl_bits_per_s"] = simulated.bits / simulated.elapsed if simulated.elapsed else 0.0
+    simulated.quit()
+    return row
+
+
+def main():
+    args = sys.argv[1:]
+    depth = int(args[0]) if args else 5
+    fanout = int(args[1]) if len(args) > 1 else 4
+    widths = tuple(int(arg) for arg in args[2:]) or (8,)
+    print("{:>6s} {:>6s} {:>7s} {:>8s} {:>6s} {:>10s} {:>12s} {:>12s} {:>12s} {:>10s} {:>12s}".format(
+        "SIBs", "regs", "bits", "ICL s", "scans", "retarget s", "model bits/s", "behav bits/s", "elaborate s",
+        "memory MB", "HDL bits/s"))
+    failed = False
+    for level in range(1, depth + 1):
+        spec = NetworkSpec(level, fanout, widths)
+        row = benchmark(spec, hdl=spec.sib_count() <= HDL_SIB_LIMIT,
+                        behavioural=spec.sib_count() <= BEHAVIOURAL_SIB_LIMIT)
+        behavioural = "{:>12s}".format("-") if row["behavioural_bits_per_s"] is None else \
+            "{:12.0f}".format(row["behavioural_bits_per_s"])
+        hdl = "{:>12s} {:>10s} {:>12s}".format("-", "-", "-") if row["elaborate_s"] is None else \
+            "{elaborate_s:12.3f} {memory_mb:10.1f} {hdl_bits_per_s:12.0f}".format(**row)
+        print("{sibs:6d} {registers:6d} {bits:7d} {icl_s:8.3f} {scans:6d} {retarget_s:10.3f} "
+              "{model_bits_per_s:12.0f} {behavioural:s} {hdl:s}{flag:s}".format(
+                  behavioural=behavioural, hdl=hdl, flag="" if row["ok"] else "  read back failed!", **row))
+        failed = failed or not row["ok"]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
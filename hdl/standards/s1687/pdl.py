@@ -0,0 +1,274 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+Interpreter for IEEE 1687 Procedural Description Language (PDL) level 1.
+
+PDL is Tcl with the i* commands added, so the scripts run in the Tcl
+interpreter of tkinter and the i* commands are served by a Retargeter.
+iWrite and iRead only queue the access; iApply performs all of the queued
+accesses with as few scans as the network allows and then compares the data
+captured by every iRead against its expected value.  Mismatches are printed
+and collected in PDLInterpreter.failures.
+
+Supported commands:
+    iProcsForModule <module>           following iProc belong to <module>
+    iProc <name> {<args>} {<body>}     define a procedure of the current module
+    iCall [<instance>.]<name> <args>   call a procedure of the module of an instance
+    iPrefix <instance>                 register names are relative to <instance>
+    iWrite <register> <value>          queue a write
+    iRead <register> [<expected>]      queue a read, x bits of expected are not compared
+    iApply                             perform the queued accesses
+    iGetReadData <register> [-hex|-bin|-dec]  data captured by the last iRead of <register>
+    iRunLoop <cycles> [-tck]           run the TAP in Run-Test/Idle (access.runtest)
+    iReset                             the network is reset (access.reset when available)
+    iNote [-comment|-status] <text>    print a note
+
+Values use the ICL number format (8'h5A, 'b1010, 42) or 0x/0b prefixes.
+
+Usage:
+    python -m hdl.standards.s1687.pdl <top module> <pdl file> <board> [<ip>:<port>] [ir=<count>:<hex>] [call=<proc> ...]
+Without <ip>:<port> the board is simulated in this process, otherwise the
+scans go through the telnet driver to a running simservice.  ir= loads the
+TAP instruction selecting the IJTAG network before the script runs.
+"""
+import sys
+import tkinter
+from hdl.standards.s1687.icl_parser import ICLError, parse_number
+from hdl.standards.s1687.icl_network import load_network
+from hdl.standards.s1687.retargeter import Retargeter
+
+
+class PDLError(Exception):
+    def __init__(self, message):
+        super(PDLError, self).__init__(message)
+
+
+def parse_value(text, width=None):
+    """
+    Convert a PDL value into an ICLNumber.
+    :param text: Value as written in the script
+    :param width: Width of the register the value is for
+    :return: ICLNumber
+    """
+    text = text.strip()
+    try:
+        if text[:2].lower() == "0x":
+            text = "'h" + text[2:]
+        elif text[:2].lower() == "0b":
+            text = "'b" + text[2:]
+        number = parse_number(text)
+    except (ValueError, KeyError, IndexError):
+        raise PDLError("{:s} is not a valid value.".format(text))
+    if width is not None:
+        number.value &= (1 << width) - 1
+        number.mask &= (1 << width) - 1
+    return number
+
+
+class ReadCheck:
+    __slots__ = ("handle", "expected", "text")
+
+    def __init__(self, handle, expected, text):
+        self.handle = handle
+        self.expected = expected
+        self.text = text
+
+    def __repr__(self):
+        return "iRead {:s}: expected {:s}, read 0x{:X}".format(self.handle.register.path, self.text,
+                                                               self.handle.value)
+
+
+class PDLInterpreter:
+    def __init__(self, retargeter, verbose=False):
+        """
+        :param retargeter: Retargeter performing the register accesses
+        :param verbose: True to print every iApply
+        """
+        self.retargeter = retargeter
+        self.network = retargeter.network
+        self.verbose = verbose
+        self.prefix = self.network.name
+        self.module = None
+        self.checks = []
+        self.read_data = {}
+        self.failures = []
+        self.applies = 0
+        self.error = None
+        self.tcl = tkinter.Tcl()
+        self.tcl.eval("namespace eval ::pdl {}")
+        for name in ("iProcsForModule", "iProc", "iCall", "iPrefix", "iWrite", "iRead", "iApply",
+                     "iGetReadData", "iRunLoop", "iReset", "iNote"):
+            self.tcl.createcommand(name, self.__wrap(getattr(self, name)))
+
+    def __wrap(self, method):
+        def command(*args):
+            try:
+                result = method(*args)
+            except (PDLError, ICLError) as e:
+                # tkinter drops the message of an exception raised in a command, keep it for run()
+                self.error = str(e)
+                raise
+            return "" if result is None else result
+        return command
+
+    def run(self, text):
+        """
+        Run PDL commands.
+        :param text: PDL source
+        :return: result of the last command
+        """
+        self.error = None
+        try:
+            return self.tcl.eval(text)
+        except tkinter.TclError as e:
+            message = self.error if self.error is not None else str(e)
+            raise PDLError(message + self.tcl.eval("set ::errorInfo"))
+
+    def run_file(self, filename):
+        with open(filename, "r") as f:
+            return self.run(f.read())
+
+    def register(self, name):
+        if self.prefix:
+            try:
+                return self.network.register(self.prefix + "." + name)
+            except ICLError:
+                pass
+        return self.network.register(name)
+
+    def iProcsForModule(self, module):
+        self.module = module
+        self.tcl.eval("namespace eval ::pdl::{:s} {{}}".format(module))
+
+    def iProc(self, name, args, body):
+        if self.module is None:
+            raise PDLError("iProc {:s} comes before iProcsForModule.".format(name))
+        self.tcl.call("proc", "::pdl::{:s}::{:s}".format(self.module, name), args, body)
+
+    def iCall(self, target, *args):
+        instance, _, name = target.rpartition(".")
+        path = self.prefix + "." + instance if instance else self.prefix
+        if path not in self.network.instances and instance in self.network.instances:
+            path = instance
+        if path not in self.network.instances:
+            raise PDLError("iCall {:s}: instance {:s} is not in the network.".format(target, path))
+        proc = "::pdl::{:s}::{:s}".format(self.network.instances[path], name)
+        if not self.tcl.eval("info procs {:s}".format(proc)):
+            raise PDLError("iCall {:s}: no iProc {:s} for module {:s}.".format(target, name,
+                                                                               self.network.instances[path]))
+        saved = self.prefix
+        self.prefix = path
+        try:
+            return self.tcl.call(proc, *args)
+        finally:
+            self.prefix = saved
+
+    def iPrefix(self, instance):
+        if instance in ("", "."):
+            self.prefix = self.network.name
+        elif instance in self.network.instances:
+            self.prefix = instance
+        else:
+            self.prefix = self.prefix + "." + instance
+
+    def iWrite(self, name, value):
+        register = self.register(name)
+        number = parse_value(value, register.width)
+        self.retargeter.write(register.path, number.value)
+
+    def iRead(self, name, expected=None):
+        register = self.register(name)
+        handle = self.retargeter.read(register.path)
+        self.checks.append(ReadCheck(handle, parse_value(expected, register.width) if expected else None,
+                                     expected))
+
+    def iApply(self, *options):
+        scans = self.retargeter.apply()
+        self.applies += 1
+        checks = self.checks
+        self.checks = []
+        for check in checks:
+            self.read_data[check.handle.register.path] = check.handle.value
+            if check.expected is not None and not check.expected.matches(check.handle.value):
+                self.failures.append(check)
+                print("PDL: mismatch", check)
+        if self.verbose:
+            print("PDL: iApply {:d}: {:d} scans".format(self.applies, scans))
+        return scans
+
+    def iGetReadData(self, name, fmt="-hex"):
+        register = self.register(name)
+        if register.path not in self.read_data:
+            raise PDLError("iGetReadData {:s}: the register has not been read.".format(name))
+        value = self.read_data[register.path]
+        if fmt == "-bin":
+            return "{:0{:d}b}".format(value, register.width)
+        if fmt == "-dec":
+            return str(value)
+        return "0x{:X}".format(value)
+
+    def iRunLoop(self, cycles, *options):
+        access = self.retargeter.access
+        if not hasattr(access, "runtest"):
+            raise PDLError("iRunLoop: the scan access cannot run clock cycles.")
+        access.runtest(int(cycles, 0))
+
+    def iReset(self, *options):
+        access = self.retargeter.access
+        if hasattr(access, "reset"):
+            access.reset()
+        self.retargeter.reset()
+
+    def iNote(self, *args):
+        print("PDL:", args[-1] if args else "")
+
+
+def main():
+    args = sys.argv[1:]
+    ir = None
+    calls = []
+    for arg in list(args):
+        if arg.startswith("ir="):
+            count, _, value = arg[3:].partition(":")
+            ir = (int(count), value)
+            args.remove(arg)
+        elif arg.startswith("call="):
+            calls.append(arg[5:])
+            args.remove(arg)
+    if len(args) not in (3, 4):
+        print(__doc__)
+        return 2
+    top, pdl_file, board = args[:3]
+    if len(args) == 4:
+        from drivers.Python.atesim.atesim import ATE, JTAGController
+        ip, _, port = args[3].partition(":")
+        ate_inst = ATE(ip, int(port))
+        ate_inst.connect(board)
+    else:
+        from drivers.Python.atesim.atesim import JTAGController
+        from hdl.ate.replay import make_ate
+        ate_inst = make_ate(board)
+        if ate_inst is None:
+            print("Board {:s} cannot be found!".format(board))
+            return 2
+        ate_inst.start_simulation()
+    jtag = JTAGController(ate_inst)
+    try:
+        if ir is not None:
+            jtag.scan_ir(*ir)
+        interpreter = PDLInterpreter(Retargeter(load_network(top), jtag), verbose=True)
+        interpreter.run_file(pdl_file)
+        for call in calls:
+            interpreter.run("iCall " + call)
+            if interpreter.checks or interpreter.retargeter.pending():
+                interpreter.iApply()
+    finally:
+        ate_inst.terminate()
+    print("{:d} iApply, {:d} scans, {:d} bits, {:d} mismatches.".format(
+        interpreter.applies, interpreter.retargeter.scans, interpreter.retargeter.bits, len(interpreter.failures)))
+    return 1 if interpreter.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Copyright (c) 2020 Bradford G. Van Treuren
+See the licence file in the top directory
+
+IEEE 1687 retargeting engine.
+
+Register reads and writes are queued against the registers of an ICLNetwork
+and apply() turns them into the scans needed to perform them.  Each scan
+loads every queued write of a register on the active path, captures every
+queued read of a register on the path and sets the SIB (and other ScanMux
+select) registers on the path toward the registers still out of reach.
+Registers that take no part in the access are loaded with their current
+update value, so they are left unchanged.
+
+The retargeter keeps the configuration (update value of every register) of
+the network between calls to apply(), so a later access only opens what is
+not open yet.  The scans go out through the scan_dr(count, tdi_string) method
+of the access object, e.g. drivers/Python/atesim JTAGController once the TAP
+selects the IJTAG network, or any object with the same method.
+"""
+from hdl.standards.s1687.icl_network import Register, ScanIn
+
+
+class RetargetError(Exception):
+    def __init__(self, message):
+        super(RetargetError, self).__init__(message)
+
+
+class RegisterRead:
+    """
+    Handle of a queued read.  value holds the captured data once the read is applied.
+    """
+    __slots__ = ("register", "value")
+
+    def __init__(self, register):
+        self.register = register
+        self.value = None
+
+    def __repr__(self):
+        return "RegisterRead({:s} = {!r})".format(self.register.path, self.value)
+
+
+class Retargeter:
+    def __init__(self, network, access, output=None, configuration=None):
+        """
+        :param network: ICLNetwork to retarget the accesses to
+        :param access: Object with a scan_dr(count, tdi_string) -> tdo_string method
+        :param output: Name of the top ScanOutPort of the network connected to TDO
+        :param configuration: Current configuration of the network, defaults to the reset configuration
+        """
+        self.network = network
+        self.access = access
+        self.output = output
+        self.configuration = configuration if configuration is not None else network.reset_configuration()
+        self.select_registers = set()
+        for mux in network.muxes.values():
+            for register, bit in mux.select:
+                self.select_registers.add(register.path)
+        self.reachable = {}
+        self.writes = {}
+        self.reads = []
+        self.path = network.scan_path(self.configuration, output)
+        self.scans = 0
+        self.bits = 0
+
+    def reset(self):
+        """
+        Forget the tracked configuration after the network has been reset.
+        """
+        self.configuration = self.network.reset_configuration()
+        self.path = self.network.scan_path(self.configuration, self.output)
+
+    def write(self, register, value):
+        """
+        Queue a write.  A later write of the same register replaces the earlier one.
+        :param register: Register path (see ICLNetwork.register)
+        :param value: Value to load
+        """
+        register = self.network.register(register)
+        self.writes[register.path] = value & ((1 << register.width) - 1)
+
+    def read(self, register):
+        """
+        Queue a read.
+        :param register: Register path (see ICLNetwork.register)
+        :return: RegisterRead handle filled in by apply()
+        """
+        handle = RegisterRead(self.network.register(register))
+        self.reads.append(handle)
+        return handle
+
+    def pending(self):
+        return len(self.writes) + len(self.reads)
+
+    def reaches(self, register):
+        """
+        :param register: Register
+        :return: set of the ids of the nodes whose scan input is (maybe through muxes) fed by the register
+        """
+        if register.path not in self.reachable:
+            nodes = set()
+            memo = {}
+
+            def visit(node):
+                if id(node) in memo:
+                    return memo[id(node)]
+                memo[id(node)] = False
+                if node is register:
+                    found = True
+                elif isinstance(node, Register):
+                    found = visit(node.upstream)
+                elif isinstance(node, ScanIn):
+                    found = False
+                else:
+                    found = False
+                    for numbers, upstream in node.inputs:
+                        found = visit(upstream) or found
+                memo[id(node)] = found
+                if found:
+                    nodes.add(id(node))
+                return found
+
+            for output in self.network.outputs.values():
+                visit(output)
+            self.reachable[register.path] = nodes
+        return self.reachable[register.path]
+
+    def route(self, register):
+        """
+        The mux settings that put a register on the scan path, preferring the mux inputs selected now.
+        :param register: Register path
+        :return: dict of (select register path, bit) -> required bit value
+        """
+        target = self.network.registers[register]
+        reaches = self.reaches(target)
+        node = self.network.outputs[self.output] if self.output is not None \
+            else next(iter(self.network.outputs.values()))
+        if id(node) not in reaches:
+            raise RetargetError("{:s} cannot be put on the scan path.".format(register))
+        required = {}
+        while node is not target:
+            if isinstance(node, Register):
+                node = node.upstream
+                continue
+            selected = node.selected(self.configuration)
+            candidates = [(numbers, upstream) for numbers, upstream in node.inputs if id(upstream) in reaches]
+            if len(candidates) == len(node.inputs) and id(selected) in reaches:
+                node = selected
+                continue
+            if id(selected) in reaches:
+                numbers, upstream = next(c for c in candidates if c[1] is selected)
+            else:
+                numbers, upstream = candidates[0]
+            number = next(n for n in numbers if n.matches(self.select_value(node))) \
+                if upstream is selected else numbers[0]
+            for index, (select, bit) in enumerate(reversed(node.select)):
+                if (number.mask >> index) & 1:
+                    required[(select.path, bit)] = (number.value >> index) & 1
+            node = upstream
+        return required
+
+    def select_value(self, mux):
+        value = 0
+        for register, bit in mux.select:
+            value = (value << 1) | ((self.configuration[register.path] >> bit) & 1)
+        return value
+
+    def goal(self, register, depth=0):
+        """
+        The mux settings to make in the next scan on the way to a register.  When a select register
+        the route depends on is off the path and not set yet, the way to that register comes first.
+        :param register: Register path
+        :return: dict of (select register path, bit) -> required bit value
+        """
+        required = self.route(register)
+        if depth < len(self.select_registers):
+            for (select, bit), value in required.items():
+                if select not in self.path and ((self.configuration[select] >> bit) & 1) != value:
+                    return self.goal(select, depth + 1)
+        return required
+
+    def plan(self, writes, reads):
+        """
+        Compute the load values of the next scan.
+        :return: dict of register path -> value to load for the registers on the current path
+        """
+        path = self.path
+        loads = {}
+        for register_path in path.offsets:
+            if register_path in writes:
+                loads[register_path] = writes[register_path]
+        targets = [p for p in writes if p not in path]
+        targets.extend(handle.register.path for handle in reads if handle.register.path not in path)
+        settings = {}
+        for target in targets:
+            required = self.goal(target)
+            # skip a target whose route conflicts with an earlier one, it is served by a later scan
+            if all(settings.get(key, value) == value for key, value in required.items()):
+                settings.update(required)
+        for (select, bit), value in settings.items():
+            if select in path and select not in writes:
+                current = loads.get(select, self.configuration[select])
+                loads[select] = (current & ~(1 << bit)) | (value << bit)
+        return loads
+
+    def scan(self, loads):
+        """
+        Perform one scan of the current path.
+        :param loads: dict register path -> value to load, the other registers keep their value
+        :return: captured scan vector as an int
+        """
+        path = self.path
+        vector = path.vector(loads, self.configuration)
+        tdo = self.access.scan_dr(path.length, "{:0{:d}X}".format(vector, (path.length + 3) // 4))
+        self.scans += 1
+        self.bits += path.length
+        select_changed = False
+        for register in path.registers:
+            value = (vector >> path.offsets[register.path]) & ((1 << register.width) - 1)
+            if value != self.configuration[register.path] and register.path in self.select_registers:
+                select_changed = True
+            self.configuration[register.path] = value
+        if select_changed:
+            self.path = self.network.scan_path(self.configuration, self.output)
+        return int(tdo, 16) if tdo else 0
+
+    def apply(self):
+        """
+        Perform the queued accesses with as few scans as the network allows.
+        :return: number of scans performed
+        """
+        writes = self.writes
+        reads = self.reads
+        self.writes = {}
+        self.reads = []
+        scans = 0
+        limit = len(self.network.registers) + len(writes) + len(reads) + 1
+        while writes or reads:
+            if scans >= limit:
+                raise RetargetError("Retargeting does not converge for {:s}.".format(
+                    ", ".join(list(writes) + [handle.register.path for handle in reads])))
+            path = self.path
+            loads = self.plan(writes, reads)
+            tdo = self.scan(loads)
+            scans += 1
+            for handle in [handle for handle in reads if handle.register.path in path]:
+                handle.value = path.extract(tdo, handle.register.path)
+                reads.remove(handle)
+            for register_path in [p for p in writes if p in path]:
+                del writes[register_path]
+        return scans
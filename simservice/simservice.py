@@ -1,6 +1,7 @@
 """
 
 """
+import io
 import os
 from platform import system
 import sys
@@ -17,6 +18,8 @@ from hdl.ate.ate import ATE
 # from hdl.boards.i2ctest.i2ctest import I2CTest
 # from hdl.boards.jtagtest.jtagtest import JTAGTest
 from hdl.boards.common.BoardFactory import BoardFactory
+from hdl.ate.checkpoint import CheckpointError
+from hdl.ate.profiler import ProfileError
 
 TELNET_IP_BINDING = ""  # all
 TELNET_PORT_BINDING = 5023
@@ -193,27 +196,53 @@ class SimulatorHandler(TelnetHandler):
                 else:
                     self.writeresponse("Simulation is STOPPED." + "\nOK")
 
+    @command('BOARDS')
+    def command_BOARDS(self, params):
+        '''
+        Report the boards that may be simulated.
+        Report the boards registered with the BoardFactory and the import time of those already loaded.
+        BOARDS
+        '''
+        if len(params) != 0:
+            self.writeerror('Invalid number of arguments received.')
+        else:
+            times = self.board_factory.get_import_times()
+            lines = []
+            for name in self.board_factory.get_board_names():
+                if name in times:
+                    lines.append("{:s} loaded {:.3f} s".format(name, times[name]))
+                else:
+                    lines.append("{:s} not loaded".format(name))
+            self.writeresponse("\n".join(lines) + "\nOK")
+
     @command('STARTSIM')
     def command_STARTSIM(self, params):
         '''
-        <Name of the board to simulate>
+        <Name of the board to simulate> [<checkpoint file>]
         Start up the MyHDL Simulation thread to run the logic simulation to be stimulated.
         Start up the MyHDL Simulation thread to run the logic simulation to be stimulated.
+        When a checkpoint file made by CHECKPOINT is given, the simulation starts from the saved state.
+        Board arguments may follow the name after a colon, e.g. STARTSIM BSChain:32 for a chain of 32 devices.
         STARTSIM SPITest
         '''
         if len(params) == 0:
             # No argument given, so respond with help message
             return self.cmdHELP(['STARTSIM'])
-        if len(params) == 1:
+        if len(params) <= 2:
             self.board_inst = self.__get_board_inst(params[0])
             if self.board_inst is not None:
-                self.ate_inst = ATE(self.board_inst)
+                self.ate_inst = ATE(self.board_inst, params[0])
                 self.ate_inst.configure_gpio(self.board_factory.get_gpio_if())
                 self.ate_inst.configure_i2c(self.board_factory.get_i2c_if())
                 self.ate_inst.configure_spi(self.board_factory.get_spi_if())
                 self.ate_inst.configure_jtag(self.board_factory.get_jtag_if())
                 self.ate_inst.configure_jtag2(self.board_factory.get_jtag2_if())
-                self.ate_inst.start_simulation()
+                try:
+                    self.ate_inst.start_simulation(params[1] if len(params) == 2 else None)
+                except (CheckpointError, OSError) as e:
+                    self.ate_inst = None
+                    self.writeerror('Unable to restore checkpoint: {:s}'.format(str(e)))
+                    return
                 sleep(5)
                 self.start_state = True
                 self.writeresponse("OK")
@@ -222,6 +251,156 @@ class SimulatorHandler(TelnetHandler):
         else:
             self.writeerror('Invalid number of arguments received.')
 
+    @command('CHECKPOINT')
+    def command_CHECKPOINT(self, params):
+        '''
+        <checkpoint file>
+        Save the state of the running simulation to a file.
+        Save the state of the running simulation to a file so STARTSIM can resume from it in a later session.
+        CHECKPOINT P2654Board1_setup.ckpt
+        '''
+        if len(params) != 1:
+            self.writeerror('Invalid number of arguments received.')
+        elif not self.start_state or self.ate_inst is None:
+            self.writeerror('Simulation must first be started with STARTSIM command.')
+        else:
+            try:
+                self.ate_inst.checkpoint(params[0])
+                self.writeresponse("OK")
+            except OSError as e:
+                self.writeerror('Unable to write checkpoint: {:s}'.format(str(e)))
+
+    @command('RECORD')
+    def command_RECORD(self, params):
+        '''
+        <transaction log file> | OFF
+        Record the Wishbone transactions of the running simulation.
+        Record every following Wishbone transaction (op, address, data, result, sim time) to a binary log
+        that may be replayed with "python -m hdl.ate.replay <log file>".  RECORD OFF stops the recording.
+        RECORD session.wblog
+        '''
+        if len(params) != 1:
+            self.writeerror('Invalid number of arguments received.')
+        elif not self.start_state or self.ate_inst is None:
+            self.writeerror('Simulation must first be started with STARTSIM command.')
+        elif params[0].upper() == "OFF":
+            self.ate_inst.stop_recording()
+            self.writeresponse("OK")
+        else:
+            try:
+                self.ate_inst.start_recording(params[0])
+                self.writeresponse("OK")
+            except OSError as e:
+                self.writeerror('Unable to open transaction log: {:s}'.format(str(e)))
+
+    @command('PROFILE')
+    def command_PROFILE(self, params):
+        '''
+        ON [PYTHON|ALL] | OFF | REPORT [<n>] | SAVE <file>
+        Profile the processes of the running simulation.
+        PROFILE ON counts the activations and the wall time of every process by hierarchical path, PYTHON
+        profiles the Python code with cProfile instead and ALL does both.  PROFILE OFF stops profiling.
+        REPORT lists the n hottest processes (20 by default).  SAVE writes the folded stacks of the processes
+        for flamegraph.pl to the file and the cProfile statistics for "python -m pstats" to <file>.prof.
+        PROFILE ON
+        '''
+        if len(params) == 0:
+            return self.cmdHELP(['PROFILE'])
+        action = params[0].upper()
+        if not self.start_state or self.ate_inst is None:
+            self.writeerror('Simulation must first be started with STARTSIM command.')
+        elif action == "ON" and len(params) <= 2:
+            kind = params[1].upper() if len(params) == 2 else "PROCESSES"
+            if kind not in ("PROCESSES", "PYTHON", "ALL"):
+                self.writeerror('Unknown profile {:s}, expected PYTHON or ALL.'.format(params[1]))
+                return
+            self.ate_inst.start_profiling(kind != "PYTHON", kind != "PROCESSES")
+            self.writeresponse("OK")
+        elif action == "OFF" and len(params) == 1:
+            self.ate_inst.stop_profiling()
+            self.writeresponse("OK")
+        elif self.ate_inst.profile is None:
+            self.writeerror('Profiling must first be started with PROFILE ON.')
+        elif action == "REPORT" and len(params) <= 2:
+            try:
+                n = int(params[1]) if len(params) == 2 else 20
+            except ValueError:
+                n = 0
+            if n < 1:
+                self.writeerror('Invalid argument received, the number of processes must be a positive integer.')
+                return
+            out = io.StringIO()
+            self.ate_inst.profile_call(lambda profile: profile.report(n, out))
+            self.writeresponse(out.getvalue() + "OK")
+        elif action == "SAVE" and len(params) == 2:
+            try:
+                self.ate_inst.profile_call(lambda profile: profile.save(params[1]))
+                self.writeresponse("OK")
+            except (ProfileError, OSError) as e:
+                self.writeerror('Unable to save the profile: {:s}'.format(str(e)))
+        else:
+            self.writeerror('Invalid number of arguments received.')
+
+    @command('SVF')
+    def command_SVF(self, params):
+        '''
+        <svf file> [JTAG|JTAG2]
+        Play an SVF file on a JTAG host of the running simulation.
+        Play an SVF file on the JTAG host (JTAG2 for the TAPSim host) inside the server, so no telnet round
+        trip is needed per scan.  Reports the number of scans and every TDO mismatch.
+        SVF idcode.svf
+        '''
+        if len(params) not in (1, 2) or (len(params) == 2 and params[1].upper() not in ("JTAG", "JTAG2")):
+            self.writeerror('Invalid number of arguments received.')
+        elif not self.start_state or self.ate_inst is None:
+            self.writeerror('Simulation must first be started with STARTSIM command.')
+        else:
+            # the SVF player is a client of the ATE, only imported when used
+            from drivers.Python.atesim.atesim import JTAGController, JTAGController2
+            from drivers.Python.atesim.svf import SVFPlayer, SVFError
+            if len(params) == 2 and params[1].upper() == "JTAG2":
+                controller = JTAGController2(self.ate_inst)
+            else:
+                controller = JTAGController(self.ate_inst)
+            player = SVFPlayer(controller)
+            try:
+                mismatches = player.play(params[0])
+            except (SVFError, OSError) as e:
+                self.writeerror('SVF failed: {:s}'.format(str(e)))
+                return
+            lines = [repr(mismatch) for mismatch in mismatches]
+            lines.append("{:d} scans, {:d} bits, {:d} mismatches".format(player.scans, player.bits,
+                                                                         len(mismatches)))
+            self.writeresponse("\n".join(lines) + "\nOK")
+
+    @command('BITBANG')
+    def command_BITBANG(self, params):
+        '''
+        <device address> <hex control values>:<shift clocks> ...
+        Run a compiled bit-bang program on the JeffBBEx device of the running simulation.
+        Run the segments of a program of hdl.devices.JeffBBEx.bitbang (format_program()) through the I2C host
+        inside the server, so no telnet round trip is needed per register access.  Returns the SO bits in hex.
+        BITBANG 0x3C 40414000:0
+        '''
+        if len(params) < 2:
+            self.writeerror('Invalid number of arguments received.')
+        elif not self.start_state or self.ate_inst is None:
+            self.writeerror('Simulation must first be started with STARTSIM command.')
+        else:
+            # the I2C driver is a client of the ATE, only imported when used
+            from drivers.Python.atesim.atesim import I2CController, AcknowledgeError
+            from hdl.devices.JeffBBEx.bitbang import BitBangScanner, parse_program
+            try:
+                program = parse_program(params[1:])
+                tdo = BitBangScanner(I2CController(self.ate_inst), int(params[0], 16)).run(program)
+            except ValueError:
+                self.writeerror('Invalid argument received.')
+                return
+            except AcknowledgeError as e:
+                self.writeerror('BITBANG failed: {:s}'.format(str(e)))
+                return
+            self.writeresponse("{:X}\nOK".format(tdo))
+
     @command('STOPSIM')
     def command_STOPSIM(self, params):
         '''
@@ -0,0 +1,4 @@
+import os
+
+# keep the parsed ICL and BSDL files in memory, the tests never read or write a cache directory
+os.environ["P2654SIM_CACHE"] = "off"
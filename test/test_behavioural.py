@@ -0,0 +1,122 @@
+import random
+import unittest
+from myhdl import block, instance, delay, Signal, intbv
+from hdl.standards.s1687.IJTAGInterface import IJTAGInterface
+from hdl.standards.s1687.icl_network import load_network
+from hdl.standards.s1687.netgen import NetworkSpec, icl_network, SimulatedNetwork, ModelNetwork
+from hdl.cores.IP_3.IP_3 import IP_3, period
+
+
+def run_ip_3(behavioural, scans, idle=150):
+    """
+    Reset IP_3 and run the scans, each followed by idle clocks for the instruments.
+    :param behavioural: True for the behavioural network of IP_3, False for its RTL
+    :param scans: list of (count, tdi)
+    :param idle: Number of clocks between the scans
+    :return: list of the TDO of the scans
+    """
+    results = []
+
+    @block
+    def tb():
+        ijtag_interface = IJTAGInterface()
+        si = Signal(bool(0))
+        so = Signal(bool(0))
+        pu_mbist = [Signal(intbv(0, min=0, max=101)) for _ in range(5)]
+        ip3_inst = IP_3("TOP", "IP_3", si, so, ijtag_interface, Signal(bool(0)), Signal(bool(0)), *pu_mbist,
+                        behavioural=behavioural)
+
+        # the controls change a quarter period away from the edges of the clock
+        def cycle(capture=False, shift=False, update=False, reset=False, tdi=0):
+            ijtag_interface.SELECT.next = True
+            ijtag_interface.CAPTURE.next = capture
+            ijtag_interface.SHIFT.next = shift
+            ijtag_interface.UPDATE.next = update
+            ijtag_interface.RESET.next = reset
+            si.next = tdi
+            yield delay(period // 4)
+            ijtag_interface.CLOCK.next = True
+            yield delay(period // 2)
+            ijtag_interface.CLOCK.next = False
+            yield delay(period // 4)
+
+        @instance
+        def stimulus():
+            for _ in cycle(reset=True):
+                yield _
+            for count, tdi in scans:
+                for _ in cycle(capture=True):
+                    yield _
+                tdo = 0
+                for i in range(count):
+                    tdo |= int(so) << i
+                    for _ in cycle(shift=True, tdi=(tdi >> i) & 1):
+                        yield _
+                for _ in cycle(update=True):
+                    yield _
+                for _ in range(idle):
+                    for _ in cycle():
+                        yield _
+                results.append(tdo)
+
+        return ip3_inst, stimulus
+
+    inst = tb()
+    inst.config_sim(trace=False)
+    inst.run_sim(quiet=1)
+    inst.quit_sim()
+    return results
+
+
+class BehaviouralTestCase(unittest.TestCase):
+    def test_behavioural_crosscheck001(self):
+        # the RTL, the behavioural model and the ICL model shift out the same bits for random scans
+        spec = NetworkSpec(depth=2, fanout=2, widths=(3, 2), sib="mixed")
+        network = icl_network(spec)
+        model = ModelNetwork(network)
+        generator = random.Random(1687)
+        scans = []
+        for _ in range(8):
+            count = network.scan_path(model.configuration).length
+            tdi = "{:0{:d}X}".format(generator.getrandbits(count), (count + 3) // 4)
+            scans.append((count, tdi, model.scan_dr(count, tdi)))
+        # MyHDL runs one simulation at a time
+        for simulated in (SimulatedNetwork(spec), SimulatedNetwork(spec, model="behavioural", network=network)):
+            try:
+                for count, tdi, expected in scans:
+                    self.assertEqual(simulated.scan_dr(count, tdi), expected)
+            finally:
+                simulated.quit()
+
+    def test_behavioural_ip_3001(self):
+        # IP_3 with its RTL network and with the behavioural network driving the same instruments
+        network = load_network("IP_3")
+        configuration = network.reset_configuration()
+        steps = [{"SIB1": 1, "SIB2": 1, "SIB3": 1},
+                 {"WIR": 3, "low": 20, "high": 40, "LEDS0": 1, "MUX0": 1, "MBIST_SReg5": 0x55},
+                 {"SELWIR": 0},
+                 {"MBIST_WSReg1": 1, "MBIST_SReg4": 0x33},
+                 {}, {},
+                 {"MBIST_WSReg1": 0, "MUX0": 0},
+                 {"SIB2": 0},
+                 {"SIB1": 0},
+                 {"SIB1": 1, "SIB3": 0},
+                 {}]
+        scans = []
+        for values in steps:
+            scan_path = network.scan_path(configuration)
+            tdi = scan_path.vector({network.register(r).path: v for r, v in values.items()}, configuration)
+            for register in scan_path.registers:
+                configuration[register.path] = scan_path.extract(tdi, register.path)
+            scans.append((scan_path.length, tdi))
+        # MyHDL runs one simulation at a time
+        rtl = run_ip_3(False, scans)
+        behavioural = run_ip_3(True, scans)
+        self.assertEqual(len(rtl), len(scans))
+        self.assertEqual(behavioural, rtl)
+        # the MBIST status, the thermometer and the comparator were captured
+        self.assertNotEqual(rtl[4], rtl[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+from myhdl import *
+from hdl.devices.JeffBBEx.jeffbbex import jeffbbexnetwork, bitbang_bridge, HISTORY_BITS
+from hdl.devices.JeffBBEx.jeffbbex import BB_CLOCK, BB_SI, BB_SELECT, BB_CAPTURE, BB_SHIFT, BB_UPDATE, BB_RESET
+from hdl.devices.JeffBBEx.bitbang import compile_scan, compile_reset, decode_history, naive_transaction_count
+from hdl.devices.JeffBBEx.bitbang import BitBangScanner, RemoteBitBangScanner, parse_program
+from hdl.ate.replay import make_ate
+from drivers.Python.atesim.atesim import ATE, I2CController, AcknowledgeError
+from hdl.standards.s1687.IJTAGInterface import IJTAGInterface
+
+
+def naive_scan(length, tdi, capture=True, update=True):
+    """
+    Every edge written on its own and SO read before every shift clock, as a host does without the compiler.
+    """
+    steps = [("write", BB_RESET), ("write", BB_RESET | BB_CLOCK), ("write", BB_RESET), ("write", 0)] \
+        if length is None else []
+    cycles = [] if length is None else \
+        ([(BB_SELECT | BB_CAPTURE, 0)] if capture else []) + \
+        [(BB_SELECT | BB_SHIFT, (tdi >> i) & 1) for i in range(length)] + \
+        ([(BB_SELECT | BB_UPDATE, 0)] if update else [])
+    for control, si in cycles:
+        setup = control | (BB_SI if si else 0)
+        steps.append(("write", setup))
+        if control & BB_SHIFT:
+            steps.append(("read", None))
+        steps += [("write", setup | BB_CLOCK), ("write", setup), ("write", 0)]
+    return steps
+
+
+@block
+def bitbang_tb(jobs, results):
+    """
+    :param jobs: list of ("naive", steps) or ("compiled", BitBangProgram)
+    :param results: list receiving the SO bits of each job
+    """
+    ijtag_interface = IJTAGInterface()
+    si = Signal(bool(0))
+    so = Signal(bool(0))
+    control = Signal(intbv(0)[8:])
+    status = Signal(intbv(0)[8:])
+    history = Signal(intbv(0)[HISTORY_BITS:])
+    network_inst = jeffbbexnetwork("TOP", "JeffDevice", ijtag_interface, si, so)
+    bridge_inst = bitbang_bridge(control, status, history, ijtag_interface, si, so)
+
+    @instance
+    def stimulus():
+        yield delay(10)
+        for kind, job in jobs:
+            tdo = 0
+            if kind == "naive":
+                done = 0
+                for op, value in job:
+                    if op == "write":
+                        control.next = value
+                        yield delay(10)
+                    else:
+                        tdo |= int(status[0]) << done
+                        done += 1
+            else:
+                histories = []
+                for data, shifts in job.segments:
+                    for value in data:
+                        control.next = value
+                        yield delay(10)
+                    if shifts:
+                        histories.append(int(history))
+                tdo = decode_history(job, histories)
+            results.append(tdo)
+        raise StopSimulation()
+
+    return network_inst, bridge_inst, stimulus
+
+
+def run(jobs):
+    results = []
+    tb = bitbang_tb(jobs, results)
+    tb.config_sim(trace=False)
+    tb.run_sim()
+    return results
+
+
+class CountingATE:
+    """
+    In process ATE counting the bus transactions, each of them a telnet round trip through the server.
+    """
+    def __init__(self, ate_inst):
+        self.ate_inst = ate_inst
+        self.transactions = 0
+
+    def write(self, adr, data):
+        self.transactions += 1
+        return self.ate_inst.write(adr, data)
+
+    def read(self, adr):
+        self.transactions += 1
+        return self.ate_inst.read(adr)
+
+    def get_value(self):
+        return self.ate_inst.get_value()
+
+    def get_last_response(self):
+        return ""
+
+
+class LoopbackTelnet:
+    """
+    Telnet client of the ATE answering the BITBANG command as simservice does.
+    """
+    def __init__(self, ate_inst):
+        self.ate_inst = ate_inst
+        self.round_trips = 0
+        self.response = ""
+
+    def write(self, s):
+        self.round_trips += 1
+        params = s.split()
+        program = parse_program(params[2:])
+        tdo = BitBangScanner(I2CController(self.ate_inst), int(params[1], 16)).run(program)
+        self.response = "{:X}\r\nOK\r\n".format(tdo)
+
+    def read_until(self, s):
+        return self.response
+
+
+class BitBangTestCase(unittest.TestCase):
+    def test_bitbang_compile001(self):
+        program = compile_scan(25, 0x155AA5A)
+        # two writes per shift, the capture and update periods and the return to idle
+        self.assertEqual(program.byte_count(), 2 * 25 + 7)
+        self.assertEqual(program.transaction_count(), 4)
+        self.assertGreater(naive_transaction_count(25) / program.transaction_count(), 25)
+
+    def test_bitbang_equivalence001(self):
+        # SIB closed: I_REG(4) O_REG(4) INSTR_REG(16) SIB(1), the last bit shifted in sets the SIB
+        scans = [(25, 0x155AA5A, True, True), (25, 0x0F0F0F1, False, False), (33, 0x1A5C3E77, True, True),
+                 (33, 0x0DEADBEE, False, True)]
+        naive = [("naive", naive_scan(None, 0))] + [("naive", naive_scan(*scan)) for scan in scans]
+        compiled = [("compiled", compile_reset())] + [("compiled", compile_scan(*scan)) for scan in scans]
+        expected = run(naive)
+        self.assertEqual(run(compiled), expected)
+        # without a capture the second scan shifts out what the first shifted in
+        self.assertEqual(expected[2], 0x155AA5A)
+
+    def test_bitbang_roundtrip001(self):
+        ate_inst = make_ate("JeffBBExBrd")
+        ate_inst.start_simulation(trace=False, settle=0)
+        try:
+            client = ATE()
+            client.tn_inst = LoopbackTelnet(ate_inst)
+            remote = RemoteBitBangScanner(client)
+            remote.reset()
+            remote.scan(25, 0x155AA5A)
+            # without a capture the second scan shifts out what the first shifted in
+            self.assertEqual(remote.scan(25, 0x0F0F0F1, False, False), 0x155AA5A)
+            self.assertEqual(client.tn_inst.round_trips, 3)
+            bus = CountingATE(ate_inst)
+            local = BitBangScanner(I2CController(bus))
+            self.assertEqual(local.scan(25, 0x155AA5A, False, False), 0x0F0F0F1)
+            self.assertGreater(bus.transactions, 100)
+            # nobody answers at 0x3D
+            with self.assertRaises(AcknowledgeError):
+                I2CController(bus).i2c_read_reg(0x3D, 0)
+        finally:
+            ate_inst.terminate()
+
+
+if __name__ == '__main__':
+    unittest.main()
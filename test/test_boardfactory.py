@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+from hdl.boards.common.BoardFactory import BoardFactory
+
+
+class BoardFactoryTestCase(unittest.TestCase):
+    def test_boardfactory_lazy001(self):
+        # Only the board that is made should be imported
+        factory = BoardFactory()
+        self.assertIn("GPIOTest", factory.get_board_names())
+        self.assertNotIn("hdl.boards.P2654Board1.P2654Board1", sys.modules)
+        board = factory.make_board("GPIOTest")
+        self.assertIsNotNone(board)
+        self.assertIs(board.o_gpio, factory.get_gpio_if().o_gpio)
+        self.assertIn("GPIOTest", factory.get_import_times())
+
+    def test_boardfactory_args001(self):
+        # Arguments after the board name go to the board constructor
+        factory = BoardFactory()
+        board = factory.make_board("BSChain:5,8245,noloads")
+        self.assertEqual(board.count, 5)
+        self.assertEqual(board.kinds, ["8245"] * 5)
+        self.assertFalse(board.loads)
+        self.assertIs(board.tdi, factory.get_jtag_if().TDI)
+        self.assertIsNone(factory.make_board("BSChain:0"))
+
+    def test_boardfactory_backend001(self):
+        # A backend after an @ goes to the board, the boards without it stay on MyHDL
+        factory = BoardFactory()
+        self.assertEqual(factory.make_board("BSChain:2,8244@myhdl").backend, "myhdl")
+        self.assertEqual(factory.make_board("BSChain:2").backend, "myhdl")
+        self.assertIsNone(factory.make_board("BSChain:2@verilator"))
+        self.assertIsNone(factory.make_board("GPIOTest@icarus"))
+        # the icarus backend of BSChain is not offered until it has run under Icarus Verilog
+        self.assertIsNone(factory.make_board("BSChain:2@icarus"))
+
+    def test_boardfactory_unknown001(self):
+        factory = BoardFactory()
+        self.assertIsNone(factory.make_board("NoSuchBoard"))
+
+    def test_boardfactory_config001(self):
+        fd, path = tempfile.mkstemp(suffix=".ini")
+        with os.fdopen(fd, "w") as f:
+            f.write("[ConfigGPIO]\nmodule = hdl.boards.jtagtest.jtagtest\nclass = JTAGTest\n"
+                    "interfaces = gpio, jtag\n")
+        try:
+            factory = BoardFactory(config_file=path)
+            board = factory.make_board("ConfigGPIO")
+            self.assertEqual(type(board).__name__, "JTAGTest")
+            self.assertIs(board.tdi, factory.get_jtag_if().TDI)
+        finally:
+            del BoardFactory.registry["ConfigGPIO"]
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
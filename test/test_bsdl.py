@@ -0,0 +1,93 @@
+import os.path
+import unittest
+from myhdl import *
+from hdl.standards.s1149dot1.bsdl import parse_file, parse_string, BSDLError
+from hdl.devices.SN74ABT8244A.SN74ABT8244ACore import SN74ABT8244ACore
+
+DEVICES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hdl", "devices")
+
+
+def tap_sequence(ir, dr, length):
+    """
+    TMS/TDI pairs from Test-Logic-Reset loading an 8 bit instruction and scanning a data register.
+    """
+    bits = [(1, 0)] * 5 + [(0, 0), (1, 0), (1, 0), (0, 0), (0, 0)]
+    bits += [(1 if i == 7 else 0, (ir >> i) & 1) for i in range(8)]
+    bits += [(1, 0), (1, 0), (0, 0), (0, 0)]
+    bits += [(1 if i == length - 1 else 0, (dr >> i) & 1) for i in range(length)]
+    bits += [(1, 0), (0, 0), (0, 0)]
+    return bits
+
+
+@block
+def core_tb(compact, sequence, trace, A1_value, A2_value):
+    Y1_o = [Signal(bool(0)) for _ in range(4)]
+    Y1_e = [Signal(bool(0)) for _ in range(4)]
+    Y2_o = [Signal(bool(0)) for _ in range(4)]
+    Y2_e = [Signal(bool(0)) for _ in range(4)]
+    A1 = [Signal(bool((A1_value >> i) & 1)) for i in range(4)]
+    A2 = [Signal(bool((A2_value >> i) & 1)) for i in range(4)]
+    tdi = Signal(bool(0))
+    tdo = Signal(bool(0))
+    tms = Signal(bool(1))
+    tck = Signal(bool(0))
+    oe_neg1 = Signal(bool(0))
+    oe_neg2 = Signal(bool(1))
+    tdo_padoe_o = Signal(bool(0))
+    inst = SN74ABT8244ACore("TOP", "CORE", oe_neg1, Y1_o, Y1_e, Y2_o, Y2_e, A1, A2, oe_neg2,
+                            tdo_padoe_o, tdi, tck, tms, tdo, compact=compact)
+
+    @instance
+    def stimulus():
+        for tms_bit, tdi_bit in sequence:
+            tms.next = tms_bit
+            tdi.next = tdi_bit
+            yield delay(10)
+            tck.next = True
+            yield delay(10)
+            tck.next = False
+            yield delay(2)
+            trace.append((int(tdo), tuple(int(s) for s in Y1_o + Y1_e + Y2_o + Y2_e)))
+        raise StopSimulation()
+
+    return inst.rtl(), stimulus
+
+
+class BSDLTestCase(unittest.TestCase):
+    def test_bsdl_parse001(self):
+        device = parse_file(os.path.join(DEVICES, "SN74ABT8244A", "sn74abt8244a.bsm"))
+        self.assertEqual(device.entity, "sn74bct8244a")
+        self.assertEqual(device.instruction_length, 8)
+        self.assertEqual(device.boundary_length, 18)
+        self.assertEqual(len(device.cells), 20)
+        self.assertEqual(device.instruction("SAMPLE"), 0x02)
+        self.assertEqual(device.decode(0x80), "EXTEST")
+        self.assertEqual(device.decode(0x55), "BYPASS")
+        self.assertEqual(device.register_for("READBN"), "BOUNDARY")
+        self.assertEqual(device.register_length("BCR"), 2)
+        self.assertIsNone(device.idcode)
+        vector = device.drive_vector({"Y1(1)": 1, "Y1(2)": 0})
+        self.assertEqual(vector, (1 << 16) | (1 << 7))
+        self.assertEqual(device.sense(1 << 15, ["A1(1)", "A1(2)"]), {"A1(1)": 1, "A1(2)": 0})
+
+        device = parse_file(os.path.join(DEVICES, "SN74ABT8245A", "sn74abt8245a.bsm"))
+        self.assertEqual(device.ports["B"], ("out", list(range(1, 9))))
+        self.assertEqual(device.output_cell("B(1)").ccell, 16)
+        self.assertEqual(device.input_cell("DIR").number, 17)
+        with self.assertRaises(BSDLError):
+            parse_string("entity broken is end broken;")
+
+    def test_bsdl_compact001(self):
+        sequence = tap_sequence(0x02, 0x2A5A5, 18) + tap_sequence(0x00, 0x10F0F, 18)
+        traces = []
+        for compact in (False, True):
+            trace = []
+            tb = core_tb(compact, sequence, trace, 0x5, 0xA)
+            tb.config_sim(trace=False)
+            tb.run_sim()
+            traces.append(trace)
+        self.assertEqual(traces[0], traces[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
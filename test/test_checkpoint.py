@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from myhdl import *
+from hdl.hosts.jtaghost.bram import RAM, RAMInterface
+from hdl.ate import checkpoint
+from hdl.ate.checkpoint import CheckpointError
+from hdl.ate.replay import make_ate
+from drivers.Python.atesim.atesim import JTAGController
+
+
+class CheckpointTestCase(unittest.TestCase):
+    def test_checkpoint_restore001(self):
+        # EXTEST drives the GPIO inputs of P2654Board1 from the boundary register of its 8244
+        fd, path = tempfile.mkstemp(suffix=".ckpt")
+        os.close(fd)
+        try:
+            ate = make_ate("P2654Board1")
+            ate.start_simulation(trace=False, settle=0)
+            jtag = JTAGController(ate)
+            self.assertEqual(jtag.scan_ir(8, "00"), "05")
+            jtag.scan_dr(18, "000080")
+            self.assertTrue(ate.read(0x1800))
+            self.assertEqual(ate.get_value(), 0x00010000)
+            ate.checkpoint(path)
+            saved = checkpoint.load(path)["time"]
+            ate.terminate()
+
+            ate = make_ate("P2654Board1")
+            ate.start_simulation(path, trace=False, settle=0)
+            jtag = JTAGController(ate)
+            try:
+                # no power-on reset: the TAP is still in EXTEST with the update register loaded
+                self.assertGreaterEqual(ate.master_inst.call(now), saved)
+                self.assertTrue(ate.read(0x1800))
+                self.assertEqual(ate.get_value(), 0x00010000)
+                jtag.scan_dr(18, "000040")
+                self.assertTrue(ate.read(0x1800))
+                self.assertEqual(ate.get_value(), 0x00020000)
+            finally:
+                ate.terminate()
+        finally:
+            os.remove(path)
+
+    def test_checkpoint_stale001(self):
+        snapshot = checkpoint.capture(RAM(RAMInterface(addr_width=4, data_width=8)), "RAMBoard")
+        with self.assertRaises(CheckpointError):
+            checkpoint.restore(RAM(RAMInterface(addr_width=4, data_width=8)), "OtherBoard", snapshot)
+        with self.assertRaises(CheckpointError):
+            checkpoint.restore(RAM(RAMInterface(addr_width=5, data_width=8)), "RAMBoard", snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
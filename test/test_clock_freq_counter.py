@@ -0,0 +1,85 @@
+import unittest
+from myhdl import *
+from hdl.instruments.clock_counter.clock_freq_counter import clock_freq_counter, period, REF_CYCLE
+from hdl.instruments.clock_generator.clock_tick import clock_tick
+
+
+@block
+def counter_bench(trace, analytic, test_period=None, tick=None, measurements=2, stop=None):
+    """
+    :param trace: list receiving (time, o_clock_freq) at every change
+    :param test_period: Period of a test clock made by the test bench
+    :param tick: M of a clock_tick making the test clock from clk instead
+    :param stop: Time the clocks stop, None to keep them running
+    """
+    clk = Signal(bool(0))
+    reset_n = Signal(bool(1))
+    o_clock_freq = Signal(modbv(0)[16:])
+    i_clk_test = Signal(bool(0))
+    running = Signal(bool(1))
+    if tick is not None:
+        test_period = tick * period
+        tick_inst = clock_tick('TOP', 'CKTICK0', clk, reset_n, i_clk_test, M=tick, N=8)
+    cfc_inst = clock_freq_counter('TOP', 'CFC0', clk, reset_n, i_clk_test, o_clock_freq, analytic=analytic,
+                                  test_period=test_period)
+
+    @instance
+    def clkgen():
+        while running:
+            clk.next = not clk
+            yield delay(period // 2)
+
+    @instance
+    def testclkgen():
+        while running and tick is None:
+            i_clk_test.next = not i_clk_test
+            yield delay(test_period // 2)
+
+    @instance
+    def stimulus():
+        yield delay(5)
+        reset_n.next = bool(0)
+        yield delay(10)
+        reset_n.next = bool(1)
+        if stop is not None:
+            yield delay(stop)
+            running.next = False
+        yield delay(measurements * REF_CYCLE * period + 20000 - now())
+        raise StopSimulation()
+
+    @always(o_clock_freq)
+    def record():
+        trace.append((now(), int(o_clock_freq)))
+
+    if tick is not None:
+        return tick_inst, cfc_inst, clkgen, stimulus, record
+    return cfc_inst, clkgen, testclkgen, stimulus, record
+
+
+def run(analytic, **kwargs):
+    trace = []
+    tb = counter_bench(trace, analytic, **kwargs)
+    tb.run_sim(quiet=1)
+    tb.quit_sim()
+    return trace
+
+
+class ClockFreqCounterTestCase(unittest.TestCase):
+    def test_clock_freq_counter_analytic001(self):
+        # the count and the time of each change of o_clock_freq as counted
+        for test_period in (200, 130, 38):
+            counted = run(False, test_period=test_period)
+            self.assertEqual(run(True, test_period=test_period), counted, test_period)
+            self.assertIn(counted[-1][1] - 4096 * period // test_period, (0, 1))
+
+    def test_clock_freq_counter_analytic002(self):
+        # a test clock made from clk changes after it
+        self.assertEqual(run(True, tick=5), run(False, tick=5))
+
+    def test_clock_freq_counter_suspend001(self):
+        # the clocks stopped once the counter saw them
+        self.assertEqual(run(True, test_period=200, stop=1000), run(False, test_period=200))
+
+
+if __name__ == '__main__':
+    unittest.main()
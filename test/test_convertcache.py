@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+from hdl.common.convertcache import ConvertError, conversion_key, convert_all, dependencies, find_converters, \
+    unchanged, read_manifest, ROOT, CONVERTED, UNCHANGED
+from hdl.common.filecache import file_hash
+
+
+class ConvertCacheTestCase(unittest.TestCase):
+    def test_convertcache_key001(self):
+        # a conversion depends on the sources of the modules its module imports
+        self.assertIn("hdl.standards.s1500.wir", find_converters(["hdl.standards.s1500.*"]))
+        self.assertIn("hdl.standards.s1500.wsp", dependencies("hdl.standards.s1500.wir"))
+        self.assertEqual(conversion_key("hdl.standards.s1500.wir"), conversion_key("hdl.standards.s1500.wir"))
+        self.assertNotEqual(conversion_key("hdl.standards.s1500.wir"), conversion_key("hdl.standards.s1500.wby"))
+        with self.assertRaises(ConvertError):
+            convert_all(["hdl.nothing.*"])
+
+    def test_convertcache_unchanged001(self):
+        # a module is converted again when its key changed or one of its files was edited
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "wir.vhd")
+            with open(output, "w") as f:
+                f.write("entity wir is\n")
+            entry = dict(key="1234", status="converted", outputs={output: file_hash(output)})
+            self.assertTrue(unchanged(entry, "1234"))
+            self.assertFalse(unchanged(entry, "5678"))
+            self.assertFalse(unchanged(None, "1234"))
+            with open(output, "a") as f:
+                f.write("end entity wir;\n")
+            self.assertFalse(unchanged(entry, "1234"))
+
+    def test_convertcache_convert001(self):
+        # the files written by _Block.convert are recorded, then skipped until one of them is edited
+        module = "hdl.standards.s1500.wby"
+        directories = [os.path.join(ROOT, "hdl", "standards", "s1500", d) for d in ("vhdl", "verilog")]
+        created = [d for d in directories if not os.path.exists(d)]
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                manifest = os.path.join(directory, "convert_manifest.json")
+                result, = convert_all([module], manifest=manifest, processes=1)
+                self.assertEqual(result.status, CONVERTED, result.message)
+                self.assertIn(os.path.join("hdl", "standards", "s1500", "vhdl", "wby.vhd"), result.outputs)
+                self.assertIn(os.path.join("hdl", "standards", "s1500", "verilog", "wby_tb.v"), result.outputs)
+                for filename in result.outputs:
+                    self.assertTrue(os.path.isfile(os.path.join(ROOT, filename)), filename)
+                self.assertEqual(read_manifest(manifest)[module]["outputs"], result.outputs)
+                self.assertEqual(convert_all([module], manifest=manifest, processes=1)[0].status, UNCHANGED)
+                with open(os.path.join(ROOT, "hdl", "standards", "s1500", "verilog", "wby.v"), "a") as f:
+                    f.write("// edited\n")
+                result, = convert_all([module], manifest=manifest, processes=1)
+                self.assertEqual(result.status, CONVERTED, result.message)
+                self.assertEqual(convert_all([module], manifest=manifest, processes=1)[0].status, UNCHANGED)
+        finally:
+            for d in created:
+                shutil.rmtree(d, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
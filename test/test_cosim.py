@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from myhdl import Signal, intbv
+from hdl.boards.common.BoardFactory import BoardFactory
+from hdl.boards.bschain.bschain import device_cores
+from hdl.common.cosim import CosimError, check
+
+
+def icarus():
+    try:
+        check()
+    except CosimError:
+        return False
+    return True
+
+
+class CosimTestCase(unittest.TestCase):
+    def test_cosim_convert001(self):
+        # the cores of a mixed chain convert to one Verilog module with its cosimulation test bench
+        board = BoardFactory().make_board("BSChain:3,mixed")
+        board.rtl()
+        ports = [device.core_ports() for device in board.devices]
+        ins = Signal(intbv(0)[sum(len(inputs) for inputs, _ in ports):])
+        outs = Signal(intbv(0)[sum(len(outputs) for _, outputs in ports):])
+        jtag = [Signal(bool(0)) for _ in range(4)]
+        with tempfile.TemporaryDirectory() as directory:
+            device_cores(board.devices, ins, outs, *jtag).convert(hdl="Verilog", directory=directory,
+                                                                  name="cores", initial_values=True)
+            with open(os.path.join(directory, "tb_cores.v")) as f:
+                bench = f.read()
+        self.assertIn("$from_myhdl", bench)
+        self.assertIn("$to_myhdl", bench)
+
+    @unittest.skipUnless(icarus(), "Icarus Verilog and myhdl.vpi are not installed")
+    def test_cosim_bschain001(self):
+        # the scans of a chain capture the same TDO under Icarus as in MyHDL
+        from hdl.boards.bschain.bschain_bench import benchmark, format_row
+        rows = [benchmark(2, "mixed", "noloads", 2, backend=backend) for backend in ("myhdl", "icarus")]
+        for row in rows:
+            print(format_row(row))
+        self.assertEqual([scan for scan, _ in rows[0]["tdo"]], ["IDCODE"] * 2 + ["BYPASS"] * 2 + ["EXTEST"] * 2)
+        self.assertEqual(rows[1]["tdo"], rows[0]["tdo"])
+
+if __name__ == '__main__':
+    unittest.main()
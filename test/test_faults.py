@@ -0,0 +1,29 @@
+import unittest
+from hdl.ate.faultsim import campaign, coverage, DETECTED, UNDETECTED
+
+
+class FaultsTestCase(unittest.TestCase):
+    def test_faults_campaign001(self):
+        # GPIOTest loops o_gpio back to i_gpio (read in the high half) and shows it on LEDs nobody reads back
+        commands = [("write", 0x1800, 0x15), ("read", 0x1800, 0), ("write", 0x1800, 0x0A), ("read", 0x1800, 0)]
+        faults = ["sa0:ioslave0.i_gpio[0]", "sa1:ioslave0.i_gpio[1]", "sa0:rtl1.self_state0",
+                  "or:rtl1.self_state0,rtl1.self_state1"]
+        golden, results = campaign("GPIOTest", commands, faults, processes=2)
+        self.assertEqual(golden[1], ("VAL", 0x150015))
+        self.assertEqual([r.status for r in results], [DETECTED, DETECTED, UNDETECTED, UNDETECTED])
+        self.assertEqual(results[0].index, 1)
+        self.assertEqual(results[1].index, 1)
+        self.assertEqual(coverage(results), 0.5)
+
+    def test_faults_timeout001(self):
+        # a stuck bus clock never finishes the first transaction, the run stops at the time limit
+        commands = [("write", 0x1800, 0x15), ("read", 0x1800, 0)]
+        golden, results = campaign("GPIOTest", commands, ["sa0:ioslave0.i_clk"], processes=1)
+        self.assertEqual(len(golden), 2)
+        self.assertEqual(results[0].status, DETECTED)
+        self.assertEqual(results[0].index, 0)
+        self.assertIn("timeout", results[0].message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from hdl.standards.s1687.icl_parser import parse_string, ICLError
+from hdl.standards.s1687.icl_network import ICLLibrary, ICLNetwork, load_network
+
+
+class ICLNetworkTestCase(unittest.TestCase):
+    def test_icl_scan_path001(self):
+        network = load_network("IP_2")
+        path = network.scan_path(network.reset_configuration())
+        self.assertEqual(path.length, 2)
+        self.assertEqual(path.offsets, {"IP_2.SIB2.SR": 0, "IP_2.SIB1.SR": 1})
+
+        path = network.scan_path({"IP_2.SIB1.SR": 1})
+        self.assertEqual(path.length, 2 + 16 + 8 + 1 + 2)
+        self.assertEqual(path.offsets["IP_2.delta.SR"], 1 + 2 + 1)
+        vector = path.vector({"IP_2.delta.SR": 0xA5, "IP_2.SIB1.SR": 1})
+        self.assertEqual(path.extract(vector, "IP_2.delta.SR"), 0xA5)
+        self.assertEqual(vector >> (path.length - 1), 1)
+
+    def test_icl_scan_mux001(self):
+        modules = parse_string("""
+            Module top {
+                ScanInPort SI;
+                ScanOutPort SO { Source M; }
+                ScanRegister sel[1:0] { ScanInSource SI; ResetValue 2'b00; }
+                ScanRegister a[3:0] { ScanInSource sel[0]; }
+                ScanMux M SelectedBy sel {
+                    2'b0x : sel;
+                    2'b1x : a;
+                }
+            }""")
+        library = ICLLibrary([])
+        library.modules.update(modules)
+        network = ICLNetwork(library, "top")
+        self.assertEqual(network.scan_path({"top.sel": 1}).length, 2)
+        self.assertEqual(network.scan_path({"top.sel": 3}).offsets, {"top.a": 0, "top.sel": 4})
+        with self.assertRaises(ICLError):
+            parse_string("Module broken { ScanRegister r { ResetValue 1'b0; } }")
+
+
+if __name__ == '__main__':
+    unittest.main()
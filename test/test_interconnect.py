@@ -0,0 +1,55 @@
+import unittest
+from hdl.standards.s1149dot1.interconnect import InterconnectTest, Net, pack, unpack, np
+
+
+def board_netlist():
+    # imported here, test_boardfactory checks that collecting the tests does not load the boards
+    from hdl.boards.P2654Board1.P2654Board1 import P2654Board1
+    return P2654Board1("TOP", "P2654Board1").interconnect_netlist()
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class InterconnectTestCase(unittest.TestCase):
+    def test_interconnect_diagnose001(self):
+        chain, nets = board_netlist()
+        test = InterconnectTest(chain, nets, complement=True)
+        self.assertEqual(test.pattern_count(), 10)
+        vectors = test.vectors()
+        self.assertEqual(vectors.shape, (10, 18))
+        # both output enables (cells 16 and 17) are on in every pattern
+        self.assertFalse(vectors[:, 16:].any())
+        self.assertTrue((unpack(pack(vectors), 18) == vectors).all())
+
+        expected, mask = test.expected()
+        captured = expected[:, :18].copy()
+        external = expected[:, 18:].copy()
+        self.assertEqual(test.diagnose(captured, external), [])
+
+        stuck = captured.copy()
+        stuck[:, 15] = 1
+        faults = test.diagnose(stuck, external)
+        self.assertEqual([(f.kind, f.nets) for f in faults], [("stuck-at-1", ["A1_1"])])
+
+        short = captured.copy()
+        short[:, 14] = short[:, 15] = short[:, 14] & short[:, 15]
+        faults = test.diagnose(short, external)
+        self.assertEqual([(f.kind, f.nets) for f in faults], [("short", ["A1_1", "A1_2"])])
+
+    def test_interconnect_open001(self):
+        chain, nets = board_netlist()
+        device = chain[0][1]
+        chain = [("U1", device), ("U2", device)]
+        nets = [Net("N{:d}".format(i), [("U1", "Y1({:d})".format(i))],
+                    [("U2", "A1({:d})".format(i)), ("U2", "A2({:d})".format(i))]) for i in range(1, 5)]
+        test = InterconnectTest(chain, nets, algorithm="walking")
+        self.assertEqual(test.pattern_count(), 4)
+        expected, mask = test.expected()
+        self.assertEqual(int(mask.sum()), 8)
+        captured = expected.copy()
+        captured[:, 18 + device.input_cell("A2(3)").number] = 1
+        faults = test.diagnose(captured)
+        self.assertEqual([(f.kind, f.nets, f.receivers) for f in faults], [("open", ["N3"], [("U2", "A2(3)")])])
+
+
+if __name__ == '__main__':
+    unittest.main()
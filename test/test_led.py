@@ -0,0 +1,129 @@
+import os
+import socket
+import unittest
+from hdl.instruments.led.led import LEDDisplay, LED, DISPLAY_ENV, DISPLAY_HOST, DISPLAY_PORT
+from myhdl import Signal
+from DisplayPanel.DisplayPanel import DisplayPanel
+
+
+class LEDTestCase(unittest.TestCase):
+    def setUp(self):
+        self.setting = os.environ.pop(DISPLAY_ENV, None)
+        LEDDisplay.display_instance = None
+
+    def tearDown(self):
+        if self.setting is not None:
+            os.environ[DISPLAY_ENV] = self.setting
+        else:
+            os.environ.pop(DISPLAY_ENV, None)
+        LEDDisplay.display_instance = None
+
+    def test_led_enablement001(self):
+        # nothing is created before the first LED, and the link stays off without the environment variable
+        self.assertIsNone(LEDDisplay.display_instance)
+        led = LED("DEMO", "LED0", Signal(bool(0)))
+        self.assertIs(led.display, LEDDisplay.display_instance)
+        self.assertFalse(led.display.enabled)
+        self.assertIsNone(led.display.flush_thread)
+        led.display.led_on("DEMO.LED0")
+        self.assertEqual(led.display.changed, [])
+
+        os.environ[DISPLAY_ENV] = "0"
+        self.assertFalse(LEDDisplay.from_environment().enabled)
+        os.environ[DISPLAY_ENV] = "1"
+        display = LEDDisplay.from_environment()
+        self.assertTrue(display.enabled)
+        self.assertEqual((display.ip, display.port), (DISPLAY_HOST, DISPLAY_PORT))
+        os.environ[DISPLAY_ENV] = "panel.local:4000"
+        display = LEDDisplay.from_environment()
+        self.assertEqual((display.ip, display.port), ("panel.local", 4000))
+        self.assertIsNone(display.flush_thread)
+
+    def test_led_coalesce001(self):
+        display = LEDDisplay(enabled=True)
+        # no thread: the batch is sent by hand over a socket pair
+        display.flush_thread = "manual"
+        display.create_led("B.LED0")
+        display.create_led("B.LED1")
+        for _ in range(1000):
+            display.led_on("B.LED0")
+            display.led_off("B.LED0")
+        display.led_on("B.LED1")
+        display.led_off("B.LED0")
+        # 2001 changes of LED0 leave a single entry holding its last state
+        self.assertEqual(display.changed, ["B.LED0", "B.LED1"])
+        self.assertEqual(display.states, {"B.LED0": 0, "B.LED1": 1})
+
+        display.client, panel_end = socket.socketpair()
+        try:
+            self.assertTrue(display.flush())
+            self.assertTrue(display.flush())  # nothing pending, nothing sent
+            display.led_off("B.LED1")
+            self.assertTrue(display.flush())
+            display.client.close()
+            data = bytearray()
+            while True:
+                chunk = panel_end.recv(4096)
+                if not chunk:
+                    break
+                data.extend(chunk)
+        finally:
+            panel_end.close()
+        messages = DisplayPanel("test").extract_messages(data)
+        self.assertEqual(messages, [b"NEW_LED B.LED0\nNEW_LED B.LED1\nLEDS B.LED0:0 B.LED1:1", b"LEDS B.LED1:0"])
+        self.assertEqual(data, bytearray())
+
+    def test_led_release001(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(2)
+        server.settimeout(5)
+        try:
+            display = LEDDisplay.enable("127.0.0.1", server.getsockname()[1], interval=0.01)
+            leds = [LED("B", "LED{:d}".format(i), Signal(bool(0))) for i in range(2)]
+            first, _ = server.accept()
+            leds[0].stop()
+            leds[0].stop()
+            self.assertIsNotNone(display.flush_thread)  # still used by LED1
+            leds[1].stop()
+            self.assertIsNone(display.flush_thread)
+            first.settimeout(5)
+            received = b""
+            while not received.endswith(b"QUIT"):
+                received += first.recv(4096)
+            first.close()
+            # the link opens again for the LEDs of the next simulation
+            LED("C", "LED0", Signal(bool(0)))
+            second, _ = server.accept()
+            second.settimeout(5)
+            received = b""
+            while b"NEW_LED C.LED0" not in received:
+                received += second.recv(4096)
+            self.assertNotIn(b"B.LED0", received)
+            display.quit()
+            second.close()
+        finally:
+            server.close()
+
+    def test_led_framing001(self):
+        panel = DisplayPanel("test")
+
+        def frame(message):
+            return "{:<10d}".format(len(message)).encode() + message
+
+        buffer = bytearray(frame(b"NEW_LED A") + frame(b"LEDS A:1 B:0") + frame(b"QUIT")[:12])
+        self.assertEqual(panel.extract_messages(buffer), [b"NEW_LED A", b"LEDS A:1 B:0"])
+        self.assertEqual(len(buffer), 12)  # the incomplete message waits for more data
+        buffer.extend(frame(b"QUIT")[12:])
+        self.assertEqual(panel.extract_messages(buffer), [b"QUIT"])
+        buffer = bytearray(b"garbage!!!more")
+        self.assertEqual(panel.extract_messages(buffer), [])
+        self.assertEqual(buffer, bytearray())
+        states = {}
+        panel.process_message(b"LEDS A:1 B:0".split(), states)
+        panel.process_message(b"LED_OFF A".split(), states)
+        self.assertEqual(states, {b"A": False, b"B": False})
+
+
+if __name__ == '__main__':
+    unittest.main()
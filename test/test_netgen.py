@@ -0,0 +1,22 @@
+import unittest
+from hdl.standards.s1687.netgen import NetworkSpec, icl_network, benchmark
+
+
+class NetgenTestCase(unittest.TestCase):
+    def test_netgen_icl001(self):
+        spec = NetworkSpec(depth=2, fanout=3, widths=(3, 2), sib="pre")
+        network = icl_network(spec)
+        self.assertEqual(len(network.registers), spec.sib_count() + spec.register_count())
+        self.assertEqual(network.scan_path().length, 3)
+        opened = {path: 1 for path in network.registers}
+        self.assertEqual(network.scan_path(opened).length, spec.bit_count())
+
+    def test_netgen_hdl001(self):
+        # the MyHDL model with pre and post SIBs scans like the ICL model
+        row = benchmark(NetworkSpec(depth=2, fanout=2, widths=(3,), sib="mixed"))
+        self.assertTrue(row["ok"])
+        self.assertEqual(row["scans"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from hdl.standards.s1687.icl_network import load_network
+from hdl.standards.s1687.retargeter import Retargeter
+from hdl.standards.s1687.pdl import PDLInterpreter, PDLError
+from test.test_retargeter import NetworkModel
+
+MBIST_PDL = """
+iProcsForModule SReg
+iProc start {code} {
+    iWrite SR $code
+    iApply
+}
+iProc check {expected} {
+    iRead SR $expected
+    iApply
+}
+
+iProcsForModule IP_3
+iProc run_all {} {
+    iWrite MBIST_WSReg1 8'h81
+    iWrite MBIST_WSReg2 8'h82
+    iWrite low 9'd70
+    iWrite high 9'd400
+    iApply
+    iCall MBIST_SReg4.start 0x84
+    iCall MBIST_SReg4.check 8'b1000xx00
+    iRead MBIST_WSReg2 8'h82
+    iRead high 'd399
+    iApply
+}
+"""
+
+
+class PDLTestCase(unittest.TestCase):
+    def test_pdl_batch001(self):
+        network = load_network("IP_3")
+        model = NetworkModel(network)
+        interpreter = PDLInterpreter(Retargeter(network, model))
+        interpreter.run(MBIST_PDL)
+        interpreter.run("iCall run_all")
+        self.assertEqual(interpreter.applies, 4)
+        self.assertEqual(model.configuration["IP_3.MBIST_SReg4.SR"], 0x84)
+        self.assertEqual(model.configuration["IP_3.high.SR"], 400)
+        self.assertEqual([check.handle.register.path for check in interpreter.failures], ["IP_3.high.SR"])
+        self.assertEqual(interpreter.run("iGetReadData MBIST_WSReg2 -dec"), "130")
+
+    def test_pdl_error001(self):
+        network = load_network("IP_3")
+        interpreter = PDLInterpreter(Retargeter(network, NetworkModel(network)))
+        with self.assertRaises(PDLError):
+            interpreter.run("iWrite no_such_register 1")
+        with self.assertRaises(PDLError):
+            interpreter.run("iCall SIB1.open")
+
+
+if __name__ == '__main__':
+    unittest.main()
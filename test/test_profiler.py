@@ -0,0 +1,58 @@
+import os
+import pstats
+import tempfile
+import unittest
+from time import perf_counter
+from hdl.ate.profiler import MONITORING
+from hdl.ate.replay import make_ate
+
+
+class ProfilerTestCase(unittest.TestCase):
+    def test_profiler_batch001(self):
+        commands = [("write", 0x1800, 0x15), ("read", 0x1800, 0), ("write", 0x1800, 0x0A), ("read", 0x1800, 0)]
+        ate = make_ate("GPIOTest")
+        responses = ate.run_batch(commands, profile=dict(processes=True, python=True))
+        self.assertEqual(responses[1], ("VAL", 0x150015))
+        profile = ate.profile
+        self.assertFalse(profile.enabled)
+        hot = profile.hot(5)
+        self.assertGreater(hot[0].activations, 0)
+        self.assertGreater(hot[0].seconds, 0.0)
+        self.assertTrue(all(s.path.startswith("__rtl.") for s in hot))
+        self.assertIn("__rtl.wbsyscon0", [s.path.rsplit(".", 1)[0] for s in profile.hot(None)])
+
+        fd, path = tempfile.mkstemp(suffix=".folded")
+        os.close(fd)
+        try:
+            profile.save(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+            stats = pstats.Stats(path + ".prof")
+        finally:
+            os.remove(path)
+            if os.path.exists(path + ".prof"):
+                os.remove(path + ".prof")
+        self.assertEqual(len(lines), len(profile.folded()))
+        stack, value = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith("__rtl;"))
+        self.assertGreater(int(value), 0)
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_profiler_overhead001(self):
+        # the wall time of the processes leaves out the overhead of the trace function
+        commands = [("write", 0x1800, i & 0xFF) for i in range(50)]
+        ate = make_ate("GPIOTest")
+        start = perf_counter()
+        ate.run_batch(commands, profile=dict(processes=True))
+        elapsed = perf_counter() - start
+        profile = ate.profile
+        if MONITORING:
+            self.assertIsNone(profile.overhead)
+        else:
+            self.assertGreater(profile.overhead, 0.0)
+        self.assertLess(sum(s.seconds for s in profile.stats.values()), elapsed)
+        self.assertGreater(sum(s.activations for s in profile.stats.values()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+from hdl.instruments.rearick_bench import run
+
+
+class RearickBenchTestCase(unittest.TestCase):
+    def test_rearick_bench_change_driven001(self):
+        # the change driven thermometer, comparator and power supply monitor change at the times of the clocked ones
+        clocked, _ = run(False, test_delay=200)
+        self.assertEqual(run(True, test_delay=200)[0], clocked)
+        self.assertEqual(clocked[-1][5], (1, 1, 1, 1, 1))
+        self.assertTrue(any(under for _, _, _, _, under, _ in clocked))
+
+    def test_rearick_bench_time_skip001(self):
+        # the time skipping MBISTs change their outputs after the clock edge as the counting ones do
+        self.assertEqual(run(True, True, 200)[0], run(False, False, 200)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from hdl.standards.s1687.icl_network import load_network
+from hdl.standards.s1687.retargeter import Retargeter
+
+
+class NetworkModel:
+    """
+    Scan access to a network whose registers capture their own update value.
+    """
+    def __init__(self, network):
+        self.network = network
+        self.configuration = network.reset_configuration()
+        self.lengths = []
+
+    def scan_dr(self, count, tdi_string):
+        path = self.network.scan_path(self.configuration)
+        assert count == path.length
+        tdo = path.vector(self.configuration)
+        tdi = int(tdi_string, 16)
+        for register in path.registers:
+            self.configuration[register.path] = path.extract(tdi, register.path)
+        self.lengths.append(count)
+        return "{:0{:d}X}".format(tdo, (count + 3) // 4)
+
+
+class RetargeterTestCase(unittest.TestCase):
+    def test_retargeter_merge001(self):
+        network = load_network("IP_3")
+        model = NetworkModel(network)
+        retargeter = Retargeter(network, model)
+        retargeter.write("MBIST_WSReg2", 0x5A)
+        retargeter.write("MBIST_SReg5", 0x81)
+        temperature = retargeter.read("temperature")
+        self.assertEqual(retargeter.apply(), 3)
+        self.assertEqual(model.configuration["IP_3.MBIST_WSReg2.SR"], 0x5A)
+        self.assertEqual(model.configuration["IP_3.MBIST_SReg5.SR"], 0x81)
+        self.assertEqual(temperature.value, 0)
+        self.assertEqual(retargeter.configuration, model.configuration)
+
+        # The network is left open, only the delta is scanned
+        retargeter.write("MBIST_WSReg2", 0x11)
+        status = retargeter.read("MBIST_SReg5")
+        self.assertEqual(retargeter.apply(), 1)
+        self.assertEqual(status.value, 0x81)
+        self.assertEqual(model.configuration["IP_3.MBIST_WSReg2.SR"], 0x11)
+
+    def test_retargeter_wir001(self):
+        network = load_network("IP_3")
+        model = NetworkModel(network)
+        retargeter = Retargeter(network, model)
+        retargeter.write("MBIST_WSReg1", 0x01)
+        retargeter.apply()
+        # SELWIR is now 0 so the WIR is off the path, it has to be selected again first
+        retargeter.write("MBIST_WSReg3", 0x03)
+        self.assertEqual(retargeter.apply(), 3)
+        self.assertEqual(model.configuration["IP_3.MBIST_WSReg3.SR"], 0x03)
+        self.assertEqual(model.configuration["IP_3.WIR"], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from drivers.Python.atesim.atesim import AcknowledgeError
+from drivers.Python.atesim.scheduler import JTAGScheduler
+from hdl.ate.replay import make_ate
+
+
+class LoopbackBus:
+    """
+    Both JTAG hosts of the ioslave as a register file.  A started scan stays busy for a number of bus
+    transactions and then captures what it shifted out, like a board with TDO wired to TDI.
+    """
+    def __init__(self, scan_time=6):
+        self.memory = {}
+        self.busy = {0x1000: 0, 0x3000: 0}
+        self.scan_time = scan_time
+        self.log = []
+        self.value = None
+
+    def tick(self):
+        for base in self.busy:
+            self.busy[base] = max(0, self.busy[base] - 1)
+
+    def write(self, addr, data):
+        self.tick()
+        self.log.append(addr)
+        if addr & 0xFFF == 0x403 and data == 1:
+            self.busy[addr & ~0xFFF] = self.scan_time
+        self.memory[addr] = data
+        return True
+
+    def read(self, addr):
+        self.tick()
+        self.log.append(addr)
+        if addr & 0xFFF == 0x404:
+            self.value = 1 if self.busy[addr & ~0xFFF] else 0
+        else:
+            self.value = self.memory.get(addr, 0)
+        return True
+
+    def get_value(self):
+        return self.value
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def test_scheduler_interleave001(self):
+        bus = LoopbackBus()
+        scheduler = JTAGScheduler(bus)
+        futures = [(scheduler.scan_dr("JTAG", 20, "{:05X}".format(i)), scheduler.scan_ir("JTAG2", 12, "A5C"))
+                   for i in range(4)]
+        self.assertEqual([(f1.result(), f2.result()) for f1, f2 in futures], [("{:05X}".format(i), "A5C")
+                                                                            for i in range(4)])
+        scheduler.close()
+        # the loads of one port fill the scan time of the other, so there are hardly any status polls
+        self.assertLess(scheduler.polls, 16)
+        ports = [addr & ~0xFFF for addr in bus.log]
+        self.assertGreater(sum(a != b for a, b in zip(ports, ports[1:])), 8)
+        self.assertEqual(bus.memory[0x3405], 1)
+        self.assertNotIn(0x1405, bus.memory)
+
+    def test_scheduler_error001(self):
+        bus = LoopbackBus()
+        scheduler = JTAGScheduler(bus)
+        controller = scheduler.controller("JTAG2")
+        self.assertEqual(controller.scan_dr(8, "3C"), "3C")
+        with self.assertRaises(ValueError):
+            scheduler.scan_dr("JTAG3", 8, "00")
+        bus.write = lambda addr, data: False
+        with self.assertRaises(AcknowledgeError):
+            scheduler.scan_dr("JTAG", 8, "00").result()
+        scheduler.close()
+
+    def test_scheduler_error002(self):
+        bus = LoopbackBus()
+        scheduler = JTAGScheduler(bus)
+        with self.assertRaises(ValueError):
+            scheduler.ba_scan_dr("JTAG", bytearray(1), 12)
+        # a scan failing on its first bus operation fails its Future and the worker goes on
+        with self.assertRaises(TypeError):
+            scheduler.ba_scan_dr("JTAG", ["3C"], 8).result(timeout=10)
+        self.assertEqual(scheduler.scan_dr("JTAG", 8, "3C").result(timeout=10), "3C")
+        scheduler.close()
+
+    def test_scheduler_backtoback001(self):
+        # transactions queued back to back reach the vector buffers of both hosts without a gap
+        data = [0x6E, 0xF4, 0x60, 0xF1]
+        commands = [("write", base + addr, value) for base in (0x1000, 0x3000) for addr, value in enumerate(data)]
+        commands += [("read", base + addr, 0) for base in (0x1000, 0x3000) for addr in range(len(data))]
+        results = make_ate("DualJTAGTest").run_batch(commands)
+        self.assertEqual(results[:8], [("OK", 0)] * 8)
+        self.assertEqual(results[8:], [("VAL", value) for value in data * 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
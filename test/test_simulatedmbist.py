@@ -0,0 +1,105 @@
+import unittest
+from myhdl import *
+from hdl.instruments.simulatedmbist.simulatedmbist import simulatedmbist, period
+from hdl.ate.profiler import Profile
+
+
+@block
+def mbist_bench(trace, commands, time_skip, running=True, test_delay=40, analyze_delay=30,
+                end=5000):
+    """
+    :param trace: list receiving (time, state, status, power, temperature) at every change
+    :param commands: list of (time, control register value) latched at the first clock edge after time
+    :param running: False to stop the clock between the commands
+    :param end: time of the end of the simulation
+    """
+    cr = Signal(intbv(0)[8:])
+    sr = Signal(intbv(0)[8:])
+    cr_latch = Signal(bool(0))
+    clock = Signal(bool(0))
+    clock_enable = Signal(bool(running))
+    reset_n = ResetSignal(1, 0, True)
+    power_usage = Signal(intbv(0, min=0, max=101))
+    thermal = Signal(intbv(0, min=0, max=101))
+    mbist_inst = simulatedmbist('TOP', 'SMBIST0', clock, reset_n, cr, cr_latch, sr, power_usage, thermal,
+                                initialize_delay=10, test_delay=test_delay, analyze_delay=analyze_delay,
+                                time_skip=time_skip)
+
+    @instance
+    def clkgen():
+        while True:
+            if not clock_enable:
+                yield clock_enable.posedge
+            clock.next = not clock
+            yield delay(period // 2)
+
+    @instance
+    def stimulus():
+        reset_n.next = bool(0)
+        yield delay(period)
+        reset_n.next = bool(1)
+        for at, value in commands:
+            yield delay(at - now())
+            clock_enable.next = True
+            yield clock.negedge
+            cr.next = value
+            cr_latch.next = True
+            yield clock.negedge
+            cr_latch.next = False
+            yield clock.negedge
+            clock_enable.next = running
+        yield delay(end - now())
+        raise StopSimulation()
+
+    @always(sr, power_usage, thermal)
+    def record():
+        trace.append((now(), int(sr), int(power_usage), int(thermal)))
+
+    return mbist_inst, clkgen, stimulus, record
+
+
+def run(commands, time_skip, **kwargs):
+    trace = []
+    tb = mbist_bench(trace, commands, time_skip, **kwargs)
+    tb.run_sim(quiet=1)
+    return trace
+
+
+class SimulatedMBISTTestCase(unittest.TestCase):
+    def test_simulatedmbist_skip001(self):
+        # a free running clock gives the same changes at the same times in both models
+        for commands in ([(100, 0x01)], [(100, 0x71)], [(100, 0x05)], [(100, 0x01), (900, 0x02)],
+                         [(100, 0x01), (2100, 0x01)]):
+            self.assertEqual(run(commands, True, running=True), run(commands, False, running=True), commands)
+
+    def test_simulatedmbist_skip002(self):
+        # the error injected in ANALYZE_DELAY (seen only when the count is 1 on the first edge)
+        self.assertEqual(run([(100, 0x09)], True, analyze_delay=1), run([(100, 0x09)], False, analyze_delay=1))
+
+    def test_simulatedmbist_suspend001(self):
+        # with the clock stopped, a test of 10**7 cycles ends at the time of the counting model
+        trace = run([(100, 0x01)], True, running=False, test_delay=10 ** 7, end=10 ** 9)
+        self.assertEqual(trace[-1][1:], (0x01, 5, 5))
+        counted = run([(100, 0x01)], False, running=True, test_delay=100)
+        self.assertEqual(trace[-1][0], counted[-1][0] + (10 ** 7 - 100) * period)
+
+    def test_simulatedmbist_wakeups001(self):
+        # with a free running clock the time_skip model only wakes up when the instrument does something
+        activations = []
+        for time_skip in (False, True):
+            trace = []
+            tb = mbist_bench(trace, [(100, 0x01)], time_skip, test_delay=2000, end=60000)
+            profile = Profile(tb)
+            profile.enable()
+            try:
+                tb.run_sim(quiet=1)
+            finally:
+                profile.disable()
+            self.assertEqual(trace[-1][1:], (0x01, 5, 5))
+            activations.append(sum(s.activations for path, s in profile.stats.items() if ".simulatedmbist0." in path))
+        self.assertGreater(activations[0], 2 * 2000)
+        self.assertLess(activations[1], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
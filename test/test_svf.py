@@ -0,0 +1,63 @@
+import unittest
+from drivers.Python.atesim.svf import SVFPlayer, SVFError, parse
+
+
+class LoopbackController:
+    """
+    TDO wired to TDI, as on the JTAGTest board, with a tiny vector buffer.
+    """
+    STATES = {"RESET": 0, "IDLE": 1, "DRPAUSE": 6, "IRPAUSE": 13}
+    MAX_SCAN_BITS = 8
+
+    def __init__(self):
+        self.operations = []
+
+    def ba_scan_ir(self, tdi_vector, count, end=None):
+        self.operations.append(("IR", count, end))
+        return bytearray(tdi_vector)
+
+    def ba_scan_dr(self, tdi_vector, count, end=None):
+        self.operations.append(("DR", count, end))
+        return bytearray(tdi_vector)
+
+    def runtest(self, ticks, state=None, end=None):
+        self.operations.append(("RUN", ticks, state, end))
+
+
+SVF = """! loopback test
+TRST OFF;
+ENDIR IDLE;
+ENDDR DRPAUSE;
+STATE RESET IDLE;
+HDR 4 TDI(5);
+SIR 8 TDI(A5) TDO(A5);
+SDR 12 TDI(ABC)
+    TDO(ABC) MASK(FFF);
+SDR 12 TDO(ABD) MASK(FF0);   // TDI is kept, the last nibble is masked
+SDR 12 TDO(ABE) MASK(FFF);
+RUNTEST IDLE 100 TCK ENDSTATE IDLE;
+FREQUENCY 1E6 HZ;
+RUNTEST 1E-3 SEC;
+"""
+
+
+class SVFTestCase(unittest.TestCase):
+    def test_svf_play001(self):
+        controller = LoopbackController()
+        player = SVFPlayer(controller, lookahead=2)
+        mismatches = player.play(SVF.splitlines(True))
+        self.assertEqual([m.command.line for m in mismatches], [11])
+        self.assertEqual(player.scans, 4)
+        # 16 bit DR scans (4 header bits) are split in two segments, pausing in between
+        self.assertEqual(controller.operations[2:4], [("DR", 8, 6), ("DR", 8, 6)])
+        self.assertEqual(controller.operations[-2:], [("RUN", 100, 1, 1), ("RUN", 1000, 1, 1)])
+
+    def test_svf_error001(self):
+        with self.assertRaises(SVFError):
+            SVFPlayer(LoopbackController()).play(["SDR 8 TDO(FF);\n"])
+        with self.assertRaises(SVFError):
+            list(parse(["SIR 8 TDI(00)\n"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import csv
+import os
+import tempfile
+import unittest
+from hdl.instruments.sweep import PARAMETERS, TEST_ERROR, parameters, run, sweep
+
+
+class SweepTestCase(unittest.TestCase):
+    def setUp(self):
+        self.distributions = dict(PARAMETERS, test_delay=("uniform", 100, 150), control2=("choice", (TEST_ERROR,)))
+
+    def test_sweep_reproducible001(self):
+        # a run has the same parameters and outcome alone, in a sweep and in another batch
+        self.assertNotEqual(parameters(7, 0, self.distributions), parameters(7, 1, self.distributions))
+        alone = run(7, 2, self.distributions)
+        self.assertGreaterEqual(alone["failed"], 1)
+        with tempfile.TemporaryDirectory() as directory:
+            results = os.path.join(directory, "sweep.csv")
+            rows = sweep(7, 3, results, processes=1, batch=2, distributions=self.distributions)
+            with open(results, newline="") as f:
+                table = list(csv.DictReader(f))
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table[2]["test_delay"], str(alone["test_delay"]))
+        del alone["seconds"], rows[2]["seconds"]
+        self.assertEqual(rows[2], alone)
+
+
+if __name__ == '__main__':
+    unittest.main()
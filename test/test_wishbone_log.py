@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from hdl.buses.wishbone.wishbone_log import TransactionRecorder, read_log, OP_WRITE, OP_READ, STATUS_ERROR
+from hdl.ate.replay import compare, replay_commands, make_ate, replay
+
+
+class WishboneLogTestCase(unittest.TestCase):
+    def test_wishbone_log_roundtrip001(self):
+        fd, path = tempfile.mkstemp(suffix=".wblog")
+        os.close(fd)
+        try:
+            recorder = TransactionRecorder(path, "GPIOTest")
+            recorder.record(("write", 0x1800, 0x15), ("OK", 0), 100)
+            recorder.record(("read", 0x1800, 0), ("VAL", 0x150015), 200)
+            recorder.record(("read", 0x1C03, 0), ("ERR", "TIMEOUT"), 300)
+            recorder.close()
+            board_name, records = read_log(path)
+            records = list(records)
+        finally:
+            os.remove(path)
+        self.assertEqual(board_name, "GPIOTest")
+        self.assertEqual([r.op for r in records], [OP_WRITE, OP_READ, OP_READ])
+        self.assertEqual(records[1].result, 0x150015)
+        self.assertEqual(records[2].status, STATUS_ERROR)
+        self.assertEqual(replay_commands(records, timed=True)[:2], [("wait", 99, 0), ("write", 0x1800, 0x15)])
+
+        differences = compare(records, [("OK", 0), ("VAL", 0x150015), ("ERR", "TIMEOUT")])
+        self.assertEqual(differences, [])
+        differences = compare(records, [("OK", 0), ("VAL", 0x000015), ("VAL", 0)])
+        self.assertEqual([d.index for d in differences], [1, 2])
+
+    def test_wishbone_log_replay001(self):
+        # a session recorded on GPIOTest replays with the same responses
+        fd, path = tempfile.mkstemp(suffix=".wblog")
+        os.close(fd)
+        try:
+            ate = make_ate("GPIOTest")
+            ate.start_simulation(trace=False, settle=0)
+            try:
+                ate.start_recording(path)
+                values = []
+                for value in (0x15, 0x0A, 0x3C):
+                    ate.write(0x1800, value)
+                    ate.read(0x1800)
+                    values.append(ate.get_value())
+            finally:
+                ate.terminate()
+            records, differences, _ = replay(path, timed=True)
+            self.assertEqual(len(records), 6)
+            self.assertEqual([r.result for r in records if r.op == OP_READ], values)
+            self.assertEqual(differences, [])
+            records, differences, _ = replay(path)
+            self.assertEqual(differences, [])
+        finally:
+            os.remove(path)
+        self.assertEqual(values, [0x150015, 0x0A000A, 0x3C003C])
+
+
+if __name__ == '__main__':
+    unittest.main()
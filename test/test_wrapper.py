@@ -0,0 +1,16 @@
+import unittest
+from hdl.standards.s1500.wrapper import wrapper_tb
+
+
+class WrapperTestCase(unittest.TestCase):
+    def test_wrapper_crosscheck001(self):
+        # wrapper_tb asserts that the blocks and the behavioural wrapper shift out the same bits
+        tb = wrapper_tb(scans=300, seed=1)
+        try:
+            tb.run_sim(quiet=1)
+        finally:
+            tb.quit_sim()
+
+
+if __name__ == '__main__':
+    unittest.main()